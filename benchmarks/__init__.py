@@ -0,0 +1,2 @@
+"""Performance benchmarks for pyautogit, run against synthetic repositories.
+"""
@@ -0,0 +1,419 @@
+"""Headless benchmark harness for pyautogit.
+
+Generates a synthetic workspace, builds the pyautogit CUI without starting its draw loop, and
+times package import (with -X importtime), startup, screen refreshes, workspace scans, log
+loading and diff rendering. Results are written as
+JSON, tagged with the pyautogit version, and can be compared against an earlier result file to
+detect regressions.
+
+Usage:
+
+    python -m benchmarks.run_benchmarks --scale small --baseline old_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import shutil
+import tempfile
+import statistics
+import subprocess
+import threading
+
+import benchmarks.synthetic_repos as SYNTHETIC
+
+
+# Name of the large repository inside the benchmark workspace
+BIG_REPO_NAME = 'big_repo'
+
+
+def time_function(function, repeat):
+    """Times repeated calls of a function
+
+    Parameters
+    ----------
+    function : no-arg function
+        Function to time
+    repeat : int
+        Number of calls
+
+    Returns
+    -------
+    timing : dict
+        Minimum, median and maximum duration in milliseconds, and the number of calls
+    """
+
+    durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - start_time) * 1000)
+    return summarize_durations(durations)
+
+
+def summarize_durations(durations):
+    """Summarizes measured durations
+
+    Parameters
+    ----------
+    durations : list of float
+        Durations in milliseconds
+
+    Returns
+    -------
+    timing : dict
+        Minimum, median and maximum duration in milliseconds, and the number of measurements
+    """
+
+    repeat = len(durations)
+    return {'min_ms'    : round(min(durations), 3),
+            'median_ms' : round(statistics.median(durations), 3),
+            'max_ms'    : round(max(durations), 3),
+            'repeat'    : repeat}
+
+
+def measure_import_time(repeat):
+    """Measures the time taken to import pyautogit in a fresh interpreter, using -X importtime
+
+    -X importtime was added in python 3.7, so on older versions the benchmark is skipped.
+
+    Parameters
+    ----------
+    repeat : int
+        Number of interpreters started
+
+    Returns
+    -------
+    timing : dict
+        Cumulative import time of the pyautogit package, summarized as in time_function, or None if skipped
+    slowest : list of tuple of (str, float)
+        The ten modules with the highest self import time in the last run, with their time in ms
+    """
+
+    if sys.version_info < (3, 7):
+        return None, []
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = source_dir
+    durations = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import pyautogit'], stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, env=env, cwd=source_dir, check=True)
+        module_times = []
+        for line in proc.stderr.decode().splitlines():
+            fields = line.split('|')
+            if not line.startswith('import time:') or not fields[1].strip().isdigit():
+                continue
+            name = fields[2].strip()
+            module_times.append((name, int(fields[0].split(':')[1]) / 1000))
+            if name == 'pyautogit':
+                durations.append(int(fields[1]) / 1000)
+    module_times.sort(key=lambda module_time : module_time[1], reverse=True)
+    if len(durations) == 0:
+        return None, module_times[:10]
+    return summarize_durations(durations), module_times[:10]
+
+
+def prepare_workspace(work_dir, scale):
+    """Generates the benchmark workspace, reusing one generated earlier at the same scale
+
+    Parameters
+    ----------
+    work_dir : str
+        Directory in which the workspace is generated
+    scale : str
+        Key of benchmarks.synthetic_repos.SCALES
+
+    Returns
+    -------
+    workspace_path : str
+        Path to the workspace
+    """
+
+    sizes = SYNTHETIC.SCALES[scale]
+    workspace_path = os.path.join(work_dir, 'workspace_{}'.format(scale))
+    marker_file = os.path.join(work_dir, 'workspace_{}.json'.format(scale))
+    if os.path.exists(marker_file):
+        with open(marker_file, 'r') as fp:
+            if json.load(fp) == sizes:
+                return workspace_path
+    if os.path.exists(workspace_path):
+        shutil.rmtree(workspace_path)
+
+    print('Generating {} benchmark workspace in {}'.format(scale, workspace_path))
+    start_time = time.perf_counter()
+    SYNTHETIC.create_synthetic_workspace(workspace_path, sizes['workspace_repos'])
+    SYNTHETIC.create_synthetic_repo(os.path.join(workspace_path, BIG_REPO_NAME), sizes['commits'], sizes['branches'],
+                                    sizes['tags'], sizes['files'], sizes['dirty'])
+    print('Generated workspace in {:.1f} s'.format(time.perf_counter() - start_time))
+    with open(marker_file, 'w') as fp:
+        json.dump(sizes, fp)
+    return workspace_path
+
+
+def create_headless_manager(workspace_path):
+    """Builds the pyautogit manager and widgets without starting the CUI
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace to open
+
+    Returns
+    -------
+    manager : PyAutogitManager
+        The initialized manager, showing the repo select screen
+    """
+
+    # py_cui sizes the grid from the terminal, which may not exist when running headless
+    os.environ.setdefault('COLUMNS', '200')
+    os.environ.setdefault('LINES', '60')
+    import py_cui
+    import pyautogit
+    os.chdir(workspace_path)
+    root = py_cui.PyCUI(5, 4)
+    return pyautogit.PyAutogitManager(root, '.', 'workspace', False, [])
+
+
+def run_benchmarks(workspace_path, repeat):
+    """Runs all benchmarks against a generated workspace
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the benchmark workspace
+    repeat : int
+        Number of timed calls per benchmark
+
+    Returns
+    -------
+    results : dict of str -> dict
+        Timing of each benchmark, keyed on benchmark name, None for skipped benchmarks
+    """
+
+    import pyautogit.commands
+    import pyautogit.commit_log
+    import pyautogit.fast_status
+    import pyautogit.repo_discovery
+    import pyautogit.workspace_scan
+
+    results = {}
+    results['import_pyautogit'], slowest_imports = measure_import_time(repeat)
+    if results['import_pyautogit'] is None:
+        print('Skipped import time, -X importtime is not supported by python {}'.format(platform.python_version()))
+    else:
+        print('Slowest imports: {}'.format(', '.join(['{} {:.1f} ms'.format(name, ms) for name, ms in slowest_imports])))
+
+    # Time until the first screen is built, which lists and scans the workspace repositories
+    startup_durations = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        manager = create_headless_manager(workspace_path)
+        startup_durations.append((time.perf_counter() - start_time) * 1000)
+        manager.close_cleanup()
+    results['startup_workspace'] = summarize_durations(startup_durations)
+
+    manager = create_headless_manager(workspace_path)
+    try:
+        repos = manager.repo_discovery.find_repos()
+
+        results['repo_discovery_cold'] = time_function(lambda : pyautogit.repo_discovery.RepoDiscovery(workspace_path).find_repos(), repeat)
+        cached_discovery = pyautogit.repo_discovery.RepoDiscovery(workspace_path)
+        cached_discovery.find_repos()
+        results['repo_discovery_cached'] = time_function(cached_discovery.find_repos, repeat)
+
+        def scan_workspace():
+            finished = threading.Event()
+            scanner = pyautogit.workspace_scan.WorkspaceScanner()
+            scanner.start_scan(workspace_path, repos, lambda result : None, on_finished=finished.set)
+            finished.wait()
+
+        results['workspace_scan'] = time_function(scan_workspace, repeat)
+        results['repo_select_refresh'] = time_function(manager.repo_select_manager.refresh_status, repeat)
+
+        os.chdir(os.path.join(workspace_path, BIG_REPO_NAME))
+        manager.current_state = 'repo'
+        control = manager.repo_control_manager
+        control.set_initial_values()
+        results['repo_control_refresh'] = time_function(control.refresh_status, repeat)
+
+        def load_log_pages():
+            pager = pyautogit.commit_log.CommitLogPager()
+            pager.load_first_page('master')
+            for _ in range(4):
+                pager.load_next_page('master')
+
+        results['log_first_page_and_4_more'] = time_function(load_log_pages, repeat)
+
+        # Plain status disables the untracked cache explicitly, since fast status leaves it in the index
+        results['git_status'] = time_function(lambda : pyautogit.commands.git_status_porcelain(config_options='-c core.untrackedCache=false -c core.fsmonitor=false'), repeat)
+        for name, include_untracked in [('git_status_fast', True), ('git_status_fast_no_untracked', False)]:
+            fast_status = pyautogit.fast_status.FastStatusMode(enabled=True, include_untracked=include_untracked)
+            config_options, include_untracked = fast_status.get_status_arguments()
+            run_status = lambda : pyautogit.commands.git_status_porcelain(config_options=config_options, include_untracked=include_untracked)
+            # The first fast run builds the untracked cache, which later runs reuse
+            run_status()
+            results[name] = time_function(run_status, repeat)
+
+        def render_diff():
+            # The diff streams in a background job, so wait for it to finish and be displayed
+            control.open_git_diff()
+            while control.diff_job_id is not None:
+                manager.run_ui_callbacks()
+                time.sleep(0.001)
+
+        results['diff_render'] = time_function(render_diff, repeat)
+
+        # Branch, tag and remote panels, read with git processes and in-process
+        run_ref_commands = lambda : [pyautogit.commands.handle_basic_command(command, 'benchmark') for command in ['git branch', 'git tag', 'git remote']]
+        results['list_refs_cli'] = time_function(run_ref_commands, repeat)
+        results['list_refs_in_process'] = time_function(lambda : [pyautogit.commands.git_get_branches(), pyautogit.commands.git_get_tags(),
+                                                                  pyautogit.commands.git_get_remotes()], repeat)
+
+        # Full history tree from git, against the first window of the in-app commit graph
+        results['tree_cli'] = time_function(lambda : pyautogit.commands.git_tree('master'), repeat)
+        results['tree_graph_window'] = time_function(control.show_tree, repeat)
+    finally:
+        os.chdir(workspace_path)
+        manager.close_cleanup()
+    return results
+
+
+def get_source_revision():
+    """Gets the git revision of the pyautogit source being benchmarked
+
+    Returns
+    -------
+    revision : str
+        Abbreviated commit hash, or None if the source is not a git checkout
+    """
+
+    source_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        return SYNTHETIC.run_git(['rev-parse', '--short', 'HEAD'], source_dir).strip()
+    except (RuntimeError, OSError):
+        return None
+
+
+def compare_results(baseline, current, threshold):
+    """Compares median timings of two result sets
+
+    Parameters
+    ----------
+    baseline : dict of str -> dict
+        Benchmark timings of the baseline run, None for skipped benchmarks
+    current : dict of str -> dict
+        Benchmark timings of the current run, None for skipped benchmarks
+    threshold : float
+        Fractional slowdown above which a benchmark counts as a regression (ex. 0.2 for 20%)
+
+    Returns
+    -------
+    comparison : list of tuple
+        (name, baseline median ms, current median ms, ratio, regressed) for each benchmark run in both sets
+    """
+
+    comparison = []
+    for name in sorted(current.keys()):
+        if baseline.get(name) is None or current[name] is None:
+            continue
+        baseline_ms = baseline[name]['median_ms']
+        current_ms = current[name]['median_ms']
+        ratio = current_ms / baseline_ms if baseline_ms > 0 else 1.0
+        comparison.append((name, baseline_ms, current_ms, ratio, ratio > 1.0 + threshold))
+    return comparison
+
+
+def parse_args():
+    """Parses benchmark harness arguments
+
+    Returns
+    -------
+    args : argparse.Namespace
+        Parsed arguments
+    """
+
+    parser = argparse.ArgumentParser(description='Benchmark pyautogit against synthetic repositories.')
+    parser.add_argument('-s', '--scale',        default='small', choices=sorted(SYNTHETIC.SCALES.keys()), help='Size of the generated workspace.')
+    parser.add_argument('-r', '--repeat',       type=int, default=5, help='Number of timed runs per benchmark.')
+    parser.add_argument('-w', '--workdir',      help='Directory for generated repositories, reused between runs. Default is a temporary directory.')
+    parser.add_argument('-o', '--output',       help='Path of the JSON results file. Default is pyautogit-<version>-<scale>.json.')
+    parser.add_argument('-b', '--baseline',     help='Results file of an earlier run to compare against.')
+    parser.add_argument('-t', '--threshold',    type=float, default=0.2, help='Fractional slowdown counted as a regression.')
+    return parser.parse_args()
+
+
+def main():
+    """Entry point for the benchmark harness
+    """
+
+    args = parse_args()
+    import pyautogit
+
+    work_dir = args.workdir
+    remove_work_dir = work_dir is None
+    if work_dir is None:
+        work_dir = tempfile.mkdtemp(prefix='pyautogit_bench_')
+    work_dir = os.path.abspath(work_dir)
+    if not os.path.exists(work_dir):
+        os.makedirs(work_dir)
+
+    output_path = args.output
+    if output_path is None:
+        output_path = 'pyautogit-{}-{}.json'.format(pyautogit.__version__, args.scale)
+    output_path = os.path.abspath(output_path)
+    baseline_path = os.path.abspath(args.baseline) if args.baseline is not None else None
+
+    try:
+        workspace_path = prepare_workspace(work_dir, args.scale)
+        results = run_benchmarks(workspace_path, args.repeat)
+    finally:
+        if remove_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'version'     : pyautogit.__version__,
+              'revision'    : get_source_revision(),
+              'scale'       : args.scale,
+              'sizes'       : SYNTHETIC.SCALES[args.scale],
+              'timestamp'   : str(datetime.datetime.now()),
+              'python'      : platform.python_version(),
+              'git'         : SYNTHETIC.run_git(['--version'], '.').strip(),
+              'benchmarks'  : results}
+    with open(output_path, 'w') as fp:
+        json.dump(report, fp, indent=4)
+
+    print('\n{:<28} {:>10} {:>10} {:>10}'.format('Benchmark', 'min ms', 'median ms', 'max ms'))
+    for name in sorted(results.keys()):
+        if results[name] is None:
+            print('{:<28} {:>10}'.format(name, 'skipped'))
+            continue
+        print('{:<28} {:>10.1f} {:>10.1f} {:>10.1f}'.format(name, results[name]['min_ms'], results[name]['median_ms'], results[name]['max_ms']))
+    if 'git_status' in results and 'git_status_fast' in results:
+        plain_ms = results['git_status']['median_ms']
+        print('\nFast status speedup: {:.2f}x, {:.2f}x without untracked files'.format(plain_ms / max(results['git_status_fast']['median_ms'], 0.001),
+                                                                                     plain_ms / max(results['git_status_fast_no_untracked']['median_ms'], 0.001)))
+    if 'list_refs_cli' in results and 'list_refs_in_process' in results:
+        print('In-process ref listing speedup: {:.2f}x'.format(results['list_refs_cli']['median_ms'] / max(results['list_refs_in_process']['median_ms'], 0.001)))
+    if 'tree_cli' in results and 'tree_graph_window' in results:
+        print('Windowed commit graph speedup: {:.2f}x'.format(results['tree_cli']['median_ms'] / max(results['tree_graph_window']['median_ms'], 0.001)))
+    print('\nWrote results to {}'.format(output_path))
+
+    if baseline_path is not None:
+        with open(baseline_path, 'r') as fp:
+            baseline = json.load(fp)
+        print('\nComparing against pyautogit {} ({})'.format(baseline['version'], baseline.get('revision')))
+        regressed = False
+        for name, baseline_ms, current_ms, ratio, is_regression in compare_results(baseline['benchmarks'], results, args.threshold):
+            marker = 'REGRESSION' if is_regression else ''
+            regressed = regressed or is_regression
+            print('{:<28} {:>10.1f} -> {:>10.1f} ({:>5.2f}x) {}'.format(name, baseline_ms, current_ms, ratio, marker))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Functions for generating synthetic git repositories and workspaces for benchmarking.
+
+History is written with a single `git fast-import` stream rather than one commit at a time, so
+even repositories with tens of thousands of commits are generated in seconds. Workspaces with
+many repositories are created by copying a single small template repository.
+"""
+
+import os
+import shutil
+from subprocess import Popen, PIPE
+
+
+# Sizes of generated data for each benchmark scale
+SCALES = {
+    'small'     : {'commits' : 500,     'branches' : 20,    'tags' : 20,    'files' : 200,      'dirty' : 20,   'workspace_repos' : 20},
+    'medium'    : {'commits' : 5000,    'branches' : 100,   'tags' : 100,   'files' : 2000,     'dirty' : 200,  'workspace_repos' : 100},
+    'large'     : {'commits' : 50000,   'branches' : 500,   'tags' : 500,   'files' : 10000,    'dirty' : 1000, 'workspace_repos' : 500},
+}
+
+
+def run_git(args, cwd, stdin_data=None):
+    """Runs a git command, raising an error if it fails
+
+    Parameters
+    ----------
+    args : list of str
+        Arguments passed to git
+    cwd : str
+        Directory to run git in
+    stdin_data : bytes
+        Default None, otherwise data written to git's stdin
+
+    Returns
+    -------
+    output : str
+        Standard output of the command
+    """
+
+    proc = Popen(['git'] + args, cwd=cwd, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+    output, error = proc.communicate(stdin_data)
+    if proc.returncode != 0:
+        raise RuntimeError('git {} failed: {}'.format(' '.join(args), error.decode()))
+    return output.decode()
+
+
+def get_data_block(text):
+    """Encodes text as a fast-import data block
+
+    Parameters
+    ----------
+    text : str
+        Contents of the block
+
+    Returns
+    -------
+    block : bytes
+        The `data <length>` command followed by the contents
+    """
+
+    encoded = text.encode()
+    return b'data ' + str(len(encoded)).encode() + b'\n' + encoded + b'\n'
+
+
+def build_fast_import_stream(num_commits, num_branches, num_tags, num_files):
+    """Builds a fast-import stream for a linear master history with branches and tags along it
+
+    Parameters
+    ----------
+    num_commits : int
+        Number of commits on master
+    num_branches : int
+        Number of branches, each pointing at a commit spread evenly along master
+    num_tags : int
+        Number of lightweight tags, spread evenly along master
+    num_files : int
+        Number of files in the tree
+
+    Returns
+    -------
+    stream : bytes
+        The fast-import input
+    """
+
+    chunks = []
+    timestamp = 1577836800
+    for commit in range(1, num_commits + 1):
+        chunks.append('commit refs/heads/master\nmark :{}\n'.format(commit).encode())
+        chunks.append('committer Benchmark <benchmark@example.com> {} +0000\n'.format(timestamp + commit * 60).encode())
+        chunks.append(get_data_block('Synthetic commit {}'.format(commit)))
+        if commit == 1:
+            for file_num in range(num_files):
+                chunks.append('M 100644 inline dir_{}/file_{}.txt\n'.format(file_num % 50, file_num).encode())
+                chunks.append(get_data_block('file {}\n'.format(file_num) * 20))
+        else:
+            file_num = commit % num_files
+            chunks.append('M 100644 inline dir_{}/file_{}.txt\n'.format(file_num % 50, file_num).encode())
+            chunks.append(get_data_block('file {} revision {}\n'.format(file_num, commit) * 20))
+        chunks.append(b'\n')
+
+    for branch in range(num_branches):
+        chunks.append('reset refs/heads/branch_{}\nfrom :{}\n\n'.format(branch, max(1, num_commits - branch * num_commits // max(num_branches, 1))).encode())
+    for tag in range(num_tags):
+        chunks.append('reset refs/tags/v{}\nfrom :{}\n\n'.format(tag, max(1, (tag + 1) * num_commits // max(num_tags, 1))).encode())
+    return b''.join(chunks)
+
+
+def create_synthetic_repo(path, num_commits, num_branches, num_tags, num_files, num_dirty):
+    """Creates a repository with generated history, checked out on master, with a dirty worktree
+
+    Parameters
+    ----------
+    path : str
+        Path of the new repository
+    num_commits : int
+        Number of commits on master
+    num_branches : int
+        Number of extra branches
+    num_tags : int
+        Number of tags
+    num_files : int
+        Number of tracked files
+    num_dirty : int
+        Number of tracked files modified and untracked files added after checkout
+    """
+
+    os.makedirs(path)
+    run_git(['init', '-q'], path)
+    run_git(['fast-import', '--quiet'], path, stdin_data=build_fast_import_stream(num_commits, num_branches, num_tags, num_files))
+    run_git(['symbolic-ref', 'HEAD', 'refs/heads/master'], path)
+    run_git(['reset', '-q', '--hard'], path)
+    run_git(['remote', 'add', 'origin', 'https://example.com/synthetic.git'], path)
+    for dirty in range(num_dirty):
+        file_num = dirty % num_files
+        if dirty % 2 == 0:
+            with open(os.path.join(path, 'dir_{}'.format(file_num % 50), 'file_{}.txt'.format(file_num)), 'a') as fp:
+                fp.write('local change {}\n'.format(dirty))
+        else:
+            with open(os.path.join(path, 'untracked_{}.txt'.format(dirty)), 'w') as fp:
+                fp.write('untracked {}\n'.format(dirty))
+
+
+def create_synthetic_workspace(path, num_repos, template_commits=20):
+    """Creates a workspace with many small repositories
+
+    Parameters
+    ----------
+    path : str
+        Path of the workspace, created if it does not exist
+    num_repos : int
+        Number of repositories
+    template_commits : int
+        Number of commits in each repository
+    """
+
+    if not os.path.exists(path):
+        os.makedirs(path)
+    template_path = os.path.join(path, 'repo_0000')
+    create_synthetic_repo(template_path, template_commits, 2, 2, 20, 2)
+    for repo_num in range(1, num_repos):
+        shutil.copytree(template_path, os.path.join(path, 'repo_{:04d}'.format(repo_num)), symlinks=True)
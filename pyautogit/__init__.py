@@ -10,12 +10,15 @@ Created: 01-Oct-2019
 # Core Python Utilities
 import argparse
 import getpass
+import importlib
 import json
 import os
 import shutil
 import subprocess
+import sys
 import threading
 import datetime
+from collections import deque
 from subprocess import Popen, PIPE
 
 # py_cui library used for Command Line UI construction
@@ -23,43 +26,51 @@ import py_cui
 
 # Subscreens and pyautogit modules
 import pyautogit.logger as LOGGER
-import pyautogit.repo_select_screen as SELECT
-import pyautogit.repo_control_screen as CONTROL
-import pyautogit.internal_editor_screen as EDITOR
-import pyautogit.settings_screen as SETTINGS
+import pyautogit.commands
 import pyautogit.metadata_manager as METADATA
+import pyautogit.repo_discovery as DISCOVERY
+import pyautogit.fast_status as FAST
+import pyautogit.git_executor as EXECUTOR
+import pyautogit.object_cache as CACHE
+import pyautogit.job_scheduler as JOBS
+import pyautogit.batch_mode as BATCH
 
 
 # Module version + copyright
 __version__     = '0.0.5'
 __copyright__   = '2019-2020'
 
+# Seconds between redraws while no key is pressed, so results posted from background threads are shown
+UI_REFRESH_TIMEOUT = 0.25
+
+# Module and class of each subscreen. Subscreens are imported and built on first use
+SUBSCREENS = {  'repo select'   : ('pyautogit.repo_select_screen',      'RepoSelectManager'),
+                'repo control'  : ('pyautogit.repo_control_screen',     'RepoControlManager'),
+                'settings'      : ('pyautogit.settings_screen',         'SettingsScreen'),
+                'editor'        : ('pyautogit.internal_editor_screen',  'EditorScreenManager')}
+
 
 # Helper pyautogit functions
 
-def find_repos_in_path(path):
+def find_repos_in_path(path, max_depth=1, ignore_patterns=None):
     """Helper function that finds repositories in the path
 
     Parameters
     ----------
     path : str
         Target path
+    max_depth : int
+        Maximum depth to search for repositories, 1 for direct children of path
+    ignore_patterns : list of str
+        Default None, otherwise shell style patterns of directory names to skip
     
     Returns
     -------
     repos : list of str
-        list of git repositories within target
+        list of git repositories within target, relative to target
     """
 
-    repos = []
-    for dir in os.listdir(path):
-        new_dir = os.path.join(path, dir)
-        if os.path.isdir(new_dir) and is_git_repo(new_dir):
-            repos.append(os.path.basename(new_dir))
-
-    LOGGER.write('Found repos in path: {}'.format(repos))
-
-    return repos
+    return DISCOVERY.RepoDiscovery(path, max_depth=max_depth, ignore_patterns=ignore_patterns).find_repos()
 
 
 def is_git_repo(path):
@@ -102,8 +113,11 @@ def parse_args():
     parser.add_argument('-c', '--credentials',      action='store_true', help='Allows user to enter credentials once when pyautogit is started.')
     parser.add_argument('-w', '--workspace',        help='Pass a path to this argument to start pyautogit in a workspace not the current directory.')
     parser.add_argument('-n', '--nosavemetadata',   action='store_true', help='Add this flag if you would like pyautogit to not save metadata between sessions.')
+    parser.add_argument('-r', '--depth',            type=int, help='Maximum depth below the workspace at which to search for repositories. Default 1.')
     parser.add_argument('-d', '--debug',            action='store_true', help='Flag that enables debug logging by default.')
     parser.add_argument('-v', '--version',          action='store_true', help='Run pyautogit with this flag to print version information.')
+    subparsers = parser.add_subparsers(dest='command', metavar='command', help='Run a batch command over the workspace without the CUI, printing a JSON report. One of {}.'.format(', '.join(BATCH.BATCH_COMMANDS)))
+    BATCH.add_batch_arguments(subparsers)
     args = vars(parser.parse_args())
 
     if args['version']:
@@ -137,6 +151,11 @@ def main():
     """
 
     target, credentials, args = parse_args()
+    if args['command'] is not None:
+        exit_code = BATCH.main(args['command'], target, args, credentials, max_depth=args['depth'])
+        EXECUTOR.get_executor().close_all()
+        exit(exit_code)
+
     save_metadata = not args['nosavemetadata']
     debug_logging = args['debug']
 
@@ -170,7 +189,7 @@ def main():
     # Use feature added in py_cui 0.0.3 to add unicode widget borders
     root.toggle_unicode_borders()
 
-    _ = PyAutogitManager(root, target, input_type, save_metadata, credentials)
+    _ = PyAutogitManager(root, target, input_type, save_metadata, credentials, discovery_depth=args['depth'])
     
     LOGGER.write('Parsed args. Target location - {}'.format(target_abs))
     LOGGER.write('Initial state - {}'.format(input_type))
@@ -201,10 +220,20 @@ class PyAutogitManager:
         Command to open external editor
     post_input_callback : no-arg or lambda function
         Function fired after a user input event
-    operation_thread : Thread
-        A thread for performing async operations. Starts as None, Thread created as needed
+    job_scheduler : JobScheduler
+        Runs long operations as prioritized, cancellable background jobs
+    idle_status_bar_text : str
+        Status bar text shown before background jobs started reporting progress
     repos : list of str
         List of repositories found in workspace
+    discovery_depth : int
+        Maximum depth below the workspace at which repositories are found
+    discovery_ignore : list of str
+        Shell style patterns of directory names skipped when finding repositories
+    fast_status : FastStatusMode
+        Fast status settings, and the fast status features detected for each repository
+    repo_discovery : RepoDiscovery
+        Finds repositories in the workspace, caching directory listings
     repo_select_widget_set : py_cui.widget_set.WidgetSet
         set of py_cui widgets that are parts of the repo select screen
     repo_menu : py_cui.widgets.ScrollMenu
@@ -237,18 +266,26 @@ class PyAutogitManager:
         Textbox for entering new commit messages
     repo_control_manager : RepoControlManager
         Manager wrapper for repo control screen
+    target_path : str
+        The path pyautogit was opened in, used to open the editor screen
+    subscreen_managers : dict of str -> ScreenManager
+        Subscreen managers built so far, keyed on the names in SUBSCREENS
+    subscreen_widget_sets : dict of str -> py_cui.widget_set.WidgetSet
+        Widget sets of the subscreens built so far
+    ui_callbacks : collections.deque of function
+        Functions posted from background threads, run on the CUI thread before the next draw
     """
 
-    def __init__(self, root, target_path, current_state, save_metadata, credentials):
+    def __init__(self, root, target_path, current_state, save_metadata, credentials, discovery_depth=None):
         """Constructor for PyAutogitManager
         """
 
         self.root = root
-        self.repo_select_manager    = SELECT.RepoSelectManager(self)
-        self.repo_control_manager   = CONTROL.RepoControlManager(self)
-        self.settings_manager       = SETTINGS.SettingsScreen(self)
-        self.editor_manager         = EDITOR.EditorScreenManager(self, target_path)
-        LOGGER.write('Initialized subscreen managers.')
+
+        # Subscreens are built when they are first opened, see get_subscreen
+        self.target_path            = target_path
+        self.subscreen_managers     = {}
+        self.subscreen_widget_sets  = {}
 
         self.save_metadata = save_metadata
 
@@ -262,6 +299,9 @@ class PyAutogitManager:
         self.current_state  = current_state
         self.default_editor = None
         self.editor_type    = 'Internal'
+        self.discovery_depth    = 1
+        self.discovery_ignore   = list(DISCOVERY.DEFAULT_IGNORE_PATTERNS)
+        self.fast_status        = FAST.FastStatusMode()
         
         self.metadata_manager   = METADATA.PyAutogitMetadataManager(self)
         self.loaded_metadata    = self.metadata_manager.read_metadata()
@@ -279,21 +319,31 @@ class PyAutogitManager:
         # Add a run on exit callback to save metadata and close log file
         self.root.run_on_exit(self.close_cleanup)
 
+        # Background threads post widget updates here, since py_cui widgets are not thread safe
+        self.ui_callbacks = deque()
+        self.root.set_on_draw_update_func(self.run_ui_callbacks)
+        self.root.set_refresh_timeout(UI_REFRESH_TIMEOUT)
+
         # Utility variable used to store user input for callbacks
         self.user_message = None
 
-        # Thread used to perform longer operations
-        self.operation_thread = None
+        # Scheduler used to perform longer operations in the background
+        self.job_scheduler = JOBS.JobScheduler()
+        self.idle_status_bar_text = None
 
-        # Repository select screen widgets, key commands.
-        self.repos = find_repos_in_path(self.workspace_path)
+        # Find repositories in the workspace, caching directory listings between refreshes
+        if discovery_depth is not None:
+            self.discovery_depth = discovery_depth
+        cache_file = None
+        if self.save_metadata:
+            cache_file = os.path.join(self.workspace_path, '.pyautogit', 'repo_discovery_cache.json')
+        self.repo_discovery = DISCOVERY.RepoDiscovery(self.workspace_path, max_depth=self.discovery_depth, ignore_patterns=self.discovery_ignore, cache_file=cache_file)
+        # Repositories are found each time the repo select screen is refreshed, so not when opening a repository
+        self.repos = []
 
-        # Initialize CUI elements for each sub-screen
-        self.repo_select_widget_set     = self.repo_select_manager.initialize_screen_elements()
-        self.repo_control_widget_set    = self.repo_control_manager.initialize_screen_elements()
-        self.settings_widget_set        = self.settings_manager.initialize_screen_elements()
-        self.editor_widget_set          = self.editor_manager.initialize_screen_elements()
-        LOGGER.write('Initialized CUI elements')
+        # Keep output computed from immutable git objects (ex. commit info) between sessions
+        if self.save_metadata:
+            CACHE.set_cache_file(os.path.join(self.workspace_path, '.pyautogit', 'object_cache.json'))
 
         # Open repo select screen in workspace view
         if self.current_state == 'workspace':
@@ -304,20 +354,186 @@ class PyAutogitManager:
             self.open_autogit_window()
 
 
+    def get_subscreen(self, name):
+        """Gets a subscreen manager, importing its module and building its widgets on first use
+
+        Parameters
+        ----------
+        name : str
+            Name of the subscreen, a key of SUBSCREENS
+
+        Returns
+        -------
+        screen_manager : ScreenManager
+            The subscreen manager
+        """
+
+        if name not in self.subscreen_managers:
+            module_name, class_name = SUBSCREENS[name]
+            screen_class = getattr(importlib.import_module(module_name), class_name)
+            if name == 'editor':
+                screen_manager = screen_class(self, self.target_path)
+            else:
+                screen_manager = screen_class(self)
+            self.subscreen_managers[name] = screen_manager
+            self.subscreen_widget_sets[name] = screen_manager.initialize_screen_elements()
+            LOGGER.write('Initialized {} subscreen'.format(name))
+        return self.subscreen_managers[name]
+
+
+    def is_subscreen_initialized(self, name):
+        """Checks if a subscreen was already built
+
+        Parameters
+        ----------
+        name : str
+            Name of the subscreen, a key of SUBSCREENS
+
+        Returns
+        -------
+        initialized : bool
+            True if the subscreen manager and widgets exist
+        """
+
+        return name in self.subscreen_widget_sets
+
+
+    def get_subscreen_widget_set(self, name):
+        """Gets the widget set of a subscreen, building the subscreen on first use
+
+        Parameters
+        ----------
+        name : str
+            Name of the subscreen, a key of SUBSCREENS
+
+        Returns
+        -------
+        widget_set : py_cui.widget_set.WidgetSet
+            Widget set of the subscreen
+        """
+
+        self.get_subscreen(name)
+        return self.subscreen_widget_sets[name]
+
+
+    @property
+    def repo_select_manager(self):
+        """The manager wrapper class for the repo select screen
+        """
+
+        return self.get_subscreen('repo select')
+
+
+    @property
+    def repo_control_manager(self):
+        """Manager wrapper for repo control screen
+        """
+
+        return self.get_subscreen('repo control')
+
+
+    @property
+    def settings_manager(self):
+        """Manager wrapper for the settings screen
+        """
+
+        return self.get_subscreen('settings')
+
+
+    @property
+    def editor_manager(self):
+        """Manager wrapper for the internal editor screen
+        """
+
+        return self.get_subscreen('editor')
+
+
+    @property
+    def repo_select_widget_set(self):
+        """set of py_cui widgets that are parts of the repo select screen
+        """
+
+        return self.get_subscreen_widget_set('repo select')
+
+
+    @property
+    def repo_control_widget_set(self):
+        """set of py_cui widgets that are parts of the repo control screen
+        """
+
+        return self.get_subscreen_widget_set('repo control')
+
+
+    @property
+    def settings_widget_set(self):
+        """set of py_cui widgets that are parts of the settings screen
+        """
+
+        return self.get_subscreen_widget_set('settings')
+
+
+    @property
+    def editor_widget_set(self):
+        """set of py_cui widgets that are parts of the internal editor screen
+        """
+
+        return self.get_subscreen_widget_set('editor')
+
+
     def close_cleanup(self):
         """Function fired upon closing pyautogit
         """
 
         if self.save_metadata:
             self.metadata_manager.write_metadata()
+        if self.is_subscreen_initialized('repo control'):
+            self.repo_control_manager.stop_watching()
+        object_cache = CACHE.get_object_cache()
+        LOGGER.write('Object cache: {} hits, {} misses'.format(object_cache.hits, object_cache.misses))
+        object_cache.save()
+        executor = EXECUTOR.get_executor()
+        if LOGGER._LOG_ENABLED:
+            LOGGER.write('Git helper latency: {}'.format(executor.get_latency_report()))
+        executor.close_all()
+        # asyncio is slow to import, so async commands are only imported once a screen runs one
+        if 'pyautogit.async_commands' in sys.modules:
+            sys.modules['pyautogit.async_commands'].get_runner().stop()
+        self.job_scheduler.shutdown()
         LOGGER.close_logger()
 
 
+    def run_on_ui_thread(self, callback):
+        """Function that queues a function to run on the CUI thread before the next draw
+
+        Used by background threads (file watcher, jobs, workspace sync) for anything that touches
+        widgets, so widgets are never updated while the CUI thread is handling user input.
+
+        Parameters
+        ----------
+        callback : no-arg or lambda function
+            Function to run on the CUI thread
+        """
+
+        self.ui_callbacks.append(callback)
+
+
+    def run_ui_callbacks(self):
+        """Function fired by py_cui at the start of each draw, running functions queued by background threads
+        """
+
+        while len(self.ui_callbacks) > 0:
+            callback = self.ui_callbacks.popleft()
+            try:
+                callback()
+            except Exception as e:
+                LOGGER.write('UI callback failed: {}'.format(str(e)), level=LOGGER.ERROR)
+
+
     def clean_exit(self):
         """Function that exits the CUI cleanly
         """
 
-        LOGGER.write('Exiting pyautogit.')
+        LOGGER.write('Exiting pyautogit.', level=LOGGER.INFO)
         self.close_cleanup()
         exit()
 
@@ -326,7 +542,7 @@ class PyAutogitManager:
         """Function that exits the CUI with an error code
         """
 
-        LOGGER.write('Exiting with error!')
+        LOGGER.write('Exiting with error!', level=LOGGER.ERROR)
         self.close_cleanup()
         exit(-1)
 
@@ -348,8 +564,11 @@ class PyAutogitManager:
         """
 
         LOGGER.write('Opening repo control window')
-        target = self.repo_select_manager.repo_menu.get()
-        self.repo_select_manager.clear_elements()
+        if self.current_state == 'workspace':
+            target = self.repo_select_manager.get_selected_repo()
+            self.repo_select_manager.clear_elements()
+        else:
+            target = os.path.basename(os.getcwd())
         self.repo_control_manager.set_initial_values()
         
         self.root.apply_widget_set(self.repo_control_widget_set)
@@ -358,6 +577,7 @@ class PyAutogitManager:
         self.current_state = 'repo'
         self.root.set_title('pyautogit v{} - {}'.format(__version__, target))
         self.repo_control_manager.refresh_status()
+        self.repo_control_manager.start_watching()
 
 
     def open_autogit_window_target(self):
@@ -365,10 +585,12 @@ class PyAutogitManager:
         """
 
         LOGGER.write('Opening autogit control window on target dir.')
-        self.repo_select_manager.clear_elements()
+        if self.is_subscreen_initialized('repo select'):
+            self.repo_select_manager.clear_elements()
         self.repo_control_manager.set_initial_values()
         self.root.apply_widget_set(self.repo_control_widget_set)
         self.repo_control_manager.refresh_status()
+        self.repo_control_manager.start_watching()
 
 
     def open_repo_select_window(self):
@@ -376,13 +598,16 @@ class PyAutogitManager:
         """
 
         LOGGER.write('Opening repo select window')
-        self.repo_control_manager.clear_elements()
-        self.settings_manager.clear_elements()
+        if self.is_subscreen_initialized('repo control'):
+            self.repo_control_manager.stop_watching()
+            self.repo_control_manager.clear_elements()
+        if self.is_subscreen_initialized('settings'):
+            self.settings_manager.clear_elements()
         self.repo_select_manager.set_initial_values()
         
         self.root.apply_widget_set(self.repo_select_widget_set)
         if self.current_state == 'repo':
-            os.chdir('..')
+            os.chdir(self.workspace_path)
         self.current_state = 'workspace'
         self.root.set_title('pyautogit v{} - {}'.format(__version__, os.path.basename(os.getcwd())))
         self.repo_select_manager.refresh_status()
@@ -394,7 +619,8 @@ class PyAutogitManager:
         """
 
         LOGGER.write('Opening settings window')
-        self.repo_select_manager.clear_elements()
+        if self.is_subscreen_initialized('repo select'):
+            self.repo_select_manager.clear_elements()
         self.settings_manager.set_initial_values()
         self.root.apply_widget_set(self.settings_widget_set)
         self.root.set_title('pyautogit v{} Settings'.format(__version__))
@@ -407,6 +633,8 @@ class PyAutogitManager:
         """
 
         LOGGER.write('Opening Editor Window')
+        if self.is_subscreen_initialized('repo control'):
+            self.repo_control_manager.stop_watching()
         self.editor_manager.open_new_directory_external(os.getcwd())
         self.editor_manager.set_initial_values()
         self.root.apply_widget_set(self.editor_widget_set)
@@ -432,7 +660,8 @@ class PyAutogitManager:
         """
 
         self.credentials.append(passwd)
-        self.repo_select_manager.refresh_status()
+        if self.is_subscreen_initialized('repo select'):
+            self.repo_select_manager.refresh_status()
         LOGGER.write('User credentials entered')
         if self.post_input_callback is not None:
             self.post_input_callback()
@@ -480,23 +709,129 @@ class PyAutogitManager:
         return len(self.credentials) == 2
 
 
-    def perform_long_operation(self, title, long_operation_function, post_loading_callback):
-        """Function that wraps an operation around a loading icon popup.
+    def perform_long_operation(self, title, long_operation_function, post_loading_callback, priority=JOBS.PRIORITY_NORMAL, repo_path=None):
+        """Function that queues an operation as a background job.
+
+        The CUI stays usable while the job runs. Progress reported through show_long_operation_progress
+        is displayed in the status bar, which is restored once no jobs remain. Jobs can be listed and
+        cancelled from the jobs panel. The post loading callback is run on the CUI thread.
 
         Parameters
         ----------
         title : str
-            title for loading icon
+            Short description of the operation
         long_operation_function : function
-            operation to perform in the background
+            operation to perform in the background, returning an (out, err) pair
         post_loading_callback : function
-            Function fired once long operation is finished.
+            Function fired with out and err once long operation is finished.
+        priority : int
+            One of the job_scheduler PRIORITY_* values
+        repo_path : str
+            Default None, otherwise the job waits for other jobs in this repository to finish
+
+        Returns
+        -------
+        job : pyautogit.job_scheduler.Job
+            The queued job
         """
 
         LOGGER.write('Executing long operation {}'.format(title))
-        self.root.show_loading_icon_popup('Please Wait', title, callback = post_loading_callback)
-        self.operation_thread = threading.Thread(target=long_operation_function)
-        self.operation_thread.start()
+        if self.job_scheduler.get_active_count() == 0:
+            self.idle_status_bar_text = self.root.status_bar.get_text()
+
+        def finish_long_operation(out, err):
+            if self.job_scheduler.get_active_count() == 0 and self.idle_status_bar_text is not None:
+                self.root.status_bar.set_text(self.idle_status_bar_text)
+                self.idle_status_bar_text = None
+            if post_loading_callback is not None:
+                post_loading_callback(out, err)
+
+        on_finished = lambda out, err : self.run_on_ui_thread(lambda : finish_long_operation(out, err))
+        job = self.job_scheduler.submit(title, long_operation_function, priority=priority, on_finished=on_finished, repo_path=repo_path)
+        self.root.status_bar.set_text('{} - queued as job #{}'.format(title, job.job_id))
+        return job
+
+
+    def show_jobs_panel(self):
+        """Function that shows queued, running and recent background jobs, newest first
+        """
+
+        jobs = self.job_scheduler.get_jobs()
+        if len(jobs) == 0:
+            self.root.show_message_popup('Background Jobs', 'No background jobs have been run.')
+            return
+        descriptions = [job.get_description() for job in reversed(jobs)]
+        self.root.show_menu_popup('Background Jobs - Enter to cancel or view result', descriptions, self.select_job)
+
+
+    def select_job(self, description):
+        """Function fired when a job is selected in the jobs panel
+
+        Unfinished jobs prompt for cancellation, finished jobs show their output.
+
+        Parameters
+        ----------
+        description : str
+            Description of the selected job, starting with #job_id
+        """
+
+        job = self.job_scheduler.get_job(int(description.split(' ')[0][1:]))
+        if job is None:
+            return
+        if job.state in ['queued', 'running']:
+            self.root.show_yes_no_popup('Cancel job #{} - {}?'.format(job.job_id, job.title), lambda yes : self.cancel_job(job.job_id) if yes else None)
+        elif job.result is not None:
+            out = job.result[0].strip()
+            if len(out) == 0:
+                out = 'No output.'
+            if job.state == 'failed':
+                self.root.show_error_popup('Job #{} - {}'.format(job.job_id, job.title), out.splitlines()[-1])
+            else:
+                self.root.show_message_popup('Job #{} - {}'.format(job.job_id, job.title), out.splitlines()[-1])
+
+
+    def cancel_job(self, job_id, show_popup=True):
+        """Function that cancels a background job, killing any git processes it is running
+
+        Parameters
+        ----------
+        job_id : int
+            Id of the job to cancel
+        show_popup : bool
+            Set to False to cancel without telling the user, ex. when a screen discards the job's result
+        """
+
+        cancelled = self.job_scheduler.cancel(job_id)
+        if cancelled and self.job_scheduler.get_active_count() == 0 and self.idle_status_bar_text is not None:
+            self.root.status_bar.set_text(self.idle_status_bar_text)
+            self.idle_status_bar_text = None
+        if not show_popup:
+            return
+        if cancelled:
+            self.root.show_message_popup('Cancelled', 'Cancelled job #{}.'.format(job_id))
+        else:
+            self.root.show_error_popup('Not Cancelled', 'Job #{} already finished.'.format(job_id))
+
+
+    def show_long_operation_progress(self, title, line):
+        """Function that displays a line of progress output from a long operation in the status bar
+
+        May be called from a job thread, so the status bar is updated on the CUI thread.
+
+        Parameters
+        ----------
+        title : str
+            Name of the running operation
+        line : str
+            Line of output produced by the operation
+        """
+
+        phase, percent = pyautogit.commands.parse_progress_line(line)
+        if phase is not None:
+            text = '{} - {}: {}%'.format(title, phase, percent)
+        else:
+            text = '{} - {}'.format(title, line.strip())
+        self.run_on_ui_thread(lambda : self.root.status_bar.set_text(text))
 
 
     def update_default_editor(self):
@@ -512,7 +847,8 @@ class PyAutogitManager:
         self.default_editor = self.user_message
         self.editor_type = 'External'
         self.root.show_message_popup('Default Editor Changed', '{} editor will be used to open directories'.format(self.user_message))
-        self.repo_select_manager.refresh_status()
+        if self.is_subscreen_initialized('repo select'):
+            self.repo_select_manager.refresh_status()
 
 
     def ask_default_editor(self):
@@ -0,0 +1,302 @@
+"""Asyncio based counterparts to the functions in pyautogit.commands.
+
+Every function here wraps the blocking function of the same name in pyautogit.commands, and
+returns the same (out, err) pair, but is a coroutine. Each function accepts an additional timeout
+argument, and if the coroutine is cancelled or times out, the underlying git process is killed.
+
+The blocking functions are run on a thread pool rather than with asyncio.create_subprocess_exec,
+since asyncio subprocesses cannot be started from an event loop outside the main thread before
+python 3.8, nor from the default event loop on windows.
+
+Since py_cui runs its own blocking draw loop, screens should not await these directly, but
+rather submit them to the AsyncCommandRunner, which runs an event loop in a background thread.
+
+This file should remain separate from the CUI interface.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pyautogit.commands
+import pyautogit.job_scheduler as JOBS
+import pyautogit.logger as LOGGER
+
+
+# Maximum number of blocking commands run at once for async callers
+MAX_WORKERS = 4
+
+# Thread pool the blocking commands are run on, created on first use
+_THREAD_POOL = None
+_THREAD_POOL_LOCK = threading.Lock()
+
+
+def get_thread_pool():
+    """Gets the thread pool blocking commands are run on, creating it if required
+
+    Returns
+    -------
+    thread_pool : concurrent.futures.ThreadPoolExecutor
+        The shared thread pool
+    """
+
+    global _THREAD_POOL
+    with _THREAD_POOL_LOCK:
+        if _THREAD_POOL is None:
+            _THREAD_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        return _THREAD_POOL
+
+
+async def run_in_thread(function, *args, timeout=None, **kwargs):
+    """Runs a blocking function from pyautogit.commands on the thread pool
+
+    The function runs as a job, so if the coroutine is cancelled or times out, any git process
+    it started is killed, and the thread is freed.
+
+    Parameters
+    ----------
+    function : function
+        The blocking function, returning an (out, err) pair
+    *args : list
+        Positional arguments passed to the function
+    timeout : float
+        Default None, otherwise number of seconds after which the command is killed
+    **kwargs : dict
+        Keyword arguments passed to the function
+
+    Returns
+    -------
+    out : str
+        Output of the function, or a timeout message
+    err : int
+        Error code of the function, -1 if it timed out
+    """
+
+    name = function.__name__
+    job = JOBS.Job(0, name, lambda : function(*args, **kwargs), JOBS.PRIORITY_NORMAL, None)
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(get_thread_pool(), lambda : JOBS.run_as_job(job, job.function))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        job.cancel()
+        LOGGER.write('Command {} timed out after {} seconds'.format(name, timeout), level=LOGGER.WARNING)
+        return "Command {} timed out after {} seconds".format(name, timeout), -1
+    except asyncio.CancelledError:
+        job.cancel()
+        raise
+
+
+def make_async_command(function):
+    """Builds the async counterpart of a blocking function from pyautogit.commands
+
+    Parameters
+    ----------
+    function : function
+        The blocking function, returning an (out, err) pair
+
+    Returns
+    -------
+    async_command : coroutine function
+        Takes the same arguments as the blocking function, and an additional timeout keyword argument
+    """
+
+    async def async_command(*args, timeout=None, **kwargs):
+        return await run_in_thread(function, *args, timeout=timeout, **kwargs)
+
+    async_command.__name__ = function.__name__
+    async_command.__doc__ = 'Async counterpart of pyautogit.commands.{}'.format(function.__name__)
+    return async_command
+
+
+#####################################################################
+#                                                                   #
+#                   Git Command Functions Below                     #
+#                                                                   #
+#####################################################################
+
+# All functions below return the same (out, err) pair as their counterpart in pyautogit.commands
+
+handle_basic_command        = make_async_command(pyautogit.commands.handle_basic_command)
+handle_streaming_command    = make_async_command(pyautogit.commands.handle_streaming_command)
+handle_credential_command   = make_async_command(pyautogit.commands.handle_credential_command)
+handle_custom_command       = make_async_command(pyautogit.commands.handle_custom_command)
+
+#---------------------#
+# Git Status Commands #
+#---------------------#
+
+git_status_short            = make_async_command(pyautogit.commands.git_status_short)
+git_status_porcelain        = make_async_command(pyautogit.commands.git_status_porcelain)
+git_status_short_branch     = make_async_command(pyautogit.commands.git_status_short_branch)
+git_status                  = make_async_command(pyautogit.commands.git_status)
+git_tree                    = make_async_command(pyautogit.commands.git_tree)
+git_log                     = make_async_command(pyautogit.commands.git_log)
+git_diff                    = make_async_command(pyautogit.commands.git_diff)
+git_diff_file               = make_async_command(pyautogit.commands.git_diff_file)
+
+#---------------------#
+# Git Object Commands #
+#---------------------#
+
+git_get_object              = make_async_command(pyautogit.commands.git_get_object)
+
+#---------------------#
+# Git Remote Commands #
+#---------------------#
+
+git_get_remotes             = make_async_command(pyautogit.commands.git_get_remotes)
+git_get_remote_info         = make_async_command(pyautogit.commands.git_get_remote_info)
+git_add_remote              = make_async_command(pyautogit.commands.git_add_remote)
+git_remove_remote           = make_async_command(pyautogit.commands.git_remove_remote)
+git_rename_remote           = make_async_command(pyautogit.commands.git_rename_remote)
+
+#---------------------#
+# Git Commit Commands #
+#---------------------#
+
+git_get_commit_info         = make_async_command(pyautogit.commands.git_get_commit_info)
+git_checkout_commit         = make_async_command(pyautogit.commands.git_checkout_commit)
+git_commit_changes          = make_async_command(pyautogit.commands.git_commit_changes)
+git_create_tag              = make_async_command(pyautogit.commands.git_create_tag)
+git_get_tags                = make_async_command(pyautogit.commands.git_get_tags)
+
+#---------------------#
+# Git Branch Commands #
+#---------------------#
+
+git_get_branches            = make_async_command(pyautogit.commands.git_get_branches)
+git_get_recent_commits      = make_async_command(pyautogit.commands.git_get_recent_commits)
+git_create_new_branch       = make_async_command(pyautogit.commands.git_create_new_branch)
+git_delete_branch           = make_async_command(pyautogit.commands.git_delete_branch)
+git_checkout_branch         = make_async_command(pyautogit.commands.git_checkout_branch)
+git_checkout_tag            = make_async_command(pyautogit.commands.git_checkout_tag)
+git_merge_branches          = make_async_command(pyautogit.commands.git_merge_branches)
+git_revert_branch_merge     = make_async_command(pyautogit.commands.git_revert_branch_merge)
+
+#-------------------#
+# Git Repo Commands #
+#-------------------#
+
+git_init_new_repo           = make_async_command(pyautogit.commands.git_init_new_repo)
+git_clone_new_repo          = make_async_command(pyautogit.commands.git_clone_new_repo)
+
+#------------------------#
+# Git (Un)Stage Commands #
+#------------------------#
+
+git_add_all                 = make_async_command(pyautogit.commands.git_add_all)
+git_reset_all               = make_async_command(pyautogit.commands.git_reset_all)
+git_add_file                = make_async_command(pyautogit.commands.git_add_file)
+git_reset_file              = make_async_command(pyautogit.commands.git_reset_file)
+git_add_files               = make_async_command(pyautogit.commands.git_add_files)
+git_reset_files             = make_async_command(pyautogit.commands.git_reset_files)
+
+#--------------------#
+# Git Stash Commands #
+#--------------------#
+
+git_stash_all               = make_async_command(pyautogit.commands.git_stash_all)
+git_unstash_all             = make_async_command(pyautogit.commands.git_unstash_all)
+git_stash_file              = make_async_command(pyautogit.commands.git_stash_file)
+
+#------------------------#
+# Git Push/Pull Commands #
+#------------------------#
+
+git_pull_branch             = make_async_command(pyautogit.commands.git_pull_branch)
+git_push_to_branch          = make_async_command(pyautogit.commands.git_push_to_branch)
+git_fetch_all               = make_async_command(pyautogit.commands.git_fetch_all)
+git_merge_fast_forward      = make_async_command(pyautogit.commands.git_merge_fast_forward)
+
+
+#####################################################################
+#                                                                   #
+#                   Background Event Loop Runner                    #
+#                                                                   #
+#####################################################################
+
+class AsyncCommandRunner:
+    """Class that runs an asyncio event loop in a background thread for use by CUI screens
+
+    Attributes
+    ----------
+    loop : asyncio.AbstractEventLoop
+        The event loop commands are run on
+    loop_thread : threading.Thread
+        Daemon thread running the loop, created on first submit
+    lock : threading.Lock
+        Lock protecting loop creation
+    """
+
+    def __init__(self):
+        """Constructor for AsyncCommandRunner
+        """
+
+        self.loop = None
+        self.loop_thread = None
+        self.lock = threading.Lock()
+
+
+    def start(self):
+        """Starts the background event loop if it is not running
+        """
+
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.loop_thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+                self.loop_thread.start()
+
+
+    def submit(self, coroutine, callback=None):
+        """Schedules a coroutine on the background loop
+
+        Parameters
+        ----------
+        coroutine : coroutine
+            Coroutine to run, usually a call to one of the functions in this module
+        callback : function
+            Default None, otherwise called with the coroutine result once it completes. Not called if cancelled.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future that can be used to wait for, or cancel the command
+        """
+
+        self.start()
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        if callback is not None:
+            def fire_callback(completed):
+                if not completed.cancelled() and completed.exception() is None:
+                    callback(completed.result())
+            future.add_done_callback(fire_callback)
+        return future
+
+
+    def stop(self):
+        """Stops the background event loop
+        """
+
+        with self.lock:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.loop_thread.join(timeout=2)
+                self.loop = None
+                self.loop_thread = None
+
+
+# Global runner shared by all screens
+_RUNNER = AsyncCommandRunner()
+
+
+def get_runner():
+    """Gets the global async command runner
+
+    Returns
+    -------
+    runner : AsyncCommandRunner
+        The shared runner instance
+    """
+
+    return _RUNNER
@@ -0,0 +1,167 @@
+"""Module for saving files from the internal editor without risking their contents.
+
+The new contents are written to a temporary file in the same directory, flushed to disk with
+fsync, and then renamed over the target. A rename within a directory is atomic, so an
+interruption leaves either the old or the new file, never a truncated one. The hash of the
+last loaded or saved contents is kept, so saving an unchanged buffer writes nothing.
+
+Symbolic links are resolved first, so the file they point to is replaced rather than the link.
+Files with several hard links are rewritten in place once the temporary file is synced, since a
+rename would detach them from their other links.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import shutil
+import binascii
+import hashlib
+
+
+def hash_text(text):
+    """Hashes editor contents, to detect if they changed since they were loaded or saved
+
+    Parameters
+    ----------
+    text : str
+        Editor contents
+
+    Returns
+    -------
+    text_hash : str
+        Hex digest of the contents
+    """
+
+    return hashlib.sha1(text.encode('utf-8', errors='surrogatepass')).hexdigest()
+
+
+def sync_directory(dir_path):
+    """Flushes a directory entry to disk, so a rename into it survives a crash
+
+    Directories cannot be opened for syncing on all platforms, in which case this does nothing.
+
+    Parameters
+    ----------
+    dir_path : str
+        Path of the directory
+    """
+
+    try:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def create_temp_file(dir_path, file_name, mode):
+    """Creates a new hidden temporary file, named after the file being saved
+
+    Unlike tempfile.mkstemp, the mode is passed to os.open, so the process umask is applied to it
+    without reading the umask through os.umask, which would briefly change it for every thread.
+
+    Parameters
+    ----------
+    dir_path : str
+        Directory to create the file in
+    file_name : str
+        Name of the file being saved
+    mode : int
+        Permissions of the new file, before the umask is applied
+
+    Returns
+    -------
+    fd : int
+        File descriptor open for writing
+    temp_path : str
+        Path of the temporary file
+    """
+
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        suffix = binascii.hexlify(os.urandom(4)).decode('ascii')
+        temp_path = os.path.join(dir_path, '.{}.{}.tmp'.format(file_name, suffix))
+        try:
+            return os.open(temp_path, flags, mode), temp_path
+        except FileExistsError:
+            pass
+
+
+def write_text(fd_or_path, text):
+    """Writes text to a file and flushes it to disk
+
+    Parameters
+    ----------
+    fd_or_path : int or str
+        File descriptor or path of the file, truncated before writing
+    text : str
+        Contents to write
+
+    Returns
+    -------
+    bytes_written : int
+        Size of the file after writing
+    """
+
+    with open(fd_or_path, 'w') as fp:
+        fp.write(text)
+        fp.flush()
+        os.fsync(fp.fileno())
+        return os.fstat(fp.fileno()).st_size
+
+
+def save_file_atomic(file_path, text, last_hash=None):
+    """Atomically replaces a file with new text, unless the text is unchanged
+
+    Parameters
+    ----------
+    file_path : str
+        Path of the file to save
+    text : str
+        New contents of the file
+    last_hash : str
+        Default None, otherwise hash of the contents last loaded from or saved to the file
+
+    Returns
+    -------
+    bytes_written : int
+        Number of bytes written, 0 if the write was skipped
+    text_hash : str
+        Hash of the saved contents
+
+    Raises
+    ------
+    OSError
+        If the file could not be written. The original file is left untouched
+    """
+
+    text_hash = hash_text(text)
+    if text_hash == last_hash and os.path.exists(file_path):
+        return 0, text_hash
+
+    file_path = os.path.realpath(file_path)
+    dir_path = os.path.dirname(file_path)
+    exists = os.path.exists(file_path)
+    in_place = exists and os.stat(file_path).st_nlink > 1
+    # Keep the temporary file private until it has the mode of the file being replaced
+    fd, temp_path = create_temp_file(dir_path, os.path.basename(file_path), 0o600 if exists else 0o666)
+    try:
+        bytes_written = write_text(fd, text)
+        if exists:
+            shutil.copymode(file_path, temp_path)
+        if not in_place:
+            os.replace(temp_path, file_path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if in_place:
+        # If this is interrupted, the temporary file is left behind with the new contents
+        write_text(file_path, text)
+        os.remove(temp_path)
+    sync_directory(dir_path)
+    return bytes_written, text_hash
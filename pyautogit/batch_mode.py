@@ -0,0 +1,330 @@
+"""Module for running workspace operations without the CUI, ex. from cron or CI.
+
+Each batch command runs over every repository found in the workspace, in parallel, using the
+same discovery, status scan and sync logic as the CUI, and prints a single JSON report to
+stdout. The exit code is 0 if every repository succeeded, and 1 otherwise.
+
+The subcommands are defined at every startup, so modules only needed to run them are imported
+by the command functions rather than here.
+
+    pyautogit -w ~/repos status
+    pyautogit -w ~/repos sync --jobs 4
+    pyautogit -w ~/repos prune --keep 'main,master,release/*' --dry-run
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import sys
+import json
+import fnmatch
+import threading
+import pyautogit.commands
+import pyautogit.repo_discovery as DISCOVERY
+import pyautogit.logger as LOGGER
+
+
+# Names of the batch subcommands
+BATCH_COMMANDS = ['status', 'sync', 'prune']
+
+# Branches never deleted by prune unless other patterns are given
+DEFAULT_KEEP_PATTERNS = ['main', 'master', 'develop']
+
+
+def add_batch_arguments(subparsers):
+    """Adds the batch subcommands to the pyautogit argument parser
+
+    Parameters
+    ----------
+    subparsers : argparse._SubParsersAction
+        Subparsers of the main pyautogit parser
+    """
+
+    status_parser = subparsers.add_parser('status', help='Print the branch, ahead/behind counts and changed files of every repository as JSON.')
+    sync_parser = subparsers.add_parser('sync', help='Fetch every repository, and fast-forward checked out branches that are behind.')
+    prune_parser = subparsers.add_parser('prune', help='Delete local branches already merged into the checked out branch.')
+    prune_parser.add_argument('--into', help='Branch or commit that branches must be merged into. Default is the checked out branch.')
+    prune_parser.add_argument('--keep', default=','.join(DEFAULT_KEEP_PATTERNS), help='Comma separated patterns of branches never deleted. Default {}.'.format(','.join(DEFAULT_KEEP_PATTERNS)))
+    prune_parser.add_argument('--dry-run', action='store_true', help='List the branches that would be deleted without deleting them.')
+    for parser in [status_parser, sync_parser, prune_parser]:
+        parser.add_argument('-j', '--jobs', type=int, default=8, help='Maximum number of repositories processed at once. Default 8.')
+
+
+def load_discovery_settings(workspace_path):
+    """Reads the repository discovery settings saved by the CUI for a workspace
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace
+
+    Returns
+    -------
+    max_depth : int
+        Maximum depth at which repositories are found
+    ignore_patterns : list of str
+        Shell style patterns of directory names to skip
+    """
+
+    max_depth = 1
+    ignore_patterns = list(DISCOVERY.DEFAULT_IGNORE_PATTERNS)
+    settings_file = os.path.join(workspace_path, '.pyautogit', 'pyautogit_settings.json')
+    if os.path.exists(settings_file):
+        try:
+            with open(settings_file, 'r') as fp:
+                metadata = json.load(fp)
+            max_depth = metadata.get('DISCOVERY_DEPTH', max_depth)
+            ignore_patterns = metadata.get('DISCOVERY_IGNORE', ignore_patterns)
+        except (OSError, ValueError):
+            pass
+    return max_depth, ignore_patterns
+
+
+def get_batch_repos(target_path, max_depth=None):
+    """Finds the repositories a batch command runs on
+
+    As in the CUI, a target that is itself a repository is treated as the only repository of
+    its parent workspace, and any other target is searched for repositories.
+
+    Parameters
+    ----------
+    target_path : str
+        Repository or workspace path
+    max_depth : int
+        Default None, otherwise overrides the saved discovery depth
+
+    Returns
+    -------
+    workspace_path : str
+        Absolute path of the workspace
+    repos : list of str
+        Repository paths relative to the workspace
+    """
+
+    target_path = os.path.abspath(target_path)
+    if os.path.exists(os.path.join(target_path, '.git')):
+        return os.path.dirname(target_path), [os.path.basename(target_path)]
+    saved_depth, ignore_patterns = load_discovery_settings(target_path)
+    if max_depth is None:
+        max_depth = saved_depth
+    return target_path, DISCOVERY.RepoDiscovery(target_path, max_depth=max_depth, ignore_patterns=ignore_patterns).find_repos()
+
+
+def run_status(workspace_path, repos, max_workers):
+    """Scans the status of every repository
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace
+    repos : list of str
+        Repository paths relative to the workspace
+    max_workers : int
+        Maximum number of concurrent git processes
+
+    Returns
+    -------
+    results : list of dict
+        Status of each repository
+    """
+
+    import pyautogit.workspace_scan
+
+    finished = threading.Event()
+    scanner = pyautogit.workspace_scan.WorkspaceScanner(max_workers=max_workers)
+    scanner.start_scan(workspace_path, repos, lambda result : None, on_finished=finished.set)
+    finished.wait()
+    results = []
+    for repo in repos:
+        result = scanner.get_result(repo)
+        results.append({'repo'      : repo,
+                        'ok'        : result.error is None,
+                        'branch'    : result.branch,
+                        'ahead'     : result.ahead,
+                        'behind'    : result.behind,
+                        'dirty'     : result.dirty,
+                        'error'     : result.error})
+    return results
+
+
+def run_sync(workspace_path, repos, max_workers, credentials):
+    """Fetches every repository, fast-forwarding checked out branches that are behind
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace
+    repos : list of str
+        Repository paths relative to the workspace
+    max_workers : int
+        Maximum number of repositories synced at once
+    credentials : list of str
+        Username and Password for remotes, empty to rely on configured credential helpers
+
+    Returns
+    -------
+    results : list of dict
+        Sync state of each repository
+    """
+
+    import pyautogit.workspace_sync
+
+    finished = threading.Event()
+    syncer = pyautogit.workspace_sync.WorkspaceSyncer(max_workers=max_workers)
+    syncer.start_sync(workspace_path, repos, credentials, lambda result : None, on_finished=finished.set)
+    finished.wait()
+    results = []
+    for repo in repos:
+        result = syncer.results[repo]
+        results.append({'repo'      : repo,
+                        'ok'        : result.state != 'failed',
+                        'state'     : result.state,
+                        'message'   : result.message,
+                        'duration'  : round(result.duration, 3)})
+    return results
+
+
+def prune_repo(repo_path, into, keep_patterns, dry_run):
+    """Deletes the local branches of a repository that are merged into a target
+
+    Branches are deleted with `git branch -d`, which refuses to delete a branch that git does
+    not consider merged, so no commits can be lost.
+
+    Parameters
+    ----------
+    repo_path : str
+        Path to the repository
+    into : str
+        Branch or commit that branches must be merged into, None for the checked out branch
+    keep_patterns : list of str
+        Shell style patterns of branches never deleted
+    dry_run : bool
+        If True, branches are listed but not deleted
+
+    Returns
+    -------
+    result : dict
+        Deleted, kept and failed branches of the repository
+    """
+
+    result = {'ok': True, 'deleted': [], 'kept': [], 'failed': {}, 'error': None}
+    out, err = pyautogit.commands.git_get_merged_branches(target=(into if into is not None else 'HEAD'), repo_path=repo_path)
+    if err != 0:
+        result['ok'] = False
+        result['error'] = out.strip()
+        return result
+    head_branch, head_err = pyautogit.commands.git_get_current_branch_name(repo_path=repo_path)
+    for branch in out.splitlines():
+        if (head_err == 0 and branch == head_branch.strip()) or branch == into or any([fnmatch.fnmatchcase(branch, pattern) for pattern in keep_patterns]):
+            result['kept'].append(branch)
+        elif dry_run:
+            result['deleted'].append(branch)
+        else:
+            out, err = pyautogit.commands.git_delete_branch(branch, repo_path=repo_path)
+            if err != 0:
+                result['ok'] = False
+                result['failed'][branch] = out.strip()
+            else:
+                result['deleted'].append(branch)
+    return result
+
+
+def run_prune(workspace_path, repos, max_workers, into, keep_patterns, dry_run):
+    """Deletes merged local branches in every repository
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace
+    repos : list of str
+        Repository paths relative to the workspace
+    max_workers : int
+        Maximum number of repositories pruned at once
+    into : str
+        Branch or commit that branches must be merged into, None for the checked out branch
+    keep_patterns : list of str
+        Shell style patterns of branches never deleted
+    dry_run : bool
+        If True, branches are listed but not deleted
+
+    Returns
+    -------
+    results : list of dict
+        Deleted, kept and failed branches of each repository
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    def prune(repo):
+        result = {'repo': repo}
+        result.update(prune_repo(os.path.join(workspace_path, repo), into, keep_patterns, dry_run))
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(prune, repos))
+
+
+def run_batch_command(command, target_path, options, credentials, max_depth=None):
+    """Runs a batch command over a workspace, and builds its JSON report
+
+    Parameters
+    ----------
+    command : str
+        One of BATCH_COMMANDS
+    target_path : str
+        Repository or workspace path
+    options : dict
+        Parsed command line arguments
+    credentials : list of str
+        Username and Password for remotes, empty to rely on configured credential helpers
+    max_depth : int
+        Default None, otherwise overrides the saved discovery depth
+
+    Returns
+    -------
+    report : dict
+        The command, workspace, per repository results, and whether all of them succeeded
+    """
+
+    workspace_path, repos = get_batch_repos(target_path, max_depth=max_depth)
+    max_workers = max(options.get('jobs', 8), 1)
+    LOGGER.write('Running batch {} over {} repos'.format(command, len(repos)), level=LOGGER.INFO)
+    if command == 'status':
+        results = run_status(workspace_path, repos, max_workers)
+    elif command == 'sync':
+        results = run_sync(workspace_path, repos, max_workers, credentials)
+    else:
+        keep_patterns = [pattern.strip() for pattern in options['keep'].split(',') if len(pattern.strip()) > 0]
+        results = run_prune(workspace_path, repos, max_workers, options['into'], keep_patterns, options['dry_run'])
+    return {'command'   : command,
+            'workspace' : workspace_path,
+            'ok'        : all([result['ok'] for result in results]),
+            'repos'     : results}
+
+
+def main(command, target_path, options, credentials, max_depth=None):
+    """Entry point for batch commands. Prints the JSON report to stdout
+
+    Parameters
+    ----------
+    command : str
+        One of BATCH_COMMANDS
+    target_path : str
+        Repository or workspace path
+    options : dict
+        Parsed command line arguments
+    credentials : list of str
+        Username and Password for remotes, empty to rely on configured credential helpers
+    max_depth : int
+        Default None, otherwise overrides the saved discovery depth
+
+    Returns
+    -------
+    exit_code : int
+        0 if every repository succeeded, 1 otherwise
+    """
+
+    report = run_batch_command(command, target_path, options, credentials, max_depth=max_depth)
+    json.dump(report, sys.stdout, indent=4)
+    sys.stdout.write('\n')
+    return 0 if report['ok'] else 1
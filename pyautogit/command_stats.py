@@ -0,0 +1,201 @@
+"""Module for collecting timing statistics of executed commands.
+
+Every command run through pyautogit.commands records its duration, exit code and number of output
+bytes here, under the name it was run with. Statistics are aggregated per name into call counts,
+failure counts, and p50/p99 durations, which can be displayed or exported as JSON.
+
+This file should remain separate from the CUI interface.
+"""
+
+import json
+import math
+import threading
+from collections import deque
+
+
+class CommandTimings:
+    """Class storing the recorded runs of commands sharing a name
+
+    Attributes
+    ----------
+    durations : collections.deque of float
+        Durations of the most recent runs, in seconds
+    count : int
+        Total number of runs
+    failures : int
+        Number of runs with a non-zero exit code
+    total_time : float
+        Total duration of all runs, in seconds
+    total_bytes : int
+        Total number of output bytes of all runs
+    last_exit_code : int
+        Exit code of the most recent run
+    """
+
+    def __init__(self, max_samples):
+        """Constructor for CommandTimings
+        """
+
+        self.durations      = deque(maxlen=max_samples)
+        self.count          = 0
+        self.failures       = 0
+        self.total_time     = 0.0
+        self.total_bytes    = 0
+        self.last_exit_code = 0
+
+
+def get_percentile(values, percentile):
+    """Gets a percentile of a list of values using the nearest rank method
+
+    Parameters
+    ----------
+    values : list of float
+        Values to compute the percentile of
+    percentile : float
+        Percentile between 0 and 100
+
+    Returns
+    -------
+    value : float
+        The percentile value, or 0 if values is empty
+    """
+
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    rank = int(math.ceil(percentile / 100.0 * len(ordered)))
+    return ordered[max(rank, 1) - 1]
+
+
+class CommandStats:
+    """Class that aggregates command run statistics by command name
+
+    Attributes
+    ----------
+    max_samples : int
+        Number of most recent durations kept per command name for percentiles
+    timings : dict of str -> CommandTimings
+        Recorded runs per command name
+    lock : threading.Lock
+        Lock protecting timings, since commands run from several threads
+    """
+
+    def __init__(self, max_samples=1000):
+        """Constructor for CommandStats
+        """
+
+        self.max_samples = max_samples
+        self.timings = {}
+        self.lock = threading.Lock()
+
+
+    def record(self, name, duration, exit_code, num_bytes):
+        """Records a single command run
+
+        Parameters
+        ----------
+        name : str
+            Name of the command
+        duration : float
+            Time taken by the command, in seconds
+        exit_code : int
+            Exit code of the command
+        num_bytes : int
+            Number of bytes of output produced
+        """
+
+        with self.lock:
+            timings = self.timings.get(name)
+            if timings is None:
+                timings = CommandTimings(self.max_samples)
+                self.timings[name] = timings
+            timings.durations.append(duration)
+            timings.count           = timings.count + 1
+            timings.total_time      = timings.total_time + duration
+            timings.total_bytes     = timings.total_bytes + num_bytes
+            timings.last_exit_code  = exit_code
+            if exit_code != 0:
+                timings.failures = timings.failures + 1
+
+
+    def get_summary(self):
+        """Gets aggregated statistics for each command name, slowest total time first
+
+        Returns
+        -------
+        summary : list of dict
+            One entry per command name, with count, failures, total/p50/p99/max times in
+            milliseconds, and total output bytes
+        """
+
+        summary = []
+        with self.lock:
+            for name, timings in self.timings.items():
+                durations = list(timings.durations)
+                summary.append({'name'          : name,
+                                'count'         : timings.count,
+                                'failures'      : timings.failures,
+                                'last_exit_code': timings.last_exit_code,
+                                'total_ms'      : round(timings.total_time * 1000, 3),
+                                'p50_ms'        : round(get_percentile(durations, 50) * 1000, 3),
+                                'p99_ms'        : round(get_percentile(durations, 99) * 1000, 3),
+                                'max_ms'        : round(max(durations) * 1000, 3),
+                                'total_bytes'   : timings.total_bytes})
+        summary.sort(key=lambda entry : entry['total_ms'], reverse=True)
+        return summary
+
+
+    def format_summary(self):
+        """Formats the aggregated statistics as a text table
+
+        Returns
+        -------
+        summary_text : str
+            Table with a row per command name
+        """
+
+        summary = self.get_summary()
+        if len(summary) == 0:
+            return 'No commands have been run yet.'
+        lines = ['{:>6} {:>4} {:>9} {:>9} {:>10}  {}'.format('Calls', 'Fail', 'p50 ms', 'p99 ms', 'Bytes', 'Command')]
+        for entry in summary:
+            lines.append('{:>6} {:>4} {:>9.1f} {:>9.1f} {:>10}  {}'.format(entry['count'], entry['failures'], entry['p50_ms'],
+                                                                         entry['p99_ms'], entry['total_bytes'], entry['name']))
+        return '\n'.join(lines)
+
+
+    def export_json(self, file_path):
+        """Writes the aggregated statistics to a json file
+
+        Parameters
+        ----------
+        file_path : str
+            Path of the json file to write
+        """
+
+        with open(file_path, 'w') as fp:
+            json.dump({'commands' : self.get_summary()}, fp, indent=4)
+
+
+    def clear(self):
+        """Discards all recorded runs
+        """
+
+        with self.lock:
+            self.timings = {}
+
+
+# Statistics shared by all command functions
+_STATS = CommandStats()
+
+
+def get_command_stats():
+    """Gets the shared command statistics
+
+    Returns
+    -------
+    stats : CommandStats
+        Statistics recorded by all command functions
+    """
+
+    return _STATS
@@ -11,10 +11,23 @@ from os import environ
 import re
 import shutil
 import stat
+import tempfile
+import time
+from collections import deque
 from sys import platform
-from subprocess import Popen, PIPE
+from subprocess import Popen, PIPE, STDOUT
 import pyautogit.askpass as ASKPASS
+import pyautogit.command_stats as STATS
+import pyautogit.git_executor as EXECUTOR
+import pyautogit.job_scheduler as JOBS
 import pyautogit.logger as LOGGER
+import pyautogit.object_cache as CACHE
+import pyautogit.ref_reader as REFS
+from pyautogit.errors import UnsupportedRepositoryError
+
+
+# Version of the installed git, read on first use by get_git_version
+_GIT_VERSION = None
 
 
 def remove_repo_tree(target):
@@ -35,9 +48,43 @@ def remove_repo_tree(target):
         shutil.rmtree(target, onerror=del_rw)
 
 
-def handle_credential_command(command, credentials, target_location='.'):
+def get_credential_environment(credentials):
+    """Function that builds a process environment that answers git credential prompts.
+
+    Parameters
+    ----------
+    credentials : list of str
+        The user's entered git remote credentials, empty if none were entered
+
+    Returns
+    -------
+    env : dict of str -> str
+        Copy of the current environment with askpass variables set
+    """
+
+    # This is a bit janky, but I'm not sure what I could do to make it better
+    #askpass_dir = os.path.dirname(ASKPASS.__file__)
+    if platform == "win32":
+        askpass_script = "askpass_pyautogit_win"
+    else:
+        askpass_script = "askpass_pyautogit"
+    #askpass_script_path = os.path.join(askpass_dir, askpass_script)
+    env = environ.copy()
+    if len(credentials) < 2:
+        # Without entered credentials, rely on credential helpers or ssh keys, and fail rather than prompt
+        env['GIT_TERMINAL_PROMPT'] = '0'
+        return env
+    env['GIT_ASKPASS'] = askpass_script
+    env['GIT_USERNAME'] = credentials[0]
+    env['GIT_PASSWORD'] = credentials[1]
+    return env
+
+
+def handle_credential_command(command, credentials, target_location='.', line_callback=None, name=None):
     """Function that executes a git command that requires credentials.
 
+    Credentials are passed only to the git process, so several credential commands may run at once.
+
     Parameters
     ----------
     command : str
@@ -46,6 +93,10 @@ def handle_credential_command(command, credentials, target_location='.'):
         The user's entered git remote credentials
     target_location : str
         Location of repository
+    line_callback : function
+        Default None, otherwise output is streamed, and this function is called with each output line
+    name : str
+        Default None, otherwise name the command is recorded under, instead of the command itself
     
     Returns
     -------
@@ -55,19 +106,13 @@ def handle_credential_command(command, credentials, target_location='.'):
         Error code if failure, 0 otherwise.
     """
 
-    out = ''
-    err = 0
-    # This is a bit janky, but I'm not sure what I could do to make it better
-    #askpass_dir = os.path.dirname(ASKPASS.__file__)
-    if platform == "win32":
-        askpass_script = "askpass_pyautogit_win"
+    env = get_credential_environment(credentials)
+    if name is None:
+        name = command
+    if line_callback is not None:
+        out, err = handle_streaming_command(command, name, line_callback, env=env, cwd=target_location)
     else:
-        askpass_script = "askpass_pyautogit"
-    #askpass_script_path = os.path.join(askpass_dir, askpass_script)
-    environ['GIT_ASKPASS'] = askpass_script
-    environ['GIT_USERNAME'] = credentials[0]
-    environ['GIT_PASSWORD'] = credentials[1]
-    out, err = handle_basic_command(command, command)
+        out, err = handle_basic_command(command, name, env=env, cwd=target_location)
 
     return out, err
 
@@ -105,7 +150,117 @@ def parse_string_into_executable_command(command, remove_quotes):
     return run_command
 
 
-def handle_basic_command(command, name, remove_quotes=True):
+def record_command_run(name, start_time, err, num_bytes):
+    """Function that records the duration, exit code and output size of a finished command.
+
+    Parameters
+    ----------
+    name : str
+        The name of the command that was run
+    start_time : float
+        time.perf_counter() value taken when the command was started
+    err : int
+        Exit code of the command, -1 if it could not be run
+    num_bytes : int
+        Number of bytes of output produced by the command
+    """
+
+    duration = time.perf_counter() - start_time
+    STATS.get_command_stats().record(name, duration, err, num_bytes)
+    LOGGER.write('Finished {} in {:.1f} ms, exit code {}, {} bytes of output'.format(name, duration * 1000, err, num_bytes))
+
+
+def handle_ref_query(name, query_function, repo_path='.'):
+    """Function that answers a read-only ref query in-process, in place of running a git command.
+
+    Parameters
+    ----------
+    name : str
+        The name of the git command being replaced
+    query_function : function
+        Function called with a RefReader, returning the output lines of the command
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        Output string matching that of the git command, or None if the query is not supported
+    err : int
+        0 if the query succeeded, None if it is not supported and the git command must be run
+    """
+
+    start_time = time.perf_counter()
+    try:
+        lines = query_function(REFS.RefReader(repo_path))
+    except UnsupportedRepositoryError as e:
+        LOGGER.write('Running {} with git, cannot read in-process: {}'.format(name, str(e)))
+        return None, None
+    out = ''.join(['{}\n'.format(line) for line in lines])
+    record_command_run('{}_in_process'.format(name), start_time, 0, len(out))
+    return out, 0
+
+
+def lookup_cached_output(kind, object_name, name, repo_path='.'):
+    """Function that looks up the cached output of a command run on an immutable object.
+
+    Names other than full object ids (ex. abbreviated hashes) are resolved with the persistent
+    cat-file check helper first, since the cache is keyed on full object ids.
+
+    Parameters
+    ----------
+    kind : str
+        Kind of output, part of the cache key
+    object_name : str
+        Name of the object the command is run on
+    name : str
+        The name of the git command being replaced
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        Cached output, or None if not cached and the command must be run
+    object_id : str
+        Full id of the object to cache the output under, or None if it cannot be resolved
+    """
+
+    start_time = time.perf_counter()
+    object_id = object_name
+    if not CACHE.is_object_id(object_name):
+        try:
+            object_id, _ = EXECUTOR.get_executor().resolve_object(object_name, repo_path=repo_path)
+        except (OSError, EOFError, ValueError):
+            object_id = None
+        if object_id is None:
+            return None, None
+    out = CACHE.get_object_cache().get(kind, object_id)
+    if out is not None:
+        record_command_run('{}_cached'.format(name), start_time, 0, len(out))
+    return out, object_id
+
+
+def store_cached_output(kind, object_id, out, err):
+    """Function that caches the output of a command run on an immutable object, if it succeeded.
+
+    Parameters
+    ----------
+    kind : str
+        Kind of output, part of the cache key
+    object_id : str
+        Full id of the object, None if the output cannot be cached
+    out : str
+        Command output
+    err : int
+        Command error code
+    """
+
+    if err == 0 and object_id is not None:
+        CACHE.get_object_cache().put(kind, object_id, out)
+
+
+def handle_basic_command(command, name, remove_quotes=True, env=None, cwd=None, input_data=None):
     """Function that executes any git command given, and returns program output.
 
     Parameters
@@ -116,6 +271,12 @@ def handle_basic_command(command, name, remove_quotes=True):
         The name of the command being run
     remove_quotes : bool
         Since subprocess takes an array of strings, we split on spaces, however in some cases we want quotes to remain together (ex. commit message)
+    env : dict of str -> str
+        Default None, otherwise environment for the git process (ex. with credentials)
+    cwd : str
+        Default None, otherwise directory the command is run in instead of the current directory
+    input_data : bytes
+        Default None, otherwise data written to the standard input of the command
     
     Returns
     -------
@@ -127,12 +288,16 @@ def handle_basic_command(command, name, remove_quotes=True):
 
     out = None
     err = 0
+    num_bytes = 0
 
     run_command = parse_string_into_executable_command(command, remove_quotes)
+    start_time = time.perf_counter()
     try:
         LOGGER.write('Executing command: {}'.format(str(run_command)))
-        proc = Popen(run_command, stdout=PIPE, stderr=PIPE)
-        output, error = proc.communicate()
+        proc = Popen(run_command, stdout=PIPE, stderr=PIPE, stdin=(PIPE if input_data is not None else None), env=env, cwd=cwd)
+        JOBS.register_process(proc)
+        output, error = proc.communicate(input=input_data)
+        num_bytes = len(output) + len(error)
         if proc.returncode != 0:
             out = error.decode()
             err = proc.returncode
@@ -141,9 +306,206 @@ def handle_basic_command(command, name, remove_quotes=True):
     except:
         out = "Unknown error processing function: {}".format(name)
         err = -1
+    record_command_run(name, start_time, err, num_bytes)
+    return out, err
+
+
+def handle_streaming_command(command, name, line_callback, remove_quotes=True, env=None, max_lines=200, cwd=None):
+    """Function that executes a git command, passing each line of output to a callback as it is produced.
+
+    stdout and stderr are read together, and lines are split on both newlines and carriage returns,
+    so progress updates (ex. 'Receiving objects:  45%') are reported as they are printed. Only the
+    last max_lines lines are kept for the returned output, so memory use stays bounded.
+
+    Parameters
+    ----------
+    command : str
+        The command string to run
+    name : str
+        The name of the command being run
+    line_callback : function
+        Function called with each line of output
+    remove_quotes : bool
+        Since subprocess takes an array of strings, we split on spaces, however in some cases we want quotes to remain together (ex. commit message)
+    env : dict of str -> str
+        Default None, otherwise environment for the git process (ex. with credentials)
+    cwd : str
+        Default None, otherwise directory the command is run in instead of the current directory
+    max_lines : int
+        Number of trailing output lines kept for the returned output
+
+    Returns
+    -------
+    out : str
+        Last lines of combined output
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    kept_lines = deque(maxlen=max_lines)
+    num_bytes = 0
+    run_command = parse_string_into_executable_command(command, remove_quotes)
+    start_time = time.perf_counter()
+    try:
+        LOGGER.write('Executing streaming command: {}'.format(str(run_command)))
+        proc = Popen(run_command, stdout=PIPE, stderr=STDOUT, env=env, cwd=cwd)
+        JOBS.register_process(proc)
+        partial = b''
+        while True:
+            chunk = proc.stdout.read1(4096)
+            if len(chunk) == 0:
+                break
+            num_bytes = num_bytes + len(chunk)
+            lines = re.split(b'[\r\n]', partial + chunk)
+            partial = lines.pop()
+            for line in lines:
+                if len(line) > 0:
+                    decoded = line.decode(errors='replace')
+                    kept_lines.append(decoded)
+                    line_callback(decoded)
+        if len(partial) > 0:
+            decoded = partial.decode(errors='replace')
+            kept_lines.append(decoded)
+            line_callback(decoded)
+        proc.wait()
+        out = '\n'.join(kept_lines)
+        err = proc.returncode
+    except:
+        out = "Unknown error processing function: {}".format(name)
+        err = -1
+    record_command_run(name, start_time, err, num_bytes)
+    return out, err
+
+
+def handle_chunked_command(command, name, chunk_callback, remove_quotes=True, cwd=None):
+    """Function that executes a git command, passing raw stdout to a callback in chunks as it is produced.
+
+    Unlike handle_basic_command, output is never collected, so commands producing very large output
+    (ex. git diff on generated files) can be consumed with bounded memory.
+
+    Parameters
+    ----------
+    command : str
+        The command string to run
+    name : str
+        The name of the command being run
+    chunk_callback : function
+        Function called with each chunk of stdout, as bytes
+    remove_quotes : bool
+        Since subprocess takes an array of strings, we split on spaces, however in some cases we want quotes to remain together (ex. commit message)
+    cwd : str
+        Default None, otherwise directory the command is run in instead of the current directory
+
+    Returns
+    -------
+    out : str
+        stderr string if failure, empty otherwise
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    num_bytes = 0
+    run_command = parse_string_into_executable_command(command, remove_quotes)
+    start_time = time.perf_counter()
+    try:
+        LOGGER.write('Executing chunked command: {}'.format(str(run_command)))
+        # stderr goes to a file, so warnings cannot fill a pipe that is not being read
+        with tempfile.TemporaryFile() as error_file:
+            proc = Popen(run_command, stdout=PIPE, stderr=error_file, cwd=cwd)
+            JOBS.register_process(proc)
+            while True:
+                chunk = proc.stdout.read1(65536)
+                if len(chunk) == 0:
+                    break
+                num_bytes = num_bytes + len(chunk)
+                chunk_callback(chunk)
+            proc.wait()
+            error_file.seek(0)
+            error = error_file.read()
+        err = proc.returncode
+        out = error.decode(errors='replace') if err != 0 else ''
+    except:
+        out = "Unknown error processing function: {}".format(name)
+        err = -1
+    record_command_run(name, start_time, err, num_bytes)
     return out, err
 
 
+def parse_progress_line(line):
+    """Function that extracts the phase and percentage from a git --progress output line
+
+    Parameters
+    ----------
+    line : str
+        Line of git output (ex. 'remote: Counting objects:  45% (9/20)')
+
+    Returns
+    -------
+    phase : str
+        Name of the progress phase, or None if the line is not a progress line
+    percent : int
+        Percentage complete, or None if the line is not a progress line
+    """
+
+    match = re.match(r'^(?:remote: )?([A-Za-z ]+):\s+(\d+)%', line)
+    if match is None:
+        return None, None
+    return match.group(1).strip(), int(match.group(2))
+
+
+def handle_concurrent_commands(commands, remove_quotes=True, cwd=None):
+    """Function that starts several git commands at once, and waits for all of them to finish.
+
+    Each command runs in its own process, but since all processes are started before any are waited on,
+    the total time taken is roughly that of the slowest command rather than the sum of all of them.
+
+    Parameters
+    ----------
+    commands : list of tuple of str
+        List of (command, name) pairs to execute
+    remove_quotes : bool
+        Since subprocess takes an array of strings, we split on spaces, however in some cases we want quotes to remain together (ex. commit message)
+    cwd : str
+        Default None, otherwise directory the commands are run in instead of the current directory
+
+    Returns
+    -------
+    results : list of tuple of (str, int)
+        (out, err) pair for each command, in the same order as the input commands
+    """
+
+    procs = []
+    start_time = time.perf_counter()
+    for command, name in commands:
+        run_command = parse_string_into_executable_command(command, remove_quotes)
+        try:
+            LOGGER.write('Executing command: {}'.format(str(run_command)))
+            procs.append(Popen(run_command, stdout=PIPE, stderr=PIPE, cwd=cwd))
+        except:
+            procs.append(None)
+
+    results = []
+    for (command, name), proc in zip(commands, procs):
+        out = "Unknown error processing function: {}".format(name)
+        err = -1
+        num_bytes = 0
+        if proc is not None:
+            try:
+                output, error = proc.communicate()
+                num_bytes = len(output) + len(error)
+                if proc.returncode != 0:
+                    out = error.decode()
+                    err = proc.returncode
+                else:
+                    out = output.decode()
+                    err = 0
+            except:
+                pass
+        record_command_run(name, start_time, err, num_bytes)
+        results.append((out, err))
+    return results
+
+
 def handle_open_external_program_command(command, name):
     """Function used to run commands that open an external program and detatch from pyautogit.
 
@@ -255,6 +617,79 @@ def git_status_short(repo_path='.'):
     return handle_basic_command(command, name)
 
 
+def git_status_porcelain(repo_path='.', config_options=None, include_untracked=True):
+    """Function for getting machine readable git status, with branch headers
+
+    Output is NUL separated, and can be parsed with pyautogit.git_status.parse_porcelain_v2
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+    config_options : str
+        Default None, otherwise -c options placed before the status subcommand (ex. from fast status mode)
+    include_untracked : bool
+        Set to False to skip searching for untracked files
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = get_status_porcelain_command(config_options, include_untracked)
+    name = "git_status_porcelain"
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
+def get_status_porcelain_command(config_options=None, include_untracked=True):
+    """Function that builds the machine readable git status command string, to be run in the repository
+
+    Parameters
+    ----------
+    config_options : str
+        Default None, otherwise -c options placed before the status subcommand
+    include_untracked : bool
+        Set to False to skip searching for untracked files
+
+    Returns
+    -------
+    command : str
+        The command string
+    """
+
+    command = 'git'
+    if config_options is not None:
+        command = '{} {}'.format(command, config_options)
+    command = '{} status --porcelain=v2 -z --branch'.format(command)
+    if not include_untracked:
+        command = '{} -uno'.format(command)
+    return command
+
+
+def git_status_short_branch(repo_path='.'):
+    """Function for getting shorthand git status, with a branch and upstream tracking header line
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = "git status -s -b"
+    name = "git_short_status_branch"
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
 def git_status(repo_path='.'):
     """Function for getting git status
 
@@ -276,6 +711,51 @@ def git_status(repo_path='.'):
     return handle_basic_command(command, name)
 
 
+def git_get_tracked_files(repo_path='.'):
+    """Function that lists the files tracked in the index
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        NUL separated paths relative to the repository root if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git ls-files -z'
+    name = 'git_get_tracked_files'
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
+def git_check_ignore(paths, repo_path='.'):
+    """Function that checks which of a list of paths are ignored by .gitignore and exclude files
+
+    Parameters
+    ----------
+    paths : list of str
+        Paths relative to the repository root
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        NUL separated ignored paths if any are ignored, otherwise stderr
+    err : int
+        0 if any path is ignored, 1 if none are, another error code if failure.
+    """
+
+    command = 'git check-ignore -z --stdin'
+    name = 'git_check_ignore'
+    input_data = b''.join([path.encode() + b'\0' for path in paths])
+    return handle_basic_command(command, name, cwd=repo_path, input_data=input_data)
+
+
 def git_tree(branch):
     """Function that gets git log as a tree
 
@@ -355,6 +835,78 @@ def git_diff_file(filename):
     return handle_basic_command(command, name)
 
 
+def git_diff_stream(chunk_callback, filename=None, repo_path=None):
+    """Function that streams git diff output, for the whole repository or a specific file
+
+    Parameters
+    ----------
+    chunk_callback : function
+        Function called with each chunk of diff output, as bytes
+    filename : str
+        Default None, otherwise name of file to diff
+    repo_path : str
+        Default None, otherwise target repo path instead of the current directory
+
+    Returns
+    -------
+    out : str
+        stderr string if failure, empty otherwise
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git diff --no-color'
+    name = 'git_diff_stream'
+    if filename is not None:
+        command = '{} -- "{}"'.format(command, filename)
+    return handle_chunked_command(command, name, chunk_callback, cwd=repo_path)
+
+
+#---------------------#
+# Git Object Commands #
+#---------------------#
+
+def git_get_object(object_id, repo_path='.'):
+    """Function that reads the raw content of a git object.
+
+    Served by a persistent `git cat-file --batch` process, falling back to a one-off
+    `git cat-file -p` if the persistent process cannot be used. Objects requested by full
+    id are cached, see pyautogit.object_cache.
+
+    Parameters
+    ----------
+    object_id : str
+        Hash or name of the target object (ex. HEAD:README.md)
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        Object content if success, error message if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    cacheable = CACHE.is_object_id(object_id)
+    if cacheable:
+        out = CACHE.get_object_cache().get('object', object_id)
+        if out is not None:
+            return out, 0
+    try:
+        object_type, content = EXECUTOR.get_executor().read_object(object_id, repo_path=repo_path)
+        if object_type is None:
+            return "Object {} not found".format(object_id), -1
+        out = content.decode(errors='replace')
+        if cacheable:
+            CACHE.get_object_cache().put('object', object_id, out)
+        return out, 0
+    except (OSError, EOFError, ValueError):
+        command = 'git cat-file -p {}'.format(object_id)
+        name = 'git_get_object'
+        return handle_basic_command(command, name, cwd=repo_path)
+
+
 #---------------------#
 # Git Remote Commands #
 #---------------------#
@@ -362,6 +914,8 @@ def git_diff_file(filename):
 def git_get_remotes():
     """Function for returning git remotes list
 
+    Remotes are read from the config files in-process when possible, see pyautogit.ref_reader.
+
     Returns
     -------
     out : str
@@ -372,7 +926,10 @@ def git_get_remotes():
 
     command = "git remote"
     name = "git_get_remotes"
-    return handle_basic_command(command, name)
+    out, err = handle_ref_query(name, lambda reader : reader.get_remotes())
+    if err is None:
+        out, err = handle_basic_command(command, name)
+    return out, err
 
 
 def git_get_remote_info(remote):
@@ -470,6 +1027,9 @@ def git_rename_remote(remote, new_name):
 def git_get_commit_info(commit_hash):
     """Function that gets info about a particular commit.
 
+    Commit content never changes, so the output, including the commit diff, is cached on the
+    full commit id. See pyautogit.object_cache.
+
     Parameters
     ----------
     commit_hash : str
@@ -485,7 +1045,12 @@ def git_get_commit_info(commit_hash):
 
     command = 'git show {}'.format(commit_hash)
     name = 'git_get_commit_info'
-    return handle_basic_command(command, name)
+    out, object_id = lookup_cached_output('commit_info', commit_hash, name)
+    if out is not None:
+        return out, 0
+    out, err = handle_basic_command(command, name)
+    store_cached_output('commit_info', object_id, out, err)
+    return out, err
 
 
 def git_checkout_commit(commit_hash):
@@ -556,6 +1121,8 @@ def git_create_tag(tag_name):
 
 def git_get_tags():
     """Function that gets list of git tags in repo
+
+    Tags are read from the repository refs in-process when possible, see pyautogit.ref_reader.
     
     Returns
     -------
@@ -567,7 +1134,10 @@ def git_get_tags():
 
     command = 'git tag'
     name = 'git_get_tags'
-    return handle_basic_command(command, name)
+    out, err = handle_ref_query(name, lambda reader : reader.get_tags())
+    if err is None:
+        out, err = handle_basic_command(command, name)
+    return out, err
 
 #---------------------#
 # Git Branch Commands #
@@ -576,6 +1146,8 @@ def git_get_tags():
 def git_get_branches():
     """Function that gets a list of the repo branches.
 
+    Branches are read from the repository refs in-process when possible, see pyautogit.ref_reader.
+
     Returns
     -------
     out : str
@@ -586,16 +1158,25 @@ def git_get_branches():
 
     command = "git branch"
     name = "git_get_branches"
-    return handle_basic_command(command, name)
+    out, err = handle_ref_query(name, lambda reader : reader.get_branches())
+    if err is None:
+        out, err = handle_basic_command(command, name)
+    return out, err
 
 
-def git_get_recent_commits(branch):
+def git_get_recent_commits(branch, max_count=None, skip=0, repo_path=None):
     """Gets recent commits made to the branch
 
     Parameters
     ----------
     branch : str
         Name of current branch
+    max_count : int
+        Default None, otherwise maximum number of commits to list
+    skip : int
+        Number of most recent commits to skip before listing
+    repo_path : str
+        Default None, otherwise target repo path instead of the current directory
 
     Returns
     -------
@@ -606,7 +1187,32 @@ def git_get_recent_commits(branch):
     """
 
     command = 'git --no-pager log {} --oneline'.format(branch)
+    if max_count is not None:
+        command = '{} -n {}'.format(command, max_count)
+    if skip > 0:
+        command = '{} --skip={}'.format(command, skip)
     name = "git_get_recent_commits"
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
+def git_count_commits(revision_range):
+    """Counts the commits in a revision range
+
+    Parameters
+    ----------
+    revision_range : str
+        Range of commits to count (ex. old_tip..new_tip)
+
+    Returns
+    -------
+    out : str
+        Number of commits if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git rev-list --count {}'.format(revision_range)
+    name = "git_count_commits"
     return handle_basic_command(command, name)
 
 
@@ -633,13 +1239,15 @@ def git_create_new_branch(branch, checkout=True):
     return handle_basic_command(command, name)
 
 
-def git_delete_branch(branch):
+def git_delete_branch(branch, repo_path='.'):
     """Deletes existing git branch
 
     Parameters
     ----------
     branch : str
         Name of branch to delete
+    repo_path : str
+        Target repo path
     
     Returns
     -------
@@ -650,7 +1258,51 @@ def git_delete_branch(branch):
     """
     command = 'git branch -d {}'.format(branch)
     name = 'git_delete_branch'
-    return handle_basic_command(command, name)
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
+def git_get_merged_branches(target='HEAD', repo_path='.'):
+    """Function that lists local branches whose tips are reachable from a target
+
+    Parameters
+    ----------
+    target : str
+        Branch or commit that the branches must be merged into
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        One branch name per line if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git for-each-ref --merged={} --format=%(refname:short) refs/heads'.format(target)
+    name = 'git_get_merged_branches'
+    return handle_basic_command(command, name, cwd=repo_path)
+
+
+def git_get_current_branch_name(repo_path='.'):
+    """Function that gets the name of the checked out branch
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    out : str
+        Branch name if success, stderr if failure or HEAD is detached
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git symbolic-ref -q --short HEAD'
+    name = 'git_get_current_branch_name'
+    return handle_basic_command(command, name, cwd=repo_path)
 
 
 def git_checkout_branch(branch):
@@ -765,7 +1417,7 @@ def git_init_new_repo(new_dir_target):
     return out, err
 
 
-def git_clone_new_repo(new_repo_url, credentials):
+def git_clone_new_repo(new_repo_url, credentials, repo_path='.', progress_callback=None):
     """Function that clones a new git repository
 
     Parameters
@@ -774,6 +1426,10 @@ def git_clone_new_repo(new_repo_url, credentials):
         URL of new repo
     credentials : list of str
         Username and Password for git remote
+    repo_path : str
+        Directory to clone the repository into
+    progress_callback : function
+        Default None, otherwise clone progress is streamed, and this function is called with each output line
     
     Returns
     -------
@@ -785,12 +1441,14 @@ def git_clone_new_repo(new_repo_url, credentials):
 
     out = None
     err = 0
-    if os.path.exists(new_repo_url.split('/')[-1]):
+    if os.path.exists(os.path.join(repo_path, new_repo_url.split('/')[-1])):
         err = -1
         out = "The target repo couldn't be cloned - Directory exists"
     else:
         command = 'git clone {}'.format(new_repo_url)
-        out, err = handle_credential_command(command, credentials)
+        if progress_callback is not None:
+            command = 'git clone --progress {}'.format(new_repo_url)
+        out, err = handle_credential_command(command, credentials, target_location=repo_path, line_callback=progress_callback)
         if err == 0:
             out = "Successfully cloned {}".format(new_repo_url)
             
@@ -848,7 +1506,7 @@ def git_add_file(filename):
         Error code if failure, 0 otherwise.
     """
 
-    command = 'git add {}'.format(filename)
+    command = 'git --literal-pathspecs add -- "{}"'.format(filename)
     name = 'git_add_file'
     return handle_basic_command(command, name)
 
@@ -869,19 +1527,150 @@ def git_reset_file(filename):
         Error code if failure, 0 otherwise.
     """
 
-    command = 'git reset HEAD {}'.format(filename)
+    command = 'git --literal-pathspecs reset HEAD -- "{}"'.format(filename)
     name = 'git_reset_file'
     return handle_basic_command(command, name)
 
 
+def get_git_version():
+    """Function that gets the version of the installed git, only running git the first time it is called
+
+    Returns
+    -------
+    version : tuple of int
+        Major, minor and patch version numbers, empty if the version could not be read
+    """
+
+    global _GIT_VERSION
+    if _GIT_VERSION is None:
+        out, err = handle_basic_command('git --version', 'git_version')
+        match = re.search(r'(\d+)\.(\d+)(?:\.(\d+))?', out) if err == 0 else None
+        _GIT_VERSION = tuple(int(number) for number in match.groups('0')) if match is not None else ()
+    return _GIT_VERSION
+
+
+def supports_pathspec_from_file():
+    """Function that checks if git supports the --pathspec-from-file option, added in git 2.25
+
+    Returns
+    -------
+    supported : bool
+        True if the option can be used
+    """
+
+    return get_git_version() >= (2, 25)
+
+
+def run_for_each_file(file_function, filenames):
+    """Function that runs a single file command for each of several files, for git versions without --pathspec-from-file
+
+    Parameters
+    ----------
+    file_function : function
+        Single file command, ex. git_add_file
+    filenames : list of str
+        Names of files
+
+    Returns
+    -------
+    out : str
+        Output of the first failed command, or of all commands if they succeed
+    err : int
+        Error code of the first failed command, 0 otherwise
+    """
+
+    outputs = []
+    for filename in filenames:
+        out, err = file_function(filename)
+        if err != 0:
+            return out, err
+        outputs.append(out)
+    return ''.join(outputs), 0
+
+
+def get_pathspec_input(filenames):
+    """Function that encodes file names for the --pathspec-from-file=- option with --pathspec-file-nul
+
+    Commands using it must also pass --literal-pathspecs, otherwise the names are read as
+    pathspecs, and ex. staging 'a[1].txt' also stages 'a1.txt'.
+
+    Parameters
+    ----------
+    filenames : list of str
+        Names of files
+
+    Returns
+    -------
+    input_data : bytes
+        NUL separated names, so names with spaces, quotes or newlines need no escaping
+    """
+
+    return '\0'.join(filenames).encode('utf-8', errors='surrogateescape')
+
+
+def git_add_files(filenames):
+    """Function that stages multiple files in repo for commit, with a single git process.
+
+    Git versions older than 2.25 start one process per file instead.
+
+    Parameters
+    ----------
+    filenames : list of str
+        Names of files to stage
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    if not supports_pathspec_from_file():
+        return run_for_each_file(git_add_file, filenames)
+    command = 'git --literal-pathspecs add --pathspec-from-file=- --pathspec-file-nul'
+    name = 'git_add_files'
+    return handle_basic_command(command, name, input_data=get_pathspec_input(filenames))
+
+
+def git_reset_files(filenames):
+    """Function that unstages multiple files in repo for commit, with a single git process.
+
+    Git versions older than 2.25 start one process per file instead.
+
+    Parameters
+    ----------
+    filenames : list of str
+        Names of files to unstage
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    if not supports_pathspec_from_file():
+        return run_for_each_file(git_reset_file, filenames)
+    command = 'git --literal-pathspecs reset -q HEAD --pathspec-from-file=- --pathspec-file-nul'
+    name = 'git_reset_files'
+    return handle_basic_command(command, name, input_data=get_pathspec_input(filenames))
+
+
 #--------------------#
 # Git Stash Commands #
 #--------------------#
 
 
-def git_stash_all():
+def git_stash_all(repo_path='.'):
     """Function that stashes all changes in repo.
 
+    Parameters
+    ----------
+    repo_path : str
+        The repository path
+
     Returns
     -------
     out : str
@@ -892,11 +1681,16 @@ def git_stash_all():
 
     command = 'git stash'
     name = 'git_stash_all'
-    return handle_basic_command(command, name)
+    return handle_basic_command(command, name, cwd=repo_path)
 
-def git_unstash_all():
+def git_unstash_all(repo_path='.'):
     """Function that unstashes all changes in repo.
 
+    Parameters
+    ----------
+    repo_path : str
+        The repository path
+
     Returns
     -------
     out : str
@@ -906,7 +1700,7 @@ def git_unstash_all():
     """
     command = 'git stash pop'
     name = 'git_unstash_all'
-    return handle_basic_command(command, name)
+    return handle_basic_command(command, name, cwd=repo_path)
 
 
 def git_stash_file(filename):
@@ -934,7 +1728,7 @@ def git_stash_file(filename):
 # Git Push/Pull Commands #
 #------------------------#
 
-def git_pull_branch(branch, remote, credentials):
+def git_pull_branch(branch, remote, credentials, repo_path='.', progress_callback=None):
     """Function that pulls a branch from the remote repo
     
     Parameters
@@ -945,6 +1739,10 @@ def git_pull_branch(branch, remote, credentials):
         Name of remote
     credentials : list of str
         Username and Password of user for remoe
+    repo_path : str
+        The repository path
+    progress_callback : function
+        Default None, otherwise pull progress is streamed, and this function is called with each output line
     
     Returns
     -------
@@ -955,10 +1753,12 @@ def git_pull_branch(branch, remote, credentials):
     """
 
     command = 'git pull {} {}'.format(remote, branch)
-    return handle_credential_command(command, credentials)
+    if progress_callback is not None:
+        command = 'git pull --progress {} {}'.format(remote, branch)
+    return handle_credential_command(command, credentials, target_location=repo_path, line_callback=progress_callback)
 
 
-def git_push_to_branch(branch, remote, credentials, repo_path='.'):
+def git_push_to_branch(branch, remote, credentials, repo_path='.', progress_callback=None):
     """Function that pushes a branch to the remote repo
     
     Parameters
@@ -971,6 +1771,8 @@ def git_push_to_branch(branch, remote, credentials, repo_path='.'):
         Username and Password of user for remote
     repo_path : str
         The repository path
+    progress_callback : function
+        Default None, otherwise push progress is streamed, and this function is called with each output line
     
     Returns
     -------
@@ -981,4 +1783,49 @@ def git_push_to_branch(branch, remote, credentials, repo_path='.'):
     """
 
     command = 'git push {} {}'.format(remote, branch)
-    return handle_credential_command(command, credentials)
+    if progress_callback is not None:
+        command = 'git push --progress {} {}'.format(remote, branch)
+    return handle_credential_command(command, credentials, target_location=repo_path, line_callback=progress_callback)
+
+
+def git_fetch_all(credentials, repo_path='.'):
+    """Function that fetches all remotes of a repository
+
+    Parameters
+    ----------
+    credentials : list of str
+        Username and Password of user for remote
+    repo_path : str
+        The repository path
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git fetch --all'
+    return handle_credential_command(command, credentials, target_location=repo_path, name='git_fetch_all')
+
+
+def git_merge_fast_forward(repo_path='.'):
+    """Function that fast-forwards the checked out branch to its upstream, failing if it cannot
+
+    Parameters
+    ----------
+    repo_path : str
+        The repository path
+
+    Returns
+    -------
+    out : str
+        Output string from stdout if success, stderr if failure
+    err : int
+        Error code if failure, 0 otherwise.
+    """
+
+    command = 'git merge --ff-only @{u}'
+    name = 'git_merge_fast_forward'
+    return handle_basic_command(command, name, cwd=repo_path)
@@ -0,0 +1,1021 @@
+"""Module for drawing the commit graph of a repository a window at a time.
+
+Rather than dumping `git log --graph --all` over the whole history, commits are walked newest
+first from the repository refs, and their lanes are laid out only as far as the displayed window
+requires. Scrolling past the end of the laid out rows continues the walk from where it stopped.
+
+Commit parents and dates are read from the commit-graph file when the repository has one, which
+requires no git process at all, and otherwise from the long-lived cat-file helper. Subjects are
+only read for the rows in the displayed window.
+
+Commits are drawn newest first, but never before their children, since a child dated before its
+parent would otherwise leave its lane open. Commits in the commit-graph are ordered by their
+generation numbers, which also guarantees that no child is found after its parent was drawn.
+Without them the walk is ordered by commit date, which only holds while clocks are not skewed
+across more than one commit in a row.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import mmap
+import heapq
+import struct
+import pyautogit.commands
+import pyautogit.git_executor as EXECUTOR
+import pyautogit.logger as LOGGER
+import pyautogit.ref_reader
+from pyautogit.errors import UnsupportedRepositoryError
+
+
+# Number of graph rows displayed at a time
+WINDOW_SIZE = 200
+
+# Length of displayed abbreviated commit hashes
+ABBREV_LENGTH = 7
+
+# Parent position marking a missing parent in commit-graph files
+GRAPH_PARENT_NONE = 0x70000000
+
+# Flag marking the second parent field as an index into the extra edges list
+GRAPH_EXTRA_EDGES = 0x80000000
+
+# Flag marking a corrected commit date offset as an index into the overflow list
+GRAPH_GENERATION_OVERFLOW = 0x80000000
+
+
+class CommitGraphFile:
+    """Class reading a single commit-graph file, or a single layer of a commit-graph chain
+
+    Attributes
+    ----------
+    file_path : str
+        Path to the commit-graph file
+    base_position : int
+        Number of commits in the layers below this one, 0 for a single file
+    hash_length : int
+        Length in bytes of object ids
+    num_commits : int
+        Number of commits in this file
+    mapped : mmap.mmap
+        Memory map of the file
+    chunks : dict of bytes -> int
+        Maps chunk ids to their offsets in the file
+    """
+
+    def __init__(self, file_path, base_position=0):
+        """Constructor for CommitGraphFile. Maps the file and reads its chunk table
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the file format is not understood
+        """
+
+        self.file_path      = file_path
+        self.base_position  = base_position
+        with open(file_path, 'rb') as fp:
+            self.mapped = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        signature, version, hash_version, num_chunks = struct.unpack_from('>4sBBB', self.mapped, 0)
+        if signature != b'CGPH' or version != 1 or hash_version not in [1, 2]:
+            self.close()
+            raise UnsupportedRepositoryError('Unsupported commit-graph file {}'.format(file_path))
+        self.hash_length = 20 if hash_version == 1 else 32
+        self.chunks = {}
+        for i in range(num_chunks):
+            chunk_id, offset = struct.unpack_from('>4sQ', self.mapped, 8 + 12 * i)
+            self.chunks[chunk_id] = offset
+        for chunk_id in [b'OIDF', b'OIDL', b'CDAT']:
+            if chunk_id not in self.chunks:
+                self.close()
+                raise UnsupportedRepositoryError('Commit-graph file {} has no {} chunk'.format(file_path, chunk_id.decode()))
+        self.num_commits = struct.unpack_from('>I', self.mapped, self.chunks[b'OIDF'] + 4 * 255)[0]
+
+
+    def find_position(self, object_id):
+        """Finds the position of a commit within this file
+
+        Parameters
+        ----------
+        object_id : bytes
+            Binary id of the commit
+
+        Returns
+        -------
+        position : int
+            Index of the commit in this file, or None if it is not in the file
+        """
+
+        fanout = self.chunks[b'OIDF']
+        first_byte = object_id[0]
+        low = 0 if first_byte == 0 else struct.unpack_from('>I', self.mapped, fanout + 4 * (first_byte - 1))[0]
+        high = struct.unpack_from('>I', self.mapped, fanout + 4 * first_byte)[0]
+        oid_list = self.chunks[b'OIDL']
+        while low < high:
+            middle = (low + high) // 2
+            start = oid_list + middle * self.hash_length
+            current = self.mapped[start:start + self.hash_length]
+            if current == object_id:
+                return middle
+            elif current < object_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+
+    def get_object_id(self, position):
+        """Gets the binary id of the commit at a position in this file
+
+        Parameters
+        ----------
+        position : int
+            Index of the commit in this file
+
+        Returns
+        -------
+        object_id : bytes
+            Binary id of the commit
+        """
+
+        start = self.chunks[b'OIDL'] + position * self.hash_length
+        return self.mapped[start:start + self.hash_length]
+
+
+    def read_commit(self, position):
+        """Reads the parents and commit time of the commit at a position in this file
+
+        Parameters
+        ----------
+        position : int
+            Index of the commit in this file
+
+        Returns
+        -------
+        parent_positions : list of int
+            Graph positions of the parents, across all layers
+        commit_time : int
+            Committer timestamp
+        topological_level : int
+            Generation number of the commit, 0 if the file was written without generation numbers
+        """
+
+        start = self.chunks[b'CDAT'] + position * (self.hash_length + 16) + self.hash_length
+        parent_1, parent_2, generation_time, time_low = struct.unpack_from('>IIII', self.mapped, start)
+        commit_time = ((generation_time & 0x3) << 32) | time_low
+        topological_level = generation_time >> 2
+        parent_positions = []
+        if parent_1 != GRAPH_PARENT_NONE:
+            parent_positions.append(parent_1)
+        if parent_2 & GRAPH_EXTRA_EDGES:
+            # Octopus merges list their second and later parents in the extra edges chunk
+            edge = self.chunks[b'EDGE'] + 4 * (parent_2 & ~GRAPH_EXTRA_EDGES)
+            while True:
+                value = struct.unpack_from('>I', self.mapped, edge)[0]
+                parent_positions.append(value & ~GRAPH_EXTRA_EDGES)
+                if value & GRAPH_EXTRA_EDGES:
+                    break
+                edge = edge + 4
+        elif parent_2 != GRAPH_PARENT_NONE:
+            parent_positions.append(parent_2)
+        return parent_positions, commit_time, topological_level
+
+
+    def read_corrected_date(self, position, commit_time):
+        """Reads the corrected commit date of the commit at a position in this file
+
+        The corrected date is the commit time, raised where required to be later than the
+        corrected dates of all parents, so it can be used as a generation number.
+
+        Parameters
+        ----------
+        position : int
+            Index of the commit in this file
+        commit_time : int
+            Committer timestamp of the commit
+
+        Returns
+        -------
+        corrected_date : int
+            Corrected commit date, or None if the file does not store them
+        """
+
+        if b'GDA2' not in self.chunks:
+            return None
+        offset = struct.unpack_from('>I', self.mapped, self.chunks[b'GDA2'] + 4 * position)[0]
+        if offset & GRAPH_GENERATION_OVERFLOW:
+            offset = struct.unpack_from('>Q', self.mapped, self.chunks[b'GDO2'] + 8 * (offset & ~GRAPH_GENERATION_OVERFLOW))[0]
+        return commit_time + offset
+
+
+    def close(self):
+        """Unmaps the file
+        """
+
+        self.mapped.close()
+
+
+class CommitGraph:
+    """Class reading commit parents and dates from a commit-graph file or chain
+
+    Attributes
+    ----------
+    layers : list of CommitGraphFile
+        Graph files, base layer first
+    use_corrected_dates : bool
+        True if all layers store corrected commit dates, which are then used as generation numbers
+    """
+
+    def __init__(self, layers):
+        """Constructor for CommitGraph
+        """
+
+        self.layers                 = layers
+        self.use_corrected_dates    = all([b'GDA2' in layer.chunks for layer in layers])
+
+
+    def lookup(self, object_id):
+        """Reads the parents, commit time and generation number of a commit
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+
+        Returns
+        -------
+        parents : list of str
+            Hex ids of the parents, or None if the commit is not in the graph
+        commit_time : int
+            Committer timestamp, or None if the commit is not in the graph
+        generation : int
+            Corrected commit date if stored, otherwise topological level. None if the commit is not
+            in the graph, or the graph has no generation numbers
+        """
+
+        try:
+            binary_id = bytes.fromhex(object_id)
+        except ValueError:
+            return None, None, None
+        for layer in reversed(self.layers):
+            if len(binary_id) != layer.hash_length:
+                return None, None, None
+            position = layer.find_position(binary_id)
+            if position is not None:
+                parent_positions, commit_time, generation = layer.read_commit(position)
+                if self.use_corrected_dates:
+                    generation = layer.read_corrected_date(position, commit_time)
+                elif generation == 0:
+                    generation = None
+                return [self.get_object_id(parent).hex() for parent in parent_positions], commit_time, generation
+        return None, None, None
+
+
+    def get_object_id(self, graph_position):
+        """Gets the binary id of a commit from its position across all layers
+
+        Parameters
+        ----------
+        graph_position : int
+            Position of the commit, counting the commits of all lower layers
+
+        Returns
+        -------
+        object_id : bytes
+            Binary id of the commit
+        """
+
+        for layer in reversed(self.layers):
+            if graph_position >= layer.base_position:
+                return layer.get_object_id(graph_position - layer.base_position)
+        raise ValueError('Invalid commit-graph position {}'.format(graph_position))
+
+
+    def close(self):
+        """Unmaps all graph files
+        """
+
+        for layer in self.layers:
+            layer.close()
+        self.layers = []
+
+
+def load_commit_graph(repo_path='.'):
+    """Loads the commit-graph of a repository, if it has one that reflects the true history
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    commit_graph : CommitGraph
+        The loaded graph, or None if there is no usable graph
+    """
+
+    try:
+        common_dir = pyautogit.ref_reader.RefReader(repo_path).common_dir
+    except UnsupportedRepositoryError:
+        return None
+
+    # Shallow clones, grafts and replace refs change parents in ways the graph file does not record
+    if 'GIT_OBJECT_DIRECTORY' in os.environ or os.path.exists(os.path.join(common_dir, 'shallow')) or \
+            os.path.exists(os.path.join(common_dir, 'info', 'grafts')) or os.path.isdir(os.path.join(common_dir, 'refs', 'replace')):
+        return None
+
+    info_dir = os.path.join(common_dir, 'objects', 'info')
+    chain_file = os.path.join(info_dir, 'commit-graphs', 'commit-graph-chain')
+    if os.path.isfile(chain_file):
+        with open(chain_file, 'r') as fp:
+            graph_files = [os.path.join(info_dir, 'commit-graphs', 'graph-{}.graph'.format(line.strip())) for line in fp if len(line.strip()) > 0]
+    elif os.path.isfile(os.path.join(info_dir, 'commit-graph')):
+        graph_files = [os.path.join(info_dir, 'commit-graph')]
+    else:
+        return None
+
+    layers = []
+    base_position = 0
+    try:
+        for graph_file in graph_files:
+            layer = CommitGraphFile(graph_file, base_position)
+            layers.append(layer)
+            base_position = base_position + layer.num_commits
+    except (OSError, ValueError, struct.error, UnsupportedRepositoryError) as e:
+        LOGGER.write('Not using commit-graph: {}'.format(str(e)))
+        for layer in layers:
+            layer.close()
+        return None
+    LOGGER.write('Loaded commit-graph with {} layers, {} commits'.format(len(layers), base_position))
+    return CommitGraph(layers)
+
+
+def parse_commit_object(content):
+    """Parses the parents, commit time and subject of a raw commit object
+
+    Parameters
+    ----------
+    content : bytes
+        Commit object content, as printed by `git cat-file commit`
+
+    Returns
+    -------
+    parents : list of str
+        Hex ids of the parents
+    commit_time : int
+        Committer timestamp
+    subject : str
+        First paragraph of the message, joined into one line as in `git log --oneline`
+    """
+
+    header, _, message = content.partition(b'\n\n')
+    parents = []
+    commit_time = 0
+    for line in header.split(b'\n'):
+        if line.startswith(b'parent '):
+            parents.append(line[len(b'parent '):].decode())
+        elif line.startswith(b'committer '):
+            fields = line.rsplit(b' ', 2)
+            if len(fields) == 3 and fields[1].isdigit():
+                commit_time = int(fields[1])
+    subject = ' '.join(message.split(b'\n\n', 1)[0].decode(errors='replace').split('\n')).strip()
+    return parents, commit_time, subject
+
+
+class CommitSource:
+    """Class reading commits for the graph, from the commit-graph when possible
+
+    Attributes
+    ----------
+    repo_path : str
+        Target repo path
+    commit_graph : CommitGraph
+        The repository commit-graph, None if it has no usable one
+    num_graph_reads : int
+        Number of commits read from the commit-graph
+    num_object_reads : int
+        Number of commit objects read with the cat-file helper
+    subjects : dict of str -> str
+        Subjects of the commits read with the cat-file helper, so displaying them needs no second read
+    """
+
+    def __init__(self, repo_path='.'):
+        """Constructor for CommitSource
+        """
+
+        self.repo_path          = repo_path
+        self.commit_graph       = load_commit_graph(repo_path)
+        self.num_graph_reads    = 0
+        self.num_object_reads   = 0
+        self.subjects           = {}
+
+
+    def read_commit_object(self, object_id):
+        """Reads and parses a commit object with the cat-file helper
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+
+        Returns
+        -------
+        commit : tuple of (list of str, int, str)
+            Parents, commit time and subject, or None if the commit cannot be read
+        """
+
+        self.num_object_reads = self.num_object_reads + 1
+        try:
+            object_type, content = EXECUTOR.get_executor().read_object(object_id, repo_path=self.repo_path)
+        except (OSError, EOFError, ValueError):
+            return None
+        if object_type != 'commit':
+            return None
+        commit = parse_commit_object(content)
+        self.subjects[object_id] = commit[2]
+        return commit
+
+
+    def get_commit(self, object_id):
+        """Gets the parents, commit time and generation number of a commit
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+
+        Returns
+        -------
+        parents : list of str
+            Hex ids of the parents, or None if the commit cannot be read
+        commit_time : int
+            Committer timestamp, or None if the commit cannot be read
+        generation : int
+            Generation number from the commit-graph, None if the commit is not in it
+        """
+
+        if self.commit_graph is not None:
+            parents, commit_time, generation = self.commit_graph.lookup(object_id)
+            if parents is not None:
+                self.num_graph_reads = self.num_graph_reads + 1
+                return parents, commit_time, generation
+        commit = self.read_commit_object(object_id)
+        if commit is None:
+            return None, None, None
+        return commit[0], commit[1], None
+
+
+    def get_parents(self, object_id):
+        """Gets the parents and commit time of a commit
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+
+        Returns
+        -------
+        parents : list of str
+            Hex ids of the parents, or None if the commit cannot be read
+        commit_time : int
+            Committer timestamp, or None if the commit cannot be read
+        """
+
+        parents, commit_time, _ = self.get_commit(object_id)
+        return parents, commit_time
+
+
+    def get_subject(self, object_id):
+        """Gets the subject of a commit
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+
+        Returns
+        -------
+        subject : str
+            The subject, empty if the commit cannot be read
+        """
+
+        if object_id in self.subjects:
+            return self.subjects[object_id]
+        commit = self.read_commit_object(object_id)
+        if commit is None:
+            return ''
+        return commit[2]
+
+
+    def close(self):
+        """Unmaps the commit-graph, if one was loaded
+        """
+
+        if self.commit_graph is not None:
+            self.commit_graph.close()
+            self.commit_graph = None
+
+
+def get_ref_tips(repo_path='.'):
+    """Gets the commits pointed to by HEAD and all branches, remote branches and tags
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    tips : list of str
+        Hex ids of the commits, HEAD first
+    decorations : dict of str -> list of str
+        Maps commit ids to the names of the refs pointing to them, as in `git log --decorate`
+    out : str
+        Output of the failed command if the refs could not be listed, otherwise None
+    """
+
+    command = 'git for-each-ref --format=%(objectname)%00%(*objectname)%00%(refname) refs/heads refs/remotes refs/tags'
+    out, err = pyautogit.commands.handle_basic_command(command, 'git_get_ref_tips', cwd=repo_path)
+    if err != 0:
+        return [], {}, out
+
+    # Prints the HEAD commit, then the checked out branch, or HEAD again if it is detached
+    tips = []
+    decorations = {}
+    head_branch = None
+    head_out, head_err = pyautogit.commands.handle_basic_command('git rev-parse HEAD --symbolic-full-name HEAD', 'git_get_head', cwd=repo_path)
+    head_lines = head_out.splitlines()
+    if head_err == 0 and len(head_lines) == 2:
+        tips.append(head_lines[0])
+        decorations[head_lines[0]] = ['HEAD']
+        head_branch = head_lines[1]
+
+    for line in out.splitlines():
+        fields = line.split('\0')
+        if len(fields) != 3:
+            continue
+        object_id, peeled_id, ref_name = fields
+        if len(peeled_id) > 0:
+            object_id = peeled_id
+        if ref_name.startswith('refs/heads/'):
+            name = ref_name[len('refs/heads/'):]
+            if ref_name == head_branch:
+                decorations[object_id][0] = 'HEAD -> {}'.format(name)
+                continue
+        elif ref_name.startswith('refs/remotes/'):
+            name = ref_name[len('refs/remotes/'):]
+        else:
+            name = 'tag: {}'.format(ref_name[len('refs/tags/'):])
+        tips.append(object_id)
+        decorations.setdefault(object_id, []).append(name)
+    return tips, decorations, None
+
+
+class GraphRow:
+    """Class representing the graph lines drawn for a single commit
+
+    Attributes
+    ----------
+    object_id : str
+        Hex id of the commit
+    lines : list of str
+        Graph lines drawn for the commit, including connector lines before and after it
+    commit_line : int
+        Index in lines of the line marking the commit itself
+    """
+
+    __slots__ = ['object_id', 'lines', 'commit_line']
+
+    def __init__(self, object_id, lines, commit_line):
+        """Constructor for GraphRow
+        """
+
+        self.object_id      = object_id
+        self.lines          = lines
+        self.commit_line    = commit_line
+
+
+def draw_lanes(lanes, marks):
+    """Draws one graph line, with a column per lane and a gap between columns
+
+    Parameters
+    ----------
+    lanes : list of str
+        Commit each lane is waiting for, None for empty lanes
+    marks : dict of int -> str
+        Characters overriding positions of the line, where lane i is at position 2 * i
+
+    Returns
+    -------
+    line : str
+        The graph line, without trailing spaces
+    """
+
+    width = max([2 * len(lanes) - 1] + [position + 1 for position in marks.keys()])
+    chars = [' '] * width
+    for i, lane in enumerate(lanes):
+        if lane is not None:
+            chars[2 * i] = '|'
+    for position, char in marks.items():
+        chars[position] = char
+    return ''.join(chars).rstrip()
+
+
+def add_edge_marks(marks, source, target):
+    """Adds the marks drawing an edge from one lane to another on a connector line
+
+    Slanted marks of other edges are not overwritten by the horizontal part of a longer edge.
+
+    Parameters
+    ----------
+    marks : dict of int -> str
+        Characters to draw, keyed on line position
+    source : int
+        Lane the edge starts from
+    target : int
+        Lane the edge ends in
+    """
+
+    if target > source:
+        for position in range(2 * source + 1, 2 * target - 1, 2):
+            marks.setdefault(position, '_')
+        marks[2 * target - 1] = '\\'
+    elif target < source:
+        marks[2 * target + 1] = '/'
+        for position in range(2 * target + 3, 2 * source, 2):
+            marks.setdefault(position, '_')
+
+
+class CommitGraphWalker:
+    """Class walking history newest first, laying out graph lanes one commit at a time
+
+    The walk state is kept between calls, so more rows can be laid out as the user scrolls.
+    Commits in the commit-graph are always drawn after commits that are not, as the graph only
+    holds older history, and among themselves by generation number. Other commits are ordered by
+    commit time.
+
+    Attributes
+    ----------
+    source : CommitSource
+        Source of commit parents and dates
+    queue : list of tuple of (int, int, int, str)
+        Heap of (0 if in the commit-graph else -1, negated generation or commit time, insertion order,
+        commit id) of commits waiting to be drawn
+    queued : set of str
+        Ids of all commits ever added to the queue
+    queued_parents : dict of str -> list of str
+        Parents of the commits waiting in the queue, read when they were queued
+    pending_children : dict of str -> int
+        Number of queued children not drawn yet, for each commit that has some
+    blocked : dict of str -> tuple
+        Queue entries taken off the heap since their commit has children left to draw
+    drawn : set of str
+        Ids of the commits drawn so far
+    lanes : list of str
+        Commit each lane is waiting for, None for empty lanes
+    rows : list of GraphRow
+        Rows laid out so far
+    num_inserted : int
+        Number of commits added to the queue, used to keep equal dates in a stable order
+    """
+
+    def __init__(self, source, tips):
+        """Constructor for CommitGraphWalker
+        """
+
+        self.source         = source
+        self.queue          = []
+        self.queued         = set()
+        self.queued_parents = {}
+        self.pending_children = {}
+        self.blocked        = {}
+        self.drawn          = set()
+        self.lanes          = []
+        self.rows           = []
+        self.num_inserted   = 0
+        for tip in tips:
+            self.add_to_queue(tip)
+
+
+    def add_to_queue(self, object_id):
+        """Queues a commit to be drawn, unless it was already queued
+
+        Parameters
+        ----------
+        object_id : str
+            Hex id of the commit
+        """
+
+        if object_id in self.queued:
+            return
+        parents, commit_time, generation = self.source.get_commit(object_id)
+        if parents is None:
+            # Missing commits, ex. beyond a shallow boundary, are not drawn
+            return
+        self.queued.add(object_id)
+        self.queued_parents[object_id] = parents
+        for parent in parents:
+            self.pending_children[parent] = self.pending_children.get(parent, 0) + 1
+        if generation is None:
+            entry = (-1, -commit_time, self.num_inserted, object_id)
+        else:
+            entry = (0, -generation, self.num_inserted, object_id)
+        heapq.heappush(self.queue, entry)
+        self.num_inserted = self.num_inserted + 1
+
+
+    def take_next_commit(self):
+        """Takes the next commit to draw off the queue, setting aside commits with children left to draw
+
+        Returns
+        -------
+        object_id : str
+            Hex id of the commit
+        """
+
+        while True:
+            entry = heapq.heappop(self.queue)
+            object_id = entry[-1]
+            if self.pending_children.get(object_id, 0) == 0:
+                return object_id
+            self.blocked[object_id] = entry
+
+
+    def finish_children(self, parents):
+        """Marks one child of each parent as drawn, queueing parents that have no children left to draw
+
+        Parameters
+        ----------
+        parents : list of str
+            Parents of the drawn commit
+        """
+
+        for parent in parents:
+            num_pending = self.pending_children.pop(parent) - 1
+            if num_pending > 0:
+                self.pending_children[parent] = num_pending
+            elif parent in self.blocked:
+                heapq.heappush(self.queue, self.blocked.pop(parent))
+
+
+    def is_complete(self):
+        """Checks if all of history has been laid out
+
+        Returns
+        -------
+        complete : bool
+            True if there are no more commits to draw
+        """
+
+        return len(self.queue) == 0
+
+
+    def get_free_lane(self, start):
+        """Finds the first empty lane at or after an index, adding a lane if none are empty
+
+        Parameters
+        ----------
+        start : int
+            First lane index to consider
+
+        Returns
+        -------
+        lane : int
+            Index of the empty lane
+        """
+
+        for i in range(start, len(self.lanes)):
+            if self.lanes[i] is None:
+                return i
+        self.lanes.append(None)
+        return len(self.lanes) - 1
+
+
+    def collapse_lanes(self):
+        """Closes gaps left by finished lanes, moving the lanes right of a gap one column left per line
+
+        Returns
+        -------
+        lines : list of str
+            Graph lines drawing the moved lanes
+        """
+
+        lines = []
+        while None in self.lanes:
+            gap = self.lanes.index(None)
+            marks = {}
+            for i in range(gap + 1, len(self.lanes)):
+                if self.lanes[i] is not None:
+                    marks[2 * i - 1] = '/'
+                    marks[2 * i] = ' '
+            lines.append(draw_lanes(self.lanes, marks))
+            del self.lanes[gap]
+        return lines
+
+
+    def layout_next(self):
+        """Lays out the lanes of the next commit in the walk
+
+        Returns
+        -------
+        row : GraphRow
+            The drawn row, or None if the walk is complete
+        """
+
+        if self.is_complete():
+            return None
+        object_id = self.take_next_commit()
+        parents = self.queued_parents.pop(object_id)
+        self.drawn.add(object_id)
+        lines = []
+
+        if object_id in self.lanes:
+            column = self.lanes.index(object_id)
+        else:
+            column = self.get_free_lane(0)
+            self.lanes[column] = object_id
+
+        # Other lanes waiting for this commit join its column, drawn above it
+        joining = [i for i, lane in enumerate(self.lanes) if lane == object_id and i != column]
+        if len(joining) > 0:
+            marks = {}
+            for i in joining:
+                add_edge_marks(marks, i, column)
+                marks[2 * i] = ' '
+            lines.append(draw_lanes(self.lanes, marks))
+            for i in joining:
+                self.lanes[i] = None
+        commit_line = len(lines)
+        lines.append(draw_lanes(self.lanes, {2 * column: '*'}))
+
+        # The first parent continues this column, further parents fork new lanes or join existing ones
+        marks = {}
+        self.lanes[column] = None
+        for i, parent in enumerate(parents):
+            if parent in self.drawn:
+                # Only possible with skewed clocks and no generation numbers, where a lane would never close
+                continue
+            if parent in self.lanes:
+                target = self.lanes.index(parent)
+                if i == 0 and target > column:
+                    # Pull the lane already waiting for the first parent back into this column
+                    add_edge_marks(marks, target, column)
+                    marks[2 * target] = ' '
+                    self.lanes[target] = None
+                    self.lanes[column] = parent
+                else:
+                    add_edge_marks(marks, column, target)
+                continue
+            if i == 0:
+                lane = column
+            else:
+                lane = self.get_free_lane(column + 1)
+                add_edge_marks(marks, column, lane)
+                marks[2 * lane] = ' '
+            self.lanes[lane] = parent
+            self.add_to_queue(parent)
+        if len(marks) > 0:
+            lines.append(draw_lanes(self.lanes, marks))
+        while len(self.lanes) > 0 and self.lanes[-1] is None:
+            self.lanes.pop()
+        lines.extend(self.collapse_lanes())
+        self.finish_children(parents)
+
+        row = GraphRow(object_id, lines, commit_line)
+        self.rows.append(row)
+        return row
+
+
+    def load_rows(self, num_rows):
+        """Lays out commits until at least num_rows rows exist, or history is complete
+
+        Parameters
+        ----------
+        num_rows : int
+            Number of rows required
+        """
+
+        while len(self.rows) < num_rows and not self.is_complete():
+            self.layout_next()
+
+
+class CommitGraphView:
+    """Class rendering a window of the commit graph as text
+
+    Attributes
+    ----------
+    walker : CommitGraphWalker
+        Walker laying out the graph rows
+    decorations : dict of str -> list of str
+        Ref names pointing to each commit
+    window_start : int
+        Index of the first row in the displayed window
+    window_size : int
+        Number of rows displayed at a time
+    """
+
+    def __init__(self, walker, decorations, window_size=WINDOW_SIZE):
+        """Constructor for CommitGraphView
+        """
+
+        self.walker         = walker
+        self.decorations    = decorations
+        self.window_start   = 0
+        self.window_size    = window_size
+        self.walker.load_rows(window_size)
+
+
+    def render_window(self):
+        """Renders the rows of the current window, reading the subjects of their commits
+
+        Returns
+        -------
+        text : str
+            Graph lines, with the abbreviated hash, ref names and subject of each commit
+        """
+
+        rows = self.walker.rows[self.window_start:self.window_start + self.window_size]
+        width = 0
+        for row in rows:
+            width = max([width] + [len(line) for line in row.lines])
+        text_lines = []
+        for row in rows:
+            for i, line in enumerate(row.lines):
+                if i != row.commit_line:
+                    text_lines.append(line)
+                    continue
+                description = row.object_id[:ABBREV_LENGTH]
+                if row.object_id in self.decorations:
+                    description = '{} ({})'.format(description, ', '.join(self.decorations[row.object_id]))
+                subject = self.walker.source.get_subject(row.object_id)
+                text_lines.append('{} {} {}'.format(line.ljust(width), description, subject))
+        return '\n'.join(text_lines)
+
+
+    def get_window_description(self):
+        """Describes the displayed rows, for the info panel title
+
+        Returns
+        -------
+        description : str
+            Range of commits displayed, and whether more history remains
+        """
+
+        num_rows = len(self.walker.rows)
+        window_end = min(self.window_start + self.window_size, num_rows)
+        if self.walker.is_complete():
+            return 'commits {}-{} of {}'.format(self.window_start + 1, window_end, num_rows)
+        return 'commits {}-{}, more - PgDn'.format(self.window_start + 1, window_end)
+
+
+    def scroll_window(self, num_windows):
+        """Moves the displayed window, laying out deeper history as required
+
+        Parameters
+        ----------
+        num_windows : int
+            Number of windows to move, negative to move back
+
+        Returns
+        -------
+        moved : bool
+            True if the displayed window changed
+        """
+
+        new_start = max(self.window_start + num_windows * self.window_size, 0)
+        self.walker.load_rows(new_start + self.window_size)
+        if new_start >= len(self.walker.rows):
+            new_start = max(len(self.walker.rows) - self.window_size, 0)
+        if new_start == self.window_start:
+            return False
+        self.window_start = new_start
+        return True
+
+
+def open_commit_graph(repo_path='.', window_size=WINDOW_SIZE):
+    """Starts a commit graph walk from all repository refs, laying out the first window
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+    window_size : int
+        Number of rows displayed at a time
+
+    Returns
+    -------
+    view : CommitGraphView
+        View of the first window, or None if the refs could not be listed
+    out : str
+        Output of the failed command if the refs could not be listed, otherwise None
+    """
+
+    tips, decorations, out = get_ref_tips(repo_path)
+    if out is not None:
+        return None, out
+    source = CommitSource(repo_path)
+    view = CommitGraphView(CommitGraphWalker(source, tips), decorations, window_size=window_size)
+    LOGGER.write('Laid out {} graph rows, {} commits read from commit-graph, {} from objects'.format(len(view.walker.rows),
+                                                                                                   source.num_graph_reads,
+                                                                                                   source.num_object_reads))
+    return view, None
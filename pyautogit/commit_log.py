@@ -0,0 +1,213 @@
+"""Module for loading the commit log in pages, with a cache per branch.
+
+Listing the full history of a branch with hundreds of thousands of commits is slow and memory
+hungry, so only the most recent page of commits is loaded at first, and older pages are loaded
+as the user scrolls. The loaded commits are kept per branch along with the tip they were loaded
+from, so that a refresh only needs to add commits newer than those already loaded.
+
+This file should remain separate from the CUI interface.
+"""
+
+import pyautogit.commands
+import pyautogit.logger as LOGGER
+
+
+# Number of commits loaded at a time
+PAGE_SIZE = 200
+
+
+class BranchLog:
+    """Class storing the commits loaded for a single branch
+
+    Attributes
+    ----------
+    tip : str
+        Hash of the commit the log was loaded from
+    commits : list of str
+        Oneline log entries loaded so far, newest first
+    complete : bool
+        True if the full history has been loaded
+    """
+
+    def __init__(self, tip, commits, complete):
+        """Constructor for BranchLog
+        """
+
+        self.tip        = tip
+        self.commits    = commits
+        self.complete   = complete
+
+
+def get_commit_hash(log_entry):
+    """Gets the commit hash from a oneline log entry
+
+    Parameters
+    ----------
+    log_entry : str
+        Oneline log entry (ex. 'c2b0e03 Initial commit')
+
+    Returns
+    -------
+    commit_hash : str
+        The abbreviated commit hash
+    """
+
+    return log_entry.split(' ', 1)[0]
+
+
+class CommitLogPager:
+    """Class that loads and caches commit log pages per branch
+
+    Attributes
+    ----------
+    page_size : int
+        Number of commits loaded at a time
+    branch_logs : dict of str -> BranchLog
+        Loaded commits, keyed on branch, tag, or commit name
+    """
+
+    def __init__(self, page_size=PAGE_SIZE):
+        """Constructor for CommitLogPager
+        """
+
+        self.page_size = page_size
+        self.branch_logs = {}
+
+
+    def update_head(self, branch, first_page):
+        """Merges a freshly loaded first page of commits into the cached log for a branch
+
+        If the previous tip is found in the new page, and every commit added since it is listed above
+        it, only the newer commits are added in front of the cached log. Otherwise, history was
+        rewritten, too many commits were added, or added commits are older than the previous tip
+        (ex. from a merged branch) and so are listed after it, and the cached log is replaced with
+        the new page.
+
+        Parameters
+        ----------
+        branch : str
+            Name of the branch, tag or commit logged
+        first_page : list of str
+            Up to page_size most recent oneline log entries
+
+        Returns
+        -------
+        commits : list of str
+            All commits loaded for the branch
+        """
+
+        complete = len(first_page) < self.page_size
+        if len(first_page) == 0:
+            self.branch_logs[branch] = BranchLog(None, [], True)
+            return []
+
+        new_tip = get_commit_hash(first_page[0])
+        cached = self.branch_logs.get(branch)
+        if cached is not None and cached.tip is not None:
+            if cached.tip == new_tip:
+                return cached.commits
+            page_hashes = [get_commit_hash(entry) for entry in first_page]
+            if cached.tip in page_hashes and self.count_new_commits(cached.tip, new_tip) == page_hashes.index(cached.tip):
+                new_commits = first_page[:page_hashes.index(cached.tip)]
+                LOGGER.write('Adding {} new commits to cached log of {}'.format(len(new_commits), branch))
+                cached.commits = new_commits + cached.commits
+                cached.tip = new_tip
+                return cached.commits
+
+        self.branch_logs[branch] = BranchLog(new_tip, list(first_page), complete)
+        return self.branch_logs[branch].commits
+
+
+    def count_new_commits(self, old_tip, new_tip):
+        """Counts the commits reachable from a new tip but not from the previous one
+
+        Parameters
+        ----------
+        old_tip : str
+            Hash of the previously loaded tip
+        new_tip : str
+            Hash of the new tip
+
+        Returns
+        -------
+        count : int
+            Number of new commits, or None if they could not be counted
+        """
+
+        out, err = pyautogit.commands.git_count_commits('{}..{}'.format(old_tip, new_tip))
+        if err != 0:
+            return None
+        return int(out.strip())
+
+
+    def load_first_page(self, branch):
+        """Loads the most recent page of commits for a branch, reusing cached commits where possible
+
+        Parameters
+        ----------
+        branch : str
+            Name of the branch, tag or commit to log
+
+        Returns
+        -------
+        commits : list of str
+            All commits loaded for the branch
+        out : str
+            Output of the log command if it failed, otherwise empty
+        err : int
+            Error code if failure, 0 otherwise
+        """
+
+        out, err = pyautogit.commands.git_get_recent_commits(branch, max_count=self.page_size)
+        if err != 0:
+            return [], out, err
+        return self.update_head(branch, out.splitlines()), '', 0
+
+
+    def load_next_page(self, branch):
+        """Loads the next page of older commits for a branch
+
+        Pages are read relative to the cached tip, so commits added to the branch since the
+        log was loaded do not shift the page offsets.
+
+        Parameters
+        ----------
+        branch : str
+            Name of the branch, tag or commit to log
+
+        Returns
+        -------
+        new_commits : list of str
+            The newly loaded older commits, empty if the log is complete or not loaded
+        """
+
+        cached = self.branch_logs.get(branch)
+        if cached is None or cached.complete or cached.tip is None:
+            return []
+        out, err = pyautogit.commands.git_get_recent_commits(cached.tip, max_count=self.page_size, skip=len(cached.commits))
+        if err != 0:
+            return []
+        new_commits = out.splitlines()
+        if len(new_commits) < self.page_size:
+            cached.complete = True
+        cached.commits = cached.commits + new_commits
+        LOGGER.write('Loaded {} older commits for {}'.format(len(new_commits), branch))
+        return new_commits
+
+
+    def is_complete(self, branch):
+        """Checks if the full history of a branch has been loaded
+
+        Parameters
+        ----------
+        branch : str
+            Name of the branch, tag or commit
+
+        Returns
+        -------
+        complete : bool
+            True if no older commits remain to be loaded
+        """
+
+        cached = self.branch_logs.get(branch)
+        return cached is None or cached.complete
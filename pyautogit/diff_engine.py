@@ -0,0 +1,555 @@
+"""Module for viewing large git diffs without holding them in memory.
+
+git diff output is streamed into a spooled temporary file, and while it is written the byte
+offsets of each file and hunk are indexed, along with a checkpoint every few hundred lines of
+large hunks. A view over the index then renders only a window of lines at a time, reading just
+the parts of the file it needs. Hunks that are too long to show in full start out collapsed to
+their header, and can be expanded on demand.
+
+The diff can be streamed from a background thread while a view renders it, so the index is
+guarded by a lock, and the view shows the rows received so far.
+
+This file should remain separate from the CUI interface.
+"""
+
+import tempfile
+import threading
+from array import array
+
+
+# Hunks with more lines than this start out collapsed
+MAX_EXPANDED_HUNK_LINES = 400
+
+# Number of lines between byte offset checkpoints within a hunk
+CHECKPOINT_LINES = 256
+
+# Lines longer than this are cut off when rendered (ex. minified files)
+MAX_LINE_LENGTH = 1000
+
+# Diffs smaller than this are kept in memory rather than written to disk
+SPOOL_SIZE = 1024 * 1024
+
+# Number of rows rendered at a time
+WINDOW_SIZE = 1000
+
+
+class DiffHunk:
+    """Class representing the location of a single hunk in the diff output
+
+    Attributes
+    ----------
+    header : str
+        The hunk header line (ex. '@@ -1,4 +1,5 @@')
+    offset : int
+        Byte offset of the hunk header in the diff output
+    num_lines : int
+        Number of lines in the hunk, including the header
+    additions : int
+        Number of added lines
+    deletions : int
+        Number of removed lines
+    checkpoints : array.array of int
+        Byte offset of every CHECKPOINT_LINES-th line of the hunk, starting with the header
+    """
+
+    __slots__ = ['header', 'offset', 'num_lines', 'additions', 'deletions', 'checkpoints']
+
+    def __init__(self, header, offset):
+        """Constructor for DiffHunk
+        """
+
+        self.header         = header
+        self.offset         = offset
+        self.num_lines      = 0
+        self.additions      = 0
+        self.deletions      = 0
+        self.checkpoints    = array('q')
+
+
+class DiffFile:
+    """Class representing the location of the diff of a single file in the diff output
+
+    Attributes
+    ----------
+    header : str
+        The 'diff --git' line of the file
+    offset : int
+        Byte offset of the header in the diff output
+    num_header_lines : int
+        Number of lines before the first hunk (ex. index, mode and ---/+++ lines)
+    hunks : list of DiffHunk
+        Hunks of the file
+    """
+
+    __slots__ = ['header', 'offset', 'num_header_lines', 'hunks']
+
+    def __init__(self, header, offset):
+        """Constructor for DiffFile
+        """
+
+        self.header             = header
+        self.offset             = offset
+        self.num_header_lines   = 0
+        self.hunks              = []
+
+
+    def get_additions(self):
+        """Counts added lines in the file
+
+        Returns
+        -------
+        additions : int
+            Number of added lines across all hunks
+        """
+
+        return sum([hunk.additions for hunk in self.hunks])
+
+
+    def get_deletions(self):
+        """Counts removed lines in the file
+
+        Returns
+        -------
+        deletions : int
+            Number of removed lines across all hunks
+        """
+
+        return sum([hunk.deletions for hunk in self.hunks])
+
+
+class DiffIndex:
+    """Class that stores streamed diff output, indexing file and hunk offsets as it arrives
+
+    Attributes
+    ----------
+    files : list of DiffFile
+        Indexed files, in diff order
+    preamble_lines : int
+        Number of lines before the first file header, usually 0
+    size : int
+        Number of bytes of diff output received
+    num_lines : int
+        Number of lines of diff output indexed
+    finished : bool
+        True once all diff output was received
+    storage : tempfile.SpooledTemporaryFile
+        Holds the raw diff output
+    partial : bytes
+        Trailing incomplete line of the last received chunk
+    lock : threading.RLock
+        Lock held while output is added or read, so a view can render while the diff streams
+    """
+
+    def __init__(self):
+        """Constructor for DiffIndex
+        """
+
+        self.files          = []
+        self.preamble_lines = 0
+        self.size           = 0
+        self.num_lines      = 0
+        self.finished       = False
+        self.storage        = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self.partial        = b''
+        self.lock           = threading.RLock()
+
+
+    def feed(self, chunk):
+        """Appends a chunk of diff output, indexing every line it completes
+
+        Parameters
+        ----------
+        chunk : bytes
+            Raw diff output
+        """
+
+        with self.lock:
+            self.storage.write(chunk)
+            data = self.partial + chunk
+            line_offset = self.size - len(self.partial)
+            self.size = self.size + len(chunk)
+            start = 0
+            while True:
+                end = data.find(b'\n', start)
+                if end < 0:
+                    break
+                self.index_line(data[start:end], line_offset + start)
+                start = end + 1
+            self.partial = data[start:]
+
+
+    def finish(self):
+        """Indexes the last line of output if it did not end with a newline
+        """
+
+        with self.lock:
+            if len(self.partial) > 0:
+                self.index_line(self.partial, self.size - len(self.partial))
+                self.storage.write(b'\n')
+                self.size = self.size + 1
+                self.partial = b''
+            self.finished = True
+
+
+    def index_line(self, line, offset):
+        """Adds a single line of diff output to the index
+
+        Parameters
+        ----------
+        line : bytes
+            Line without its newline
+        offset : int
+            Byte offset of the line in the diff output
+        """
+
+        self.num_lines = self.num_lines + 1
+        if line.startswith(b'diff --git '):
+            self.files.append(DiffFile(decode_line(line), offset))
+            return
+        if len(self.files) == 0:
+            self.preamble_lines = self.preamble_lines + 1
+            return
+        diff_file = self.files[-1]
+        if line.startswith(b'@@'):
+            diff_file.hunks.append(DiffHunk(decode_line(line), offset))
+        elif len(diff_file.hunks) == 0:
+            diff_file.num_header_lines = diff_file.num_header_lines + 1
+            return
+        hunk = diff_file.hunks[-1]
+        if hunk.num_lines % CHECKPOINT_LINES == 0:
+            hunk.checkpoints.append(offset)
+        hunk.num_lines = hunk.num_lines + 1
+        if line.startswith(b'+'):
+            hunk.additions = hunk.additions + 1
+        elif line.startswith(b'-'):
+            hunk.deletions = hunk.deletions + 1
+
+
+    def read_lines(self, offset, count):
+        """Reads lines of diff output
+
+        Parameters
+        ----------
+        offset : int
+            Byte offset of the first line to read
+        count : int
+            Number of lines to read
+
+        Returns
+        -------
+        lines : list of str
+            Decoded lines, cut off at MAX_LINE_LENGTH characters
+        """
+
+        lines = []
+        with self.lock:
+            self.storage.seek(offset)
+            for _ in range(count):
+                line = self.storage.readline()
+                if len(line) == 0:
+                    break
+                lines.append(decode_line(line.rstrip(b'\n')))
+            self.storage.seek(0, 2)
+        return lines
+
+
+    def read_hunk_lines(self, hunk, start, count):
+        """Reads lines of a hunk, starting from the nearest checkpoint
+
+        Parameters
+        ----------
+        hunk : DiffHunk
+            Hunk to read from
+        start : int
+            Index of the first line within the hunk, 0 being the header
+        count : int
+            Number of lines to read
+
+        Returns
+        -------
+        lines : list of str
+            Decoded lines
+        """
+
+        count = min(count, hunk.num_lines - start)
+        if count <= 0:
+            return []
+        checkpoint = start // CHECKPOINT_LINES
+        skip = start - checkpoint * CHECKPOINT_LINES
+        return self.read_lines(hunk.checkpoints[checkpoint], skip + count)[skip:]
+
+
+    def get_num_lines(self):
+        """Counts lines in the full diff
+
+        Returns
+        -------
+        num_lines : int
+            Number of lines of diff output
+        """
+
+        return self.num_lines
+
+
+    def close(self):
+        """Discards the stored diff output
+        """
+
+        with self.lock:
+            self.storage.close()
+
+
+def decode_line(line):
+    """Decodes a line of diff output for display
+
+    Parameters
+    ----------
+    line : bytes
+        Raw line
+
+    Returns
+    -------
+    decoded : str
+        Decoded line, cut off at MAX_LINE_LENGTH characters
+    """
+
+    if len(line) > MAX_LINE_LENGTH:
+        return line[:MAX_LINE_LENGTH].decode(errors='replace') + ' ...'
+    return line.decode(errors='replace').rstrip('\r')
+
+
+class DiffView:
+    """Class that renders a window of an indexed diff, tracking which files and hunks are collapsed
+
+    The diff is treated as a list of rows. An expanded file contributes its header lines and its
+    hunks, a collapsed file contributes a single summary row. Likewise an expanded hunk contributes
+    all of its lines, and a collapsed hunk a single summary row.
+
+    Attributes
+    ----------
+    index : DiffIndex
+        The indexed diff
+    window_size : int
+        Maximum number of rows rendered at once
+    window_start : int
+        First rendered row
+    collapsed_files : set of int
+        Indexes of collapsed files
+    hunk_overrides : set of tuple of (int, int)
+        (file index, hunk index) of hunks toggled away from their default state
+    row_targets : list of tuple
+        For each rendered row, the (file index, hunk index) it belongs to, with a hunk index of
+        None for file header rows
+    """
+
+    def __init__(self, index, window_size=WINDOW_SIZE):
+        """Constructor for DiffView
+        """
+
+        self.index              = index
+        self.window_size        = window_size
+        self.window_start       = 0
+        self.collapsed_files    = set()
+        self.hunk_overrides     = set()
+        self.row_targets        = []
+
+
+    def is_hunk_expanded(self, file_index, hunk_index):
+        """Checks if a hunk is shown in full
+
+        Parameters
+        ----------
+        file_index : int
+            Index of the file
+        hunk_index : int
+            Index of the hunk within the file
+
+        Returns
+        -------
+        expanded : bool
+            True if the hunk is expanded
+        """
+
+        hunk = self.index.files[file_index].hunks[hunk_index]
+        default_expanded = hunk.num_lines <= MAX_EXPANDED_HUNK_LINES
+        return default_expanded != ((file_index, hunk_index) in self.hunk_overrides)
+
+
+    def get_sections(self):
+        """Lists the rows of the diff as sections, without reading any diff output
+
+        Returns
+        -------
+        sections : list of tuple
+            (file index, hunk index, number of rows) per file header, collapsed file, or hunk
+        """
+
+        sections = []
+        for file_index, diff_file in enumerate(self.index.files):
+            if file_index in self.collapsed_files:
+                sections.append((file_index, None, 1))
+                continue
+            sections.append((file_index, None, 1 + diff_file.num_header_lines))
+            for hunk_index, hunk in enumerate(diff_file.hunks):
+                num_rows = hunk.num_lines if self.is_hunk_expanded(file_index, hunk_index) else 1
+                sections.append((file_index, hunk_index, num_rows))
+        return sections
+
+
+    def get_num_rows(self):
+        """Counts rows in the diff with the current collapsed state
+
+        Returns
+        -------
+        num_rows : int
+            Number of rows
+        """
+
+        return sum([num_rows for _, _, num_rows in self.get_sections()])
+
+
+    def render_section_rows(self, file_index, hunk_index, start, count):
+        """Renders some rows of a single section
+
+        Parameters
+        ----------
+        file_index : int
+            Index of the file
+        hunk_index : int
+            Index of the hunk, None for the file header
+        start : int
+            First row within the section
+        count : int
+            Number of rows to render
+
+        Returns
+        -------
+        rows : list of str
+            Rendered rows
+        """
+
+        diff_file = self.index.files[file_index]
+        if hunk_index is None:
+            if file_index in self.collapsed_files:
+                return ['{}  [{} hunks, +{} -{} collapsed]'.format(diff_file.header, len(diff_file.hunks), diff_file.get_additions(), diff_file.get_deletions())]
+            return self.index.read_lines(diff_file.offset, start + count)[start:]
+        hunk = diff_file.hunks[hunk_index]
+        if not self.is_hunk_expanded(file_index, hunk_index):
+            return ['{}  [{} lines, +{} -{} collapsed]'.format(hunk.header, hunk.num_lines - 1, hunk.additions, hunk.deletions)]
+        return self.index.read_hunk_lines(hunk, start, count)
+
+
+    def render_window(self):
+        """Renders the rows of the current window
+
+        Returns
+        -------
+        text : str
+            Rendered rows, one per line
+        """
+
+        window_end = self.window_start + self.window_size
+        rows = []
+        self.row_targets = []
+        with self.index.lock:
+            if self.window_start < self.index.preamble_lines:
+                preamble = self.index.read_lines(0, min(self.index.preamble_lines, window_end))[self.window_start:]
+                rows.extend(preamble)
+                self.row_targets.extend([(None, None)] * len(preamble))
+            row = self.index.preamble_lines
+            for file_index, hunk_index, num_rows in self.get_sections():
+                if row >= window_end:
+                    break
+                if row + num_rows > self.window_start:
+                    start = max(self.window_start - row, 0)
+                    count = min(num_rows - start, window_end - row - start)
+                    section_rows = self.render_section_rows(file_index, hunk_index, start, count)
+                    rows.extend(section_rows)
+                    self.row_targets.extend([(file_index, hunk_index)] * len(section_rows))
+                row = row + num_rows
+        return '\n'.join(rows)
+
+
+    def get_window_description(self):
+        """Describes the rendered window for display in a title
+
+        Returns
+        -------
+        description : str
+            Empty if the whole diff was received and fits in the window, otherwise the range of rows
+            shown, and whether more rows are still being received
+        """
+
+        with self.index.lock:
+            num_rows = self.index.preamble_lines + self.get_num_rows()
+            finished = self.index.finished
+        if self.window_start == 0 and num_rows <= self.window_size:
+            return '' if finished else 'loading'
+        window_end = min(self.window_start + self.window_size, num_rows)
+        if not finished:
+            return 'rows {}-{} of {}+, loading'.format(self.window_start + 1, window_end, num_rows)
+        return 'rows {}-{} of {}'.format(self.window_start + 1, window_end, num_rows)
+
+
+    def scroll_window(self, num_windows):
+        """Moves the window by whole windows, staying within the diff
+
+        Parameters
+        ----------
+        num_windows : int
+            Number of windows to move forward, negative to move back
+
+        Returns
+        -------
+        moved : bool
+            False if the window was already at the start or end of the diff
+        """
+
+        with self.index.lock:
+            num_rows = self.index.preamble_lines + self.get_num_rows()
+        last_start = max(num_rows - 1, 0) // self.window_size * self.window_size
+        new_start = min(max(self.window_start + num_windows * self.window_size, 0), last_start)
+        moved = new_start != self.window_start
+        self.window_start = new_start
+        return moved
+
+
+    def toggle_row(self, row):
+        """Expands or collapses the hunk or file of a rendered row
+
+        The window is moved so that the toggled hunk or file is its first row.
+
+        Parameters
+        ----------
+        row : int
+            Row within the rendered window
+
+        Returns
+        -------
+        toggled : bool
+            False if the row does not belong to a file or hunk
+        """
+
+        if row < 0 or row >= len(self.row_targets):
+            return False
+        file_index, hunk_index = self.row_targets[row]
+        if file_index is None:
+            return False
+        if hunk_index is None:
+            if file_index in self.collapsed_files:
+                self.collapsed_files.remove(file_index)
+            else:
+                self.collapsed_files.add(file_index)
+        elif (file_index, hunk_index) in self.hunk_overrides:
+            self.hunk_overrides.remove((file_index, hunk_index))
+        else:
+            self.hunk_overrides.add((file_index, hunk_index))
+
+        new_start = self.index.preamble_lines
+        with self.index.lock:
+            for section_file, section_hunk, num_rows in self.get_sections():
+                if section_file == file_index and section_hunk == hunk_index:
+                    break
+                new_start = new_start + num_rows
+        self.window_start = new_start
+        return True
@@ -0,0 +1,186 @@
+"""Module for listing directories with many entries in the editor file browser.
+
+A single os.scandir pass collects the name and type of every entry, using the type cached by
+the directory read itself rather than a stat call per entry. The cached entries can then be
+filtered and paged into a menu without touching the filesystem again, and updated one entry at
+a time when a file is saved or created.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import fnmatch
+
+
+# Prefix marking directories in the file browser
+DIR_PREFIX = '<DIR> '
+
+# Prefix of the file browser item that loads the next page of entries
+MORE_PREFIX = '<MORE> '
+
+# Number of entries added to the file browser at a time
+PAGE_SIZE = 500
+
+
+class DirEntryInfo:
+    """Class holding the cached name and type of a directory entry
+
+    Attributes
+    ----------
+    name : str
+        Name of the entry
+    is_dir : bool
+        True if the entry is a directory, or a link to one
+    """
+
+    __slots__ = ['name', 'is_dir']
+
+    def __init__(self, name, is_dir):
+        """Constructor for DirEntryInfo
+        """
+
+        self.name   = name
+        self.is_dir = is_dir
+
+
+    def __str__(self):
+        """Formats the entry as displayed in the file browser
+        """
+
+        if self.is_dir:
+            return DIR_PREFIX + self.name
+        return self.name
+
+
+class DirListing:
+    """Class holding a cached, filterable listing of a directory
+
+    Attributes
+    ----------
+    path : str
+        Path of the listed directory
+    entries : list of DirEntryInfo
+        Every entry in the directory, in scandir order
+    filter_text : str
+        Current filter, empty if all entries are shown
+    filtered : list of DirEntryInfo
+        Entries matching the current filter
+    """
+
+    def __init__(self, path):
+        """Constructor for DirListing
+        """
+
+        self.path           = path
+        self.entries        = []
+        self.filter_text    = ''
+        self.filtered       = []
+
+
+    def scan(self):
+        """Reads the directory entries, replacing the cached listing
+
+        Raises
+        ------
+        OSError
+            If the directory cannot be read
+        """
+
+        entries = []
+        # The scandir iterator only supports the context manager protocol from python 3.6
+        dir_iterator = os.scandir(self.path)
+        try:
+            for dir_entry in dir_iterator:
+                try:
+                    is_dir = dir_entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append(DirEntryInfo(dir_entry.name, is_dir))
+        finally:
+            if hasattr(dir_iterator, 'close'):
+                dir_iterator.close()
+        self.entries = entries
+        self.apply_filter()
+
+
+    def matches_filter(self, entry):
+        """Checks if an entry matches the current filter
+
+        Filters containing wildcards are matched as glob patterns, others as substrings.
+        Both ignore case.
+
+        Parameters
+        ----------
+        entry : DirEntryInfo
+            The entry to check
+
+        Returns
+        -------
+        matches : bool
+            True if the entry should be shown
+        """
+
+        if len(self.filter_text) == 0:
+            return True
+        name = entry.name.lower()
+        pattern = self.filter_text.lower()
+        if any([char in pattern for char in '*?[']):
+            return fnmatch.fnmatchcase(name, pattern)
+        return pattern in name
+
+
+    def apply_filter(self, filter_text=None):
+        """Recomputes the filtered entries from the cached listing
+
+        Parameters
+        ----------
+        filter_text : str
+            Default None, otherwise the new filter. Empty shows all entries
+        """
+
+        if filter_text is not None:
+            self.filter_text = filter_text.strip()
+        self.filtered = [entry for entry in self.entries if self.matches_filter(entry)]
+
+
+    def update_entry(self, name):
+        """Adds, updates or removes a single cached entry after it was changed
+
+        Parameters
+        ----------
+        name : str
+            Name of the changed entry in the listed directory
+        """
+
+        entry_path = os.path.join(self.path, name)
+        exists = os.path.lexists(entry_path)
+        for i, entry in enumerate(self.entries):
+            if entry.name == name:
+                if exists:
+                    entry.is_dir = os.path.isdir(entry_path)
+                else:
+                    del self.entries[i]
+                break
+        else:
+            if exists:
+                self.entries.append(DirEntryInfo(name, os.path.isdir(entry_path)))
+        self.apply_filter()
+
+
+    def get_page(self, start, count=PAGE_SIZE):
+        """Gets a page of the filtered entries
+
+        Parameters
+        ----------
+        start : int
+            Index of the first filtered entry
+        count : int
+            Maximum number of entries
+
+        Returns
+        -------
+        page : list of str
+            Entries formatted as displayed in the file browser
+        """
+
+        return [str(entry) for entry in self.filtered[start:start + count]]
@@ -2,4 +2,11 @@
 
 Author: Jakub Wlodek  
 Created: 01-Oct-19
-"""
\ No newline at end of file
+"""
+
+
+class UnsupportedRepositoryError(Exception):
+    """Error raised when a repository cannot be read in-process, and the git CLI must be used instead
+    """
+
+    pass
@@ -0,0 +1,208 @@
+"""Module for speeding up git status on large worktrees.
+
+Most of the time spent by git status on a large worktree goes into checking every file for
+modifications, and searching every directory for untracked files. Two git features avoid this:
+the untracked cache, stored in the index, remembers which directories have not changed since the
+last search, and the built-in fsmonitor daemon tells git which files changed since it last asked.
+Fast status mode detects whether each is configured or available for a repository, enables the
+ones that are not explicitly disabled for its status commands, and can skip untracked files
+entirely.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import pyautogit.commands
+import pyautogit.logger as LOGGER
+
+
+class FastStatusSupport:
+    """Class representing the fast status features available in a repository
+
+    Attributes
+    ----------
+    untracked_cache_config : str
+        Value of core.untrackedCache, None if unset
+    fsmonitor_config : str
+        Value of core.fsmonitor, None if unset
+    fsmonitor_daemon : bool
+        True if the installed git has a built-in fsmonitor daemon for this platform
+    """
+
+    def __init__(self, untracked_cache_config, fsmonitor_config, fsmonitor_daemon):
+        """Constructor for FastStatusSupport
+        """
+
+        self.untracked_cache_config = untracked_cache_config
+        self.fsmonitor_config       = fsmonitor_config
+        self.fsmonitor_daemon       = fsmonitor_daemon
+
+
+    def uses_untracked_cache(self):
+        """Checks if status will use the untracked cache in fast mode
+
+        Returns
+        -------
+        used : bool
+            False only if the repository explicitly disables the untracked cache
+        """
+
+        return self.untracked_cache_config != 'false'
+
+
+    def uses_fsmonitor(self):
+        """Checks if status will use a filesystem monitor in fast mode
+
+        Returns
+        -------
+        used : bool
+            True if a monitor is configured, or the built-in daemon is available and not disabled
+        """
+
+        if self.fsmonitor_config is None:
+            return self.fsmonitor_daemon
+        return self.fsmonitor_config != 'false'
+
+
+    def get_config_options(self):
+        """Gets the -c options that enable the features not already configured
+
+        Returns
+        -------
+        config_options : str
+            Options to place before the git subcommand, None if none are needed
+        """
+
+        options = []
+        if self.untracked_cache_config in [None, 'keep']:
+            options.append('-c core.untrackedCache=true')
+        if self.fsmonitor_config is None and self.fsmonitor_daemon:
+            options.append('-c core.fsmonitor=true')
+        if len(options) == 0:
+            return None
+        return ' '.join(options)
+
+
+def detect_fast_status_support(repo_path='.'):
+    """Checks which fast status features a repository has configured or available
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+
+    Returns
+    -------
+    support : FastStatusSupport
+        The detected features
+    """
+
+    commands = [('git config --get core.untrackedCache', 'git_get_untracked_cache_config'),
+                ('git config --get core.fsmonitor', 'git_get_fsmonitor_config'),
+                ('git fsmonitor--daemon status', 'git_fsmonitor_status')]
+    results = pyautogit.commands.handle_concurrent_commands(commands, cwd=repo_path)
+
+    # config --get exits with 1 if the key is not set
+    configs = []
+    for out, err in results[:2]:
+        configs.append(out.strip().lower() if err == 0 and len(out.strip()) > 0 else None)
+
+    # The daemon status exits with 0 if it is running, and reports that it is not watching the
+    # repository if it is supported but stopped. Older git, or unsupported platforms, fail otherwise.
+    daemon_out, daemon_err = results[2]
+    fsmonitor_daemon = daemon_err == 0 or 'not watching' in daemon_out
+    support = FastStatusSupport(configs[0], configs[1], fsmonitor_daemon)
+    LOGGER.write('Fast status support for {}: untracked cache {}, fsmonitor {}'.format(repo_path, support.uses_untracked_cache(), support.uses_fsmonitor()))
+    return support
+
+
+class FastStatusMode:
+    """Class holding the fast status settings, and the detected support of each repository
+
+    Attributes
+    ----------
+    enabled : bool
+        True if status commands should use fast status features
+    include_untracked : bool
+        False to skip searching for untracked files when fast status is enabled
+    support_cache : dict of str -> FastStatusSupport
+        Detected support, keyed on absolute repository path
+    """
+
+    def __init__(self, enabled=False, include_untracked=True):
+        """Constructor for FastStatusMode
+        """
+
+        self.enabled            = enabled
+        self.include_untracked  = include_untracked
+        self.support_cache      = {}
+
+
+    def get_support(self, repo_path='.'):
+        """Gets the fast status support of a repository, detecting it on first use
+
+        Parameters
+        ----------
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        support : FastStatusSupport
+            The detected features
+        """
+
+        key = os.path.abspath(repo_path)
+        if key not in self.support_cache:
+            self.support_cache[key] = detect_fast_status_support(repo_path)
+        return self.support_cache[key]
+
+
+    def get_status_arguments(self, repo_path='.'):
+        """Gets the arguments status commands should be run with
+
+        Parameters
+        ----------
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        config_options : str
+            Options to place before the status subcommand, None if none are needed
+        include_untracked : bool
+            False if untracked files should not be searched for
+        """
+
+        if not self.enabled:
+            return None, True
+        return self.get_support(repo_path).get_config_options(), self.include_untracked
+
+
+    def get_description(self, repo_path='.'):
+        """Describes the fast status features in use, for display
+
+        Parameters
+        ----------
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        description : str
+            Comma separated list of features in use, empty if fast status is disabled
+        """
+
+        if not self.enabled:
+            return ''
+        support = self.get_support(repo_path)
+        features = []
+        if support.uses_untracked_cache():
+            features.append('untracked cache')
+        if support.uses_fsmonitor():
+            features.append('fsmonitor')
+        if not self.include_untracked:
+            features.append('no untracked')
+        if len(features) == 0:
+            return 'fast'
+        return 'fast: {}'.format(', '.join(features))
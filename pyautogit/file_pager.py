@@ -0,0 +1,145 @@
+"""Module for viewing large files a page at a time.
+
+The file is memory mapped rather than read, so opening it costs neither time nor memory in
+proportion to its size. A sparse line index records the line number at the first line start
+after every block of bytes, and is built with a single pass of C level byte counting. Any line can
+then be found by seeking to the nearest indexed position and skipping less than one block.
+
+This file should remain separate from the CUI interface.
+"""
+
+import mmap
+import bisect
+
+
+# Files larger than this are opened read-only in paged mode by the internal editor
+PAGED_SIZE_THRESHOLD = 4 * 1024 * 1024
+
+# Number of bytes between line index entries
+INDEX_BLOCK_SIZE = 64 * 1024
+
+
+class FilePager:
+    """Class that reads windows of lines from a memory mapped file
+
+    Attributes
+    ----------
+    file_path : str
+        Path to the file
+    size : int
+        Size of the file in bytes
+    num_lines : int
+        Number of lines in the file
+    index_offsets : list of int
+        Byte offsets of indexed line starts, in increasing order
+    index_lines : list of int
+        Line number of each indexed line start
+    fp : file
+        The open file
+    mapped : mmap.mmap
+        Memory map of the file
+    """
+
+    def __init__(self, file_path):
+        """Constructor for FilePager. Opens and indexes the file
+        """
+
+        self.file_path      = file_path
+        self.fp             = open(file_path, 'rb')
+        self.size           = self.fp.seek(0, 2)
+        self.mapped         = None
+        self.index_offsets  = [0]
+        self.index_lines    = [0]
+        self.num_lines      = 0
+        if self.size > 0:
+            self.mapped = mmap.mmap(self.fp.fileno(), 0, access=mmap.ACCESS_READ)
+            self.build_index()
+
+
+    def build_index(self):
+        """Counts lines, recording the first line start of each block in the index
+        """
+
+        line_number = 0
+        block_start = 0
+        while block_start < self.size:
+            block_end = min(block_start + INDEX_BLOCK_SIZE, self.size)
+            newline = self.mapped.find(b'\n', block_start, block_end)
+            if newline >= 0 and newline + 1 < self.size:
+                line_start = newline + 1
+                line_number = line_number + self.mapped[block_start:line_start].count(b'\n')
+                self.index_offsets.append(line_start)
+                self.index_lines.append(line_number)
+                line_number = line_number + self.mapped[line_start:block_end].count(b'\n')
+            else:
+                line_number = line_number + self.mapped[block_start:block_end].count(b'\n')
+            block_start = block_end
+        # A last line without a trailing newline is still a line
+        if not self.mapped[self.size - 1:self.size] == b'\n':
+            line_number = line_number + 1
+        self.num_lines = line_number
+
+
+    def find_line_offset(self, line_number):
+        """Finds the byte offset at which a line starts
+
+        Parameters
+        ----------
+        line_number : int
+            Index of the line, 0 being the first line
+
+        Returns
+        -------
+        offset : int
+            Byte offset of the line start, or the file size if the line does not exist
+        """
+
+        if line_number >= self.num_lines:
+            return self.size
+        position = bisect.bisect_right(self.index_lines, line_number) - 1
+        offset = self.index_offsets[position]
+        for _ in range(line_number - self.index_lines[position]):
+            offset = self.mapped.find(b'\n', offset) + 1
+        return offset
+
+
+    def get_lines(self, start, count):
+        """Reads a window of lines
+
+        Parameters
+        ----------
+        start : int
+            Index of the first line to read
+        count : int
+            Maximum number of lines to read
+
+        Returns
+        -------
+        lines : list of str
+            Decoded lines, with invalid characters replaced
+        """
+
+        if self.mapped is None or start >= self.num_lines:
+            return []
+        start_offset = self.find_line_offset(start)
+        end_offset = start_offset
+        for _ in range(min(count, self.num_lines - start)):
+            newline = self.mapped.find(b'\n', end_offset)
+            if newline < 0:
+                end_offset = self.size
+                break
+            end_offset = newline + 1
+        lines = self.mapped[start_offset:end_offset].decode(errors='replace').split('\n')
+        if len(lines) > 0 and len(lines[-1]) == 0:
+            lines.pop()
+        return [line.rstrip('\r') for line in lines]
+
+
+    def close(self):
+        """Unmaps and closes the file
+        """
+
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self.fp.close()
@@ -0,0 +1,593 @@
+"""Module for watching a repository for changes made outside of pyautogit.
+
+On Linux, inotify is used through ctypes to watch the worktree along with the index, HEAD,
+config and refs in the git directory. Where inotify is unavailable, the same files are polled
+for modification time changes instead. Changed paths are mapped onto the repository control
+panels they affect, so that only those panels need to be re-fetched.
+
+Only directories containing tracked files are watched in the worktree, and new directories are
+skipped if git ignores them, so dependency and build output directories are never walked. Listing
+the tracked files is done on the watch thread rather than when the repository is opened.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import sys
+import time
+import struct
+import select
+import threading
+import ctypes
+import ctypes.util
+import pyautogit.commands
+import pyautogit.logger as LOGGER
+
+
+# Panels of the repository control screen that a change can affect
+PANEL_FILES     = 'files'
+PANEL_BRANCHES  = 'branches'
+PANEL_REMOTES   = 'remotes'
+PANEL_COMMITS   = 'commits'
+
+# inotify constants, from sys/inotify.h
+IN_MODIFY       = 0x00000002
+IN_ATTRIB       = 0x00000004
+IN_CLOSE_WRITE  = 0x00000008
+IN_MOVED_FROM   = 0x00000040
+IN_MOVED_TO     = 0x00000080
+IN_CREATE       = 0x00000100
+IN_DELETE       = 0x00000200
+IN_Q_OVERFLOW   = 0x00004000
+IN_IGNORED      = 0x00008000
+IN_ISDIR        = 0x40000000
+IN_NONBLOCK     = 0o4000
+IN_CLOEXEC      = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def get_git_dir(repo_path):
+    """Finds the git directory of a repository, following `gitdir:` files used by worktrees and submodules
+
+    Parameters
+    ----------
+    repo_path : str
+        Path to the repository worktree
+
+    Returns
+    -------
+    git_dir : str
+        Path to the git directory
+    """
+
+    git_dir = os.path.join(repo_path, '.git')
+    if os.path.isfile(git_dir):
+        with open(git_dir, 'r') as fp:
+            contents = fp.read().strip()
+        if contents.startswith('gitdir:'):
+            git_dir = os.path.join(repo_path, contents[len('gitdir:'):].strip())
+    return os.path.abspath(git_dir)
+
+
+def get_affected_panels(git_path):
+    """Maps a changed path onto the repository control panels that display it
+
+    Parameters
+    ----------
+    git_path : str
+        Changed path relative to the git directory, or None for a change in the worktree
+
+    Returns
+    -------
+    panels : set of str
+        Names of affected panels, empty if the change is not displayed anywhere
+    """
+
+    if git_path is None:
+        return set([PANEL_FILES])
+    parts = git_path.replace(os.sep, '/').split('/')
+    if parts[-1].endswith('.lock'):
+        return set()
+    if parts[0] == 'index':
+        return set([PANEL_FILES])
+    elif parts[0] == 'HEAD':
+        return set([PANEL_BRANCHES, PANEL_COMMITS, PANEL_FILES])
+    elif parts[0] == 'config':
+        return set([PANEL_REMOTES])
+    elif parts[0] == 'packed-refs':
+        return set([PANEL_BRANCHES, PANEL_COMMITS])
+    elif parts[0] == 'refs' and len(parts) > 1:
+        if parts[1] == 'heads':
+            return set([PANEL_BRANCHES, PANEL_COMMITS])
+        elif parts[1] == 'tags':
+            return set([PANEL_BRANCHES])
+    return set()
+
+
+def get_tracked_paths(repo_path):
+    """Lists the tracked files of a repository, and the directories containing them
+
+    Parameters
+    ----------
+    repo_path : str
+        Path to the repository worktree
+
+    Returns
+    -------
+    files : list of str
+        Absolute paths of tracked files, empty if they could not be listed
+    directories : list of str
+        Absolute paths of the worktree root and every directory containing a tracked file
+    """
+
+    out, err = pyautogit.commands.git_get_tracked_files(repo_path=repo_path)
+    if err != 0:
+        LOGGER.write('Failed to list tracked files, watching worktree root only', level=LOGGER.WARNING)
+        return [], [repo_path]
+    files = [name for name in out.split('\0') if len(name) > 0]
+    directories = set([''])
+    for name in files:
+        directory = os.path.dirname(name)
+        while directory not in directories:
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+    return [os.path.join(repo_path, name) for name in files], [os.path.join(repo_path, name) if len(name) > 0 else repo_path for name in sorted(directories)]
+
+
+def get_ignored_paths(repo_path, paths):
+    """Finds which of a list of worktree paths are ignored by git
+
+    Parameters
+    ----------
+    repo_path : str
+        Path to the repository worktree
+    paths : list of str
+        Absolute paths in the worktree
+
+    Returns
+    -------
+    ignored : set of str
+        The absolute paths that are ignored
+    """
+
+    if len(paths) == 0:
+        return set()
+    relative_paths = [os.path.relpath(path, repo_path) for path in paths]
+    out, err = pyautogit.commands.git_check_ignore(relative_paths, repo_path=repo_path)
+    if err != 0:
+        return set()
+    ignored = set([name for name in out.split('\0') if len(name) > 0])
+    return set([path for path, relative_path in zip(paths, relative_paths) if relative_path in ignored])
+
+
+def load_inotify():
+    """Loads the C library if it provides inotify
+
+    Returns
+    -------
+    libc : ctypes.CDLL
+        The loaded C library, or None if inotify is unavailable
+    """
+
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class InotifyBackend:
+    """Class that reports repository changes using inotify
+
+    Attributes
+    ----------
+    repo_path : str
+        Path to the repository worktree
+    git_dir : str
+        Path to the git directory
+    max_watches : int
+        Maximum number of worktree directories watched
+    libc : ctypes.CDLL
+        C library providing inotify
+    fd : int
+        inotify file descriptor
+    watches : dict of int -> str
+        Maps watch descriptors to watched directories
+    """
+
+    name = 'inotify'
+
+    def __init__(self, repo_path, git_dir, libc, max_watches=8192):
+        """Constructor for InotifyBackend
+        """
+
+        self.repo_path      = repo_path
+        self.git_dir        = git_dir
+        self.max_watches    = max_watches
+        self.libc           = libc
+        self.fd             = -1
+        self.watches        = {}
+
+
+    def open(self):
+        """Creates the inotify instance and watches the worktree and git directory
+
+        Returns
+        -------
+        opened : bool
+            False if inotify could not be initialized
+        """
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            LOGGER.write('inotify_init1 failed with errno {}'.format(ctypes.get_errno()), level=LOGGER.WARNING)
+            return False
+        self.add_watch(self.git_dir)
+        self.add_tree(os.path.join(self.git_dir, 'refs'))
+        _, directories = get_tracked_paths(self.repo_path)
+        for directory in directories:
+            self.add_watch(directory)
+        LOGGER.write('Watching {} directories with inotify'.format(len(self.watches)))
+        return True
+
+
+    def add_watch(self, path):
+        """Adds a watch on a single directory
+
+        Parameters
+        ----------
+        path : str
+            Directory to watch
+        """
+
+        if len(self.watches) >= self.max_watches:
+            return
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = path
+
+
+    def add_tree(self, path):
+        """Adds watches on a directory in the git directory and all of its subdirectories
+
+        Parameters
+        ----------
+        path : str
+            Top directory to watch
+        """
+
+        for root, dirs, _ in os.walk(path):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.git_dir and d != '.git']
+            self.add_watch(root)
+            if len(self.watches) >= self.max_watches:
+                LOGGER.write('Reached limit of {} inotify watches'.format(self.max_watches))
+                return
+
+
+    def add_worktree_tree(self, path):
+        """Adds watches on a new worktree directory and its subdirectories, skipping those git ignores
+
+        Parameters
+        ----------
+        path : str
+            New directory to watch
+        """
+
+        directories = [path]
+        while len(directories) > 0 and len(self.watches) < self.max_watches:
+            ignored = get_ignored_paths(self.repo_path, directories)
+            subdirectories = []
+            for directory in directories:
+                if directory in ignored:
+                    continue
+                self.add_watch(directory)
+                try:
+                    subdirectories.extend([entry.path for entry in os.scandir(directory) if entry.is_dir(follow_symlinks=False) and entry.name != '.git'])
+                except OSError:
+                    pass
+            directories = subdirectories
+
+
+    def read_changes(self, timeout, stop_event):
+        """Waits for and reads changes
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum time to wait for a change, in seconds
+        stop_event : threading.Event
+            Event set when watching should stop
+
+        Returns
+        -------
+        changes : list of str
+            Changed paths relative to the git directory, None for worktree changes
+        """
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if len(readable) == 0 or stop_event.is_set():
+            return []
+        try:
+            buffer = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset = offset + EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b'\0').decode(errors='replace')
+            offset = offset + name_len
+            if mask & IN_Q_OVERFLOW:
+                changes.extend(['HEAD', 'config'])
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = os.path.join(directory, name)
+            git_path = get_git_relative_path(path, self.git_dir)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                if git_path is None:
+                    self.add_worktree_tree(path)
+                else:
+                    self.add_tree(path)
+            changes.append(git_path)
+        return changes
+
+
+    def close(self):
+        """Closes the inotify instance, removing all watches
+        """
+
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.watches = {}
+
+
+class PollingBackend:
+    """Class that reports repository changes by polling file modification times
+
+    Attributes
+    ----------
+    repo_path : str
+        Path to the repository worktree
+    git_dir : str
+        Path to the git directory
+    interval : float
+        Time between polls, in seconds
+    tracked_paths : list of str
+        Tracked files and the directories containing them, listed again when the index changes
+    signature : dict of str -> tuple of (int, int)
+        Modification time and size of each polled path at the last poll
+    """
+
+    name = 'polling'
+
+    def __init__(self, repo_path, git_dir, interval=2.0):
+        """Constructor for PollingBackend
+        """
+
+        self.repo_path  = repo_path
+        self.git_dir    = git_dir
+        self.interval       = interval
+        self.tracked_paths  = []
+        self.signature      = {}
+
+
+    def open(self):
+        """Lists the tracked paths, and takes the initial signature of the repository
+
+        Returns
+        -------
+        opened : bool
+            Always True
+        """
+
+        self.list_tracked_paths()
+        self.signature = self.take_signature()
+        LOGGER.write('Polling {} paths every {} seconds'.format(len(self.signature), self.interval))
+        return True
+
+
+    def list_tracked_paths(self):
+        """Lists the worktree paths that are polled
+
+        Directories are polled along with files, since creating or deleting an untracked file
+        changes the modification time of its directory.
+        """
+
+        files, directories = get_tracked_paths(self.repo_path)
+        self.tracked_paths = directories + files
+
+
+    def take_signature(self):
+        """Stats every polled path
+
+        Returns
+        -------
+        signature : dict of str -> tuple of (int, int)
+            Maps path to its modification time and size
+        """
+
+        signature = {}
+        paths = [os.path.join(self.git_dir, name) for name in ['index', 'HEAD', 'config', 'packed-refs']]
+        for root, dirs, files in os.walk(os.path.join(self.git_dir, 'refs')):
+            paths.extend([os.path.join(root, name) for name in files])
+        paths.extend(self.tracked_paths)
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature[path] = (stat.st_mtime_ns, stat.st_size)
+        return signature
+
+
+    def read_changes(self, timeout, stop_event):
+        """Waits one polling interval, then compares the repository against the last signature
+
+        Parameters
+        ----------
+        timeout : float
+            Ignored, polls are always one interval apart
+        stop_event : threading.Event
+            Event set when watching should stop
+
+        Returns
+        -------
+        changes : list of str
+            Changed paths relative to the git directory, None for worktree changes
+        """
+
+        if stop_event.wait(self.interval):
+            return []
+        signature = self.take_signature()
+        changed = [path for path in signature.keys() if self.signature.get(path) != signature[path]]
+        changed.extend([path for path in self.signature.keys() if path not in signature])
+        self.signature = signature
+        if os.path.join(self.git_dir, 'index') in changed:
+            self.list_tracked_paths()
+            self.signature = self.take_signature()
+        return [get_git_relative_path(path, self.git_dir) for path in changed]
+
+
+    def close(self):
+        """Discards the stored signature
+        """
+
+        self.tracked_paths = []
+        self.signature = {}
+
+
+def get_git_relative_path(path, git_dir):
+    """Gets a path relative to the git directory
+
+    Parameters
+    ----------
+    path : str
+        Absolute changed path
+    git_dir : str
+        Path to the git directory
+
+    Returns
+    -------
+    git_path : str
+        Path relative to the git directory, or None if the path is in the worktree
+    """
+
+    if path == git_dir or path.startswith(git_dir + os.sep):
+        return os.path.relpath(path, git_dir)
+    return None
+
+
+class RepoWatcher:
+    """Class that watches a repository in a background thread and reports affected panels
+
+    Changes are collected until none arrive for the debounce time, so that a single git
+    operation touching many files results in a single callback.
+
+    Attributes
+    ----------
+    repo_path : str
+        Path to the repository worktree
+    on_change : function
+        Function called with the set of affected panel names
+    debounce : float
+        Quiet time required before reporting changes, in seconds
+    poll_interval : float
+        Time between polls if inotify is unavailable, in seconds
+    use_inotify : bool
+        Set to False to always poll
+    backend : InotifyBackend or PollingBackend
+        Source of change events, None until opened by the watch thread
+    ready : threading.Event
+        Event set once the backend is opened, and changes are being watched
+    stop_event : threading.Event
+        Event set to stop the watch thread
+    thread : threading.Thread
+        The watch thread
+    """
+
+    def __init__(self, repo_path, on_change, debounce=0.3, poll_interval=2.0, use_inotify=True):
+        """Constructor for RepoWatcher
+        """
+
+        self.repo_path      = os.path.abspath(repo_path)
+        self.on_change      = on_change
+        self.debounce       = debounce
+        self.poll_interval  = poll_interval
+        self.use_inotify    = use_inotify
+        self.backend        = None
+        self.ready          = threading.Event()
+        self.stop_event     = threading.Event()
+        self.thread         = None
+
+
+    def start(self):
+        """Starts the watch thread
+        """
+
+        self.thread = threading.Thread(target=self.watch_loop, daemon=True)
+        self.thread.start()
+
+
+    def open_backend(self):
+        """Opens inotify if available, otherwise polling. Runs on the watch thread, since listing tracked files can be slow
+        """
+
+        git_dir = get_git_dir(self.repo_path)
+        libc = load_inotify() if self.use_inotify else None
+        if libc is not None:
+            self.backend = InotifyBackend(self.repo_path, git_dir, libc)
+            if not self.backend.open():
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self.repo_path, git_dir, interval=self.poll_interval)
+            self.backend.open()
+        LOGGER.write('Started {} watcher on {}'.format(self.backend.name, self.repo_path))
+        self.ready.set()
+
+
+    def watch_loop(self):
+        """Main loop of the watch thread
+        """
+
+        self.open_backend()
+        pending = set()
+        while not self.stop_event.is_set():
+            changes = self.backend.read_changes(self.debounce if len(pending) > 0 else 1.0, self.stop_event)
+            for change in changes:
+                pending.update(get_affected_panels(change))
+            if len(pending) > 0 and (len(changes) == 0 or self.backend.name == 'polling'):
+                panels = pending
+                pending = set()
+                if not self.stop_event.is_set():
+                    LOGGER.write('Detected changes affecting {}'.format(sorted(panels)))
+                    try:
+                        self.on_change(panels)
+                    except Exception as e:
+                        LOGGER.write('Change handler failed: {}'.format(str(e)), level=LOGGER.ERROR)
+        self.backend.close()
+
+
+    def stop(self):
+        """Stops the watch thread
+        """
+
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
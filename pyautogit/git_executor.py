@@ -0,0 +1,346 @@
+"""Module containing long-lived git helper processes that can be reused across commands.
+
+Some git commands support a batch mode, where requests are written to stdin and answers are read
+back from stdout, all from a single process. Reusing these processes avoids the fork/exec cost of
+starting git for each query. The executor keeps one helper of each kind per repository, and records
+how long requests take so the savings relative to one process per command can be measured.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import threading
+import time
+from subprocess import Popen, PIPE
+import pyautogit.logger as LOGGER
+import pyautogit.command_stats as STATS
+
+
+class GitHelperProcess:
+    """Base class for a git process that answers requests over stdin/stdout
+
+    Attributes
+    ----------
+    repo_path : str
+        Absolute path of the repository the helper runs in
+    run_command : list of str
+        The command used to start the helper process
+    proc : subprocess.Popen
+        The running helper process, None if not started or closed
+    lock : threading.Lock
+        Lock ensuring only one request is written/read at a time
+    """
+
+    def __init__(self, repo_path, run_command):
+        """Constructor for GitHelperProcess
+        """
+
+        self.repo_path = repo_path
+        self.run_command = run_command
+        self.proc = None
+        self.lock = threading.Lock()
+
+
+    def start(self):
+        """Starts the helper process if it is not running
+        """
+
+        if self.proc is None or self.proc.poll() is not None:
+            LOGGER.write('Starting git helper process: {}'.format(str(self.run_command)))
+            self.proc = Popen(self.run_command, stdin=PIPE, stdout=PIPE, stderr=PIPE, cwd=self.repo_path)
+
+
+    def close(self):
+        """Closes stdin of the helper, and waits for it to exit
+        """
+
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+                self.proc.wait(timeout=2)
+            except:
+                self.proc.kill()
+            self.proc = None
+
+
+class GitCatFileProcess(GitHelperProcess):
+    """Helper wrapping `git cat-file --batch`, used for reading objects by id
+    """
+
+    def __init__(self, repo_path):
+        """Constructor for GitCatFileProcess
+        """
+
+        super().__init__(repo_path, ['git', 'cat-file', '--batch'])
+
+
+    def read_object(self, object_id):
+        """Reads a single object from the repository
+
+        Parameters
+        ----------
+        object_id : str
+            Hash, or any name git can resolve to an object (ex. HEAD:README.md)
+
+        Returns
+        -------
+        object_type : str
+            Type of the object (commit, tree, blob, tag), or None if missing
+        content : bytes
+            Raw object content, or None if missing
+        """
+
+        with self.lock:
+            self.start()
+            self.proc.stdin.write('{}\n'.format(object_id).encode())
+            self.proc.stdin.flush()
+            header = self.proc.stdout.readline().decode().split()
+            if len(header) != 3:
+                return None, None
+            size = int(header[2])
+            content = self.proc.stdout.read(size)
+            self.proc.stdout.read(1)
+            return header[1], content
+
+
+class GitCatFileCheckProcess(GitHelperProcess):
+    """Helper wrapping `git cat-file --batch-check`, used for resolving names to full object ids
+    """
+
+    def __init__(self, repo_path):
+        """Constructor for GitCatFileCheckProcess
+        """
+
+        super().__init__(repo_path, ['git', 'cat-file', '--batch-check'])
+
+
+    def resolve_object(self, name):
+        """Resolves an object name without reading the object content
+
+        Parameters
+        ----------
+        name : str
+            Hash, abbreviated hash, or any name git can resolve to an object
+
+        Returns
+        -------
+        object_id : str
+            Full id of the object, or None if missing or ambiguous
+        object_type : str
+            Type of the object, or None if missing or ambiguous
+        """
+
+        with self.lock:
+            self.start()
+            self.proc.stdin.write('{}\n'.format(name).encode())
+            self.proc.stdin.flush()
+            header = self.proc.stdout.readline().decode().split()
+            if len(header) != 3:
+                return None, None
+            return header[0], header[1]
+
+
+class GitExecutor:
+    """Pool of helper processes, keyed on repository and helper kind
+
+    Attributes
+    ----------
+    helpers : dict of tuple -> GitHelperProcess
+        Running helper processes
+    max_samples : int
+        Number of most recent request durations kept per helper kind
+    request_times : dict of str -> CommandTimings
+        Count, total and recent durations of requests served by a helper, keyed on helper kind
+    spawn_baseline : float
+        Measured time in seconds to run one short git command in a new process, None until measured
+    lock : threading.Lock
+        Lock protecting the helper dictionary and request timings
+    """
+
+    def __init__(self, max_samples=1000):
+        """Constructor for GitExecutor
+        """
+
+        self.helpers = {}
+        self.max_samples = max_samples
+        self.request_times = {}
+        self.spawn_baseline = None
+        self.lock = threading.Lock()
+
+
+    def get_helper(self, key, create_helper):
+        """Gets a helper from the pool, creating it if required
+
+        Parameters
+        ----------
+        key : tuple
+            Unique key for the helper
+        create_helper : no-arg function
+            Function that creates the helper if not found
+
+        Returns
+        -------
+        helper : GitHelperProcess
+            Helper process for the key
+        """
+
+        with self.lock:
+            if key not in self.helpers.keys():
+                self.helpers[key] = create_helper()
+            return self.helpers[key]
+
+
+    def record_request(self, kind, start_time):
+        """Records the duration of a request served by a helper
+
+        Parameters
+        ----------
+        kind : str
+            Helper kind name
+        start_time : float
+            time.perf_counter() value taken when the request started
+        """
+
+        duration = time.perf_counter() - start_time
+        with self.lock:
+            timings = self.request_times.get(kind)
+            if timings is None:
+                timings = STATS.CommandTimings(self.max_samples)
+                self.request_times[kind] = timings
+            timings.durations.append(duration)
+            timings.count += 1
+            timings.total_time += duration
+
+
+    def read_object(self, object_id, repo_path='.'):
+        """Reads an object using the repository's cat-file helper
+
+        Parameters
+        ----------
+        object_id : str
+            Name of the object to read
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        object_type : str
+            Type of the object, or None if missing
+        content : bytes
+            Raw object content, or None if missing
+        """
+
+        repo_path = os.path.abspath(repo_path)
+        helper = self.get_helper(('cat-file', repo_path), lambda : GitCatFileProcess(repo_path))
+        start_time = time.perf_counter()
+        try:
+            return helper.read_object(object_id)
+        except (OSError, EOFError, ValueError):
+            helper.close()
+            raise
+        finally:
+            self.record_request('cat-file', start_time)
+
+
+    def resolve_object(self, name, repo_path='.'):
+        """Resolves an object name to its full id using the repository's cat-file check helper
+
+        Parameters
+        ----------
+        name : str
+            Name of the object to resolve
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        object_id : str
+            Full id of the object, or None if missing or ambiguous
+        object_type : str
+            Type of the object, or None if missing or ambiguous
+        """
+
+        repo_path = os.path.abspath(repo_path)
+        helper = self.get_helper(('cat-file-check', repo_path), lambda : GitCatFileCheckProcess(repo_path))
+        start_time = time.perf_counter()
+        try:
+            return helper.resolve_object(name)
+        except (OSError, EOFError, ValueError):
+            helper.close()
+            raise
+        finally:
+            self.record_request('cat-file-check', start_time)
+
+
+    def measure_spawn_baseline(self, repo_path='.'):
+        """Times a short git command run in a fresh process, for comparison with helper requests
+
+        Parameters
+        ----------
+        repo_path : str
+            Target repo path
+
+        Returns
+        -------
+        spawn_baseline : float
+            Time in seconds taken to run the command
+        """
+
+        start_time = time.perf_counter()
+        proc = Popen(['git', 'cat-file', '-t', 'HEAD'], stdout=PIPE, stderr=PIPE, cwd=repo_path)
+        proc.communicate()
+        self.spawn_baseline = time.perf_counter() - start_time
+        return self.spawn_baseline
+
+
+    def get_latency_report(self, repo_path='.'):
+        """Summarizes helper request latency compared to starting a process per request
+
+        Parameters
+        ----------
+        repo_path : str
+            Repository used to measure the spawn baseline, if not yet measured
+
+        Returns
+        -------
+        report : dict of str -> dict
+            Per helper kind: number of requests, mean request time, baseline spawn time, and estimated seconds saved
+        """
+
+        report = {}
+        if self.spawn_baseline is None and len(self.request_times) > 0:
+            self.measure_spawn_baseline(repo_path)
+        with self.lock:
+            for kind, timings in self.request_times.items():
+                mean_time = timings.total_time / timings.count
+                entry = {'requests': timings.count, 'mean_seconds': mean_time, 'spawn_baseline_seconds': self.spawn_baseline, 'saved_seconds': None}
+                if self.spawn_baseline is not None:
+                    entry['saved_seconds'] = (self.spawn_baseline * timings.count) - timings.total_time
+                report[kind] = entry
+        return report
+
+
+    def close_all(self):
+        """Closes all running helper processes
+        """
+
+        with self.lock:
+            for helper in self.helpers.values():
+                helper.close()
+            self.helpers = {}
+
+
+# Global executor shared by pyautogit.commands
+_EXECUTOR = GitExecutor()
+
+
+def get_executor():
+    """Gets the global git executor
+
+    Returns
+    -------
+    executor : GitExecutor
+        The shared executor instance
+    """
+
+    return _EXECUTOR
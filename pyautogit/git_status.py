@@ -0,0 +1,245 @@
+"""Module for parsing machine readable git status output into typed records.
+
+`git status --porcelain=v2 -z --branch` separates entries with NUL characters and never quotes
+paths, so file names with spaces, quotes or non-ascii characters, as well as renames, are parsed
+reliably. Each changed file becomes a compact StatusEntry record, which displays the same way as
+a line of `git status -s` output.
+
+This file should remain separate from the CUI interface.
+"""
+
+import difflib
+
+
+class StatusEntry:
+    """Class representing the status of a single file
+
+    Attributes
+    ----------
+    kind : str
+        One of 'changed', 'renamed', 'copied', 'unmerged', 'untracked' or 'ignored'
+    index_status : str
+        Single character status of the file in the index, as in `git status -s`
+    worktree_status : str
+        Single character status of the file in the working tree, as in `git status -s`
+    path : str
+        Path of the file relative to the repository root
+    orig_path : str
+        Path the file was renamed or copied from, None otherwise
+    """
+
+    __slots__ = ['kind', 'index_status', 'worktree_status', 'path', 'orig_path']
+
+    def __init__(self, kind, index_status, worktree_status, path, orig_path=None):
+        """Constructor for StatusEntry
+        """
+
+        self.kind               = kind
+        self.index_status       = index_status
+        self.worktree_status    = worktree_status
+        self.path               = path
+        self.orig_path          = orig_path
+
+
+    def __str__(self):
+        """Formats the entry as a line of `git status -s` output, for display in menus
+        """
+
+        if self.orig_path is not None:
+            return '{}{} {} -> {}'.format(self.index_status, self.worktree_status, self.orig_path, self.path)
+        return '{}{} {}'.format(self.index_status, self.worktree_status, self.path)
+
+
+    def __eq__(self, other):
+        """Entries are equal if they describe the same file in the same state
+        """
+
+        if not isinstance(other, StatusEntry):
+            return NotImplemented
+        return self.get_key() == other.get_key() and self.index_status == other.index_status and self.worktree_status == other.worktree_status and self.kind == other.kind
+
+
+    def __hash__(self):
+        """Hashes the file the entry describes
+        """
+
+        return hash(self.get_key())
+
+
+    def get_key(self):
+        """Gets the identity of the file the entry describes, regardless of its state
+
+        Returns
+        -------
+        key : tuple of (str, str)
+            The path and original path of the file
+        """
+
+        return (self.path, self.orig_path)
+
+
+    def has_staged_changes(self):
+        """Checks if the file has changes in the index
+
+        Returns
+        -------
+        staged : bool
+            True if the file has changes that would be committed
+        """
+
+        return self.index_status not in [' ', '?', '!']
+
+
+class StatusBranch:
+    """Class representing the branch header of porcelain v2 status output
+
+    Attributes
+    ----------
+    head : str
+        Name of the checked out branch, None if HEAD is detached
+    oid : str
+        Commit hash of HEAD, None if the repository has no commits yet
+    upstream : str
+        Name of the upstream branch, None if there is none
+    ahead : int
+        Number of commits ahead of the upstream
+    behind : int
+        Number of commits behind the upstream
+    """
+
+    __slots__ = ['head', 'oid', 'upstream', 'ahead', 'behind']
+
+    def __init__(self):
+        """Constructor for StatusBranch
+        """
+
+        self.head       = None
+        self.oid        = None
+        self.upstream   = None
+        self.ahead      = 0
+        self.behind     = 0
+
+
+def convert_status_char(status_char):
+    """Converts a porcelain v2 status character to its `git status -s` form
+
+    Parameters
+    ----------
+    status_char : str
+        Status character, with '.' meaning unmodified
+
+    Returns
+    -------
+    short_char : str
+        Status character, with ' ' meaning unmodified
+    """
+
+    return ' ' if status_char == '.' else status_char
+
+
+def parse_branch_header(branch, header):
+    """Adds a single '# branch.*' header to the branch information
+
+    Parameters
+    ----------
+    branch : StatusBranch
+        Branch information being parsed
+    header : str
+        Header without the leading '# '
+    """
+
+    key, _, value = header.partition(' ')
+    if key == 'branch.head':
+        branch.head = None if value == '(detached)' else value
+    elif key == 'branch.oid':
+        branch.oid = None if value == '(initial)' else value
+    elif key == 'branch.upstream':
+        branch.upstream = value
+    elif key == 'branch.ab':
+        ahead, behind = value.split(' ')
+        branch.ahead = int(ahead)
+        branch.behind = -int(behind)
+
+
+def parse_porcelain_v2(status_output):
+    """Parses `git status --porcelain=v2 -z --branch` output
+
+    Parameters
+    ----------
+    status_output : str
+        NUL separated status output
+
+    Returns
+    -------
+    branch : StatusBranch
+        Branch information from the status headers
+    entries : list of StatusEntry
+        One entry per changed, untracked or ignored file, in git's order
+    """
+
+    branch = StatusBranch()
+    entries = []
+    fields = status_output.split('\0')
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        i = i + 1
+        if len(field) < 2:
+            continue
+        marker = field[0]
+        if marker == '#':
+            parse_branch_header(branch, field[2:])
+        elif marker == '1':
+            parts = field.split(' ', 8)
+            entries.append(StatusEntry('changed', convert_status_char(parts[1][0]), convert_status_char(parts[1][1]), parts[8]))
+        elif marker == '2':
+            # Renames and copies are followed by a separate field holding the original path
+            parts = field.split(' ', 9)
+            kind = 'renamed' if parts[8].startswith('R') else 'copied'
+            orig_path = fields[i] if i < len(fields) else None
+            i = i + 1
+            entries.append(StatusEntry(kind, convert_status_char(parts[1][0]), convert_status_char(parts[1][1]), parts[9], orig_path=orig_path))
+        elif marker == 'u':
+            parts = field.split(' ', 10)
+            entries.append(StatusEntry('unmerged', parts[1][0], parts[1][1], parts[10]))
+        elif marker == '?':
+            entries.append(StatusEntry('untracked', '?', '?', field[2:]))
+        elif marker == '!':
+            entries.append(StatusEntry('ignored', '!', '!', field[2:]))
+    return branch, entries
+
+
+def update_entry_list(items, entries):
+    """Updates a list of status entries in place to match a new list, touching only changed entries
+
+    Entries for the same file are matched by path. Unchanged entries keep their existing objects,
+    entries whose state changed are replaced, and added or removed files are inserted or deleted.
+
+    Parameters
+    ----------
+    items : list of StatusEntry
+        Current entries, modified in place (ex. the item list of a menu)
+    entries : list of StatusEntry
+        New entries
+
+    Returns
+    -------
+    num_changed : int
+        Number of entries that were replaced, inserted or removed
+    """
+
+    num_changed = 0
+    old_keys = [item.get_key() if isinstance(item, StatusEntry) else item for item in items]
+    new_keys = [entry.get_key() for entry in entries]
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    # Apply edits back to front, so earlier positions stay valid
+    for tag, old_start, old_end, new_start, new_end in reversed(matcher.get_opcodes()):
+        if tag == 'equal':
+            for offset in range(old_end - old_start):
+                if items[old_start + offset] != entries[new_start + offset]:
+                    items[old_start + offset] = entries[new_start + offset]
+                    num_changed = num_changed + 1
+        else:
+            items[old_start:old_end] = entries[new_start:new_end]
+            num_changed = num_changed + max(old_end - old_start, new_end - new_start)
+    return num_changed
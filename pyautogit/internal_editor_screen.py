@@ -5,6 +5,10 @@ import os
 import shutil
 import py_cui.widget_set
 import pyautogit.screen_manager
+import pyautogit.file_pager
+import pyautogit.dir_listing
+import pyautogit.atomic_save
+import pyautogit.logger as LOGGER
 
 class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
     """Class representing internal editor screen for pyautogit
@@ -15,6 +19,20 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         The current opened path for the editor
     is_new_file_open : bool
         Flag that says if a new file is open
+    file_pager : pyautogit.file_pager.FilePager
+        Pager for the file opened in read-only paged mode, None if no file is paged
+    paged_size_threshold : int
+        Files larger than this many bytes are opened in read-only paged mode
+    pager_start : int
+        Index of the first line of the paged file currently loaded
+    pager_margin : int
+        Number of lines loaded past the visible lines of the paged file
+    dir_listing : pyautogit.dir_listing.DirListing
+        Cached listing of the opened directory
+    listing_shown : int
+        Number of filtered listing entries currently added to the file menu
+    loaded_hash : str
+        Hash of the editor contents when the open file was last loaded or saved, None for a new file
     """
 
     def __init__(self, top_manager, opened_path):
@@ -25,9 +43,16 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         if os.path.isdir(opened_path):
             self.opened_path = opened_path
         else:
-            self.opened_path = os.dirname(opened_path)
+            self.opened_path = os.path.dirname(opened_path)
 
-        self.new_file_open = False
+        self.new_file_open          = False
+        self.file_pager             = None
+        self.paged_size_threshold   = pyautogit.file_pager.PAGED_SIZE_THRESHOLD
+        self.pager_start            = 0
+        self.pager_margin           = 200
+        self.dir_listing            = None
+        self.listing_shown          = 0
+        self.loaded_hash            = None
 
 
     def initialize_screen_elements(self):
@@ -47,7 +72,9 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         self.current_dir_textbox.set_focus_text('Open Directory - Enter | Cancel - Esc')
 
         self.edit_text_block = pyautogit_editor_widget_set.add_text_block('Open file', 0, 2, row_span=6, column_span=6)
-        self.edit_text_block.set_focus_text('Save - Esc + S | Return - Esc')
+        self.edit_text_block.add_key_command(py_cui.keys.KEY_PAGE_DOWN, lambda : self.scroll_file_page(1))
+        self.edit_text_block.add_key_command(py_cui.keys.KEY_PAGE_UP,   lambda : self.scroll_file_page(-1))
+        self.edit_text_block.set_focus_text('Save - Esc + S | Page Large File - PgUp/PgDn | Return - Esc')
 
         self.new_dir_textbox = pyautogit_editor_widget_set.add_text_box('Add New Directory', 4, 0, column_span=2)
         self.new_dir_textbox.add_key_command(py_cui.keys.KEY_ENTER, self.add_new_directory)
@@ -57,15 +84,20 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         self.new_file_textbox.add_key_command(py_cui.keys.KEY_ENTER, self.add_new_file)
         self.new_file_textbox.set_focus_text('Create File - Enter | Cancel - Esc')
 
-        self.file_menu = pyautogit_editor_widget_set.add_scroll_menu('Directory Files', 0, 0, row_span=4, column_span=2)
+        self.filter_textbox = pyautogit_editor_widget_set.add_text_box('Filter Files', 3, 0, column_span=2)
+        self.filter_textbox.add_key_command(py_cui.keys.KEY_ENTER, self.filter_dir_listing)
+        self.filter_textbox.set_focus_text('Filter - Enter (text or glob, empty shows all) | Cancel - Esc')
+
+        self.file_menu = pyautogit_editor_widget_set.add_scroll_menu('Directory Files', 0, 0, row_span=3, column_span=2)
         self.file_menu.add_key_command(py_cui.keys.KEY_ENTER,   self.open_file_dir)
         self.file_menu.add_key_command(py_cui.keys.KEY_DELETE,  self.delete_selected_file_dir)
         self.file_menu.add_key_command(py_cui.keys.KEY_F_LOWER, lambda : self.manager.root.move_focus(self.new_file_textbox))
         self.file_menu.add_key_command(py_cui.keys.KEY_D_LOWER, lambda : self.manager.root.move_focus(self.new_dir_textbox))
         self.file_menu.add_key_command(py_cui.keys.KEY_R_LOWER, self.refresh_status)
+        self.file_menu.add_key_command(py_cui.keys.KEY_F_UPPER, lambda : self.manager.root.move_focus(self.filter_textbox))
         self.file_menu.add_key_command(py_cui.keys.KEY_BACKSPACE, self.manager.open_autogit_window_target)
         self.file_menu.add_text_color_rule('<DIR>', py_cui.GREEN_ON_BLACK, 'startswith', match_type='region', region=[5,1000])
-        self.file_menu.set_focus_text('Return -Bcksp | Open - Enter | New File - f | New Dir - d | Refresh - r | Delete - Del | Return - Esc')
+        self.file_menu.set_focus_text('Return -Bcksp | Open - Enter | New File - f | New Dir - d | Filter - F | Refresh - r | Delete - Del | Return - Esc')
 
         self.info_panel = self.edit_text_block
 
@@ -96,10 +128,12 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         """Function for clearing widgets in editor screen
         """
 
+        self.close_file_pager()
         self.info_panel.clear()
         self.info_panel.title = 'Open file'
         self.current_dir_textbox.clear()
         self.new_file_textbox.clear()
+        self.filter_textbox.clear()
         self.file_menu.clear()
 
 
@@ -130,21 +164,95 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
             self.manager.root.show_error_popup('Not a Dir', 'ERROR - {} is not a directory'.format(target))
             return
         target = os.path.abspath(target)
+        dir_listing = pyautogit.dir_listing.DirListing(target)
+        try:
+            dir_listing.scan()
+        except OSError:
+            self.manager.root.show_error_popup('OS ERROR', 'ERROR - {} could not be read'.format(target))
+            return
         self.current_dir_textbox.set_text(target)
+
+        # Refreshing the same directory keeps its filter, opening another one clears it
+        if self.dir_listing is not None and self.dir_listing.path == target:
+            dir_listing.apply_filter(self.dir_listing.filter_text)
+        else:
+            self.filter_textbox.clear()
         self.opened_path = target
+        self.dir_listing = dir_listing
+        LOGGER.write('Listed {} entries in {}'.format(len(dir_listing.entries), target))
+        self.show_dir_listing()
 
-        files = []
-        files.append('<DIR> ..')
-        dir_contents = os.listdir(self.opened_path)
-        for elem in dir_contents:
-            if os.path.isfile(os.path.join(self.opened_path, elem)):
-                files.append(elem)
-            else:
-                files.append('<DIR> ' + elem)
 
+    def show_dir_listing(self, min_shown=0):
+        """Adds the first page of the filtered directory listing to the file menu
+
+        Parameters
+        ----------
+        min_shown : int
+            Minimum number of entries to add, so that a refresh keeps already loaded pages
+        """
+
+        page = self.dir_listing.get_page(0, max(min_shown, pyautogit.dir_listing.PAGE_SIZE))
         self.file_menu.clear()
-        self.file_menu.add_item_list(files)
-        
+        self.file_menu.add_item('<DIR> ..')
+        self.file_menu.add_item_list(page)
+        self.listing_shown = len(page)
+        self.add_more_entries_item()
+
+        title = 'Directory Files'
+        if len(self.dir_listing.filter_text) > 0:
+            title = '{} - {} of {} match \'{}\''.format(title, len(self.dir_listing.filtered), len(self.dir_listing.entries), self.dir_listing.filter_text)
+        self.file_menu.set_title(title)
+
+
+    def add_more_entries_item(self):
+        """Adds an item that loads the next page, if not all filtered entries are in the file menu
+        """
+
+        remaining = len(self.dir_listing.filtered) - self.listing_shown
+        if remaining > 0:
+            self.file_menu.add_item('{}{} more entries - Enter to load'.format(pyautogit.dir_listing.MORE_PREFIX, remaining))
+
+
+    def load_more_entries(self):
+        """Replaces the load more item with the next page of the filtered directory listing
+        """
+
+        items = self.file_menu.get_item_list()
+        if len(items) > 0 and items[-1].startswith(pyautogit.dir_listing.MORE_PREFIX):
+            items.pop()
+        page = self.dir_listing.get_page(self.listing_shown)
+        self.file_menu.add_item_list(page)
+        self.listing_shown = self.listing_shown + len(page)
+        self.add_more_entries_item()
+
+
+    def filter_dir_listing(self):
+        """Filters the cached directory listing with the text in the filter box
+        """
+
+        if self.dir_listing is None:
+            return
+        self.dir_listing.apply_filter(self.filter_textbox.get())
+        self.show_dir_listing()
+        self.manager.root.move_focus(self.file_menu)
+
+
+    def update_listing_entry(self, name):
+        """Updates a single entry of the cached directory listing, without listing the directory again
+
+        Parameters
+        ----------
+        name : str
+            Name of the created, saved or deleted entry in the opened directory
+        """
+
+        if self.dir_listing is None or self.dir_listing.path != self.opened_path:
+            self.refresh_status()
+            return
+        self.dir_listing.update_entry(name)
+        self.show_dir_listing(min_shown=self.listing_shown)
+
 
     def add_new_file(self):
         """Function for creating a new file
@@ -153,6 +261,9 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         if os.path.exists(os.path.join(self.current_dir_textbox.get(), self.new_file_textbox.get())):
             self.manager.root.show_error_popup('File Exists', 'File exists with name {}!'.format(self.new_file_textbox.get()))
         else:
+            self.close_file_pager()
+            self.set_initial_values()
+            self.loaded_hash = None
             self.edit_text_block.title = 'Open file - ' + self.new_file_textbox.get() + ' - (Unsaved)'
             self.edit_text_block.clear()
             self.new_file_textbox.clear()
@@ -177,33 +288,134 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         """
 
         filename = self.file_menu.get()
-        if filename.startswith('<DIR>'):
+        if filename is None:
+            return
+        elif filename.startswith(pyautogit.dir_listing.MORE_PREFIX):
+            self.load_more_entries()
+        elif filename.startswith('<DIR>'):
             self.current_dir_textbox.set_text(os.path.join(self.opened_path, filename[6:]))
             self.open_new_directory()
         else:
+            self.close_file_pager()
+            self.set_initial_values()
+            file_path = os.path.join(self.opened_path, filename)
+            try:
+                if os.path.getsize(file_path) > self.paged_size_threshold:
+                    self.open_paged_file(filename)
+                    return
+            except OSError:
+                self.manager.root.show_error_popup('OS ERROR', 'Failed to open {}!'.format(filename))
+                return
             try:
                 self.edit_text_block.text_color_rules = []
-                fp = open(os.path.join(self.opened_path, filename), 'r')
+                fp = open(file_path, 'r')
                 text = fp.read()
                 fp.close()
                 self.edit_text_block.set_text(text)
+                self.loaded_hash = pyautogit.atomic_save.hash_text(self.edit_text_block.get())
                 self.edit_text_block.title = 'Open file - {}'.format(filename)
             except:
                 self.manager.root.show_warning_popup('Not a text file', 'The selected file could not be opened - not a text file')
 
 
+    def open_paged_file(self, filename):
+        """Opens a large file in read-only paged mode, loading only the lines around the view
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file in the opened directory
+        """
+
+        try:
+            self.file_pager = pyautogit.file_pager.FilePager(os.path.join(self.opened_path, filename))
+        except (OSError, ValueError):
+            self.manager.root.show_error_popup('OS ERROR', 'Failed to map {} into memory!'.format(filename))
+            return
+        LOGGER.write('Opened {} in paged mode, {} bytes, {} lines'.format(filename, self.file_pager.size, self.file_pager.num_lines))
+        self.pager_start = 0
+        self.edit_text_block.text_color_rules = []
+        self.render_file_page()
+
+
+    def get_file_page_size(self):
+        """Gets the number of lines loaded at a time from a paged file
+
+        Returns
+        -------
+        page_size : int
+            Number of visible lines plus the margin
+        """
+
+        return max(self.edit_text_block.get_viewport_height(), 1) + self.pager_margin
+
+
+    def render_file_page(self):
+        """Loads the current window of the paged file into the editor
+        """
+
+        lines = self.file_pager.get_lines(self.pager_start, self.get_file_page_size())
+        self.edit_text_block.set_text('\n'.join(lines))
+        filename = os.path.basename(self.file_pager.file_path)
+        self.edit_text_block.title = 'Read only - {} - lines {}-{} of {}'.format(filename, self.pager_start + 1,
+                                                                             self.pager_start + len(lines), self.file_pager.num_lines)
+        self.manager.root.set_status_bar_text('{} | Page - PgUp/PgDn | Open File Menu - m'.format(self.edit_text_block.title))
+
+
+    def scroll_file_page(self, num_pages):
+        """Moves the loaded window of the paged file forwards or backwards
+
+        Parameters
+        ----------
+        num_pages : int
+            Number of windows to move, negative to move back
+        """
+
+        if self.file_pager is None:
+            return
+        page_size = self.get_file_page_size()
+        last_start = max(self.file_pager.num_lines - page_size, 0)
+        new_start = min(max(self.pager_start + num_pages * page_size, 0), last_start)
+        if new_start != self.pager_start:
+            self.pager_start = new_start
+            self.render_file_page()
+
+
+    def close_file_pager(self):
+        """Unmaps and closes the paged file, if one is open
+        """
+
+        if self.file_pager is not None:
+            self.file_pager.close()
+            self.file_pager = None
+
+
     def save_opened_file(self):
         """Function that saves the opened file
         """
 
-        if self.edit_text_block.title.startswith('Open file - '):
+        if self.file_pager is not None:
+            self.manager.root.show_error_popup('Read Only', 'Files over {} MB are opened read-only.'.format(self.paged_size_threshold // (1024 * 1024)))
+        elif self.edit_text_block.title.startswith('Open file - '):
             filename = self.edit_text_block.title.split('-', 1)[1].strip()
-            fp = open(os.path.join(self.opened_path, filename), 'w')
-            fp.write(self.edit_text_block.get())
-            fp.close()
-            self.refresh_status()
+            if filename.endswith(' - (Unsaved)'):
+                filename = filename[:-len(' - (Unsaved)')]
+            try:
+                bytes_written, self.loaded_hash = pyautogit.atomic_save.save_file_atomic(os.path.join(self.opened_path, filename),
+                                                                                         self.edit_text_block.get(),
+                                                                                         last_hash=self.loaded_hash)
+            except OSError as e:
+                self.manager.root.show_error_popup('Save Error', 'Failed to save {}: {}'.format(filename, str(e)))
+                return
+            if bytes_written > 0:
+                LOGGER.write('Saved {}, {} bytes written'.format(filename, bytes_written))
+                self.update_listing_entry(filename)
             self.manager.root.move_focus(self.edit_text_block)
             self.edit_text_block.title = 'Open file - {}'.format(filename)
+            if bytes_written > 0:
+                self.manager.root.set_status_bar_text('Saved {} - {} bytes written'.format(filename, bytes_written))
+            else:
+                self.manager.root.set_status_bar_text('No changes to save in {}'.format(filename))
         else:
             self.manager.root.show_error_popup('No File Opened', 'Please open a file before saving it.')
 
@@ -212,18 +424,22 @@ class EditorScreenManager(pyautogit.screen_manager.ScreenManager):
         """Function that deletes the selected file
         """
 
-        if not self.file_menu.get().startswith('<DIR>'):
-            target = os.path.join(self.current_dir_textbox.get(), self.file_menu.get())
+        selected = self.file_menu.get()
+        if selected is None or selected.startswith(pyautogit.dir_listing.MORE_PREFIX) or selected == '<DIR> ..':
+            return
+        elif not selected.startswith('<DIR>'):
+            name = selected
+            target = os.path.join(self.current_dir_textbox.get(), name)
             try:
                 os.remove(target)
             except:
                 self.manager.root.show_error_popup('Delete Error', 'Failed to delete the target file!')
         else:
-            target = os.path.join(self.current_dir_textbox.get(), self.file_menu.get()[6:])
+            name = selected[6:]
+            target = os.path.join(self.current_dir_textbox.get(), name)
             try:
                 shutil.rmtree(target)
             except:
                 self.manager.root.show_error_popup('Delete Error', 'Could not remove target directory!')
 
-        self.refresh_status()
-
+        self.update_listing_entry(name)
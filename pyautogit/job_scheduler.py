@@ -0,0 +1,459 @@
+"""Module for running long operations as prioritized background jobs.
+
+Jobs are queued by priority and run on a small pool of worker threads, so a slow push in one
+repository does not hold up a fetch in another. Jobs in the same repository run one at a time,
+in priority order, so they do not fail on each other's index.lock. Each job has an id that can be
+used to cancel it. A queued job is simply dropped, while a running job has any git processes it
+started killed, since commands run from a job's thread register their processes with it.
+
+Callbacks are fired on the worker thread, so callers that update the CUI must hand them over to
+the CUI thread.
+
+This file should remain separate from the CUI interface.
+"""
+
+import time
+import heapq
+import threading
+import pyautogit.logger as LOGGER
+
+
+# Job priorities, jobs with lower values are started first
+PRIORITY_HIGH   = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW    = 2
+
+# Stores the job run by each worker thread, so commands can register their processes with it
+_CURRENT_JOB = threading.local()
+
+
+def get_current_job():
+    """Gets the job run by the calling thread
+
+    Returns
+    -------
+    job : Job
+        The running job, or None if the calling thread is not a job worker
+    """
+
+    return getattr(_CURRENT_JOB, 'job', None)
+
+
+def register_process(proc):
+    """Registers a started process with the job run by the calling thread, if any
+
+    Parameters
+    ----------
+    proc : subprocess.Popen
+        The started process
+    """
+
+    job = get_current_job()
+    if job is not None:
+        job.add_process(proc)
+
+
+def run_as_job(job, function):
+    """Runs a function on the calling thread as part of a job, so processes it starts can be killed by cancelling the job
+
+    Parameters
+    ----------
+    job : Job
+        The job the function runs as
+    function : no-arg function
+        Function to run
+
+    Returns
+    -------
+    result : obj
+        Return value of the function
+    """
+
+    _CURRENT_JOB.job = job
+    try:
+        return function()
+    finally:
+        _CURRENT_JOB.job = None
+
+
+class Job:
+    """Class representing a single background job
+
+    Attributes
+    ----------
+    job_id : int
+        Unique id of the job
+    title : str
+        Short description of the job
+    function : no-arg function
+        Function run by the job, returning an (out, err) pair
+    priority : int
+        Job priority, lower runs first
+    on_finished : function
+        Function called with the (out, err) result once the job finishes, unless cancelled
+    repo_path : str
+        Repository the job runs in, None if it may run alongside any other job
+    state : str
+        One of 'queued', 'running', 'done', 'failed' or 'cancelled'
+    result : tuple of (str, int)
+        (out, err) pair returned by the function, None until finished
+    submit_time : float
+        time.time() when the job was queued
+    start_time : float
+        time.time() when the job started running, None if it has not
+    end_time : float
+        time.time() when the job stopped running, None if it has not
+    processes : list of subprocess.Popen
+        Processes started by the job
+    lock : threading.Lock
+        Lock protecting state and processes
+    """
+
+    def __init__(self, job_id, title, function, priority, on_finished, repo_path=None):
+        """Constructor for Job
+        """
+
+        self.job_id         = job_id
+        self.title          = title
+        self.function       = function
+        self.priority       = priority
+        self.on_finished    = on_finished
+        self.repo_path      = repo_path
+        self.state          = 'queued'
+        self.result         = None
+        self.submit_time    = time.time()
+        self.start_time     = None
+        self.end_time       = None
+        self.processes      = []
+        self.lock           = threading.Lock()
+
+
+    def add_process(self, proc):
+        """Tracks a process started by the job, killing it immediately if the job was cancelled
+
+        Parameters
+        ----------
+        proc : subprocess.Popen
+            The started process
+        """
+
+        with self.lock:
+            self.processes = [process for process in self.processes if process.poll() is None]
+            self.processes.append(proc)
+            cancelled = self.state == 'cancelled'
+        if cancelled:
+            proc.kill()
+
+
+    def cancel(self):
+        """Cancels the job, killing any running processes it started
+
+        Returns
+        -------
+        cancelled : bool
+            False if the job had already finished
+        """
+
+        with self.lock:
+            if self.state not in ['queued', 'running']:
+                return False
+            self.state = 'cancelled'
+            processes = list(self.processes)
+        for proc in processes:
+            if proc.poll() is None:
+                proc.kill()
+        return True
+
+
+    def is_cancelled(self):
+        """Checks if the job was cancelled
+
+        Returns
+        -------
+        cancelled : bool
+            True if the job was cancelled
+        """
+
+        return self.state == 'cancelled'
+
+
+    def get_description(self):
+        """Gets a one line description of the job for display
+
+        Returns
+        -------
+        description : str
+            Job id, state, title and elapsed time
+        """
+
+        if self.start_time is None:
+            elapsed = time.time() - self.submit_time
+        elif self.end_time is None:
+            elapsed = time.time() - self.start_time
+        else:
+            elapsed = self.end_time - self.start_time
+        return '#{} [{}] {} ({:.1f}s)'.format(self.job_id, self.state, self.title, elapsed)
+
+
+class JobScheduler:
+    """Class that runs jobs by priority on a pool of worker threads
+
+    Attributes
+    ----------
+    max_workers : int
+        Maximum number of jobs running at once
+    max_history : int
+        Number of finished jobs remembered for display
+    queue : list of tuple
+        Heap of (priority, job id, job) for queued jobs
+    jobs : list of Job
+        Queued, running and recently finished jobs, oldest first
+    workers : list of threading.Thread
+        Started worker threads
+    busy_repos : set of str
+        Repositories that have a running job
+    next_id : int
+        Id given to the next submitted job
+    on_change : function
+        Default None, otherwise function called with a job whenever it changes state
+    running : bool
+        False once the scheduler is shut down
+    condition : threading.Condition
+        Condition protecting the queue and signalling workers
+    """
+
+    def __init__(self, max_workers=4, max_history=50):
+        """Constructor for JobScheduler
+        """
+
+        self.max_workers    = max_workers
+        self.max_history    = max_history
+        self.queue          = []
+        self.jobs           = []
+        self.workers        = []
+        self.busy_repos     = set()
+        self.next_id        = 1
+        self.on_change      = None
+        self.running        = True
+        self.condition      = threading.Condition()
+
+
+    def submit(self, title, function, priority=PRIORITY_NORMAL, on_finished=None, repo_path=None):
+        """Queues a job
+
+        Parameters
+        ----------
+        title : str
+            Short description of the job
+        function : no-arg function
+            Function to run, returning an (out, err) pair
+        priority : int
+            One of PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW
+        on_finished : function
+            Default None, otherwise function called with out and err once the job finishes
+        repo_path : str
+            Default None, otherwise the job waits for other jobs in this repository to finish
+
+        Returns
+        -------
+        job : Job
+            The queued job
+        """
+
+        with self.condition:
+            job = Job(self.next_id, title, function, priority, on_finished, repo_path=repo_path)
+            self.next_id = self.next_id + 1
+            heapq.heappush(self.queue, (priority, job.job_id, job))
+            self.jobs.append(job)
+            self.trim_history()
+            if len(self.workers) < self.max_workers:
+                worker = threading.Thread(target=self.worker_loop, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.condition.notify()
+        LOGGER.write('Queued job {} - {}'.format(job.job_id, title))
+        self.notify_change(job)
+        return job
+
+
+    def trim_history(self):
+        """Forgets the oldest finished jobs beyond max_history. Must be called holding the condition
+        """
+
+        finished = [job for job in self.jobs if job.state not in ['queued', 'running']]
+        if len(finished) > self.max_history:
+            to_remove = finished[:len(finished) - self.max_history]
+            self.jobs = [job for job in self.jobs if job not in to_remove]
+
+
+    def take_next_job(self):
+        """Removes the highest priority queued job whose repository has no running job. Must be called holding the condition
+
+        Returns
+        -------
+        job : Job
+            The job to run next, or None if every queued job waits on a busy repository
+        """
+
+        for entry in sorted(self.queue):
+            job = entry[2]
+            if job.repo_path is None or job.repo_path not in self.busy_repos:
+                self.queue.remove(entry)
+                heapq.heapify(self.queue)
+                return job
+        return None
+
+
+    def worker_loop(self):
+        """Main loop of a worker thread, running queued jobs until shut down
+        """
+
+        while True:
+            with self.condition:
+                job = None
+                while self.running:
+                    job = self.take_next_job()
+                    if job is not None:
+                        break
+                    self.condition.wait()
+                if not self.running:
+                    return
+                if job.repo_path is not None:
+                    self.busy_repos.add(job.repo_path)
+            try:
+                self.run_job(job)
+            finally:
+                with self.condition:
+                    self.busy_repos.discard(job.repo_path)
+                    self.condition.notify_all()
+
+
+    def run_job(self, job):
+        """Runs a single job on the calling worker thread
+
+        Parameters
+        ----------
+        job : Job
+            Job to run
+        """
+
+        with job.lock:
+            if job.state != 'queued':
+                return
+            job.state = 'running'
+            job.start_time = time.time()
+        self.notify_change(job)
+
+        try:
+            result = run_as_job(job, job.function)
+        except Exception as e:
+            result = ('Job {} failed: {}'.format(job.title, str(e)), -1)
+
+        with job.lock:
+            job.end_time = time.time()
+            job.result = result
+            if job.state == 'running':
+                job.state = 'done' if result[1] == 0 else 'failed'
+            cancelled = job.state == 'cancelled'
+        LOGGER.write('Job {} - {} finished as {}'.format(job.job_id, job.title, job.state))
+        if not cancelled and job.on_finished is not None:
+            job.on_finished(*result)
+        self.notify_change(job)
+
+
+    def notify_change(self, job):
+        """Calls the on_change callback for a job, if one is set
+
+        Parameters
+        ----------
+        job : Job
+            The job that changed state
+        """
+
+        if self.on_change is not None:
+            self.on_change(job)
+
+
+    def cancel(self, job_id):
+        """Cancels a job
+
+        Parameters
+        ----------
+        job_id : int
+            Id of the job to cancel
+
+        Returns
+        -------
+        cancelled : bool
+            False if the job does not exist or already finished
+        """
+
+        job = self.get_job(job_id)
+        if job is None or not job.cancel():
+            return False
+        with job.lock:
+            if job.end_time is None and job.start_time is None:
+                job.end_time = time.time()
+                job.start_time = job.end_time
+        LOGGER.write('Cancelled job {} - {}'.format(job.job_id, job.title))
+        self.notify_change(job)
+        return True
+
+
+    def get_job(self, job_id):
+        """Finds a job by id
+
+        Parameters
+        ----------
+        job_id : int
+            Id of the job
+
+        Returns
+        -------
+        job : Job
+            The job, or None if it is not known
+        """
+
+        with self.condition:
+            for job in self.jobs:
+                if job.job_id == job_id:
+                    return job
+        return None
+
+
+    def get_jobs(self):
+        """Gets all known jobs
+
+        Returns
+        -------
+        jobs : list of Job
+            Queued, running and recently finished jobs, oldest first
+        """
+
+        with self.condition:
+            return list(self.jobs)
+
+
+    def get_active_count(self):
+        """Counts jobs that are queued or running
+
+        Returns
+        -------
+        active : int
+            Number of unfinished jobs
+        """
+
+        with self.condition:
+            return len([job for job in self.jobs if job.state in ['queued', 'running']])
+
+
+    def shutdown(self):
+        """Cancels all unfinished jobs, and stops the worker threads
+        """
+
+        for job in self.get_jobs():
+            job.cancel()
+        with self.condition:
+            self.running = False
+            self.queue = []
+            self.condition.notify_all()
@@ -1,10 +1,25 @@
 """Module containing logging classes and functions.
 
 The logger is controlled via a set of global variables set by the pyautogit client.
+
+Messages are not written by the calling thread. write() checks the level and enabled flag,
+and places the raw message on a queue. A background writer thread formats queued messages,
+writes them to the log file in batches, and rotates the file once it grows past a size limit.
 """
 
 import os
+import queue
+import atexit
 import datetime
+import threading
+
+# Log levels, in increasing order of severity
+DEBUG   = 10
+INFO    = 20
+WARNING = 30
+ERROR   = 40
+
+_LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
 
 # Global var that stores path to logfile
 _LOG_FILE_PATH = None
@@ -12,8 +27,126 @@ _LOG_FILE_PATH = None
 # Global var that stores whether or not logging is enabled
 _LOG_ENABLED = False
 
-# Global var that stores file pointer for log file
-_LOG_FILE_POINTER = None
+# Global var that stores the minimum level of written messages
+_LOG_LEVEL = DEBUG
+
+# Global var that stores the size in bytes after which the log file is rotated
+_LOG_MAX_BYTES = 5 * 1024 * 1024
+
+# Global var that stores the number of rotated log files kept
+_LOG_BACKUP_COUNT = 3
+
+# Global var that stores the background log writer
+_LOG_WRITER = None
+
+
+class LogWriter(threading.Thread):
+    """Thread that writes queued log messages to the log file in batches
+
+    Attributes
+    ----------
+    log_file_path : str
+        Path to the log file
+    max_bytes : int
+        Size after which the log file is rotated, 0 to never rotate
+    backup_count : int
+        Number of rotated files kept, named log_file_path.1, log_file_path.2 and so on
+    max_batch : int
+        Maximum number of messages written at once
+    message_queue : queue.Queue
+        Queued (timestamp, level, text, no_timestamp) tuples, None to stop the writer
+    fp : file
+        The open log file
+    """
+
+    def __init__(self, log_file_path, max_bytes, backup_count, max_batch=512):
+        """Constructor for LogWriter. Opens the log file for appending
+        """
+
+        super().__init__(name='pyautogit-logger', daemon=True)
+        self.log_file_path  = log_file_path
+        self.max_bytes      = max_bytes
+        self.backup_count   = backup_count
+        self.max_batch      = max_batch
+        self.message_queue  = queue.Queue()
+        self.fp             = open(log_file_path, 'a')
+
+
+    def run(self):
+        """Waits for messages, writing each available batch with a single write call
+        """
+
+        running = True
+        while running:
+            batch = [self.message_queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.message_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                batch = batch[:batch.index(None)]
+                running = False
+            if len(batch) > 0:
+                self.write_batch(batch)
+        self.fp.close()
+
+
+    def write_batch(self, batch):
+        """Formats and writes a batch of messages, rotating the log file first if it is full
+
+        Parameters
+        ----------
+        batch : list of tuple
+            Queued (timestamp, level, text, no_timestamp) messages
+        """
+
+        try:
+            lines = []
+            size = self.fp.tell()
+            for timestamp, level, text, no_timestamp in batch:
+                if self.max_bytes > 0 and size >= self.max_bytes:
+                    self.fp.write(''.join(lines))
+                    self.rotate()
+                    lines = []
+                    size = self.fp.tell()
+                if no_timestamp:
+                    line = '{}\n'.format(text)
+                else:
+                    line = '{} - {} - {}\n'.format(timestamp, get_level_name(level), text)
+                lines.append(line)
+                size = size + len(line)
+            self.fp.write(''.join(lines))
+            self.fp.flush()
+        except (OSError, ValueError):
+            pass
+
+
+    def rotate(self):
+        """Renames the log file to log_file_path.1, shifting older rotated files, and starts a new one
+        """
+
+        self.fp.close()
+        try:
+            for i in range(self.backup_count - 1, 0, -1):
+                source = '{}.{}'.format(self.log_file_path, i)
+                if os.path.exists(source):
+                    os.replace(source, '{}.{}'.format(self.log_file_path, i + 1))
+            if self.backup_count > 0:
+                os.replace(self.log_file_path, '{}.1'.format(self.log_file_path))
+            else:
+                os.remove(self.log_file_path)
+        finally:
+            # If renaming failed, keep appending to the current file and retry on the next batch
+            self.fp = open(self.log_file_path, 'a')
+
+
+    def stop(self):
+        """Writes all queued messages, then stops the writer and closes the log file
+        """
+
+        self.message_queue.put(None)
+        self.join()
 
 
 def toggle_logging():
@@ -35,7 +168,7 @@ def toggle_logging():
             _LOG_ENABLED = initialized
         else:
             return
-                
+
 
 def set_log_file_path(log_file_path):
     """Sets the path to the log file
@@ -50,6 +183,53 @@ def set_log_file_path(log_file_path):
     _LOG_FILE_PATH = log_file_path
 
 
+def set_log_level(log_level):
+    """Sets the minimum level of written messages. Messages below it are discarded by write()
+
+    Parameters
+    ----------
+    log_level : int
+        One of DEBUG, INFO, WARNING or ERROR
+    """
+
+    global _LOG_LEVEL
+    _LOG_LEVEL = log_level
+
+
+def get_level_name(log_level):
+    """Gets the display name of a log level
+
+    Parameters
+    ----------
+    log_level : int
+        One of DEBUG, INFO, WARNING or ERROR
+
+    Returns
+    -------
+    level_name : str
+        Name of the level
+    """
+
+    return _LEVEL_NAMES.get(log_level, str(log_level))
+
+
+def set_log_rotation(max_bytes, backup_count):
+    """Sets when the log file is rotated, taking effect the next time logging is enabled
+
+    Parameters
+    ----------
+    max_bytes : int
+        Size after which the log file is rotated, 0 to never rotate
+    backup_count : int
+        Number of rotated log files kept
+    """
+
+    global _LOG_MAX_BYTES
+    global _LOG_BACKUP_COUNT
+    _LOG_MAX_BYTES = max_bytes
+    _LOG_BACKUP_COUNT = backup_count
+
+
 def initialize_logger():
     """Function for initializing log-file writing in addition to stdout output
 
@@ -60,46 +240,47 @@ def initialize_logger():
     """
 
     global _LOG_FILE_PATH
-    global _LOG_FILE_POINTER
+    global _LOG_WRITER
     if os.path.exists(_LOG_FILE_PATH):
         if not os.access(_LOG_FILE_PATH, os.W_OK):
             return False
-    _LOG_FILE_POINTER = open(_LOG_FILE_PATH, 'w+')
+    try:
+        _LOG_WRITER = LogWriter(_LOG_FILE_PATH, _LOG_MAX_BYTES, _LOG_BACKUP_COUNT)
+    except OSError:
+        return False
+    _LOG_WRITER.start()
     return True
 
 
 def close_logger():
-    """Function that closes the opened logfile
+    """Function that writes any queued messages and closes the opened logfile
     """
 
-    global _LOG_FILE_POINTER
-    if _LOG_FILE_POINTER is not None:
-        _LOG_FILE_POINTER.close()
-        _LOG_FILE_POINTER = None
+    global _LOG_WRITER
+    if _LOG_WRITER is not None:
+        _LOG_WRITER.stop()
+        _LOG_WRITER = None
 
 
+def write(text, no_timestamp=False, level=DEBUG):
+    """Main logging funcion. Queues the message for the log writer if logging is enabled
 
-def write(text, no_timestamp=False):
-    """Main logging funcion. Called if write function was set
-    
     Parameters
     ----------
     text : str
         debug text to print
     no_timestamp=False : bool
         a flag to disable timestamp printing when required
+    level : int
+        Default DEBUG, otherwise the level of the message
     """
 
-    global _LOG_FILE_POINTER
-    global _LOG_ENABLED
-    if _LOG_ENABLED and _LOG_FILE_POINTER is not None:
-
-        # remove timestamp if not in use
-        if no_timestamp:
-            final_text = '{}\n'.format(text)
-        else:
-            # otherwise add timestamp
-            final_text = '{} - {}\n'.format(datetime.datetime.now(), text)
+    if level < _LOG_LEVEL or not _LOG_ENABLED:
+        return
+    log_writer = _LOG_WRITER
+    if log_writer is not None:
+        log_writer.message_queue.put((datetime.datetime.now(), level, text, no_timestamp))
 
-        _LOG_FILE_POINTER.write(final_text)
 
+# Write any queued messages if pyautogit exits without closing the logger
+atexit.register(close_logger)
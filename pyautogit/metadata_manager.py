@@ -40,6 +40,11 @@ class PyAutogitMetadataManager:
         metadata['EDITOR']      = self.manager.default_editor
         metadata['VERSION']     = pyautogit.__version__
         metadata['LOG_ENABLE']  = LOGGER._LOG_ENABLED
+        metadata['LOG_LEVEL']   = LOGGER._LOG_LEVEL
+        metadata['DISCOVERY_DEPTH']     = self.manager.discovery_depth
+        metadata['DISCOVERY_IGNORE']    = self.manager.discovery_ignore
+        metadata['FAST_STATUS']         = self.manager.fast_status.enabled
+        metadata['FAST_STATUS_UNTRACKED']   = self.manager.fast_status.include_untracked
         LOGGER.write('Writing metadata: {}'.format(metadata))
         fp = open(settings_file, 'w')
         json.dump(metadata, fp)
@@ -61,6 +66,16 @@ class PyAutogitMetadataManager:
             self.manager.editor_type = 'External'
         if 'VERSION' in metadata.keys() and metadata['VERSION'] != pyautogit.__version__:
             self.manager.root.show_message_popup('PyAutogit Updated', 'Congratulations for updating to pyautogit {}! See patch notes on github.'.format(pyautogit.__version__))
+        if 'DISCOVERY_DEPTH' in metadata.keys():
+            self.manager.discovery_depth = metadata['DISCOVERY_DEPTH']
+        if 'DISCOVERY_IGNORE' in metadata.keys():
+            self.manager.discovery_ignore = metadata['DISCOVERY_IGNORE']
+        if 'FAST_STATUS' in metadata.keys():
+            self.manager.fast_status.enabled = metadata['FAST_STATUS']
+        if 'FAST_STATUS_UNTRACKED' in metadata.keys():
+            self.manager.fast_status.include_untracked = metadata['FAST_STATUS_UNTRACKED']
+        if 'LOG_LEVEL' in metadata.keys():
+            LOGGER.set_log_level(metadata['LOG_LEVEL'])
         if 'LOG_ENABLE' in metadata.keys() and metadata['LOG_ENABLE']:
             #LOGGER.toggle_logging()
             pass
@@ -0,0 +1,233 @@
+"""Module for caching command output that depends only on immutable git objects.
+
+A commit, tree or blob can never change once its object id is known, so output computed from
+one (ex. `git show <commit>`) is cached, keyed on the kind of output and the full object id.
+The cache is bounded, and evicts the least recently used entries first. It is kept in memory,
+and can be saved to a json file in .pyautogit on exit and loaded again on the next start, so
+commits viewed in an earlier session do not need to be read again.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import re
+import json
+import threading
+from collections import OrderedDict
+import pyautogit.atomic_save
+import pyautogit.logger as LOGGER
+
+
+# Version of the cache file format, bumped when the format changes
+CACHE_VERSION = 1
+
+# Default maximum number of cached entries
+MAX_ENTRIES = 1000
+
+# Default maximum total size of cached output, in characters
+MAX_SIZE = 16 * 1024 * 1024
+
+# Output larger than this is never cached, so a single entry cannot flush the whole cache
+MAX_ENTRY_SIZE = 1024 * 1024
+
+# Matches full SHA-1 and SHA-256 object ids
+OBJECT_ID_PATTERN = re.compile('^([0-9a-f]{40}|[0-9a-f]{64})$')
+
+
+def is_object_id(name):
+    """Checks if a name is a full object id, as opposed to a ref or abbreviated hash
+
+    Parameters
+    ----------
+    name : str
+        Object name
+
+    Returns
+    -------
+    is_id : bool
+        True if the name is a full lowercase hex object id
+    """
+
+    return OBJECT_ID_PATTERN.match(name) is not None
+
+
+class ObjectCache:
+    """Bounded least recently used cache of output keyed on object id
+
+    Attributes
+    ----------
+    cache_file : str
+        Path to the json cache file, None to only cache in memory
+    max_entries : int
+        Maximum number of cached entries
+    max_size : int
+        Maximum total size of cached output, in characters
+    entries : OrderedDict of str -> str
+        Cached output keyed on '<kind>:<object id>', least recently used first
+    size : int
+        Total size of cached output
+    loaded : bool
+        True once the cache file has been read
+    modified : bool
+        True if entries were added since the cache file was read or written
+    hits : int
+        Number of lookups answered from the cache
+    misses : int
+        Number of lookups not found in the cache
+    lock : threading.Lock
+        Lock protecting the entries, as commands run from background threads
+    """
+
+    def __init__(self, cache_file=None, max_entries=MAX_ENTRIES, max_size=MAX_SIZE):
+        """Constructor for ObjectCache
+        """
+
+        self.cache_file     = cache_file
+        self.max_entries    = max_entries
+        self.max_size       = max_size
+        self.entries        = OrderedDict()
+        self.size           = 0
+        self.loaded         = False
+        self.modified       = False
+        self.hits           = 0
+        self.misses         = 0
+        self.lock           = threading.Lock()
+
+
+    def load(self):
+        """Reads the cache file on first use, discarding it if unreadable or of another version
+        """
+
+        if self.loaded:
+            return
+        self.loaded = True
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as fp:
+                contents = json.load(fp)
+        except (OSError, ValueError):
+            LOGGER.write('Discarding unreadable object cache {}'.format(self.cache_file))
+            return
+        if contents.get('version') != CACHE_VERSION:
+            return
+        for key, value in contents.get('entries', []):
+            self.add_entry(key, value)
+        LOGGER.write('Loaded {} cached object entries'.format(len(self.entries)))
+
+
+    def add_entry(self, key, value):
+        """Adds or replaces an entry as the most recently used one, evicting entries over the limits
+
+        Parameters
+        ----------
+        key : str
+            Cache key
+        value : str
+            Cached output
+        """
+
+        if key in self.entries:
+            self.size = self.size - len(self.entries.pop(key))
+        self.entries[key] = value
+        self.size = self.size + len(value)
+        while len(self.entries) > self.max_entries or self.size > self.max_size:
+            _, evicted = self.entries.popitem(last=False)
+            self.size = self.size - len(evicted)
+
+
+    def get(self, kind, object_id):
+        """Gets cached output, marking it as most recently used
+
+        Parameters
+        ----------
+        kind : str
+            Kind of output (ex. commit_info)
+        object_id : str
+            Full object id the output was computed from
+
+        Returns
+        -------
+        value : str
+            Cached output, or None if not cached
+        """
+
+        key = '{}:{}'.format(kind, object_id)
+        with self.lock:
+            self.load()
+            value = self.entries.get(key)
+            if value is None:
+                self.misses = self.misses + 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits = self.hits + 1
+            return value
+
+
+    def put(self, kind, object_id, value):
+        """Caches output computed from an object
+
+        Parameters
+        ----------
+        kind : str
+            Kind of output (ex. commit_info)
+        object_id : str
+            Full object id the output was computed from
+        value : str
+            Output to cache
+        """
+
+        if len(value) > min(MAX_ENTRY_SIZE, self.max_size):
+            return
+        with self.lock:
+            self.load()
+            self.add_entry('{}:{}'.format(kind, object_id), value)
+            self.modified = True
+
+
+    def save(self):
+        """Writes the cache file, if there is one and entries were added
+        """
+
+        with self.lock:
+            if self.cache_file is None or not self.modified:
+                return
+            contents = {'version'   : CACHE_VERSION,
+                        'entries'   : list(self.entries.items())}
+            try:
+                cache_dir = os.path.dirname(self.cache_file)
+                if not os.path.exists(cache_dir):
+                    os.mkdir(cache_dir)
+                pyautogit.atomic_save.save_file_atomic(self.cache_file, json.dumps(contents))
+                self.modified = False
+            except OSError as e:
+                LOGGER.write('Failed to write object cache: {}'.format(str(e)), level=LOGGER.WARNING)
+
+
+# Global cache shared by pyautogit.commands, in memory only until a cache file is set
+_OBJECT_CACHE = ObjectCache()
+
+
+def get_object_cache():
+    """Gets the global object cache
+
+    Returns
+    -------
+    object_cache : ObjectCache
+        The shared cache instance
+    """
+
+    return _OBJECT_CACHE
+
+
+def set_cache_file(cache_file):
+    """Replaces the global object cache with one persisted to a file
+
+    Parameters
+    ----------
+    cache_file : str
+        Path to the json cache file, None to only cache in memory
+    """
+
+    global _OBJECT_CACHE
+    _OBJECT_CACHE = ObjectCache(cache_file=cache_file)
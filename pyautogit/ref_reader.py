@@ -0,0 +1,400 @@
+"""Module for reading refs and config of a repository without starting git processes.
+
+Branch, tag and remote lists only require reading a handful of small files: HEAD, the loose
+refs under refs/, packed-refs and the config files. RefReader parses these directly, producing
+the same output as `git branch`, `git tag` and `git remote`. Whenever it finds something it does
+not fully understand (ex. reftable storage, config includes, custom sort orders, linked worktrees
+or a detached HEAD), it raises UnsupportedRepositoryError, and callers fall back to the git CLI.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import re
+from pyautogit.errors import UnsupportedRepositoryError
+
+
+# Environment variables that change which repository or config files git reads
+UNSUPPORTED_ENVIRONMENT = ['GIT_DIR', 'GIT_COMMON_DIR', 'GIT_WORK_TREE', 'GIT_CONFIG', 'GIT_CONFIG_GLOBAL',
+                           'GIT_CONFIG_SYSTEM', 'GIT_CONFIG_COUNT', 'GIT_CONFIG_PARAMETERS', 'GIT_NAMESPACE']
+
+# Config sections that change ref listing output, or pull in config this module does not read
+UNSUPPORTED_SECTIONS = ['include', 'includeif', 'column', 'versionsort']
+
+# Config keys, as section.key, that change ref listing output
+UNSUPPORTED_KEYS = ['branch.sort', 'tag.sort', 'extensions.refstorage', 'extensions.worktreeconfig']
+
+OBJECT_ID_REGEX = re.compile(r'^([0-9a-f]{40}|[0-9a-f]{64})$')
+SECTION_REGEX   = re.compile(r'^\[\s*([A-Za-z0-9.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\](.*)$')
+KEY_REGEX       = re.compile(r'^([A-Za-z][A-Za-z0-9-]*)\s*(?:=(.*))?$')
+
+
+def parse_config_value(raw_value):
+    """Parses a config value, removing quotes, escapes and trailing comments
+
+    Parameters
+    ----------
+    raw_value : str
+        Text after the '=' of a config line
+
+    Returns
+    -------
+    value : str
+        The parsed value
+
+    Raises
+    ------
+    UnsupportedRepositoryError
+        If the value continues on the next line, or is malformed
+    """
+
+    value = ''
+    in_quotes = False
+    i = 0
+    raw_value = raw_value.strip()
+    while i < len(raw_value):
+        char = raw_value[i]
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == '\\':
+            if i + 1 >= len(raw_value):
+                raise UnsupportedRepositoryError('Config value continues on next line')
+            value = value + {'n': '\n', 't': '\t', 'b': '\b'}.get(raw_value[i + 1], raw_value[i + 1])
+            i = i + 1
+        elif char in '#;' and not in_quotes:
+            break
+        else:
+            value = value + char
+        i = i + 1
+    if in_quotes:
+        raise UnsupportedRepositoryError('Unterminated quote in config value')
+    return value.strip()
+
+
+def parse_config(config_text):
+    """Parses git config file contents
+
+    Parameters
+    ----------
+    config_text : str
+        Contents of a config file
+
+    Returns
+    -------
+    entries : list of tuple of (str, str, str, str)
+        (section, subsection, key, value) of each entry, in file order. Section and key are lower
+        case, subsection is None for sections without one, and value is None for keys without '='
+
+    Raises
+    ------
+    UnsupportedRepositoryError
+        If a line cannot be parsed
+    """
+
+    entries = []
+    section = None
+    subsection = None
+    for line in config_text.splitlines():
+        line = line.strip()
+        match = SECTION_REGEX.match(line)
+        if match is not None:
+            section = match.group(1).lower()
+            subsection = match.group(2)
+            if subsection is not None:
+                subsection = re.sub(r'\\(.)', r'\1', subsection)
+            elif '.' in section:
+                # Deprecated [section.subsection] syntax
+                section, subsection = section.split('.', 1)
+            line = match.group(3).strip()
+        if len(line) == 0 or line[0] in '#;':
+            continue
+        match = KEY_REGEX.match(line)
+        if match is None or section is None:
+            raise UnsupportedRepositoryError('Cannot parse config line: {}'.format(line))
+        value = None
+        if match.group(2) is not None:
+            value = parse_config_value(match.group(2))
+        entries.append((section, subsection, match.group(1).lower(), value))
+    return entries
+
+
+def get_global_config_paths():
+    """Gets the paths of the system and global config files read by git, in reading order
+
+    Returns
+    -------
+    config_paths : list of str
+        Config file paths, which may not exist
+    """
+
+    config_paths = []
+    if 'GIT_CONFIG_NOSYSTEM' not in os.environ:
+        config_paths.append('/etc/gitconfig')
+    xdg_config_home = os.environ.get('XDG_CONFIG_HOME', os.path.join(os.path.expanduser('~'), '.config'))
+    config_paths.append(os.path.join(xdg_config_home, 'git', 'config'))
+    config_paths.append(os.path.join(os.path.expanduser('~'), '.gitconfig'))
+    return config_paths
+
+
+class RefReader:
+    """Class that lists branches, tags and remotes of a repository by reading its files
+
+    Attributes
+    ----------
+    repo_path : str
+        Path to the repository working tree
+    git_dir : str
+        Path to the git directory holding HEAD
+    common_dir : str
+        Path to the git directory holding refs and config, which differs from git_dir in linked worktrees
+    """
+
+    def __init__(self, repo_path='.'):
+        """Constructor for RefReader. Locates the git directory
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the repository layout is not supported
+        """
+
+        for variable in UNSUPPORTED_ENVIRONMENT:
+            if variable in os.environ:
+                raise UnsupportedRepositoryError('{} is set'.format(variable))
+        self.repo_path  = repo_path
+        self.git_dir    = self.find_git_dir()
+        self.common_dir = self.git_dir
+        commondir_file = os.path.join(self.git_dir, 'commondir')
+        if os.path.isfile(commondir_file):
+            self.common_dir = os.path.normpath(os.path.join(self.git_dir, self.read_file(commondir_file).strip()))
+
+
+    def find_git_dir(self):
+        """Finds the git directory of the repository
+
+        Returns
+        -------
+        git_dir : str
+            Path to the git directory
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If repo_path does not contain a .git directory or gitdir file
+        """
+
+        dot_git = os.path.join(self.repo_path, '.git')
+        if os.path.isdir(dot_git):
+            return dot_git
+        elif os.path.isfile(dot_git):
+            contents = self.read_file(dot_git).strip()
+            if contents.startswith('gitdir: '):
+                return os.path.normpath(os.path.join(self.repo_path, contents[len('gitdir: '):]))
+        raise UnsupportedRepositoryError('No git directory found in {}'.format(self.repo_path))
+
+
+    def read_file(self, file_path):
+        """Reads a small text file from the repository
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the file
+
+        Returns
+        -------
+        contents : str
+            The file contents
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the file cannot be read or decoded
+        """
+
+        try:
+            with open(file_path, 'r', encoding='utf-8') as fp:
+                return fp.read()
+        except (OSError, UnicodeDecodeError) as e:
+            raise UnsupportedRepositoryError('Cannot read {}: {}'.format(file_path, str(e)))
+
+
+    def read_config(self):
+        """Reads the system, global and repository config, checking for unsupported settings
+
+        Returns
+        -------
+        entries : list of tuple of (str, str, str, str)
+            (section, subsection, key, value) config entries, in git reading order
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the config contains settings that change ref listing, or cannot be parsed
+        """
+
+        entries = []
+        for config_path in get_global_config_paths() + [os.path.join(self.common_dir, 'config')]:
+            if os.path.isfile(config_path):
+                entries.extend(parse_config(self.read_file(config_path)))
+        for section, subsection, key, value in entries:
+            if section in UNSUPPORTED_SECTIONS or '{}.{}'.format(section, key) in UNSUPPORTED_KEYS:
+                raise UnsupportedRepositoryError('Unsupported config {}.{}'.format(section, key))
+            if section == 'core' and key == 'repositoryformatversion' and value not in ['0', '1']:
+                raise UnsupportedRepositoryError('Unsupported repository format version {}'.format(value))
+        return entries
+
+
+    def read_refs(self, prefix):
+        """Reads loose and packed refs under a prefix
+
+        Parameters
+        ----------
+        prefix : str
+            Ref prefix, ex. 'refs/heads/'
+
+        Returns
+        -------
+        refs : dict of str -> str
+            Maps ref names, without the prefix, to object ids
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If a ref is symbolic, or a ref file cannot be parsed
+        """
+
+        refs = {}
+        packed_refs_file = os.path.join(self.common_dir, 'packed-refs')
+        if os.path.isfile(packed_refs_file):
+            for line in self.read_file(packed_refs_file).splitlines():
+                if len(line) == 0 or line[0] in '#^':
+                    continue
+                object_id, _, ref_name = line.partition(' ')
+                if OBJECT_ID_REGEX.match(object_id) is None or len(ref_name) == 0:
+                    raise UnsupportedRepositoryError('Cannot parse packed ref: {}'.format(line))
+                if ref_name.startswith(prefix):
+                    refs[ref_name[len(prefix):]] = object_id
+
+        # Loose refs take precedence over packed ones
+        ref_dir = os.path.join(self.common_dir, *prefix.strip('/').split('/'))
+        for dir_path, _, file_names in os.walk(ref_dir):
+            for file_name in file_names:
+                if file_name.endswith('.lock'):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                object_id = self.read_file(file_path).strip()
+                if OBJECT_ID_REGEX.match(object_id) is None:
+                    raise UnsupportedRepositoryError('Cannot parse ref file {}'.format(file_path))
+                refs[os.path.relpath(file_path, ref_dir).replace(os.sep, '/')] = object_id
+        return refs
+
+
+    def get_current_branch(self):
+        """Gets the branch HEAD points to
+
+        Returns
+        -------
+        current_branch : str
+            Name of the checked out branch, which may not have any commits yet
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If HEAD is detached, or points outside of refs/heads
+        """
+
+        head = self.read_file(os.path.join(self.git_dir, 'HEAD')).strip()
+        if not head.startswith('ref: refs/heads/'):
+            raise UnsupportedRepositoryError('HEAD is not a branch: {}'.format(head))
+        return head[len('ref: refs/heads/'):]
+
+
+    def get_branches(self):
+        """Lists local branches
+
+        Returns
+        -------
+        branches : list of str
+            Branches formatted as in `git branch` output (checked out branch marked with '* ')
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the branches cannot be listed exactly as git would
+        """
+
+        self.read_config()
+        worktrees_dir = os.path.join(self.common_dir, 'worktrees')
+        if os.path.isdir(worktrees_dir) and len(os.listdir(worktrees_dir)) > 0:
+            # git marks branches checked out in other worktrees, which requires reading each of them
+            raise UnsupportedRepositoryError('Repository has linked worktrees')
+        current_branch = self.get_current_branch()
+        branches = []
+        for branch in sorted(self.read_refs('refs/heads/').keys()):
+            if branch == current_branch:
+                branches.append('* {}'.format(branch))
+            else:
+                branches.append('  {}'.format(branch))
+        return branches
+
+
+    def get_tags(self):
+        """Lists tags
+
+        Returns
+        -------
+        tags : list of str
+            Tag names, in the same order as `git tag`
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the tags cannot be listed exactly as git would
+        """
+
+        self.read_config()
+        return sorted(self.read_refs('refs/tags/').keys())
+
+
+    def get_ref_lines(self):
+        """Lists branches and tags together
+
+        Returns
+        -------
+        ref_lines : list of str
+            Refs formatted as in `git for-each-ref --format=%(HEAD)%(refname) refs/heads refs/tags` output
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the branches or tags cannot be listed exactly as git would
+        """
+
+        ref_lines = ['{}refs/heads/{}'.format(branch[0], branch[2:]) for branch in self.get_branches()]
+        return ref_lines + [' refs/tags/{}'.format(tag) for tag in self.get_tags()]
+
+
+    def get_remotes(self):
+        """Lists remotes
+
+        Returns
+        -------
+        remotes : list of str
+            Names of remotes, in the same order as `git remote`
+
+        Raises
+        ------
+        UnsupportedRepositoryError
+            If the remotes cannot be listed exactly as git would
+        """
+
+        for legacy_dir in ['remotes', 'branches']:
+            legacy_path = os.path.join(self.common_dir, legacy_dir)
+            if os.path.isdir(legacy_path) and len(os.listdir(legacy_path)) > 0:
+                raise UnsupportedRepositoryError('Repository has remotes defined in .git/{}'.format(legacy_dir))
+        remotes = set()
+        for section, subsection, _, _ in self.read_config():
+            if section == 'remote' and subsection is not None:
+                remotes.add(subsection)
+        return sorted(remotes)
@@ -12,6 +12,13 @@ from sys import platform
 import py_cui
 import pyautogit
 import pyautogit.commands
+import pyautogit.commit_log
+import pyautogit.commit_graph
+import pyautogit.diff_engine
+import pyautogit.fs_watcher
+import pyautogit.git_status
+import pyautogit.job_scheduler as JOBS
+import pyautogit.repo_snapshot
 import pyautogit.screen_manager
 import pyautogit.logger as LOGGER
 
@@ -26,6 +33,30 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
     ----------
     menu_choices : list of str
         Overriden list of menu choices accessible from the repository control menu
+    commit_pager : CommitLogPager
+        Loads and caches pages of the commit log for the commits menu
+    commits_log_target : str
+        Branch or tag whose commits are shown in the commits menu
+    commit_load_margin : int
+        Older commits are loaded once the selection is within this many entries of the end
+    repo_watcher : RepoWatcher
+        Watches the open repository for outside changes, None if not watching
+    diff_view : DiffView
+        Renders the last opened diff a window at a time, None if no diff was opened
+    diff_index : DiffIndex
+        Index of the last opened diff, which may still be streaming, None if no diff was opened
+    diff_job_id : int
+        Id of the job streaming the last opened diff, None once it finished
+    diff_base_title : str
+        Title of the last opened diff
+    diff_title : str
+        Title of the last rendered diff window, used to check if it is still displayed
+    graph_view : CommitGraphView
+        Renders the commit graph a window at a time, None if the tree was not opened
+    graph_title : str
+        Title of the last rendered graph window, used to check if it is still displayed
+    marked_files : set of tuple of (str, str)
+        Keys of the add files menu entries marked for batched staging or unstaging
     """
 
     def __init__(self, top_manager):
@@ -40,11 +71,31 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
                                 'Add All', 
                                 'Stash All', 
                                 'Stash Pop',
+                                'Background Jobs',
                                 'Open Repository in Editor', 
                                 'Enter Custom Command', 
                                 'About',
                                 'Exit']
 
+        self.commit_pager       = pyautogit.commit_log.CommitLogPager()
+        self.commits_log_target = None
+        self.commit_load_margin = 20
+        self.repo_watcher       = None
+        self.diff_view          = None
+        self.diff_index         = None
+        self.diff_job_id        = None
+        self.diff_base_title    = None
+        self.diff_title         = None
+        self.graph_view         = None
+        self.graph_title        = None
+        self.marked_files       = set()
+
+        # Popup titles for commands that may fail when taking a repository snapshot
+        self.snapshot_error_messages = {'git_get_refs'              : ('List Branches', 'Cannot get git branches'),
+                                        'git_get_remotes'           : ('List Remotes', 'Cannot get git remotes'),
+                                        'git_status_porcelain'      : ('Show Status', 'Failed to get status'),
+                                        'git_get_recent_commits'    : ('Recent Commits', 'Cannot get recent commits')}
+
 
     def process_menu_selection(self, selection):
         """Override of base class, executes based on user menu selection
@@ -60,13 +111,15 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         elif selection == 'Add All':
             self.add_all_changes()
         elif selection == 'Push Branch':
-            self.execute_long_operation('Pushing', self.push_repo_branch, credentials_required=True)
+            self.push_repo_branch()
         elif selection == 'Pull Branch':
-            self.execute_long_operation('Pulling', self.pull_repo_branch, credentials_required=True)
+            self.pull_repo_branch()
         elif selection == 'Stash All':
-            self.execute_long_operation('Stashing', self.stash_all_changes, credentials_required=False)
+            self.stash_all_changes()
         elif selection == 'Stash Pop':
-            self.execute_long_operation('Unstashing', self.unstash_all_changes, credentials_required=False)
+            self.unstash_all_changes()
+        elif selection == 'Background Jobs':
+            self.manager.show_jobs_panel()
         elif selection == 'Checkout Version':
             self.show_version_selection_screen()
         elif selection == 'About':
@@ -103,8 +156,9 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_L_LOWER, self.show_log)
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_A_LOWER, self.add_all_changes)
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_E_LOWER, self.open_editor)
-        repo_control_widget_set.add_key_command(py_cui.keys.KEY_F_LOWER, lambda : self.execute_long_operation('Pulling', self.pull_repo_branch, credentials_required=True))
-        repo_control_widget_set.add_key_command(py_cui.keys.KEY_P_LOWER, lambda : self.execute_long_operation('Pushing', self.push_repo_branch, credentials_required=True))
+        repo_control_widget_set.add_key_command(py_cui.keys.KEY_F_LOWER, self.pull_repo_branch)
+        repo_control_widget_set.add_key_command(py_cui.keys.KEY_P_LOWER, self.push_repo_branch)
+        repo_control_widget_set.add_key_command(py_cui.keys.KEY_J_LOWER, self.manager.show_jobs_panel)
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_H_LOWER, self.show_help_overview)
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_C_UPPER, self.ask_custom_command)
 
@@ -125,8 +179,10 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         self.add_files_menu.add_key_command(py_cui.keys.KEY_ENTER,      self.add_revert_file)
         self.add_files_menu.add_key_command(py_cui.keys.KEY_SPACE,      self.open_git_diff_file)
         self.add_files_menu.add_key_command(py_cui.keys.KEY_E_LOWER,    self.open_editor_file)
+        self.add_files_menu.add_key_command(py_cui.keys.KEY_X_LOWER,    self.toggle_file_mark)
+        self.add_files_menu.add_key_command(py_cui.keys.KEY_X_UPPER,    self.toggle_all_file_marks)
         self.add_files_menu.add_key_command(py_cui.keys.KEY_H_LOWER,    self.show_help_add_files_menu)
-        self.add_files_menu.set_focus_text('Add/Unstage - Enter | Diff - Space | Edit - e | Help - h | Return - Esc')
+        self.add_files_menu.set_focus_text('Add/Unstage (Marked) - Enter | Mark - x | Mark All - X | Diff - Space | Edit - e | Help - h | Return - Esc')
 
         # Shows current git remotes
         self.remotes_menu = repo_control_widget_set.add_scroll_menu('Git Remotes', 2, 0, row_span=2, column_span=2)
@@ -157,6 +213,9 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         self.commits_menu.add_key_command(py_cui.keys.KEY_ENTER,        self.show_commit_info)
         self.commits_menu.add_key_command(py_cui.keys.KEY_SPACE,        self.checkout_commit)
         self.commits_menu.add_key_command(py_cui.keys.KEY_H_LOWER,      self.show_help_commits_menu)
+        self.commits_menu.add_key_command(py_cui.keys.KEY_DOWN_ARROW,   self.load_more_commits)
+        self.commits_menu.add_key_command(py_cui.keys.KEY_PAGE_DOWN,    self.load_more_commits)
+        self.commits_menu.add_key_command(py_cui.keys.KEY_END,          self.load_more_commits)
         self.commits_menu.add_text_color_rule('^.*? ', py_cui.GREEN_ON_BLACK, 'contains', match_type='regex', include_whitespace=True)
         self.commits_menu.set_focus_text('Commit Info - Enter | Checkout - Space | Help - h | Return - Esc')
 
@@ -170,6 +229,10 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         self.info_text_block.add_text_color_rule('**    ',      py_cui.RED_ON_BLACK,    'startswith')
         self.info_text_block.add_text_color_rule('\* *\w+ ',    py_cui.CYAN_ON_BLACK,   'contains', match_type='regex')
         #self.info_text_block.selectable = False
+        self.info_text_block.add_key_command(py_cui.keys.KEY_PAGE_DOWN, lambda : self.scroll_info_window(1))
+        self.info_text_block.add_key_command(py_cui.keys.KEY_PAGE_UP,   lambda : self.scroll_info_window(-1))
+        self.info_text_block.add_key_command(py_cui.keys.KEY_CTRL_E,    self.toggle_diff_section)
+        self.info_text_block.set_focus_text('Diff: Expand/Collapse Hunk - Ctrl+E | Diff/Tree: Next Rows - PgDn | Previous Rows - PgUp | Return - Esc')
 
         # Add some simple shortcut commands
         repo_control_widget_set.add_key_command(py_cui.keys.KEY_C_LOWER, lambda : self.manager.root.move_focus(self.commit_message_box))
@@ -199,47 +262,169 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
 
         self.info_text_block.set_text(self.manager.get_about_info())
         self.branch_menu_state = 'branches'
-        self.manager.root.set_status_bar_text('Return - Bcksp | Menu - m | Refresh - r | Add All - a | Commit - c | Log - l | Editor - e | Pull - f | Push - p | Help -h')
+        self.manager.root.set_status_bar_text('Return - Bcksp | Menu - m | Refresh - r | Add All - a | Commit - c | Log - l | Editor - e | Pull - f | Push - p | Jobs - j | Help -h')
 
 
     def refresh_status(self):
         """Function that refreshes a git repository status
+
+        All panels are populated from a single repository snapshot, which collects the required
+        git information concurrently rather than one command at a time.
         """
 
         remote          = self.remotes_menu.get_selected_item_index()
         selected_file   = self.add_files_menu.get_selected_item_index()
 
+        status_config, include_untracked = self.manager.fast_status.get_status_arguments()
+        snapshot = pyautogit.repo_snapshot.take_repo_snapshot(show_tags=(self.branch_menu_state == 'tags'), max_commits=self.commit_pager.page_size,
+                                                              status_config=status_config, include_untracked=include_untracked)
+        self.update_branch_menu_mode()
+        if self.branch_menu_state == 'branches':
+            self.update_branch_menu(snapshot.branches)
+        else:
+            self.update_tags_menu(snapshot.tags)
+        self.update_remotes_menu(snapshot.remotes)
+        self.update_add_files_menu(snapshot.status)
+        self.commits_log_target = snapshot.log_target
+        self.update_commits_menu(self.commit_pager.update_head(snapshot.log_target, snapshot.recent_commits))
+
+        for name in snapshot.errors.keys():
+            out, err = snapshot.errors[name]
+            command_name, error_message = self.snapshot_error_messages.get(name, ('Refresh', 'Failed to refresh status'))
+            self.show_command_result(out, err, show_on_success=False, command_name=command_name, error_message=error_message)
+
+        if len(self.remotes_menu.get_item_list()) > remote:
+            self.remotes_menu.set_selected_item_index(remote)
+        if len(self.add_files_menu.get_item_list()) > selected_file:
+            self.add_files_menu.set_selected_item_index(selected_file)
+
+
+    def start_watching(self):
+        """Starts watching the current repository, refreshing affected panels when it changes
+        """
+
+        self.stop_watching()
+        repo_path = os.getcwd()
+        self.repo_watcher = pyautogit.fs_watcher.RepoWatcher(repo_path, lambda panels : self.queue_panel_refresh(repo_path, panels))
+        self.repo_watcher.start()
+
+
+    def stop_watching(self):
+        """Stops watching the current repository
+        """
+
+        if self.repo_watcher is not None:
+            self.repo_watcher.stop()
+            self.repo_watcher = None
+
+
+    def queue_panel_refresh(self, repo_path, panels):
+        """Called from the watch thread, queues a refresh of the changed panels on the CUI thread
+
+        Parameters
+        ----------
+        repo_path : str
+            Repository the change was detected in
+        panels : set of str
+            Names of panels to refresh, as defined in pyautogit.fs_watcher
+        """
+
+        def refresh():
+            if self.repo_watcher is not None and self.repo_watcher.repo_path == repo_path:
+                self.refresh_panels(panels)
+        self.manager.run_on_ui_thread(refresh)
+
+
+    def refresh_panels(self, panels):
+        """Re-fetches only the given panels, rather than the full repository status
+
+        Parameters
+        ----------
+        panels : set of str
+            Names of panels to refresh, as defined in pyautogit.fs_watcher
+        """
+
+        if pyautogit.fs_watcher.PANEL_FILES in panels:
+            selected_file = self.add_files_menu.get_selected_item_index()
+            self.get_repo_status_short()
+            if len(self.add_files_menu.get_item_list()) > selected_file:
+                self.add_files_menu.set_selected_item_index(selected_file)
+        if pyautogit.fs_watcher.PANEL_BRANCHES in panels:
+            if self.branch_menu_state == 'branches':
+                self.get_repo_branches()
+            else:
+                self.get_repo_tags()
+        if pyautogit.fs_watcher.PANEL_REMOTES in panels:
+            remote = self.remotes_menu.get_selected_item_index()
+            self.get_repo_remotes()
+            if len(self.remotes_menu.get_item_list()) > remote:
+                self.remotes_menu.set_selected_item_index(remote)
+        if pyautogit.fs_watcher.PANEL_COMMITS in panels and self.commits_log_target is not None:
+            commits, _, err = self.commit_pager.load_first_page(self.commits_log_target)
+            if err == 0:
+                self.update_commits_menu(commits)
+
+
+    def update_branch_menu_mode(self):
+        """Sets branch menu and new branch textbox titles and commands depending on branch/tag mode
+        """
+
         if self.branch_menu_state == 'branches':
-            self.get_repo_branches()
             self.branch_menu.title = 'Git Branches'
             self.new_branch_textbox.title = 'New Branch'
             self.new_branch_textbox.update_key_command(py_cui.keys.KEY_ENTER, self.create_new_branch)
             self.new_branch_textbox.set_focus_text('Enter - Create new branch | Esc - Return')
         else:
-            self.get_repo_tags()
             self.branch_menu.title = 'Git Tags'
             self.new_branch_textbox.title = 'New Tag'
             self.new_branch_textbox.update_key_command(py_cui.keys.KEY_ENTER, self.create_new_tag)
             self.new_branch_textbox.set_focus_text('Enter - Create new tag | Esc - Return')
-        
-        self.get_repo_remotes()
-        self.get_repo_status_short()
-        self.get_recent_commits()
-
-        if len(self.remotes_menu.get_item_list()) > remote:
-            self.remotes_menu.set_selected_item_index(remote)
-        if len(self.add_files_menu.get_item_list()) > selected_file:
-            self.add_files_menu.set_selected_item_index(selected_file)
 
 
     def get_repo_status_short(self):
         """Gets shorthand repository status
         """
 
-        out, err = pyautogit.commands.git_status_short()
+        status_config, include_untracked = self.manager.fast_status.get_status_arguments()
+        out, err = pyautogit.commands.git_status_porcelain(config_options=status_config, include_untracked=include_untracked)
         self.show_command_result(out, err, show_on_success=False, command_name="Show Status", error_message="Failed to get status")
-        self.add_files_menu.clear()
-        self.add_files_menu.add_item_list(out.splitlines())
+        if err == 0:
+            _, entries = pyautogit.git_status.parse_porcelain_v2(out)
+            self.update_add_files_menu(entries)
+
+
+    def update_add_files_menu(self, entries):
+        """Updates the add files menu, changing only entries whose status changed
+
+        The menu title notes when fast status mode is in use, since it may hide untracked files.
+
+        Parameters
+        ----------
+        entries : list of pyautogit.git_status.StatusEntry
+            Status of each changed file
+        """
+
+        items = self.add_files_menu.get_item_list()
+        num_changed = pyautogit.git_status.update_entry_list(items, entries)
+        if num_changed > 0:
+            LOGGER.write('Updated {} status entries'.format(num_changed))
+        if self.add_files_menu.get_selected_item_index() >= len(items):
+            self.add_files_menu.set_selected_item_index(max(len(items) - 1, 0))
+        self.marked_files.intersection_update([item.get_key() for item in items])
+        self.update_add_files_title()
+
+
+    def update_add_files_title(self):
+        """Sets the add files menu title, noting fast status mode and the number of marked files
+        """
+
+        title = 'Add Files'
+        fast_description = self.manager.fast_status.get_description()
+        if len(fast_description) > 0:
+            title = '{} ({})'.format(title, fast_description)
+        if len(self.marked_files) > 0:
+            title = '{} - {} marked'.format(title, len(self.marked_files))
+        self.add_files_menu.set_title(title)
 
 
     def get_repo_remotes(self):
@@ -248,8 +433,20 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
 
         out, err = pyautogit.commands.git_get_remotes()
         self.show_command_result(out, err, show_on_success=False, command_name="List Remotes", error_message='Cannot get git remotes')
+        self.update_remotes_menu(out.splitlines())
+
+
+    def update_remotes_menu(self, remotes):
+        """Replaces the contents of the remotes menu
+
+        Parameters
+        ----------
+        remotes : list of str
+            Names of repository remotes
+        """
+
         self.remotes_menu.clear()
-        self.remotes_menu.add_item_list(out.splitlines())
+        self.remotes_menu.add_item_list(remotes)
 
 
     def show_branches(self):
@@ -266,8 +463,20 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
 
         out, err = pyautogit.commands.git_get_branches()
         self.show_command_result(out, err, show_on_success=False, command_name="List Branches", error_message='Cannot get git branches')
+        self.update_branch_menu(out.splitlines())
+
+
+    def update_branch_menu(self, branches):
+        """Replaces the contents of the branch menu, and selects the checked out branch
+
+        Parameters
+        ----------
+        branches : list of str
+            Branches formatted as in `git branch` output
+        """
+
         self.branch_menu.clear()
-        self.branch_menu.add_item_list(out.splitlines())
+        self.branch_menu.add_item_list(branches)
         selected_branch = 0
         for branch in self.branch_menu.get_item_list():
             if branch.startswith('*'):
@@ -290,9 +499,21 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
 
         out, err = pyautogit.commands.git_get_tags()
         self.show_command_result(out, err, show_on_success=False, command_name="List Tags", error_message="Cannot list git tags")
-        self.branch_menu.clear()
         tags = out.splitlines()
         tags.reverse()
+        self.update_tags_menu(tags)
+
+
+    def update_tags_menu(self, tags):
+        """Replaces the contents of the branch menu with repository tags
+
+        Parameters
+        ----------
+        tags : list of str
+            Tag names, most recent first
+        """
+
+        self.branch_menu.clear()
         self.branch_menu.add_item_list(tags)
 
 
@@ -340,12 +561,36 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
                 branch = branch.split(' ')[-1][:-1]
         else:
             branch = self.branch_menu.get()
-        out, err = pyautogit.commands.git_get_recent_commits(branch)
+        commits, out, err = self.commit_pager.load_first_page(branch)
         if err < 0:
-            self.root.show_error_popup('Cannot get recent commits', out)
+            self.manager.root.show_error_popup('Cannot get recent commits', out)
         else:
-            self.commits_menu.clear()
-            self.commits_menu.add_item_list(out.splitlines())
+            self.commits_log_target = branch
+            self.update_commits_menu(commits)
+
+
+    def update_commits_menu(self, commits):
+        """Replaces the contents of the commits menu
+
+        Parameters
+        ----------
+        commits : list of str
+            Oneline log entries
+        """
+
+        self.commits_menu.clear()
+        self.commits_menu.add_item_list(commits)
+
+
+    def load_more_commits(self):
+        """Loads the next page of older commits once the selection nears the end of the commits menu
+        """
+
+        if self.commits_log_target is None or self.commit_pager.is_complete(self.commits_log_target):
+            return
+        remaining = len(self.commits_menu.get_item_list()) - self.commits_menu.get_selected_item_index()
+        if remaining <= self.commit_load_margin:
+            self.commits_menu.add_item_list(self.commit_pager.load_next_page(self.commits_log_target))
 
 
     def create_new_tag(self):
@@ -363,87 +608,332 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
             self.manager.show_warning_popup('Warning', 'Cannot create tag with an empty name!')
 
 
-    def show_log(self):
-        """Displays the git log
+    def get_selected_log_target(self):
+        """Gets the branch or tag name selected in the branch menu, to be used as a log target
+
+        Returns
+        -------
+        branch : str
+            Name of selected branch or tag, or commit hash for a detached head. None if nothing is selected
         """
 
         if self.branch_menu.get() is None:
-            return
+            return None
         if self.branch_menu_state == 'branches':
             branch = self.branch_menu.get()[2:]
             if branch.startswith('(HEAD'):
                 branch = branch.split(' ')[-1][:-1]
         else:
             branch = self.branch_menu.get()
-        out, err = pyautogit.commands.git_log(branch)
-        if err < 0:
-            self.root.show_error_popup('Unable to show git log for branch {}.'.format(branch), out)
-        else:
-            self.info_text_block.set_text(out)
-            self.info_text_block.set_title('Git log')
+        return branch
+
+
+    def show_log(self):
+        """Displays the git log
+
+        The log is collected in the background so that long histories do not freeze the CUI.
+        """
+
+        branch = self.get_selected_log_target()
+        if branch is None:
+            return
+        # Not imported at startup, see run_async_command
+        import pyautogit.async_commands
+
+        self.info_text_block.set_title('Git log (Loading)')
+        coroutine = pyautogit.async_commands.git_log(branch)
+        self.run_async_command(coroutine, lambda out, err : self.display_log_output(branch, out, err, 'Git log'))
 
 
     def show_tree(self):
-        """Displays git log as a tree
+        """Displays the commit graph of all refs as a tree
+
+        Only the first window of history is laid out, so long histories do not freeze the CUI.
+        Older commits are laid out as the graph is scrolled with PgDn.
         """
 
-        if self.branch_menu.get() is None:
+        view, out = pyautogit.commit_graph.open_commit_graph()
+        if view is None:
+            self.manager.root.show_error_popup('Unable to show git tree.', out)
             return
-        if self.branch_menu_state == 'branches':
-            branch = self.branch_menu.get()[2:]
-            if branch.startswith('(HEAD'):
-                branch = branch.split(' ')[-1][:-1]
+        self.close_graph()
+        self.graph_view = view
+        self.render_graph()
+
+
+    def render_graph(self):
+        """Renders the current window of the commit graph into the info panel
+        """
+
+        self.info_text_block.set_text(self.graph_view.render_window())
+        self.graph_title = 'Git tree ({})'.format(self.graph_view.get_window_description())
+        self.info_text_block.set_title(self.graph_title)
+
+
+    def is_showing_graph(self):
+        """Checks if the info panel still displays the commit graph
+
+        Returns
+        -------
+        showing_graph : bool
+            True if the commit graph is displayed
+        """
+
+        return self.graph_view is not None and self.info_text_block.get_title() == self.graph_title
+
+
+    def scroll_graph(self, num_windows):
+        """Moves the displayed commit graph window forwards or backwards
+
+        Parameters
+        ----------
+        num_windows : int
+            Number of windows to move, negative to move back
+        """
+
+        if self.is_showing_graph() and self.graph_view.scroll_window(num_windows):
+            self.render_graph()
+
+
+    def close_graph(self):
+        """Discards the commit graph view, and unmaps the commit-graph file it reads
+        """
+
+        if self.graph_view is not None:
+            self.graph_view.walker.source.close()
+            self.graph_view = None
+            self.graph_title = None
+
+
+    def scroll_info_window(self, num_windows):
+        """Moves the window of the diff or commit graph displayed in the info panel
+
+        Parameters
+        ----------
+        num_windows : int
+            Number of windows to move, negative to move back
+        """
+
+        if self.is_showing_graph():
+            self.scroll_graph(num_windows)
         else:
-            branch = self.branch_menu.get()
-        out, err = pyautogit.commands.git_tree(branch)
-        if err < 0:
-            self.root.show_error_popup('Unable to show git log for branch {}.'.format(branch), out)
+            self.scroll_diff(num_windows)
+
+
+    def display_log_output(self, branch, out, err, title):
+        """Displays collected log or tree output in the info panel
+
+        Parameters
+        ----------
+        branch : str
+            The branch or tag that was logged
+        out : str
+            Command output
+        err : int
+            Command error code
+        title : str
+            Title for the info panel
+        """
+
+        if err != 0:
+            self.manager.root.show_error_popup('Unable to show git log for branch {}.'.format(branch), out)
         else:
             self.info_text_block.set_text(out)
-            self.info_text_block.set_title('Git tree')
+            self.info_text_block.set_title(title)
 
 
     def stash_all_changes(self):
         """Stashes all repo changes
         """
 
-        self.message, self.status = pyautogit.commands.git_stash_all()
-        self.refresh_status()
-        self.manager.root.stop_loading_popup()
+        repo_path = os.getcwd()
+        self.execute_long_operation('Stashing', lambda : pyautogit.commands.git_stash_all(repo_path=repo_path), priority=JOBS.PRIORITY_HIGH)
 
 
     def unstash_all_changes(self):
         """Pops the stash
         """
 
-        self.message, self.status = pyautogit.commands.git_unstash_all()
-        self.refresh_status()
-        self.manager.root.stop_loading_popup()
+        repo_path = os.getcwd()
+        self.execute_long_operation('Unstashing', lambda : pyautogit.commands.git_unstash_all(repo_path=repo_path), priority=JOBS.PRIORITY_HIGH)
 
 
     def open_git_diff(self):
         """Opens current git diff state
         """
 
-        out, err = pyautogit.commands.git_diff()
-        if err < 0:
-            self.manager.root.show_error_popup('Unable to show git diff repo.', out)
-        else:
-            self.info_text_block.set_text(out)
-            self.info_text_block.set_title('Git Diff')
+        self.show_diff('Git Diff', 'Unable to show git diff repo.')
 
 
     def open_git_diff_file(self):
         """Gets the diff for a selected file
         """
 
-        filename = self.add_files_menu.get()[3:]
-        out, err = pyautogit.commands.git_diff_file(filename)
+        entry = self.add_files_menu.get()
+        if entry is None:
+            return
+        filename = entry.path
+        self.show_diff('Git Diff - {}'.format(filename), 'Unable to show git diff for file {}.'.format(filename), filename=filename)
+
+
+    def show_diff(self, title, error_message, filename=None):
+        """Streams a diff into a new diff view in a background job
+
+        The first window is displayed as soon as enough lines were received to fill it, or once
+        the diff finishes if it is shorter, so large diffs do not block the CUI.
+
+        Parameters
+        ----------
+        title : str
+            Title for the info panel
+        error_message : str
+            Title of the error popup if the diff cannot be run
+        filename : str
+            Default None, otherwise name of file to diff
+        """
+
+        self.close_diff()
+        repo_path = os.getcwd()
+        index = pyautogit.diff_engine.DiffIndex()
+        self.diff_index = index
+        self.info_text_block.clear()
+        self.info_text_block.set_title('{} (loading)'.format(title))
+        first_window_queued = [False]
+
+        def feed(chunk):
+            index.feed(chunk)
+            if not first_window_queued[0] and index.num_lines >= pyautogit.diff_engine.WINDOW_SIZE:
+                first_window_queued[0] = True
+                self.manager.run_on_ui_thread(lambda : self.show_diff_window(index, title))
+
+        def stream_diff():
+            out, err = pyautogit.commands.git_diff_stream(feed, filename=filename, repo_path=repo_path)
+            index.finish()
+            return out, err
+
+        job = self.manager.perform_long_operation(title, stream_diff, lambda out, err : self.finish_diff(index, title, error_message, out, err),
+                                                  priority=JOBS.PRIORITY_HIGH)
+        self.diff_job_id = job.job_id
+
+
+    def show_diff_window(self, index, title):
+        """Displays the first window of a diff, unless it was already displayed or another diff was opened since
+
+        Parameters
+        ----------
+        index : DiffIndex
+            Index of the diff
+        title : str
+            Title for the info panel
+        """
+
+        if self.diff_index is index and self.diff_view is None:
+            self.diff_view = pyautogit.diff_engine.DiffView(index)
+            self.render_diff(title)
+
+
+    def finish_diff(self, index, title, error_message, out, err):
+        """Displays a diff once it was fully received, or the error if it could not be run
+
+        Parameters
+        ----------
+        index : DiffIndex
+            Index of the diff
+        title : str
+            Title for the info panel
+        error_message : str
+            Title of the error popup if the diff cannot be run
+        out : str
+            stderr output of git diff if it failed
+        err : int
+            Exit code of git diff
+        """
+
+        if self.diff_index is not index:
+            return
+        self.diff_job_id = None
         if err < 0:
-            self.manager.root.show_error_popup('Unable to show git diff for file {}.'.format(filename), out)
-        else:
+            self.close_diff()
+            self.manager.root.show_error_popup(error_message, out)
+        elif err != 0:
+            self.close_diff()
             self.info_text_block.set_text(out)
-            self.info_text_block.set_title('Git Diff - {}'.format(filename))
+            self.info_text_block.set_title(title)
+        else:
+            LOGGER.write('Indexed diff of {} bytes, {} files'.format(index.size, len(index.files)))
+            if self.diff_view is None:
+                self.show_diff_window(index, title)
+            elif self.is_showing_diff():
+                # Updates the window title, which showed the diff as still loading
+                self.render_diff()
+
+
+    def render_diff(self, base_title=None):
+        """Renders the current window of the diff view into the info panel
+
+        Parameters
+        ----------
+        base_title : str
+            Default None, otherwise new title of the diff, without the window description
+        """
+
+        if base_title is not None:
+            self.diff_base_title = base_title
+        self.info_text_block.set_text(self.diff_view.render_window())
+        description = self.diff_view.get_window_description()
+        self.diff_title = self.diff_base_title
+        if len(description) > 0:
+            self.diff_title = '{} ({})'.format(self.diff_title, description)
+        self.info_text_block.set_title(self.diff_title)
+
+
+    def is_showing_diff(self):
+        """Checks if the info panel still displays the diff view
+
+        Returns
+        -------
+        showing_diff : bool
+            True if the diff view is displayed
+        """
+
+        return self.diff_view is not None and self.info_text_block.get_title() == self.diff_title
+
+
+    def scroll_diff(self, num_windows):
+        """Moves the displayed diff window forwards or backwards
+
+        Parameters
+        ----------
+        num_windows : int
+            Number of windows to move, negative to move back
+        """
+
+        if self.is_showing_diff() and self.diff_view.scroll_window(num_windows):
+            self.render_diff()
+
+
+    def toggle_diff_section(self):
+        """Expands or collapses the diff hunk or file under the cursor
+        """
+
+        if self.is_showing_diff():
+            _, row = self.info_text_block.get_cursor_text_pos()
+            if self.diff_view.toggle_row(row):
+                self.render_diff()
+
+
+    def close_diff(self):
+        """Discards the diff view and its stored diff output, stopping the diff if it is still streaming
+        """
+
+        if self.diff_job_id is not None:
+            self.manager.cancel_job(self.diff_job_id, show_popup=False)
+            self.diff_job_id = None
+        if self.diff_index is not None:
+            self.diff_index.close()
+            self.diff_index = None
+        self.diff_view = None
+        self.diff_title = None
 
 
     def open_editor(self, file=None):
@@ -469,8 +959,9 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         """Opens an external editor for a selected file
         """
 
-        filename = self.add_files_menu.get()[3:]
-        self.open_editor(file=filename)
+        entry = self.add_files_menu.get()
+        if entry is not None:
+            self.open_editor(file=entry.path)
 
 
     def add_all_changes(self):
@@ -484,19 +975,98 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
             self.refresh_status()
 
 
-    def add_revert_file(self):
-        """Adds/Reverts single file from staging
+    def get_marked_entries(self):
+        """Gets the add files menu entries marked for batched staging or unstaging
+
+        Returns
+        -------
+        entries : list of pyautogit.git_status.StatusEntry
+            Marked entries, in menu order
+        """
+
+        return [item for item in self.add_files_menu.get_item_list() if item.get_key() in self.marked_files]
+
+
+    def toggle_file_mark(self):
+        """Marks or unmarks the selected file for batched staging or unstaging
         """
 
-        filename = self.add_files_menu.get()
-        if filename.startswith(' ') or filename.startswith('?'):
-            out, err = pyautogit.commands.git_add_file(filename[3:])
+        entry = self.add_files_menu.get()
+        if entry is None:
+            return
+        if entry.get_key() in self.marked_files:
+            self.marked_files.remove(entry.get_key())
         else:
-            out, err = pyautogit.commands.git_reset_file(filename[3:])
-        if err < 0:
-            self.manager.root.show_error_popup('Cannot add/revert file {}'.format(filename), out)
+            self.marked_files.add(entry.get_key())
+        self.show_marked_files()
+
+
+    def toggle_all_file_marks(self):
+        """Marks all files, or clears the marks if all files are already marked
+        """
+
+        keys = set([item.get_key() for item in self.add_files_menu.get_item_list()])
+        if keys.issubset(self.marked_files):
+            self.marked_files.clear()
         else:
-            self.refresh_status()
+            self.marked_files = keys
+        self.show_marked_files()
+
+
+    def show_marked_files(self):
+        """Lists the marked files in the info panel, since the menu cannot highlight them
+        """
+
+        self.update_add_files_title()
+        marked_entries = self.get_marked_entries()
+        self.info_text_block.set_title('Marked Files ({}) - Enter in Add Files to stage/unstage'.format(len(marked_entries)))
+        self.info_text_block.set_text('\n'.join([str(entry) for entry in marked_entries]))
+
+
+    def add_revert_file(self):
+        """Adds/Reverts the marked files from staging, or the selected file if none are marked
+        """
+
+        entries = self.get_marked_entries()
+        if len(entries) == 0:
+            entry = self.add_files_menu.get()
+            if entry is None:
+                return
+            entries = [entry]
+        self.add_revert_files(entries)
+
+
+    def add_revert_files(self, entries):
+        """Stages unstaged files and unstages staged ones, with at most one git process each
+
+        Parameters
+        ----------
+        entries : list of pyautogit.git_status.StatusEntry
+            Entries to stage or unstage
+        """
+
+        add_paths = []
+        reset_paths = []
+        for entry in entries:
+            if not entry.has_staged_changes():
+                add_paths.append(entry.path)
+            else:
+                # Unstaging a rename must also restore its original path in the index
+                reset_paths.append(entry.path)
+                if entry.orig_path is not None:
+                    reset_paths.append(entry.orig_path)
+
+        LOGGER.write('Staging {} and unstaging {} files'.format(len(add_paths), len(reset_paths)))
+        if len(add_paths) > 0:
+            out, err = pyautogit.commands.git_add_files(add_paths)
+            if err != 0:
+                self.manager.root.show_error_popup('Cannot add {} file(s)'.format(len(add_paths)), out)
+        if len(reset_paths) > 0:
+            out, err = pyautogit.commands.git_reset_files(reset_paths)
+            if err != 0:
+                self.manager.root.show_error_popup('Cannot unstage {} file(s)'.format(len(reset_paths)), out)
+        self.marked_files.clear()
+        self.refresh_status()
 
 
     #-----------------------------------#
@@ -578,27 +1148,35 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
 
 
     def pull_repo_branch(self):
-        """Pulls from remote
+        """Pulls from remote in a background job
         """
 
         branch = self.branch_menu.get()[2:]
         remote = self.remotes_menu.get()
-        self.message, self.status = pyautogit.commands.git_pull_branch(branch, remote, self.manager.credentials)
-        self.refresh_status()
-        self.manager.root.stop_loading_popup()
+        repo_path = os.getcwd()
+        title = 'Pulling {} from {}'.format(branch, remote)
+        progress = lambda line : self.manager.show_long_operation_progress(title, line)
+        pull = lambda : pyautogit.commands.git_pull_branch(branch, remote, self.manager.credentials, repo_path=repo_path, progress_callback=progress)
+        self.execute_long_operation(title, pull, credentials_required=True)
 
 
     def push_repo_branch(self):
-        """Pushes to remote
+        """Pushes to remote in a background job
         """
 
         branch = self.branch_menu.get()[2:]
         remote = self.remotes_menu.get()
-        self.message, self.status = pyautogit.commands.git_push_to_branch(branch, remote, self.manager.credentials)
-        if self.status == 0:
-            self.message = 'Pushed {} to {} successfully.'.format(branch, remote)
-        self.refresh_status()
-        self.manager.root.stop_loading_popup()
+        repo_path = os.getcwd()
+        title = 'Pushing {} to {}'.format(branch, remote)
+        progress = lambda line : self.manager.show_long_operation_progress(title, line)
+
+        def push():
+            out, err = pyautogit.commands.git_push_to_branch(branch, remote, self.manager.credentials, repo_path=repo_path, progress_callback=progress)
+            if err == 0:
+                out = 'Pushed {} to {} successfully.'.format(branch, remote)
+            return out, err
+
+        self.execute_long_operation(title, push, credentials_required=True)
 
 
     def create_new_branch(self):
@@ -727,6 +1305,8 @@ class RepoControlManager(pyautogit.screen_manager.ScreenManager):
         help_message = '\n'
         help_message = help_message + 'Your currently selected menu is the add files menu.\n'
         help_message = help_message + '\nFrom here, use the arrow keys to scroll, Enter to stage and unstage files for commit.\n'
+        help_message = help_message + '\nTo stage or unstage many files at once, mark them with "x", or mark all with "X".\n'
+        help_message = help_message + 'Enter then stages or unstages all marked files together.\n'
         help_message = help_message + '\nIf you would like to edit a file, press "e".\nThis will open the internal editor or if specified an external one.\n'
         help_message = help_message + '\nPressing the Space button will display git diff information for the selected file, if any.\n'
         help_message = help_message + '\nTo return to overview mode, press Escape.\n'
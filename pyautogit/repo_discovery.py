@@ -0,0 +1,197 @@
+"""Module for discovering git repositories within a workspace.
+
+Directories are listed with os.scandir, down to a configurable depth and skipping entries that
+match ignore patterns. Repositories are not descended into. The listing of every visited
+directory is cached along with its modification time, and since adding, removing or renaming an
+entry updates the modification time of its parent, a later discovery only needs to stat each
+cached directory, and re-lists just the ones that changed.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import json
+import fnmatch
+import pyautogit.logger as LOGGER
+
+
+# Directory names never searched for repositories
+DEFAULT_IGNORE_PATTERNS = ['.pyautogit', 'node_modules', '__pycache__']
+
+# Version of the cache file format, bumped when the format changes
+CACHE_VERSION = 1
+
+
+def is_ignored(name, ignore_patterns):
+    """Checks if a directory name matches any ignore pattern
+
+    Parameters
+    ----------
+    name : str
+        Name of the directory
+    ignore_patterns : list of str
+        Shell style patterns (ex. 'build*')
+
+    Returns
+    -------
+    ignored : bool
+        True if the directory should not be searched
+    """
+
+    for pattern in ignore_patterns:
+        if fnmatch.fnmatch(name, pattern):
+            return True
+    return False
+
+
+class RepoDiscovery:
+    """Class that finds repositories in a workspace, reusing cached directory listings
+
+    Attributes
+    ----------
+    workspace_path : str
+        Path to the workspace
+    max_depth : int
+        Maximum depth at which repositories are found, 1 for direct children of the workspace
+    ignore_patterns : list of str
+        Shell style patterns of directory names to skip
+    cache_file : str
+        Path to the json cache file, None to only cache in memory
+    cache : dict of str -> dict
+        Maps directory path relative to the workspace to its mtime, whether it is a repository,
+        and its searchable subdirectories
+    """
+
+    def __init__(self, workspace_path, max_depth=1, ignore_patterns=None, cache_file=None):
+        """Constructor for RepoDiscovery
+        """
+
+        self.workspace_path     = os.path.abspath(workspace_path)
+        self.max_depth          = max_depth
+        self.ignore_patterns    = list(DEFAULT_IGNORE_PATTERNS) if ignore_patterns is None else list(ignore_patterns)
+        self.cache_file         = cache_file
+        self.cache              = None
+
+
+    def load_cache(self):
+        """Reads the cache file, discarding it if it was written with different settings
+        """
+
+        self.cache = {}
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as fp:
+                contents = json.load(fp)
+        except (OSError, ValueError):
+            LOGGER.write('Discarding unreadable repository cache {}'.format(self.cache_file))
+            return
+        if contents.get('version') != CACHE_VERSION or contents.get('max_depth') != self.max_depth or contents.get('ignore_patterns') != self.ignore_patterns:
+            return
+        self.cache = contents.get('directories', {})
+
+
+    def save_cache(self):
+        """Writes the cache file
+        """
+
+        if self.cache_file is None:
+            return
+        contents = {'version'           : CACHE_VERSION,
+                    'max_depth'         : self.max_depth,
+                    'ignore_patterns'   : self.ignore_patterns,
+                    'directories'       : self.cache}
+        try:
+            cache_dir = os.path.dirname(self.cache_file)
+            if not os.path.exists(cache_dir):
+                os.mkdir(cache_dir)
+            with open(self.cache_file, 'w') as fp:
+                json.dump(contents, fp)
+        except OSError as e:
+            LOGGER.write('Failed to write repository cache: {}'.format(str(e)), level=LOGGER.WARNING)
+
+
+    def scan_directory(self, rel_path, mtime, depth):
+        """Lists a single directory
+
+        Parameters
+        ----------
+        rel_path : str
+            Directory path relative to the workspace
+        mtime : int
+            Modification time of the directory, in nanoseconds
+        depth : int
+            Depth of the directory below the workspace
+
+        Returns
+        -------
+        entry : dict
+            Cache entry for the directory
+        """
+
+        is_repo = False
+        subdirs = []
+        # The scandir iterator only supports the context manager protocol from python 3.6
+        entries = os.scandir(os.path.join(self.workspace_path, rel_path))
+        try:
+            for dir_entry in entries:
+                if dir_entry.name == '.git':
+                    is_repo = True
+                elif depth < self.max_depth and not is_ignored(dir_entry.name, self.ignore_patterns):
+                    try:
+                        if dir_entry.is_dir():
+                            subdirs.append(dir_entry.name)
+                    except OSError:
+                        pass
+        finally:
+            if hasattr(entries, 'close'):
+                entries.close()
+        # The workspace itself is never reported as a repository
+        is_repo = is_repo and depth > 0
+        if is_repo:
+            subdirs = []
+        subdirs.sort()
+        return {'mtime' : mtime, 'repo' : is_repo, 'subdirs' : subdirs}
+
+
+    def find_repos(self):
+        """Finds repositories in the workspace
+
+        Returns
+        -------
+        repos : list of str
+            Repository paths relative to the workspace
+        """
+
+        if self.cache is None:
+            self.load_cache()
+        old_cache = self.cache
+        self.cache = {}
+        repos = []
+        stats = {'listed' : 0, 'reused' : 0}
+
+        def visit(rel_path, depth):
+            try:
+                mtime = os.stat(os.path.join(self.workspace_path, rel_path)).st_mtime_ns
+            except OSError:
+                return
+            entry = old_cache.get(rel_path)
+            if entry is None or entry['mtime'] != mtime:
+                try:
+                    entry = self.scan_directory(rel_path, mtime, depth)
+                except OSError:
+                    return
+                stats['listed'] = stats['listed'] + 1
+            else:
+                stats['reused'] = stats['reused'] + 1
+            self.cache[rel_path] = entry
+            if entry['repo']:
+                repos.append(rel_path)
+            for subdir in entry['subdirs']:
+                visit(os.path.join(rel_path, subdir), depth + 1)
+
+        visit('', 0)
+        if stats['listed'] > 0 or len(old_cache) != len(self.cache):
+            self.save_cache()
+        LOGGER.write('Found repos in path: {} (listed {} directories, reused {})'.format(repos, stats['listed'], stats['reused']))
+        return repos
@@ -1,10 +1,13 @@
 """Manager implementation for CUI screen for selecting different repositories.
 """
 
+import threading
 import py_cui
 import pyautogit
 import pyautogit.commands
 import pyautogit.screen_manager
+import pyautogit.workspace_scan
+import pyautogit.workspace_sync
 import pyautogit.logger as LOGGER
 
 
@@ -15,6 +18,16 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
     ----------
     menu_choices : list of str
         Overriden attribute from base class with expanded menu choices.
+    workspace_scanner : WorkspaceScanner
+        Runs parallel status scans over the repositories in the workspace
+    repo_labels : dict of str -> str
+        Maps labels shown in the repo menu to repository names
+    repo_menu_lock : threading.Lock
+        Lock protecting repo_menu_update_queued, which is set from scan threads
+    repo_menu_update_queued : bool
+        True if a repo menu rebuild is queued on the CUI thread, so scan results arriving until it runs share it
+    workspace_syncer : WorkspaceSyncer
+        Fetches and fast-forwards all repositories in the workspace in parallel
     """
 
     def __init__(self, top_manager):
@@ -23,12 +36,19 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         
         super().__init__(top_manager, 'repo selection')
         self.menu_choices = ['(Re)Enter Credentials',
+                                'Sync All Repositories',
+                                'Background Jobs',
                                 'Open Directory',
                                 'Clone New Repository',
                                 'Create New Repository',
                                 'Settings',
                                 'Enter Custom Command',
                                 'Exit']
+        self.workspace_scanner  = pyautogit.workspace_scan.WorkspaceScanner()
+        self.repo_labels        = {}
+        self.repo_menu_lock     = threading.Lock()
+        self.repo_menu_update_queued = False
+        self.workspace_syncer   = pyautogit.workspace_sync.WorkspaceSyncer()
 
 
     def process_menu_selection(self, selection):
@@ -43,6 +63,10 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
 
         if selection == '(Re)Enter Credentials':
             self.manager.ask_credentials()
+        elif selection == 'Sync All Repositories':
+            self.sync_all_repos()
+        elif selection == 'Background Jobs':
+            self.manager.show_jobs_panel()
         elif selection == 'Open Directory':
             # This will be implemented once py_cui adds a filemanager popup.
             self.manager.open_not_supported_popup(selection)
@@ -81,6 +105,7 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         
         self.repo_menu = repo_select_widget_set.add_scroll_menu('Repos in Workspace', 1, 2, row_span=2)
         self.repo_menu.add_item_list(self.manager.repos)
+        self.repo_menu.add_text_color_rule(r'~[0-9]+\]$', py_cui.YELLOW_ON_BLACK, 'contains', match_type='line')
         self.repo_menu.add_key_command(py_cui.keys.KEY_ENTER,   self.manager.open_autogit_window)
         self.repo_menu.add_key_command(py_cui.keys.KEY_SPACE,   self.show_repo_status)
         self.repo_menu.add_key_command(py_cui.keys.KEY_DELETE,  self.ask_delete_repo)
@@ -90,7 +115,9 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         self.repo_menu.add_key_command(py_cui.keys.KEY_S_LOWER, self.manager.open_settings_window)
         self.repo_menu.add_key_command(py_cui.keys.KEY_C_LOWER, self.manager.ask_credentials)
         self.repo_menu.add_key_command(py_cui.keys.KEY_E_LOWER, self.manager.ask_default_editor)
-        self.repo_menu.set_focus_text('Quit - q | Open - Enter | Status - Space | Menu - m | Refresh - r | Delete - Del | Settings - s | Credentials - c | Editor - e')
+        self.repo_menu.add_key_command(py_cui.keys.KEY_F_LOWER, self.sync_all_repos)
+        self.repo_menu.add_key_command(py_cui.keys.KEY_J_LOWER, self.manager.show_jobs_panel)
+        self.repo_menu.set_focus_text('Quit - q | Open - Enter | Status - Space | Menu - m | Refresh - r | Sync All - f | Jobs - j | Delete - Del | Settings - s | Credentials - c | Editor - e')
 
         self.git_status_box = repo_select_widget_set.add_text_block('Git Repo Status', 1, 0, row_span=4, column_span=2)
         self.git_status_box.set_selectable(False)
@@ -100,19 +127,20 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         self.current_status_box.set_selectable(False)
         
         self.clone_new_box = repo_select_widget_set.add_text_box('Clone Repository - Enter Remote URL', 3, 2, column_span=2)
-        self.clone_new_box.add_key_command(py_cui.keys.KEY_ENTER, lambda : self.execute_long_operation('Cloning', self.clone_new_repo, credentials_required=True))
+        self.clone_new_box.add_key_command(py_cui.keys.KEY_ENTER, self.clone_new_repo)
         
         self.create_new_box = repo_select_widget_set.add_text_box('Create New Repository - Enter Directory Name', 4, 2, column_span=2)
         self.create_new_box.add_key_command(py_cui.keys.KEY_ENTER, self.create_new_repo)
         
         repo_select_widget_set.add_key_command(py_cui.keys.KEY_S_LOWER, self.manager.open_settings_window)
-        #repo_select_widget_set.add_key_command(py_cui.keys.KEY_F_LOWER, self.sync_all_repos)
+        repo_select_widget_set.add_key_command(py_cui.keys.KEY_F_LOWER, self.sync_all_repos)
+        repo_select_widget_set.add_key_command(py_cui.keys.KEY_J_LOWER, self.manager.show_jobs_panel)
         repo_select_widget_set.add_key_command(py_cui.keys.KEY_R_LOWER, self.refresh_status)
         repo_select_widget_set.add_key_command(py_cui.keys.KEY_C_LOWER, self.manager.ask_credentials)
         repo_select_widget_set.add_key_command(py_cui.keys.KEY_M_LOWER, self.show_menu)
         repo_select_widget_set.add_key_command(py_cui.keys.KEY_E_LOWER, self.manager.ask_default_editor)
-        repo_select_widget_set.add_key_command(py_cui.keys.KEY_A_LOWER, lambda : self.git_status_box.set_text(self.manager.get_about_info()))
-        repo_select_widget_set.add_key_command(py_cui.keys.KEY_H_LOWER, lambda : self.git_status_box.set_text(self.manager.get_welcome_message()))
+        repo_select_widget_set.add_key_command(py_cui.keys.KEY_A_LOWER, lambda : self.show_info_text(self.manager.get_about_info()))
+        repo_select_widget_set.add_key_command(py_cui.keys.KEY_H_LOWER, lambda : self.show_info_text(self.manager.get_welcome_message()))
 
         self.info_panel = self.git_status_box
 
@@ -134,11 +162,24 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         """
 
         if self.manager.metadata_manager.first_time:
-            self.git_status_box.set_text(self.manager.get_welcome_message())
+            self.show_info_text(self.manager.get_welcome_message())
             self.manager.metadata_manager.first_time = False
         else:
-            self.git_status_box.set_text(self.manager.get_about_info(with_logo = False))
-        self.manager.root.set_status_bar_text('Quit - q | Full Menu - m | Refresh - r | Update Credentials - c | Settings Menu - s')
+            self.show_info_text(self.manager.get_about_info(with_logo = False))
+        self.manager.root.set_status_bar_text('Quit - q | Full Menu - m | Refresh - r | Sync All - f | Jobs - j | Update Credentials - c | Settings Menu - s')
+
+
+    def show_info_text(self, text):
+        """Function that shows general information in the status box, under its default title
+
+        Parameters
+        ----------
+        text : str
+            Text to show
+        """
+
+        self.git_status_box.title = 'Git Repo Status'
+        self.git_status_box.set_text(text)
 
 
     def refresh_status(self):
@@ -146,9 +187,9 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         """
 
         LOGGER.write('Refreshing repo select status')
-        self.manager.repos = pyautogit.find_repos_in_path(self.manager.workspace_path)
-        self.repo_menu.clear()
-        self.repo_menu.add_item_list(self.manager.repos)
+        self.manager.repos = self.manager.repo_discovery.find_repos()
+        self.update_repo_menu()
+        self.workspace_scanner.start_scan(self.manager.workspace_path, list(self.manager.repos), lambda result : self.queue_repo_menu_update())
 
         status_message = 'Current directory:\n{}\n\n'.format(self.manager.workspace_path)
         status_message = status_message + '# of Repos: {}\n\n'.format(len(self.manager.repos))
@@ -163,11 +204,93 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         self.current_status_box.set_text(status_message)
 
 
+    def get_repo_label(self, repo):
+        """Gets the repo menu label for a repository, including its scanned status if available
+
+        Parameters
+        ----------
+        repo : str
+            Name of the repository
+
+        Returns
+        -------
+        label : str
+            Label shown in the repo menu
+        """
+
+        result = self.workspace_scanner.get_result(repo)
+        if result is None:
+            return repo
+        return '{} [{}]'.format(repo, result.get_summary())
+
+
+    def update_repo_menu(self):
+        """Rebuilds repo menu labels from the latest scan results, keeping the current selection
+        """
+
+        with self.repo_menu_lock:
+            self.repo_menu_update_queued = False
+        selected = self.repo_menu.get_selected_item_index()
+        labels = [self.get_repo_label(repo) for repo in self.manager.repos]
+        self.repo_labels = dict(zip(labels, self.manager.repos))
+        self.repo_menu.clear()
+        self.repo_menu.add_item_list(labels)
+        if len(labels) > selected:
+            self.repo_menu.set_selected_item_index(selected)
+
+
+    def queue_repo_menu_update(self):
+        """Called from scan threads, queues a single repo menu rebuild on the CUI thread for all results arriving before it runs
+        """
+
+        with self.repo_menu_lock:
+            if self.repo_menu_update_queued:
+                return
+            self.repo_menu_update_queued = True
+        self.manager.run_on_ui_thread(self.update_repo_menu)
+
+
+    def update_repo_label(self, repo):
+        """Updates the repo menu label of a single repository from its latest scan result
+
+        Parameters
+        ----------
+        repo : str
+            Name of the repository
+        """
+
+        if repo not in self.manager.repos:
+            return
+        index = self.manager.repos.index(repo)
+        items = self.repo_menu.get_item_list()
+        if index >= len(items):
+            return
+        label = self.get_repo_label(repo)
+        self.repo_labels.pop(items[index], None)
+        self.repo_labels[label] = repo
+        items[index] = label
+
+
+    def get_selected_repo(self):
+        """Gets the name of the repository selected in the repo menu
+
+        Returns
+        -------
+        repo : str
+            Name of selected repository, None if no repositories are listed
+        """
+
+        label = self.repo_menu.get()
+        if label is None:
+            return None
+        return self.repo_labels.get(label, label)
+
+
     def ask_delete_repo(self):
         """Function that asks user for confirmation for repo deletion
         """
 
-        target = self.repo_menu.get()
+        target = self.get_selected_repo()
         self.manager.root.show_yes_no_popup("Are you sure you want to delete {}?".format(target), self.delete_repo)
 
 
@@ -181,7 +304,7 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
         """
 
         if to_delete:
-            target = self.repo_menu.get()
+            target = self.get_selected_repo()
             LOGGER.write('Deleting repository {}'.format(target))
             pyautogit.commands.remove_repo_tree(target)
             self.refresh_status()
@@ -189,32 +312,113 @@ class RepoSelectManager(pyautogit.screen_manager.ScreenManager):
 
     def show_repo_status(self):
         """Function that shows the current repository status
+
+        The status is collected in the background, and displayed once ready. Only the selected
+        repository is rescanned, to update its label in the repo menu.
         """
 
-        current_repo = self.repo_menu.get_selected_item_index()
-        repo_name = self.repo_menu.get()
+        # Not imported at startup, see run_async_command
+        import pyautogit.async_commands
+
+        repo_name = self.get_selected_repo()
         LOGGER.write('Displaying repo status for {}'.format(repo_name))
         self.git_status_box.clear()
-        out, err = pyautogit.commands.git_status(repo_name)
+        self.git_status_box.title = 'Git Repo Status - {} (Loading)'.format(repo_name)
+        coroutine = pyautogit.async_commands.git_status(repo_name)
+        self.run_async_command(coroutine, lambda out, err : self.display_repo_status(repo_name, out, err))
+        self.workspace_scanner.rescan_repo(self.manager.workspace_path, repo_name,
+                                           lambda result : self.manager.run_on_ui_thread(lambda : self.update_repo_label(repo_name)))
+
+
+    def display_repo_status(self, repo_name, out, err):
+        """Function that displays collected repository status
+
+        Parameters
+        ----------
+        repo_name : str
+            Name of the repository
+        out : str
+            Output of git status
+        err : int
+            Error code of git status
+        """
+
         if err != 0:
             self.manager.root.show_error_popup('Unable to get git status!', out)
         self.git_status_box.title = 'Git Repo Status - {}'.format(repo_name)
         self.git_status_box.set_text('\n{}'.format(out))
+
+
+    def sync_all_repos(self):
+        """Function that fetches and fast-forwards all repositories in the workspace
+
+        Credentials are requested first if they were not yet entered. If a sync is already
+        running, its summary is shown instead.
+        """
+
+        if self.workspace_syncer.running:
+            self.show_sync_summary()
+        elif not self.manager.were_credentials_entered():
+            self.manager.ask_credentials(callback=self.start_workspace_sync)
+        else:
+            self.start_workspace_sync()
+
+
+    def start_workspace_sync(self):
+        """Function that starts the workspace sync, displaying a live summary as repositories finish
+        """
+
+        repos = list(self.manager.repos)
+        credentials = list(self.manager.credentials)
+        started = self.workspace_syncer.start_sync(self.manager.workspace_path, repos, credentials,
+                                                   lambda result : self.manager.run_on_ui_thread(self.update_sync_summary),
+                                                   on_finished=lambda : self.manager.run_on_ui_thread(self.finish_workspace_sync))
+        if started:
+            self.show_sync_summary()
+
+
+    def show_sync_summary(self):
+        """Function that displays the state of the running or last workspace sync
+        """
+
+        title = 'Workspace Sync'
+        if self.workspace_syncer.running:
+            title = 'Workspace Sync (Running)'
+        self.git_status_box.title = title
+        self.git_status_box.set_text(self.workspace_syncer.get_summary_text())
+
+
+    def update_sync_summary(self):
+        """Function that redraws the sync summary as repositories finish, unless the user moved on to other information
+
+        Anything else shown in the status box sets its own title, so the summary is only
+        redrawn while the title is still the workspace sync one.
+        """
+
+        if self.git_status_box.title.startswith('Workspace Sync'):
+            self.show_sync_summary()
+
+
+    def finish_workspace_sync(self):
+        """Function fired on the CUI thread once every repository has been synced
+        """
+
+        self.update_sync_summary()
         self.refresh_status()
-        self.repo_menu.selected_item = current_repo
 
 
     def clone_new_repo(self):
-        """Function that clones new repo from given URL
+        """Function that clones new repo from given URL in a background job
         """
 
         new_repo_url = self.clone_new_box.get()
+        workspace_path = self.manager.workspace_path
         LOGGER.write('Cloning new repo {}'.format(new_repo_url))
-        self.message, self.status = pyautogit.commands.git_clone_new_repo(new_repo_url, self.manager.credentials)
-        self.refresh_status()
+        title = 'Cloning {}'.format(new_repo_url)
+        progress = lambda line : self.manager.show_long_operation_progress(title, line)
+        clone = lambda : pyautogit.commands.git_clone_new_repo(new_repo_url, self.manager.credentials, repo_path=workspace_path, progress_callback=progress)
+        self.execute_long_operation(title, clone, credentials_required=True)
         self.clone_new_box.clear()
-        # Turn off loading popup
-        self.manager.root.stop_loading_popup()
 
 
     def create_new_repo(self):
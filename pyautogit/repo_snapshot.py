@@ -0,0 +1,194 @@
+"""Module for collecting the state of a repository in a single pass.
+
+Refreshing the repository control screen requires branches or tags, remotes, short status and
+recent commits. Rather than running these commands one after another, a snapshot starts all of
+the required git processes at once, and parses their output into a single RepoSnapshot object
+that the screen can render.
+
+This file should remain separate from the CUI interface.
+"""
+
+import pyautogit.commands
+import pyautogit.git_status
+import pyautogit.logger as LOGGER
+
+
+class RepoSnapshot:
+    """Class representing the state of a repository at a single point in time
+
+    Attributes
+    ----------
+    repo_path : str
+        Path to the repository the snapshot was taken of
+    current_branch : str
+        Name of the checked out branch, or None if HEAD is detached
+    branches : list of str
+        Local branches, formatted as in `git branch` output (checked out branch marked with '* ')
+    tags : list of str
+        Repository tags, most recent name first
+    remotes : list of str
+        Names of repository remotes
+    status : list of pyautogit.git_status.StatusEntry
+        Status of each changed file
+    recent_commits : list of str
+        Most recent page of the oneline log of the branch or tag the commits panel displays
+    log_target : str
+        Name of the branch or tag that recent_commits were logged for, HEAD if detached
+    errors : dict of str -> tuple of (str, int)
+        Maps name of any failed command to its (out, err) pair
+    """
+
+    def __init__(self, repo_path):
+        """Constructor for RepoSnapshot
+        """
+
+        self.repo_path      = repo_path
+        self.current_branch = None
+        self.branches       = []
+        self.tags           = []
+        self.remotes        = []
+        self.status         = []
+        self.recent_commits = []
+        self.log_target     = None
+        self.errors         = {}
+
+
+def parse_ref_lines(ref_output):
+    """Parses `git for-each-ref --format=%(HEAD)%(refname)` output into branch and tag lists
+
+    Parameters
+    ----------
+    ref_output : str
+        Output of for-each-ref over refs/heads and refs/tags
+
+    Returns
+    -------
+    branches : list of str
+        Branch list formatted as in `git branch` output
+    tags : list of str
+        Tag names, in the same order as `git tag`
+    """
+
+    branches = []
+    tags = []
+    for line in ref_output.splitlines():
+        if len(line) < 2:
+            continue
+        head_marker = line[0]
+        ref_name = line[1:]
+        if ref_name.startswith('refs/heads/'):
+            branches.append('{} {}'.format(head_marker, ref_name[len('refs/heads/'):]))
+        elif ref_name.startswith('refs/tags/'):
+            tags.append(ref_name[len('refs/tags/'):])
+    return branches, tags
+
+
+def parse_status_header(header_line):
+    """Parses the `## ...` branch header line printed by `git status -s -b`
+
+    Parameters
+    ----------
+    header_line : str
+        First line of the status output
+
+    Returns
+    -------
+    current_branch : str
+        Name of the checked out branch, or None if HEAD is detached
+    """
+
+    header = header_line[3:].strip()
+    if header.startswith('HEAD (no branch)'):
+        return None
+    for prefix in ['No commits yet on ', 'Initial commit on ']:
+        if header.startswith(prefix):
+            return header[len(prefix):]
+    return header.split('...', 1)[0].split(' ', 1)[0]
+
+
+def take_repo_snapshot(repo_path='.', show_tags=False, max_commits=200, status_config=None, include_untracked=True):
+    """Collects branches, tags, remotes, status and recent commits for a repository
+
+    All git processes are started together. Refs and remotes are read in-process when the
+    repository allows it, so only status and log require git processes. If tags are displayed,
+    the log for the most recent tag is collected once the tag list is known, matching what the
+    commits panel would show.
+
+    Parameters
+    ----------
+    repo_path : str
+        Target repo path
+    show_tags : bool
+        If true, the commits list is collected for the first tag rather than for HEAD
+    max_commits : int
+        Maximum number of recent commits collected
+    status_config : str
+        Default None, otherwise -c options for the status command (ex. from fast status mode)
+    include_untracked : bool
+        Set to False to skip searching for untracked files
+
+    Returns
+    -------
+    snapshot : RepoSnapshot
+        The collected repository state
+    """
+
+    snapshot = RepoSnapshot(repo_path)
+    results = {}
+    results['git_get_refs'] = pyautogit.commands.handle_ref_query('git_get_refs', lambda reader : reader.get_ref_lines(), repo_path=repo_path)
+    results['git_get_remotes'] = pyautogit.commands.handle_ref_query('git_get_remotes', lambda reader : reader.get_remotes(), repo_path=repo_path)
+
+    commands = []
+    if results['git_get_refs'][1] is None:
+        commands.append(('git for-each-ref --format=%(HEAD)%(refname) refs/heads refs/tags', 'git_get_refs'))
+    if results['git_get_remotes'][1] is None:
+        commands.append(('git remote', 'git_get_remotes'))
+    commands.append((pyautogit.commands.get_status_porcelain_command(status_config, include_untracked), 'git_status_porcelain'))
+    if not show_tags:
+        commands.append(('git --no-pager log HEAD --oneline -n {}'.format(max_commits), 'git_get_recent_commits'))
+
+    # Run in the repository rather than with -C, since commands are split on spaces
+    command_results = pyautogit.commands.handle_concurrent_commands(commands, cwd=repo_path)
+    LOGGER.write('Collected repository snapshot for {} with {} commands'.format(repo_path, len(commands)))
+    for (_, name), (out, err) in zip(commands, command_results):
+        results[name] = (out, err)
+        if err != 0:
+            snapshot.errors[name] = (out, err)
+
+    refs_out, refs_err = results['git_get_refs']
+    if refs_err == 0:
+        snapshot.branches, snapshot.tags = parse_ref_lines(refs_out)
+        snapshot.tags.reverse()
+
+    remotes_out, remotes_err = results['git_get_remotes']
+    if remotes_err == 0:
+        snapshot.remotes = remotes_out.splitlines()
+
+    status_out, status_err = results['git_status_porcelain']
+    if status_err == 0:
+        branch, snapshot.status = pyautogit.git_status.parse_porcelain_v2(status_out)
+        snapshot.current_branch = branch.head
+
+    if show_tags:
+        if len(snapshot.tags) > 0:
+            snapshot.log_target = snapshot.tags[0]
+            out, err = pyautogit.commands.git_get_recent_commits(snapshot.tags[0], max_count=max_commits, repo_path=repo_path)
+            if err != 0:
+                snapshot.errors['git_get_recent_commits'] = (out, err)
+            else:
+                snapshot.recent_commits = out.splitlines()
+    else:
+        snapshot.log_target = snapshot.current_branch if snapshot.current_branch is not None else 'HEAD'
+        log_out, log_err = results['git_get_recent_commits']
+        if log_err == 0:
+            snapshot.recent_commits = log_out.splitlines()
+        elif status_err == 0 and len(snapshot.branches) == 0 and snapshot.current_branch is not None:
+            # A freshly initialized repository has no commits to log, which is not an error
+            del snapshot.errors['git_get_recent_commits']
+
+    # for-each-ref does not list a detached HEAD, so add it in the same form as `git branch`
+    if status_err == 0 and snapshot.current_branch is None and len(snapshot.recent_commits) > 0 and not show_tags:
+        head_hash = snapshot.recent_commits[0].split(' ', 1)[0]
+        snapshot.branches.insert(0, '* (HEAD detached at {})'.format(head_hash))
+
+    return snapshot
@@ -5,8 +5,10 @@ as well as what the screen must do to refresh its status. Also supports performi
 operations, and running custom commands
 """
 
+import os
 from sys import platform
 import pyautogit.commands
+import pyautogit.job_scheduler
 import pyautogit.logger as LOGGER
 
 
@@ -29,6 +31,8 @@ class ScreenManager:
         Overriden by children, list of options that pop up in menu
     info_panel : py_cui.widgets.TextBlock
         The main textblock on the screen, used to display status information.
+    async_future : concurrent.futures.Future
+        Future for the last async command started by the screen, None if none was started
     """
 
     def __init__(self, top_manager, screen_type):
@@ -42,6 +46,7 @@ class ScreenManager:
         self.utility_var = None
         self.menu_choices = ['About', 'Exit']
         self.info_panel = None
+        self.async_future = None
 
 
     def initialize_screen_elements(self):
@@ -117,11 +122,15 @@ class ScreenManager:
             self.info_panel.set_text(box_out)
 
 
-    def show_status_long_op(self, name='Command', succ_message="Success", err_message = "Error"):
+    def show_status_long_op(self, out, err, name='Command', succ_message="Success", err_message = "Error"):
         """Shows the status of a long(async) operation on success completion
 
         Parameters
         ----------
+        out : str
+            output of the operation
+        err : int
+            exit code of the operation
         name : str
             name of command run.
         succ_message : str
@@ -130,9 +139,7 @@ class ScreenManager:
             message to show on unsuccessful completion
         """
 
-        self.show_command_result(self.message, self.status, command_name=name, success_message=succ_message, error_message=err_message)
-        self.message = ''
-        self.status = 0
+        self.show_command_result(out, err, command_name=name, success_message=succ_message, error_message=err_message)
 
 
     def refresh_status(self):
@@ -170,6 +177,35 @@ class ScreenManager:
         self.refresh_status()
 
 
+    def run_async_command(self, coroutine, callback):
+        """Runs a command from pyautogit.async_commands in the background, without blocking the CUI.
+
+        If a previous async command started by this screen is still running, it is cancelled,
+        so only the result of the most recent request is displayed.
+
+        Parameters
+        ----------
+        coroutine : coroutine
+            Coroutine from pyautogit.async_commands to run
+        callback : function
+            Function called on the CUI thread with the command's (out, err) result once it completes
+        """
+
+        # asyncio is slow to import, and only needed once an async command is run, so it is not imported at startup
+        import pyautogit.async_commands
+
+        if self.async_future is not None and not self.async_future.done():
+            self.async_future.cancel()
+
+        def finish_async_command(future, result):
+            # A command that finished just before a newer one was started is not displayed
+            if future is self.async_future:
+                callback(*result)
+
+        future = pyautogit.async_commands.get_runner().submit(coroutine, lambda result : self.manager.run_on_ui_thread(lambda : finish_async_command(future, result)))
+        self.async_future = future
+
+
     def ask_custom_command(self):
         """Function that prompts user to enter custom command
         """
@@ -180,20 +216,50 @@ class ScreenManager:
         self.manager.root.show_text_box_popup('Please Enter A {} Command:'.format(shell), self.handle_user_command)
 
     
-    def execute_long_operation(self, loading_messge, long_op_function, credentials_required=False):
+    def execute_long_operation(self, loading_messge, long_op_function, credentials_required=False, priority=pyautogit.job_scheduler.PRIORITY_NORMAL):
         """Wrapper function that allows for executing long operations w/ credential requirements.
 
+        The operation is queued as a background job, which waits for other jobs started from the same
+        directory. Since the user may open another repository before it finishes, long_op_function
+        must not rely on the current directory, and the screen is only refreshed afterwards if it
+        still shows the directory the operation was started from.
+
         Parameters
         ----------
         loading_message : str
-            Message displayed while async op is performed
+            Short description of the operation, shown in the jobs panel
         long_op_function : no-arg or lambda function
-            Function that is fired in an async second thread
+            Function that is fired in a background job, returning an (out, err) pair
         credentials_required : bool
             If true, prompts to enter credentials before starting async op
+        priority : int
+            One of the job_scheduler PRIORITY_* values
         """
-        
+
+        origin_path = os.getcwd()
+        on_finished = lambda out, err : self.finish_long_operation(loading_messge, origin_path, out, err)
+        submit = lambda : self.manager.perform_long_operation(loading_messge, long_op_function, on_finished, priority=priority, repo_path=origin_path)
         if credentials_required and not self.manager.were_credentials_entered():
-            self.manager.ask_credentials(callback=lambda : self.manager.perform_long_operation(loading_messge, long_op_function, self.show_status_long_op))
+            self.manager.ask_credentials(callback=submit)
         else:
-            self.manager.perform_long_operation(loading_messge, long_op_function, self.show_status_long_op)
\ No newline at end of file
+            submit()
+
+
+    def finish_long_operation(self, name, origin_path, out, err):
+        """Shows the result of a finished long operation, and refreshes the screen if it is still relevant
+
+        Parameters
+        ----------
+        name : str
+            Short description of the operation
+        origin_path : str
+            Directory that was open when the operation was started
+        out : str
+            output of the operation
+        err : int
+            exit code of the operation
+        """
+
+        self.show_status_long_op(out, err, name=name)
+        if os.getcwd() == origin_path:
+            self.refresh_status()
\ No newline at end of file
@@ -2,14 +2,12 @@
 """
 
 import os
-import webbrowser
 import datetime
 import py_cui.widget_set
 import pyautogit
 import pyautogit.screen_manager
+import pyautogit.command_stats as STATS
 import pyautogit.logger as LOGGER
-import urllib.request
-import urllib.error
 
 
 class SettingsScreen(pyautogit.screen_manager.ScreenManager):
@@ -43,7 +41,7 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         """
 
         # Output widget set
-        settings_widget_set = self.manager.root.create_new_widget_set(9, 6)
+        settings_widget_set = self.manager.root.create_new_widget_set(12, 6)
         settings_widget_set.add_key_command(py_cui.keys.KEY_BACKSPACE, self.manager.open_repo_select_window)
 
         # Logo and link labels
@@ -57,7 +55,8 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         debug_log_label.toggle_border()
         self.debug_log_toggle = settings_widget_set.add_button('Toggle Logs', 2, 1, command=self.toggle_logging)
         self.debug_enter_path_button = settings_widget_set.add_button('Set Log File', 2, 2, command=self.ask_log_file_path)
-        self.debug_log_status_label = settings_widget_set.add_label('OFF - {}'.format(LOGGER._LOG_FILE_PATH), 3, 0, column_span=3)
+        self.debug_log_status_label = settings_widget_set.add_label('OFF - {}'.format(LOGGER._LOG_FILE_PATH), 3, 0, column_span=2)
+        self.debug_log_level_button = settings_widget_set.add_button('Log Level', 3, 2, command=self.cycle_log_level)
 
         # Default editor settings
         editor_label = settings_widget_set.add_label('Default Editor', 4, 0)
@@ -81,8 +80,21 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         self.show_tutorial_button = settings_widget_set.add_button('Tutorial', 8, 1, command=self.show_tutorial)
         self.open_web_docs_button = settings_widget_set.add_button('Online Docs', 8, 2, command=self.open_web_docs)
 
+        # Command profiling settings
+        profiling_label = settings_widget_set.add_label('Profiling', 9, 0)
+        profiling_label.toggle_border()
+        self.show_command_stats_button      = settings_widget_set.add_button('Command Stats',   9, 1, command=self.show_command_stats)
+        self.export_command_stats_button    = settings_widget_set.add_button('Export Stats',    9, 2, command=self.ask_command_stats_path)
+
+        # Fast status settings
+        fast_status_label = settings_widget_set.add_label('Fast Status', 10, 0)
+        fast_status_label.toggle_border()
+        self.fast_status_toggle         = settings_widget_set.add_button('Toggle Fast Status',  10, 1, command=self.toggle_fast_status)
+        self.fast_status_untracked      = settings_widget_set.add_button('Toggle Untracked',    10, 2, command=self.toggle_fast_status_untracked)
+        self.fast_status_label          = settings_widget_set.add_label('', 11, 0, column_span=3)
+
         # Info panel
-        self.settings_info_panel = settings_widget_set.add_text_block('Settings Info Log', 2, 3, row_span=7, column_span=3)
+        self.settings_info_panel = settings_widget_set.add_text_block('Settings Info Log', 2, 3, row_span=10, column_span=3)
         self.settings_info_panel.set_selectable(False)
         self.info_panel = self.settings_info_panel
 
@@ -121,6 +133,10 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
             Filename to fetch from github repository
         """
 
+        # urllib is slow to import, and only needed here, so it is not imported at startup
+        import urllib.request
+        import urllib.error
+
         self.info_panel.clear()
         self.info_panel.set_selectable(True)
         self.show_settings_log = False
@@ -149,10 +165,50 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         self.info_panel.set_text(self.current_info_log)
 
 
+    def show_command_stats(self):
+        """Function that displays p50/p99 durations of executed commands in the info panel
+        """
+
+        self.info_panel.clear()
+        self.info_panel.set_selectable(True)
+        self.show_settings_log = False
+        self.info_panel.set_text(STATS.get_command_stats().format_summary())
+
+
+    def ask_command_stats_path(self):
+        """Prompts user to enter a path to export command stats to
+        """
+
+        self.manager.root.show_text_box_popup('Enter JSON export path, or leave blank for .pyautogit/', self.export_command_stats)
+
+
+    def export_command_stats(self, file_path):
+        """Function that exports command statistics as JSON
+
+        Parameters
+        ----------
+        file_path : str
+            Path to the json file. If empty, a dated file in .pyautogit is used
+        """
+
+        if len(file_path.strip()) == 0:
+            settings_dir = os.path.join(self.manager.workspace_path, '.pyautogit')
+            file_path = os.path.join(settings_dir, 'command_stats_{}.json'.format(str(datetime.datetime.today()).split(' ')[0]))
+            if not os.path.exists(settings_dir):
+                os.mkdir(settings_dir)
+        try:
+            STATS.get_command_stats().export_json(file_path)
+            self.add_to_settings_log('Exported command stats to: {}'.format(file_path))
+        except OSError as e:
+            self.manager.root.show_error_popup('Export Failed', 'Unable to write command stats to {}: {}'.format(file_path, str(e)))
+
+
     def open_web_docs(self):
         """Function tasked with open docs in external browser
         """
 
+        import webbrowser
+
         try:
             webbrowser.open('https://jwlodek.github.io/pyautogit-docs')
         except:
@@ -201,6 +257,24 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         self.refresh_status()
 
 
+    def toggle_fast_status(self):
+        """Function that enables/disables fast status mode
+        """
+
+        self.manager.fast_status.enabled = not self.manager.fast_status.enabled
+        self.add_to_settings_log('Toggled fast status')
+        self.refresh_status()
+
+
+    def toggle_fast_status_untracked(self):
+        """Function that toggles whether fast status mode searches for untracked files
+        """
+
+        self.manager.fast_status.include_untracked = not self.manager.fast_status.include_untracked
+        self.add_to_settings_log('Toggled untracked files in fast status')
+        self.refresh_status()
+
+
     def toggle_logging(self):
         """Function that enables/disables logging
         """
@@ -210,6 +284,20 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         self.refresh_status()
 
 
+    def cycle_log_level(self):
+        """Function that switches to the next log level, so less severe messages are skipped
+        """
+
+        levels = [LOGGER.DEBUG, LOGGER.INFO, LOGGER.WARNING, LOGGER.ERROR]
+        if LOGGER._LOG_LEVEL in levels:
+            new_level = levels[(levels.index(LOGGER._LOG_LEVEL) + 1) % len(levels)]
+        else:
+            new_level = LOGGER.DEBUG
+        LOGGER.set_log_level(new_level)
+        self.add_to_settings_log('Set log level to {}'.format(LOGGER.get_level_name(new_level)))
+        self.refresh_status()
+
+
     def ask_default_editor(self):
         """Function that asks user for editor, and then refreshes
         """
@@ -258,6 +346,11 @@ class SettingsScreen(pyautogit.screen_manager.ScreenManager):
         if LOGGER._LOG_ENABLED:
             logging_on_off = 'ON'
         log_file_path = LOGGER._LOG_FILE_PATH
-        self.debug_log_status_label.set_title('{} - {}'.format(logging_on_off, log_file_path))
+        self.debug_log_status_label.set_title('{} - {} - {}'.format(logging_on_off, LOGGER.get_level_name(LOGGER._LOG_LEVEL), log_file_path))
+
+        self.editor_status_label.set_title('{} - {}'.format(self.manager.editor_type, self.manager.default_editor))
 
-        self.editor_status_label.set_title('{} - {}'.format(self.manager.editor_type, self.manager.default_editor))
\ No newline at end of file
+        fast_status = self.manager.fast_status
+        fast_on_off = 'ON' if fast_status.enabled else 'OFF'
+        untracked = 'Untracked files shown' if fast_status.include_untracked else 'Untracked files skipped'
+        self.fast_status_label.set_title('{} - {}'.format(fast_on_off, untracked))
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""Module for computing the status of every repository in a workspace in parallel.
+
+Each repository requires a single `git status -s -b` call, which gives the checked out branch,
+ahead/behind counts relative to its upstream, and the number of changed files. Calls are spread
+over a thread pool, and a callback is fired as each repository finishes so that results can be
+displayed as they arrive.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pyautogit.commands
+import pyautogit.repo_snapshot
+import pyautogit.logger as LOGGER
+
+
+class RepoScanResult:
+    """Class representing the scanned status of a single repository
+
+    Attributes
+    ----------
+    repo : str
+        Name of the repository directory
+    branch : str
+        Checked out branch, None if HEAD is detached
+    ahead : int
+        Number of commits ahead of upstream
+    behind : int
+        Number of commits behind upstream
+    dirty : int
+        Number of changed or untracked files
+    error : str
+        Error message if status could not be read, None otherwise
+    """
+
+    def __init__(self, repo):
+        """Constructor for RepoScanResult
+        """
+
+        self.repo   = repo
+        self.branch = None
+        self.ahead  = 0
+        self.behind = 0
+        self.dirty  = 0
+        self.error  = None
+
+
+    def get_summary(self):
+        """Gets a short one line summary of the repository status
+
+        Returns
+        -------
+        summary : str
+            Summary in the form 'branch +ahead -behind ~dirty'
+        """
+
+        if self.error is not None:
+            return 'error'
+        summary = self.branch if self.branch is not None else 'detached'
+        if self.ahead > 0:
+            summary = '{} +{}'.format(summary, self.ahead)
+        if self.behind > 0:
+            summary = '{} -{}'.format(summary, self.behind)
+        if self.dirty > 0:
+            summary = '{} ~{}'.format(summary, self.dirty)
+        return summary
+
+
+def parse_ahead_behind(header_line):
+    """Gets ahead/behind counts from the `## ...` header printed by `git status -s -b`
+
+    Parameters
+    ----------
+    header_line : str
+        First line of the status output
+
+    Returns
+    -------
+    ahead : int
+        Number of commits ahead of upstream
+    behind : int
+        Number of commits behind upstream
+    """
+
+    ahead = 0
+    behind = 0
+    ahead_match = re.search(r'ahead (\d+)', header_line)
+    if ahead_match is not None:
+        ahead = int(ahead_match.group(1))
+    behind_match = re.search(r'behind (\d+)', header_line)
+    if behind_match is not None:
+        behind = int(behind_match.group(1))
+    return ahead, behind
+
+
+def scan_repo(workspace_path, repo):
+    """Computes the status of a single repository
+
+    Parameters
+    ----------
+    workspace_path : str
+        Path to the workspace containing the repository
+    repo : str
+        Name of the repository directory
+
+    Returns
+    -------
+    result : RepoScanResult
+        Scanned repository status
+    """
+
+    result = RepoScanResult(repo)
+    out, err = pyautogit.commands.git_status_short_branch(os.path.join(workspace_path, repo))
+    if err != 0:
+        result.error = out.strip()
+        return result
+    status_lines = out.splitlines()
+    if len(status_lines) > 0 and status_lines[0].startswith('## '):
+        result.branch = pyautogit.repo_snapshot.parse_status_header(status_lines[0])
+        result.ahead, result.behind = parse_ahead_behind(status_lines[0])
+        status_lines = status_lines[1:]
+    result.dirty = len(status_lines)
+    return result
+
+
+class WorkspaceScanner:
+    """Class that runs parallel status scans over workspace repositories
+
+    Only the most recently started scan reports results, so starting a new scan while one is
+    running silently discards the older scan's remaining results.
+
+    Attributes
+    ----------
+    max_workers : int
+        Maximum number of concurrent git processes
+    results : dict of str -> RepoScanResult
+        Most recent result for each repository
+    scan_id : int
+        Counter identifying the current scan
+    lock : threading.Lock
+        Lock protecting results and scan_id
+    """
+
+    def __init__(self, max_workers=8):
+        """Constructor for WorkspaceScanner
+        """
+
+        self.max_workers = max_workers
+        self.results = {}
+        self.scan_id = 0
+        self.lock = threading.Lock()
+
+
+    def start_scan(self, workspace_path, repos, on_result, on_finished=None):
+        """Starts scanning repositories in a background thread pool
+
+        Parameters
+        ----------
+        workspace_path : str
+            Path to the workspace
+        repos : list of str
+            Names of repositories to scan
+        on_result : function
+            Function called with each RepoScanResult as it finishes
+        on_finished : no-arg function
+            Default None, otherwise function called once every repository has been scanned
+        """
+
+        with self.lock:
+            self.scan_id = self.scan_id + 1
+            scan_id = self.scan_id
+        LOGGER.write('Starting workspace scan of {} repos'.format(len(repos)))
+
+        remaining = [len(repos)]
+
+        def scan_and_report(repo):
+            # Repositories still queued when a newer scan starts are skipped
+            with self.lock:
+                if scan_id != self.scan_id:
+                    return
+            result = scan_repo(workspace_path, repo)
+            with self.lock:
+                if scan_id != self.scan_id:
+                    return
+                self.results[repo] = result
+                remaining[0] = remaining[0] - 1
+                is_last = remaining[0] == 0
+            on_result(result)
+            if is_last and on_finished is not None:
+                on_finished()
+
+        if len(repos) == 0:
+            if on_finished is not None:
+                on_finished()
+            return
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        for repo in repos:
+            pool.submit(scan_and_report, repo)
+        pool.shutdown(wait=False)
+
+
+    def rescan_repo(self, workspace_path, repo, on_result):
+        """Scans a single repository in a background thread, without interrupting a running scan
+
+        Parameters
+        ----------
+        workspace_path : str
+            Path to the workspace
+        repo : str
+            Name of the repository
+        on_result : function
+            Function called with the RepoScanResult once it finishes
+        """
+
+        def scan_and_report():
+            result = scan_repo(workspace_path, repo)
+            with self.lock:
+                self.results[repo] = result
+            on_result(result)
+
+        threading.Thread(target=scan_and_report, daemon=True).start()
+
+
+    def get_result(self, repo):
+        """Gets the last scanned result for a repository
+
+        Parameters
+        ----------
+        repo : str
+            Name of the repository
+
+        Returns
+        -------
+        result : RepoScanResult
+            Last result, or None if the repository was not scanned
+        """
+
+        with self.lock:
+            return self.results.get(repo)
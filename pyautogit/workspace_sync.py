@@ -0,0 +1,242 @@
+"""Module for fetching and fast-forwarding every repository in a workspace in parallel.
+
+Each repository is fetched, and if its checked out branch is strictly behind its upstream, it is
+fast-forwarded. Branches that have diverged, or repositories without an upstream, are fetched but
+left untouched. Repositories are synced over a bounded thread pool, and a callback is fired
+whenever a repository changes state so a summary can be displayed while the sync runs.
+
+This file should remain separate from the CUI interface.
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pyautogit.commands
+import pyautogit.repo_snapshot
+import pyautogit.workspace_scan
+import pyautogit.logger as LOGGER
+
+
+# Sync states that mean a repository is finished
+FINISHED_STATES = ['up to date', 'fast-forwarded', 'fetched', 'diverged', 'failed']
+
+
+class RepoSyncResult:
+    """Class representing the sync state of a single repository
+
+    Attributes
+    ----------
+    repo : str
+        Name of the repository directory
+    state : str
+        One of 'pending', 'fetching', 'merging', or a state in FINISHED_STATES
+    message : str
+        Short description of the result, or the error output if the sync failed
+    duration : float
+        Time taken to sync the repository, in seconds
+    """
+
+    def __init__(self, repo):
+        """Constructor for RepoSyncResult
+        """
+
+        self.repo       = repo
+        self.state      = 'pending'
+        self.message    = ''
+        self.duration   = 0.0
+
+
+    def is_finished(self):
+        """Checks if the repository is done syncing
+
+        Returns
+        -------
+        finished : bool
+            True if the state is final
+        """
+
+        return self.state in FINISHED_STATES
+
+
+def sync_repo(repo_path, credentials, result, on_update):
+    """Fetches a repository, and fast-forwards its checked out branch if it is behind
+
+    Parameters
+    ----------
+    repo_path : str
+        Path to the repository
+    credentials : list of str
+        Username and Password of user for remote
+    result : RepoSyncResult
+        Result object updated as the sync progresses
+    on_update : function
+        Function called with result after every state change
+    """
+
+    start_time = time.perf_counter()
+
+    def set_state(state, message=''):
+        result.state = state
+        result.message = message
+        result.duration = time.perf_counter() - start_time
+        on_update(result)
+
+    set_state('fetching')
+    out, err = pyautogit.commands.git_fetch_all(credentials, repo_path=repo_path)
+    if err != 0:
+        set_state('failed', out.strip())
+        return
+
+    out, err = pyautogit.commands.git_status_short_branch(repo_path)
+    if err != 0:
+        set_state('failed', out.strip())
+        return
+    header = out.splitlines()[0] if len(out) > 0 else ''
+    branch = pyautogit.repo_snapshot.parse_status_header(header) if header.startswith('## ') else None
+    if branch is None or '...' not in header:
+        set_state('fetched', 'no upstream to fast-forward')
+        return
+    ahead, behind = pyautogit.workspace_scan.parse_ahead_behind(header)
+    if behind == 0:
+        set_state('up to date', branch)
+    elif ahead > 0:
+        set_state('diverged', '{} is {} ahead, {} behind'.format(branch, ahead, behind))
+    else:
+        set_state('merging', branch)
+        out, err = pyautogit.commands.git_merge_fast_forward(repo_path)
+        if err != 0:
+            set_state('failed', out.strip())
+        else:
+            set_state('fast-forwarded', '{} by {} commits'.format(branch, behind))
+
+
+class WorkspaceSyncer:
+    """Class that syncs workspace repositories over a bounded thread pool
+
+    Attributes
+    ----------
+    max_workers : int
+        Maximum number of repositories synced at once
+    results : dict of str -> RepoSyncResult
+        Sync state of each repository in the current or last sync
+    running : bool
+        True while a sync is in progress
+    lock : threading.Lock
+        Lock protecting results and running
+    """
+
+    def __init__(self, max_workers=8):
+        """Constructor for WorkspaceSyncer
+        """
+
+        self.max_workers = max_workers
+        self.results = {}
+        self.running = False
+        self.lock = threading.Lock()
+
+
+    def start_sync(self, workspace_path, repos, credentials, on_update, on_finished=None):
+        """Starts syncing repositories in a background thread pool
+
+        Parameters
+        ----------
+        workspace_path : str
+            Path to the workspace
+        repos : list of str
+            Names of repositories to sync
+        credentials : list of str
+            Username and Password of user for remote, shared by all repositories
+        on_update : function
+            Function called with a RepoSyncResult whenever a repository changes state
+        on_finished : no-arg function
+            Default None, otherwise function called once every repository is synced
+
+        Returns
+        -------
+        started : bool
+            False if a sync was already running
+        """
+
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+            self.results = dict([(repo, RepoSyncResult(repo)) for repo in repos])
+        LOGGER.write('Starting workspace sync of {} repos with {} workers'.format(len(repos), self.max_workers))
+
+        remaining = [len(repos)]
+
+        def finish():
+            with self.lock:
+                self.running = False
+            LOGGER.write('Finished workspace sync: {}'.format(self.get_counts()))
+            if on_finished is not None:
+                on_finished()
+
+        def sync_and_report(repo):
+            try:
+                sync_repo(os.path.join(workspace_path, repo), credentials, self.results[repo], on_update)
+            except Exception as e:
+                self.results[repo].state = 'failed'
+                self.results[repo].message = str(e)
+                on_update(self.results[repo])
+            with self.lock:
+                remaining[0] = remaining[0] - 1
+                is_last = remaining[0] == 0
+            if is_last:
+                finish()
+
+        if len(repos) == 0:
+            finish()
+            return True
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        for repo in repos:
+            pool.submit(sync_and_report, repo)
+        pool.shutdown(wait=False)
+        return True
+
+
+    def get_counts(self):
+        """Counts repositories in each sync state
+
+        Returns
+        -------
+        counts : dict of str -> int
+            Number of repositories in each state that has any
+        """
+
+        counts = {}
+        with self.lock:
+            for result in self.results.values():
+                counts[result.state] = counts.get(result.state, 0) + 1
+        return counts
+
+
+    def get_summary_text(self):
+        """Formats the sync state of every repository for display
+
+        Failed and diverged repositories are listed first, since they need attention.
+
+        Returns
+        -------
+        summary : str
+            Per-state counts followed by one line per repository
+        """
+
+        with self.lock:
+            results = list(self.results.values())
+        finished = len([result for result in results if result.is_finished()])
+        counts = self.get_counts()
+        lines = ['Synced {}/{} repositories'.format(finished, len(results))]
+        lines.append(', '.join(['{}: {}'.format(state, counts[state]) for state in sorted(counts.keys())]))
+        lines.append('')
+        order = ['failed', 'diverged', 'fetching', 'merging', 'pending', 'fast-forwarded', 'fetched', 'up to date']
+        results.sort(key=lambda result : (order.index(result.state), result.repo))
+        for result in results:
+            line = '{} - {}'.format(result.repo, result.state)
+            if len(result.message) > 0:
+                line = '{} ({})'.format(line, result.message.splitlines()[-1])
+            lines.append(line)
+        return '\n'.join(lines)
@@ -31,7 +31,7 @@ setup(
     long_description=long_description,
     long_description_content_type='text/markdown',
     cmdclass={'install':InstallLibrary},
-    packages = find_packages(exclude=['tests', 'docs']),
+    packages = find_packages(exclude=['tests', 'docs', 'benchmarks']),
     extras_require={
         'test': ['pytest'],
     },
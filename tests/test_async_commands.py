@@ -0,0 +1,45 @@
+import pytest
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pyautogit.async_commands as ASYNC_COMMANDS
+
+
+def run_coroutine(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_async_git_get_branches():
+    out, err = run_coroutine(ASYNC_COMMANDS.git_get_branches())
+    assert err == 0
+    assert '*' in out
+
+
+def test_async_command_timeout():
+    command = '{} -c "import time; time.sleep(5)"'.format(sys.executable)
+    out, err = run_coroutine(ASYNC_COMMANDS.handle_basic_command(command, 'sleep', timeout=0.2))
+    assert err == -1
+    assert 'timed out' in out
+
+
+def test_runner_submit():
+    future = ASYNC_COMMANDS.get_runner().submit(ASYNC_COMMANDS.git_get_remotes())
+    _, err = future.result(timeout=10)
+    assert err == 0
+
+
+def test_runner_cancel_kills_process(monkeypatch):
+    monkeypatch.setattr(ASYNC_COMMANDS, '_THREAD_POOL', ThreadPoolExecutor(max_workers=1))
+    command = '{} -c "import time; time.sleep(5)"'.format(sys.executable)
+    start_time = time.time()
+    future = ASYNC_COMMANDS.get_runner().submit(ASYNC_COMMANDS.handle_basic_command(command, 'sleep'))
+    time.sleep(0.5)
+    future.cancel()
+    _, err = ASYNC_COMMANDS.get_runner().submit(ASYNC_COMMANDS.git_status_short_branch()).result(timeout=10)
+    assert err == 0
+    assert time.time() - start_time < 4
@@ -0,0 +1,54 @@
+import os
+import stat
+import pytest
+import pyautogit.atomic_save as SAVE
+
+
+def test_save_and_skip(tmpdir):
+    path = os.path.join(str(tmpdir), 'test.txt')
+    bytes_written, text_hash = SAVE.save_file_atomic(path, 'hello\n')
+    assert bytes_written == 6
+    assert text_hash == SAVE.hash_text('hello\n')
+    assert SAVE.save_file_atomic(path, 'hello\n', last_hash=text_hash) == (0, text_hash)
+    os.chmod(path, 0o640)
+    bytes_written, _ = SAVE.save_file_atomic(path, 'hello world\n', last_hash=text_hash)
+    assert bytes_written == 12
+    with open(path, 'r') as fp:
+        assert fp.read() == 'hello world\n'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    assert os.listdir(str(tmpdir)) == ['test.txt']
+
+
+def test_failed_save_keeps_file(tmpdir):
+    path = os.path.join(str(tmpdir), 'test.txt')
+    SAVE.save_file_atomic(path, 'original\n')
+    with pytest.raises(UnicodeEncodeError):
+        SAVE.save_file_atomic(path, 'bad \udcff\n')
+    with open(path, 'r') as fp:
+        assert fp.read() == 'original\n'
+    assert os.listdir(str(tmpdir)) == ['test.txt']
+
+
+def test_save_keeps_links(tmpdir):
+    path = os.path.join(str(tmpdir), 'test.txt')
+    SAVE.save_file_atomic(path, 'original\n')
+    link_path = os.path.join(str(tmpdir), 'link.txt')
+    hard_link_path = os.path.join(str(tmpdir), 'hard.txt')
+    os.symlink(path, link_path)
+    os.link(path, hard_link_path)
+    SAVE.save_file_atomic(link_path, 'through link\n')
+    assert os.path.islink(link_path)
+    for saved_path in [path, link_path, hard_link_path]:
+        with open(saved_path, 'r') as fp:
+            assert fp.read() == 'through link\n'
+    assert sorted(os.listdir(str(tmpdir))) == ['hard.txt', 'link.txt', 'test.txt']
+
+
+def test_new_file_mode_follows_umask(tmpdir):
+    path = os.path.join(str(tmpdir), 'test.txt')
+    umask = os.umask(0o027)
+    try:
+        SAVE.save_file_atomic(path, 'hello\n')
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
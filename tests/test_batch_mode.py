@@ -0,0 +1,63 @@
+import os
+from subprocess import check_output
+import pyautogit.batch_mode as BATCH
+
+
+def git(repo, *args):
+    return check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test'] + list(args), cwd=repo).decode()
+
+
+def make_workspace(path):
+    workspace = str(path)
+    for repo in ['repo_a', 'repo_b']:
+        os.mkdir(os.path.join(workspace, repo))
+        git(os.path.join(workspace, repo), 'init', '-q', '-b', 'master')
+        git(os.path.join(workspace, repo), 'commit', '-q', '--allow-empty', '-m', 'init')
+    repo_a = os.path.join(workspace, 'repo_a')
+    git(repo_a, 'branch', 'merged')
+    git(repo_a, 'branch', 'release-1')
+    git(repo_a, 'checkout', '-q', '-b', 'unmerged')
+    git(repo_a, 'commit', '-q', '--allow-empty', '-m', 'work')
+    git(repo_a, 'checkout', '-q', 'master')
+    with open(os.path.join(repo_a, 'untracked'), 'w') as fp:
+        fp.write('x')
+    return workspace
+
+
+def test_status_report(tmpdir):
+    workspace = make_workspace(tmpdir)
+    report = BATCH.run_batch_command('status', workspace, {'jobs': 2}, [])
+    assert report['ok'] and report['workspace'] == workspace
+    assert [(result['repo'], result['branch'], result['dirty']) for result in report['repos']] == [('repo_a', 'master', 1), ('repo_b', 'master', 0)]
+
+    report = BATCH.run_batch_command('status', os.path.join(workspace, 'repo_b'), {'jobs': 2}, [])
+    assert [result['repo'] for result in report['repos']] == ['repo_b']
+
+
+def test_prune_merged_branches(tmpdir):
+    workspace = make_workspace(tmpdir)
+    repo_a = os.path.join(workspace, 'repo_a')
+    options = {'jobs': 2, 'into': None, 'keep': 'master,release-*', 'dry_run': True}
+    report = BATCH.run_batch_command('prune', repo_a, options, [])
+    assert report['repos'][0]['deleted'] == ['merged']
+    assert report['repos'][0]['kept'] == ['master', 'release-1']
+    assert 'merged' in git(repo_a, 'branch')
+
+    options['dry_run'] = False
+    report = BATCH.run_batch_command('prune', repo_a, options, [])
+    assert report['ok'] and report['repos'][0]['deleted'] == ['merged']
+    assert git(repo_a, 'branch', '--format=%(refname:short)').split() == ['master', 'release-1', 'unmerged']
+
+
+def test_batch_mode_in_path_with_space(tmpdir):
+    workspace_path = os.path.join(str(tmpdir), 'work space')
+    os.mkdir(workspace_path)
+    workspace = make_workspace(workspace_path)
+    report = BATCH.run_batch_command('status', workspace, {'jobs': 2}, [])
+    assert [(result['repo'], result['branch']) for result in report['repos']] == [('repo_a', 'master'), ('repo_b', 'master')]
+
+    repo_a = os.path.join(workspace, 'repo_a')
+    options = {'jobs': 2, 'into': None, 'keep': 'master,release-*', 'dry_run': False}
+    report = BATCH.run_batch_command('prune', repo_a, options, [])
+    assert report['ok'] and report['repos'][0]['deleted'] == ['merged']
+    assert git(repo_a, 'branch', '--format=%(refname:short)').split() == ['master', 'release-1', 'unmerged']
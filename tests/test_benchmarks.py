@@ -0,0 +1,28 @@
+import os
+import pytest
+import benchmarks.synthetic_repos as SYNTHETIC
+import benchmarks.run_benchmarks as BENCHMARKS
+
+
+def test_create_synthetic_repo(tmpdir):
+    repo_path = str(tmpdir.join('repo'))
+    SYNTHETIC.create_synthetic_repo(repo_path, 30, 3, 2, 10, 4)
+    assert SYNTHETIC.run_git(['rev-list', '--count', 'HEAD'], repo_path).strip() == '30'
+    assert len(SYNTHETIC.run_git(['branch'], repo_path).splitlines()) == 4
+    assert len(SYNTHETIC.run_git(['tag'], repo_path).splitlines()) == 2
+    assert len(SYNTHETIC.run_git(['status', '-s'], repo_path).splitlines()) == 4
+
+
+def test_compare_results():
+    baseline = {'refresh' : {'median_ms' : 10.0}, 'scan' : {'median_ms' : 10.0}}
+    current = {'refresh' : {'median_ms' : 13.0}, 'scan' : {'median_ms' : 11.0}, 'new' : {'median_ms' : 1.0}}
+    comparison = BENCHMARKS.compare_results(baseline, current, 0.2)
+    assert [entry[0] for entry in comparison] == ['refresh', 'scan']
+    assert comparison[0][4]
+    assert not comparison[1][4]
+
+    # Benchmarks skipped in either run, ex. import time before python 3.7, are not compared
+    baseline['import'] = None
+    current['import'] = {'median_ms' : 1.0}
+    current['scan'] = None
+    assert [entry[0] for entry in BENCHMARKS.compare_results(baseline, current, 0.2)] == ['refresh']
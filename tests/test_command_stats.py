@@ -0,0 +1,36 @@
+import json
+import pytest
+import pyautogit.commands
+import pyautogit.command_stats as STATS
+
+
+def test_get_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert STATS.get_percentile(values, 50) == 50.0
+    assert STATS.get_percentile(values, 99) == 99.0
+    assert STATS.get_percentile([], 50) == 0.0
+
+
+def test_command_stats_summary(tmpdir):
+    stats = STATS.CommandStats()
+    stats.record('git_status', 0.010, 0, 100)
+    stats.record('git_status', 0.030, 128, 20)
+    stats.record('git_log', 0.001, 0, 5)
+    summary = stats.get_summary()
+    assert summary[0]['name'] == 'git_status'
+    assert summary[0]['count'] == 2
+    assert summary[0]['failures'] == 1
+    assert summary[0]['total_bytes'] == 120
+    export_path = str(tmpdir.join('stats.json'))
+    stats.export_json(export_path)
+    with open(export_path, 'r') as fp:
+        assert len(json.load(fp)['commands']) == 2
+
+
+def test_handle_basic_command_records_stats():
+    stats = STATS.get_command_stats()
+    stats.clear()
+    out, err = pyautogit.commands.handle_basic_command('git status', 'git_status_stats_test')
+    summary = stats.get_summary()
+    assert summary[0]['name'] == 'git_status_stats_test'
+    assert summary[0]['total_bytes'] == len(out.encode())
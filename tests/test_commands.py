@@ -19,4 +19,65 @@ def test_git_commit():
 def test_git_commit_rem_quotes():
     target = ['git', 'commit', '-m', 'Hello World']
     actual = COMMANDS.parse_string_into_executable_command('git commit -m "Hello World"', True)
-    assert HELPER.compare_lists(target, actual)
\ No newline at end of file
+    assert HELPER.compare_lists(target, actual)
+
+def test_git_get_object():
+    out, err = COMMANDS.git_get_object('HEAD')
+    assert err == 0
+    assert out.startswith('tree ')
+
+
+def test_git_get_object_missing():
+    _, err = COMMANDS.git_get_object('not-a-real-object')
+    assert err != 0
+
+
+def test_parse_progress_line():
+    assert COMMANDS.parse_progress_line('remote: Counting objects:  45% (9/20)') == ('Counting objects', 45)
+    assert COMMANDS.parse_progress_line('Receiving objects: 100% (20/20), done.') == ('Receiving objects', 100)
+    assert COMMANDS.parse_progress_line("Cloning into 'pyautogit'...") == (None, None)
+
+
+def test_handle_streaming_command():
+    lines = []
+    out, err = COMMANDS.handle_streaming_command('git branch', 'git_get_branches', lines.append)
+    assert err == 0
+    assert HELPER.compare_lists(out.splitlines(), lines)
+
+
+def test_git_add_reset_files(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    COMMANDS.handle_basic_command('git init -q', 'git_init')
+    COMMANDS.handle_basic_command('git -c user.name=test -c user.email=test commit -q --allow-empty -m init', 'git_commit')
+    names = ['a.txt', 'with space.txt', 'b.txt']
+    for name in names:
+        with open(name, 'w') as fp:
+            fp.write('test\n')
+    out, err = COMMANDS.git_add_files(names[:2])
+    assert err == 0
+    out, _ = COMMANDS.handle_basic_command('git diff --cached --name-only', 'git_diff_cached')
+    assert HELPER.compare_lists(names[:2], out.splitlines())
+    out, err = COMMANDS.git_reset_files(['with space.txt'])
+    assert err == 0
+    out, _ = COMMANDS.handle_basic_command('git diff --cached --name-only', 'git_diff_cached')
+    assert out.splitlines() == ['a.txt']
+
+
+@pytest.mark.parametrize('git_version', [(2, 39, 0), (2, 24, 0)])
+def test_git_add_reset_files_are_literal(tmpdir, monkeypatch, git_version):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(COMMANDS, '_GIT_VERSION', git_version)
+    COMMANDS.handle_basic_command('git init -q', 'git_init')
+    COMMANDS.handle_basic_command('git -c user.name=test -c user.email=test commit -q --allow-empty -m init', 'git_commit')
+    for name in ['a[1].txt', 'a1.txt', '*.md', 'b.md']:
+        with open(name, 'w') as fp:
+            fp.write('test\n')
+    out, err = COMMANDS.git_add_files(['a[1].txt', '*.md'])
+    assert err == 0
+    out, _ = COMMANDS.handle_basic_command('git diff --cached --name-only', 'git_diff_cached')
+    assert HELPER.compare_lists(['*.md', 'a[1].txt'], out.splitlines())
+    COMMANDS.git_add_files(['a1.txt', 'b.md'])
+    out, err = COMMANDS.git_reset_files(['a[1].txt', '*.md'])
+    assert err == 0
+    out, _ = COMMANDS.handle_basic_command('git diff --cached --name-only', 'git_diff_cached')
+    assert HELPER.compare_lists(['a1.txt', 'b.md'], out.splitlines())
@@ -0,0 +1,110 @@
+import os
+import pytest
+from subprocess import check_output
+import pyautogit.commit_graph as GRAPH
+
+
+def git(repo, *args, date=None):
+    env = dict(os.environ)
+    if date is not None:
+        env['GIT_AUTHOR_DATE'] = env['GIT_COMMITTER_DATE'] = '{} +0000'.format(date)
+    return check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test'] + list(args), cwd=repo, env=env).decode()
+
+
+def make_repo(path):
+    repo = str(path)
+    git(repo, 'init', '-q', '-b', 'master')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'base', date=1500000000)
+    git(repo, 'checkout', '-q', '-b', 'feature')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'feature work', date=1500001000)
+    git(repo, 'checkout', '-q', 'master')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'master work', date=1500002000)
+    git(repo, 'merge', '-q', '--no-ff', 'feature', '-m', 'merge feature', date=1500003000)
+    git(repo, 'tag', '-a', 'v1', '-m', 'release')
+    return repo
+
+
+def get_expected_commits(repo):
+    commits = {}
+    for line in git(repo, 'rev-list', '--all', '--parents', '--timestamp').splitlines():
+        fields = line.split()
+        commits[fields[1]] = (fields[2:], int(fields[0]))
+    return commits
+
+
+def test_commit_graph_matches_objects(tmpdir):
+    repo = make_repo(tmpdir)
+    assert GRAPH.CommitSource(repo).commit_graph is None
+    git(repo, 'commit-graph', 'write', '--reachable')
+    source = GRAPH.CommitSource(repo)
+    assert source.commit_graph is not None
+    for object_id, commit in get_expected_commits(repo).items():
+        assert source.get_parents(object_id) == commit
+    assert source.num_object_reads == 0
+    source.close()
+
+
+def test_graph_layout(tmpdir):
+    repo = make_repo(tmpdir)
+    view, out = GRAPH.open_commit_graph(repo, window_size=2)
+    assert out is None
+    lines = view.render_window().splitlines()
+    assert lines[0].startswith('*')
+    assert '(HEAD -> master, tag: v1) merge feature' in lines[0]
+    assert lines[1] == '|\\'
+    assert 'master work' in lines[2]
+    assert view.get_window_description() == 'commits 1-2, more - PgDn'
+
+    assert view.scroll_window(1)
+    assert view.get_window_description() == 'commits 3-4 of 4'
+    text = view.render_window()
+    assert '(feature) feature work' in text and text.splitlines()[-1].endswith('base')
+    assert not view.scroll_window(1)
+    assert [row.object_id for row in view.walker.rows] == git(repo, 'rev-list', '--all', '--date-order').split()
+
+
+def make_skewed_repo(path, skewed_dates):
+    # A <- B <- skewed commits dated before B <- D, with a side branch forked from B merged into D
+    repo = str(path)
+    git(repo, 'init', '-q', '-b', 'master')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'A', date=1500001000)
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'B', date=1500002000)
+    git(repo, 'branch', 'side')
+    for i, date in enumerate(skewed_dates):
+        git(repo, 'commit', '-q', '--allow-empty', '-m', 'skewed {}'.format(i), date=date)
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'D', date=1500003000)
+    git(repo, 'checkout', '-q', 'side')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'S', date=1500002500)
+    git(repo, 'checkout', '-q', 'master')
+    git(repo, 'merge', '-q', '--no-ff', 'side', '-m', 'merge side', date=1500004000)
+    return repo
+
+
+def assert_topo_order(repo, walker):
+    walker.load_rows(100)
+    assert walker.is_complete()
+    assert walker.lanes == []
+    order = [row.object_id for row in walker.rows]
+    commits = get_expected_commits(repo)
+    assert sorted(order) == sorted(commits.keys())
+    for object_id, (parents, _) in commits.items():
+        for parent in parents:
+            assert order.index(parent) > order.index(object_id)
+
+
+def test_child_dated_before_parent(tmpdir):
+    repo = make_skewed_repo(tmpdir, [1500000500])
+    tips, _, _ = GRAPH.get_ref_tips(repo)
+    assert_topo_order(repo, GRAPH.CommitGraphWalker(GRAPH.CommitSource(repo), tips))
+
+
+@pytest.mark.parametrize('generation_version', ['1', '2'])
+def test_generation_numbers_order_skewed_history(tmpdir, generation_version):
+    repo = make_skewed_repo(tmpdir, [1500000500, 1500000600])
+    git(repo, '-c', 'commitGraph.generationVersion={}'.format(generation_version), 'commit-graph', 'write', '--reachable')
+    source = GRAPH.CommitSource(repo)
+    assert source.commit_graph.use_corrected_dates == (generation_version == '2')
+    tips, _, _ = GRAPH.get_ref_tips(repo)
+    assert_topo_order(repo, GRAPH.CommitGraphWalker(source, tips))
+    assert source.num_object_reads == 0
+    source.close()
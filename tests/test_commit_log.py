@@ -0,0 +1,70 @@
+import os
+from subprocess import check_output
+import pytest
+import pyautogit.commit_log as COMMIT_LOG
+import tests.helper_test_funcs as HELPER
+
+
+def test_get_commit_hash():
+    assert COMMIT_LOG.get_commit_hash('c2b0e03 Initial commit') == 'c2b0e03'
+
+
+def make_commit(repo, message, date, *args):
+    env = dict(os.environ, GIT_AUTHOR_DATE='{} +0000'.format(date), GIT_COMMITTER_DATE='{} +0000'.format(date))
+    check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test', 'commit', '-q', '--allow-empty', '-m', message] + list(args), cwd=repo, env=env)
+
+
+def git_log(repo, count):
+    return check_output(['git', 'log', '--oneline', '-n', str(count)], cwd=repo).decode().splitlines()
+
+
+def test_update_head_prepends_new_commits(tmpdir, monkeypatch):
+    repo = str(tmpdir)
+    check_output(['git', 'init', '-q', '-b', 'master'], cwd=repo)
+    monkeypatch.chdir(repo)
+    for i in range(3):
+        make_commit(repo, 'commit {}'.format(i), 1500000000 + i)
+    pager = COMMIT_LOG.CommitLogPager(page_size=3)
+    first_page = git_log(repo, 3)
+    pager.update_head('master', first_page)
+    make_commit(repo, 'commit 3', 1500000003)
+    commits = pager.update_head('master', git_log(repo, 3))
+    assert HELPER.compare_lists(git_log(repo, 3)[:1] + first_page, commits)
+    assert not pager.is_complete('master')
+
+
+def test_update_head_reloads_after_merging_older_commits(tmpdir, monkeypatch):
+    repo = str(tmpdir)
+    check_output(['git', 'init', '-q', '-b', 'master'], cwd=repo)
+    monkeypatch.chdir(repo)
+    make_commit(repo, 'base', 1500000000)
+    check_output(['git', 'checkout', '-q', '-b', 'side'], cwd=repo)
+    make_commit(repo, 'side 1', 1500000001)
+    make_commit(repo, 'side 2', 1500000002)
+    check_output(['git', 'checkout', '-q', 'master'], cwd=repo)
+    for i in range(3):
+        make_commit(repo, 'master {}'.format(i), 1500000010 + i)
+    pager = COMMIT_LOG.CommitLogPager(page_size=10)
+    pager.update_head('master', git_log(repo, 10))
+    check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test', 'merge', '-q', '--no-ff', '-m', 'merge side', 'side'], cwd=repo)
+    commits = pager.update_head('master', git_log(repo, 10))
+    assert HELPER.compare_lists(git_log(repo, 10), commits)
+    assert len(commits) == 7
+
+
+def test_update_head_resets_rewritten_history():
+    pager = COMMIT_LOG.CommitLogPager(page_size=3)
+    pager.update_head('master', ['ccc Third', 'bbb Second', 'aaa First'])
+    commits = pager.update_head('master', ['eee Amended', 'aaa First'])
+    assert HELPER.compare_lists(['eee Amended', 'aaa First'], commits)
+    assert pager.is_complete('master')
+
+
+def test_load_pages():
+    pager = COMMIT_LOG.CommitLogPager(page_size=1)
+    commits, out, err = pager.load_first_page('HEAD')
+    assert err == 0
+    assert len(commits) == 1
+    older = pager.load_next_page('HEAD')
+    assert len(older) == 1
+    assert older[0] != commits[0]
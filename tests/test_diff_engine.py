@@ -0,0 +1,114 @@
+import os
+from subprocess import check_call
+import pyautogit.commands
+import pyautogit.diff_engine as DIFF
+
+
+def get_sample_diff(big_hunk_lines):
+    lines = ['diff --git a/small.txt b/small.txt',
+             'index 1234567..89abcde 100644',
+             '--- a/small.txt',
+             '+++ b/small.txt',
+             '@@ -1,2 +1,2 @@',
+             ' same',
+             '-old',
+             '+new',
+             'diff --git a/big.txt b/big.txt',
+             'index 1234567..89abcde 100644',
+             '--- a/big.txt',
+             '+++ b/big.txt',
+             '@@ -0,0 +1,{} @@'.format(big_hunk_lines)]
+    lines.extend(['+line {}'.format(i) for i in range(big_hunk_lines)])
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def index_in_chunks(data, chunk_size):
+    index = DIFF.DiffIndex()
+    for i in range(0, len(data), chunk_size):
+        index.feed(data[i:i + chunk_size])
+    index.finish()
+    return index
+
+
+def test_index_files_and_hunks():
+    data = get_sample_diff(1000)
+    index = index_in_chunks(data, 7)
+    assert [diff_file.header for diff_file in index.files] == ['diff --git a/small.txt b/small.txt', 'diff --git a/big.txt b/big.txt']
+    small, big = index.files
+    assert small.num_header_lines == 3
+    assert small.hunks[0].num_lines == 4
+    assert (small.get_additions(), small.get_deletions()) == (1, 1)
+    assert big.hunks[0].num_lines == 1001
+    assert big.get_additions() == 1000
+    assert len(big.hunks[0].checkpoints) == 4
+    assert index.get_num_lines() == len(data.splitlines())
+    assert index.read_hunk_lines(big.hunks[0], 600, 2) == ['+line 599', '+line 600']
+    index.close()
+
+
+def test_view_collapses_large_hunks():
+    index = index_in_chunks(get_sample_diff(1000), 4096)
+    view = DIFF.DiffView(index, window_size=50)
+    text = view.render_window()
+    assert text.splitlines()[-1] == '@@ -0,0 +1,1000 @@  [1000 lines, +1000 -0 collapsed]'
+    assert view.get_window_description() == ''
+
+    assert view.toggle_row(len(text.splitlines()) - 1)
+    assert view.get_window_description() == 'rows 13-62 of 1013'
+    rows = view.render_window().splitlines()
+    assert len(rows) == 50
+    assert rows[:2] == ['@@ -0,0 +1,1000 @@', '+line 0']
+    assert view.scroll_window(100)
+    assert view.render_window().splitlines()[-1] == '+line 999'
+    assert not view.scroll_window(1)
+
+    view.window_start = 0
+    view.render_window()
+    assert view.toggle_row(0)
+    assert view.render_window().splitlines()[0].endswith('[1 hunks, +1 -1 collapsed]')
+    index.close()
+
+
+def test_stream_repo_diff(tmpdir):
+    repo = str(tmpdir)
+    check_call(['git', 'init', '-q'], cwd=repo)
+    with open(os.path.join(repo, 'test.txt'), 'w') as fp:
+        fp.write('first\n')
+    check_call(['git', 'add', 'test.txt'], cwd=repo)
+    check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', 'commit', '-q', '-m', 'first'], cwd=repo)
+    with open(os.path.join(repo, 'test.txt'), 'w') as fp:
+        fp.write('second\n')
+    index = DIFF.DiffIndex()
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        out, err = pyautogit.commands.git_diff_stream(index.feed)
+    finally:
+        os.chdir(cwd)
+    index.finish()
+    assert err == 0
+    assert index.files[0].header == 'diff --git a/test.txt b/test.txt'
+    assert DIFF.DiffView(index).render_window().splitlines()[-2:] == ['-first', '+second']
+    index.close()
+
+
+def test_view_while_streaming():
+    data = get_sample_diff(2000)
+    index = DIFF.DiffIndex()
+    index.feed(data[:len(data) // 2])
+    view = DIFF.DiffView(index, window_size=5)
+    assert view.render_window().splitlines()[0] == 'diff --git a/small.txt b/small.txt'
+    assert view.get_window_description().endswith('+, loading')
+    index.feed(data[len(data) // 2:])
+    index.finish()
+    assert index.get_num_lines() == 2013
+    assert view.get_window_description() == 'rows 1-5 of 13'
+
+    small = DIFF.DiffIndex()
+    small.feed(get_sample_diff(10))
+    small_view = DIFF.DiffView(small)
+    assert small_view.get_window_description() == 'loading'
+    small.finish()
+    assert small_view.get_window_description() == ''
+    index.close()
+    small.close()
@@ -0,0 +1,39 @@
+import os
+import pyautogit.dir_listing as LISTING
+
+
+def make_dir(tmpdir):
+    path = str(tmpdir)
+    os.mkdir(os.path.join(path, 'src'))
+    for name in ['README.md', 'setup.py', 'test_a.py']:
+        with open(os.path.join(path, name), 'w') as fp:
+            fp.write('test\n')
+    return path
+
+
+def test_scan_and_filter(tmpdir):
+    listing = LISTING.DirListing(make_dir(tmpdir))
+    listing.scan()
+    assert sorted(listing.get_page(0)) == ['<DIR> src', 'README.md', 'setup.py', 'test_a.py']
+    listing.apply_filter('READ')
+    assert listing.get_page(0) == ['README.md']
+    listing.apply_filter('*.py')
+    assert sorted(listing.get_page(0)) == ['setup.py', 'test_a.py']
+    assert len(listing.get_page(1, count=5)) == 1
+    listing.apply_filter('')
+    assert len(listing.filtered) == 4
+
+
+def test_update_entry(tmpdir):
+    path = make_dir(tmpdir)
+    listing = LISTING.DirListing(path)
+    listing.scan()
+    listing.apply_filter('.py')
+    with open(os.path.join(path, 'new.py'), 'w') as fp:
+        fp.write('test\n')
+    listing.update_entry('new.py')
+    assert listing.get_page(0)[-1] == 'new.py'
+    os.remove(os.path.join(path, 'setup.py'))
+    listing.update_entry('setup.py')
+    assert sorted(listing.get_page(0)) == ['new.py', 'test_a.py']
+    assert len(listing.entries) == 4
@@ -0,0 +1,52 @@
+import os
+from subprocess import check_call
+import pyautogit.commands
+import pyautogit.fast_status as FAST
+import pyautogit.git_status as STATUS
+
+
+def make_repo(path):
+    # The space checks that repository paths are not split into separate arguments
+    repo = os.path.join(str(path), 'work space')
+    os.mkdir(repo)
+    check_call(['git', 'init', '-q'], cwd=repo)
+    with open(os.path.join(repo, 'untracked.txt'), 'w') as fp:
+        fp.write('test\n')
+    return repo
+
+
+def test_config_options():
+    assert FAST.FastStatusSupport(None, None, False).get_config_options() == '-c core.untrackedCache=true'
+    assert FAST.FastStatusSupport('keep', None, True).get_config_options() == '-c core.untrackedCache=true -c core.fsmonitor=true'
+    support = FAST.FastStatusSupport('false', 'false', True)
+    assert support.get_config_options() is None
+    assert not support.uses_untracked_cache()
+    assert not support.uses_fsmonitor()
+
+
+def test_detect_configured_repo(tmpdir):
+    repo = make_repo(tmpdir)
+    check_call(['git', 'config', 'core.untrackedCache', 'false'], cwd=repo)
+    support = FAST.detect_fast_status_support(repo)
+    assert support.untracked_cache_config == 'false'
+    assert support.fsmonitor_config is None
+
+
+def test_fast_status_mode(tmpdir):
+    repo = make_repo(tmpdir)
+    mode = FAST.FastStatusMode()
+    assert mode.get_status_arguments(repo) == (None, True)
+    assert mode.get_description(repo) == ''
+
+    mode.enabled = True
+    mode.include_untracked = False
+    config_options, include_untracked = mode.get_status_arguments(repo)
+    assert '-c core.untrackedCache=true' in config_options
+    assert mode.get_description(repo).startswith('fast: untracked cache')
+    assert mode.get_description(repo).endswith('no untracked')
+
+    out, err = pyautogit.commands.git_status_porcelain(repo, config_options=config_options, include_untracked=include_untracked)
+    assert err == 0
+    assert STATUS.parse_porcelain_v2(out)[1] == []
+    out, err = pyautogit.commands.git_status_porcelain(repo, config_options=config_options)
+    assert [str(entry) for entry in STATUS.parse_porcelain_v2(out)[1]] == ['?? untracked.txt']
@@ -0,0 +1,40 @@
+import os
+import pyautogit.file_pager as PAGER
+
+
+def write_file(tmpdir, name, data):
+    path = os.path.join(str(tmpdir), name)
+    with open(path, 'wb') as fp:
+        fp.write(data)
+    return path
+
+
+def test_small_files(tmpdir):
+    pager = PAGER.FilePager(write_file(tmpdir, 'empty.txt', b''))
+    assert pager.num_lines == 0
+    assert pager.get_lines(0, 10) == []
+    pager.close()
+
+    pager = PAGER.FilePager(write_file(tmpdir, 'a.txt', b'one\r\ntwo\nthree'))
+    assert pager.num_lines == 3
+    assert pager.get_lines(0, 10) == ['one', 'two', 'three']
+    assert pager.get_lines(2, 10) == ['three']
+    pager.close()
+
+    pager = PAGER.FilePager(write_file(tmpdir, 'b.txt', b'one\n\ntwo\n'))
+    assert pager.num_lines == 3
+    assert pager.get_lines(1, 2) == ['', 'two']
+    assert pager.get_lines(3, 1) == []
+    pager.close()
+
+
+def test_multi_block_file(tmpdir):
+    lines = ['line {}'.format(i) * (i % 7 + 1) for i in range(30000)]
+    path = write_file(tmpdir, 'large.txt', '\n'.join(lines).encode() + b'\n')
+    pager = PAGER.FilePager(path)
+    assert os.path.getsize(path) > 4 * PAGER.INDEX_BLOCK_SIZE
+    assert len(pager.index_offsets) > 4
+    assert pager.num_lines == len(lines)
+    for start in [0, 1, 9999, 12345, 29990]:
+        assert pager.get_lines(start, 20) == lines[start:start + 20]
+    pager.close()
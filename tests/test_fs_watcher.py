@@ -0,0 +1,81 @@
+import os
+import time
+import threading
+from subprocess import check_output
+import pytest
+import pyautogit.fs_watcher as WATCHER
+
+
+def test_get_affected_panels():
+    assert WATCHER.get_affected_panels(None) == set(['files'])
+    assert WATCHER.get_affected_panels('index') == set(['files'])
+    assert WATCHER.get_affected_panels('index.lock') == set()
+    assert WATCHER.get_affected_panels('refs/heads/master') == set(['branches', 'commits'])
+    assert WATCHER.get_affected_panels('config') == set(['remotes'])
+    assert WATCHER.get_affected_panels('objects/ab') == set()
+
+
+def test_get_git_relative_path():
+    assert WATCHER.get_git_relative_path('/repo/.git/refs/heads/dev', '/repo/.git') == os.path.join('refs', 'heads', 'dev')
+    assert WATCHER.get_git_relative_path('/repo/README.md', '/repo/.git') is None
+
+
+def make_repo(path):
+    os.makedirs(os.path.join(str(path), '.git', 'refs', 'heads'))
+    with open(os.path.join(str(path), '.git', 'HEAD'), 'w') as fp:
+        fp.write('ref: refs/heads/master\n')
+
+
+def test_polling_backend(tmpdir):
+    make_repo(tmpdir)
+    backend = WATCHER.PollingBackend(str(tmpdir), os.path.join(str(tmpdir), '.git'), interval=0.01)
+    backend.open()
+    with open(os.path.join(str(tmpdir), '.git', 'refs', 'heads', 'master'), 'w') as fp:
+        fp.write('0' * 40)
+    changes = backend.read_changes(0, threading.Event())
+    assert changes == [os.path.join('refs', 'heads', 'master')]
+
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_repo_watcher(tmpdir, use_inotify):
+    make_repo(tmpdir)
+    reported = []
+    watcher = WATCHER.RepoWatcher(str(tmpdir), reported.append, debounce=0.05, poll_interval=0.05, use_inotify=use_inotify)
+    watcher.start()
+    assert watcher.ready.wait(5)
+    with open(os.path.join(str(tmpdir), 'new_file.txt'), 'w') as fp:
+        fp.write('change')
+    for _ in range(100):
+        if len(reported) > 0:
+            break
+        time.sleep(0.05)
+    watcher.stop()
+    assert set(['files']) in reported
+
+
+def test_inotify_skips_ignored_directories(tmpdir):
+    libc = WATCHER.load_inotify()
+    if libc is None:
+        pytest.skip('inotify is not available')
+    repo = str(tmpdir)
+    check_output(['git', 'init', '-q'], cwd=repo)
+    os.makedirs(os.path.join(repo, 'src', 'pkg'))
+    os.makedirs(os.path.join(repo, 'build', 'out'))
+    for name in ['.gitignore', os.path.join('src', 'pkg', 'module.py')]:
+        with open(os.path.join(repo, name), 'w') as fp:
+            fp.write('build/\nnode_modules/\n')
+    check_output(['git', 'add', '.gitignore', 'src'], cwd=repo)
+    backend = WATCHER.InotifyBackend(repo, os.path.join(repo, '.git'), libc)
+    assert backend.open()
+    watched = set(backend.watches.values())
+    assert set([repo, os.path.join(repo, 'src'), os.path.join(repo, 'src', 'pkg')]).issubset(watched)
+    assert os.path.join(repo, 'build') not in watched
+
+    os.makedirs(os.path.join(repo, 'node_modules', 'dep'))
+    os.makedirs(os.path.join(repo, 'docs', 'api'))
+    changes = backend.read_changes(1, threading.Event())
+    backend_watched = set(backend.watches.values())
+    backend.close()
+    assert None in changes
+    assert os.path.join(repo, 'node_modules') not in backend_watched
+    assert set([os.path.join(repo, 'docs'), os.path.join(repo, 'docs', 'api')]).issubset(backend_watched)
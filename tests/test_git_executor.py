@@ -0,0 +1,15 @@
+import time
+import pyautogit.git_executor as EXECUTOR
+
+
+def test_request_times_bounded():
+    executor = EXECUTOR.GitExecutor(max_samples=3)
+    for _ in range(5):
+        executor.record_request('cat-file', time.perf_counter())
+    timings = executor.request_times['cat-file']
+    assert len(timings.durations) == 3
+    assert timings.count == 5
+    executor.spawn_baseline = 1.0
+    report = executor.get_latency_report()
+    assert report['cat-file']['requests'] == 5
+    assert report['cat-file']['saved_seconds'] > 0
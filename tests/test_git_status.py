@@ -0,0 +1,64 @@
+import os
+from subprocess import check_call
+import pyautogit.commands
+import pyautogit.git_status as STATUS
+import tests.helper_test_funcs as HELPER
+
+
+SAMPLE_STATUS = '\0'.join(['# branch.oid 1234567890abcdef',
+                           '# branch.head master',
+                           '# branch.upstream origin/master',
+                           '# branch.ab +2 -3',
+                           '1 .M N... 100644 100644 100644 1234567 1234567 file with spaces.txt',
+                           '1 A. N... 000000 100644 100644 0000000 1234567 new.txt',
+                           '2 R. N... 100644 100644 100644 1234567 1234567 R100 renamed.txt',
+                           'original.txt',
+                           'u UU N... 100644 100644 100644 100644 1234567 1234567 1234567 conflict.txt',
+                           '? "quoted".txt',
+                           '']) + '\0'
+
+
+def test_parse_porcelain_v2():
+    branch, entries = STATUS.parse_porcelain_v2(SAMPLE_STATUS)
+    assert branch.head == 'master'
+    assert branch.upstream == 'origin/master'
+    assert (branch.ahead, branch.behind) == (2, 3)
+    assert HELPER.compare_lists([' M file with spaces.txt', 'A  new.txt', 'R  original.txt -> renamed.txt', 'UU conflict.txt', '?? "quoted".txt'],
+                                [str(entry) for entry in entries])
+    assert [entry.kind for entry in entries] == ['changed', 'changed', 'renamed', 'unmerged', 'untracked']
+    assert [entry.has_staged_changes() for entry in entries] == [False, True, True, True, False]
+    assert entries[2].path == 'renamed.txt'
+    assert entries[2].orig_path == 'original.txt'
+
+
+def test_parse_detached_initial():
+    branch, entries = STATUS.parse_porcelain_v2('# branch.oid (initial)\0# branch.head (detached)\0')
+    assert branch.head is None
+    assert branch.oid is None
+    assert entries == []
+
+
+def test_update_entry_list():
+    _, old_entries = STATUS.parse_porcelain_v2(SAMPLE_STATUS)
+    items = list(old_entries)
+    _, new_entries = STATUS.parse_porcelain_v2(SAMPLE_STATUS)
+    assert STATUS.update_entry_list(items, new_entries) == 0
+    assert all([item is old for item, old in zip(items, old_entries)])
+
+    new_entries[0] = STATUS.StatusEntry('changed', 'M', ' ', 'file with spaces.txt')
+    del new_entries[3]
+    new_entries.append(STATUS.StatusEntry('untracked', '?', '?', 'z.txt'))
+    assert STATUS.update_entry_list(items, new_entries) == 3
+    assert HELPER.compare_lists([str(entry) for entry in new_entries], [str(item) for item in items])
+    assert items[1] is old_entries[1]
+
+
+def test_git_status_porcelain(tmpdir):
+    repo = str(tmpdir)
+    check_call(['git', 'init', '-q'], cwd=repo)
+    with open(os.path.join(repo, 'a b.txt'), 'w') as fp:
+        fp.write('test\n')
+    out, err = pyautogit.commands.git_status_porcelain(repo)
+    assert err == 0
+    _, entries = STATUS.parse_porcelain_v2(out)
+    assert [str(entry) for entry in entries] == ['?? a b.txt']
@@ -0,0 +1,103 @@
+import sys
+import time
+import threading
+import pyautogit.commands
+import pyautogit.job_scheduler as JOBS
+
+
+def test_jobs_run_by_priority():
+    order = []
+    gate = threading.Event()
+    finished = threading.Event()
+    scheduler = JOBS.JobScheduler(max_workers=1)
+    scheduler.submit('blocker', lambda : (gate.wait(10), 0))
+    scheduler.submit('low', lambda : (order.append('low'), 0), priority=JOBS.PRIORITY_LOW)
+    scheduler.submit('high', lambda : (order.append('high'), 0), priority=JOBS.PRIORITY_HIGH)
+    scheduler.submit('normal', lambda : ('normal done', 0), on_finished=lambda out, err : (order.append(out), finished.set()))
+    gate.set()
+    assert finished.wait(10)
+    time.sleep(0.1)
+    assert order == ['high', 'normal done', 'low']
+    scheduler.shutdown()
+
+
+def test_cancel_queued_job():
+    gate = threading.Event()
+    ran = []
+    scheduler = JOBS.JobScheduler(max_workers=1)
+    scheduler.submit('blocker', lambda : (gate.wait(10), 0))
+    queued = scheduler.submit('queued', lambda : (ran.append(True), 0))
+    assert scheduler.cancel(queued.job_id)
+    assert not scheduler.cancel(queued.job_id)
+    gate.set()
+    time.sleep(0.2)
+    assert ran == []
+    assert queued.state == 'cancelled'
+    assert scheduler.get_active_count() == 0
+    scheduler.shutdown()
+
+
+def test_cancel_running_job_kills_process():
+    results = []
+    scheduler = JOBS.JobScheduler()
+    command = '{} -c "import time; time.sleep(30)"'.format(sys.executable) if ' ' not in sys.executable else 'sleep 30'
+    job = scheduler.submit('sleep', lambda : pyautogit.commands.handle_basic_command(command, 'sleep'), on_finished=lambda out, err : results.append(err))
+    for _ in range(100):
+        if len(job.processes) > 0:
+            break
+        time.sleep(0.05)
+    start_time = time.time()
+    assert scheduler.cancel(job.job_id)
+    while job.end_time is None and time.time() - start_time < 10:
+        time.sleep(0.05)
+    assert time.time() - start_time < 10
+    assert job.state == 'cancelled'
+    assert results == []
+    scheduler.shutdown()
+
+
+def test_failed_job_reports_error():
+    finished = threading.Event()
+    results = []
+
+    def fail():
+        raise RuntimeError('boom')
+
+    scheduler = JOBS.JobScheduler()
+    job = scheduler.submit('fail', fail, on_finished=lambda out, err : (results.append((out, err)), finished.set()))
+    assert finished.wait(10)
+    assert job.state == 'failed'
+    assert results[0][1] != 0
+    assert 'boom' in results[0][0]
+    assert job.get_description().startswith('#{} [failed] fail'.format(job.job_id))
+    scheduler.shutdown()
+
+
+def test_jobs_in_same_repo_run_one_at_a_time():
+    gate = threading.Event()
+    other_done = threading.Event()
+    order = []
+
+    def pull():
+        gate.wait(10)
+        order.append('pull')
+        return '', 0
+
+    scheduler = JOBS.JobScheduler(max_workers=4)
+    pull_job = scheduler.submit('pull', pull, repo_path='/repos/a')
+    for _ in range(100):
+        if pull_job.state == 'running':
+            break
+        time.sleep(0.05)
+    scheduler.submit('stash', lambda : (order.append('stash'), 0), priority=JOBS.PRIORITY_HIGH, repo_path='/repos/a')
+    scheduler.submit('fetch', lambda : (order.append('fetch'), 0), repo_path='/repos/b', on_finished=lambda out, err : other_done.set())
+    assert other_done.wait(10)
+    time.sleep(0.1)
+    assert order == ['fetch']
+    gate.set()
+    for _ in range(100):
+        if scheduler.get_active_count() == 0:
+            break
+        time.sleep(0.05)
+    assert order == ['fetch', 'pull', 'stash']
+    scheduler.shutdown()
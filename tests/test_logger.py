@@ -0,0 +1,53 @@
+import os
+import pyautogit.logger as LOGGER
+
+
+def enable_logging(log_file_path, max_bytes=1024 * 1024, backup_count=2, level=LOGGER.DEBUG):
+    LOGGER.set_log_file_path(log_file_path)
+    LOGGER.set_log_rotation(max_bytes, backup_count)
+    LOGGER.set_log_level(level)
+    LOGGER.toggle_logging()
+    assert LOGGER._LOG_ENABLED
+
+
+def disable_logging():
+    LOGGER.toggle_logging()
+    assert not LOGGER._LOG_ENABLED
+    LOGGER.set_log_level(LOGGER.DEBUG)
+    LOGGER.set_log_rotation(5 * 1024 * 1024, 3)
+
+
+def read_lines(path):
+    with open(path, 'r') as fp:
+        return fp.read().splitlines()
+
+
+def test_levels_and_append(tmpdir):
+    log_file = os.path.join(str(tmpdir), 'test.log')
+    enable_logging(log_file, level=LOGGER.INFO)
+    LOGGER.write('skipped')
+    LOGGER.write('written', level=LOGGER.WARNING)
+    LOGGER.write('raw', no_timestamp=True, level=LOGGER.ERROR)
+    disable_logging()
+    lines = read_lines(log_file)
+    assert len(lines) == 2
+    assert lines[0].endswith(' - WARNING - written')
+    assert lines[1] == 'raw'
+
+    # Logging again appends rather than truncating
+    enable_logging(log_file)
+    LOGGER.write('second session')
+    disable_logging()
+    assert len(read_lines(log_file)) == 3
+
+
+def test_rotation(tmpdir):
+    log_file = os.path.join(str(tmpdir), 'test.log')
+    enable_logging(log_file, max_bytes=100, backup_count=2)
+    for i in range(50):
+        LOGGER.write('message {}'.format(i) * 10)
+    disable_logging()
+    assert os.path.exists(log_file)
+    assert os.path.exists(log_file + '.1')
+    assert not os.path.exists(log_file + '.3')
+    assert read_lines(log_file)[-1].endswith('message 49' * 10)
@@ -0,0 +1,47 @@
+import os
+from subprocess import check_output
+import pyautogit.commands
+import pyautogit.object_cache as CACHE
+
+
+COMMIT_ID = 'a' * 40
+
+
+def test_lru_eviction():
+    cache = CACHE.ObjectCache(max_entries=2, max_size=10)
+    cache.put('commit_info', '1' * 40, 'one')
+    cache.put('commit_info', '2' * 40, 'two')
+    assert cache.get('commit_info', '1' * 40) == 'one'
+    cache.put('commit_info', '3' * 40, 'three')
+    assert cache.get('commit_info', '2' * 40) is None
+    assert cache.get('commit_info', '1' * 40) == 'one'
+    cache.put('commit_info', '4' * 40, 'four')
+    cache.put('commit_info', '5' * 40, 'over the limit')
+    assert list(cache.entries.keys()) == ['commit_info:' + '1' * 40, 'commit_info:' + '4' * 40]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_persists_between_sessions(tmpdir):
+    cache_file = os.path.join(str(tmpdir), '.pyautogit', 'object_cache.json')
+    cache = CACHE.ObjectCache(cache_file=cache_file)
+    cache.put('commit_info', COMMIT_ID, 'commit info')
+    cache.save()
+    assert CACHE.ObjectCache(cache_file=cache_file).get('commit_info', COMMIT_ID) == 'commit info'
+    assert CACHE.ObjectCache(cache_file=cache_file).get('object', COMMIT_ID) is None
+
+
+def test_commit_info_cached_by_full_id(tmpdir, monkeypatch):
+    repo = str(tmpdir)
+    check_output(['git', 'init', '-q'], cwd=repo)
+    check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test', 'commit', '-q', '--allow-empty', '-m', 'cached'], cwd=repo)
+    commit_id = check_output(['git', 'rev-parse', 'HEAD'], cwd=repo).decode().strip()
+    monkeypatch.chdir(repo)
+    monkeypatch.setattr(CACHE, '_OBJECT_CACHE', CACHE.ObjectCache())
+
+    out, err = pyautogit.commands.git_get_commit_info(commit_id[:7])
+    assert err == 0 and 'cached' in out
+    assert CACHE.get_object_cache().get('commit_info', commit_id) == out
+    CACHE.get_object_cache().put('commit_info', commit_id, 'from cache')
+    assert pyautogit.commands.git_get_commit_info(commit_id[:7]) == ('from cache', 0)
+    _, err = pyautogit.commands.git_get_commit_info('not-a-commit')
+    assert err != 0
@@ -0,0 +1,58 @@
+import os
+import pytest
+from subprocess import check_call, check_output
+import pyautogit.commands
+import pyautogit.ref_reader as REFS
+from pyautogit.errors import UnsupportedRepositoryError
+
+
+def git(repo, *args):
+    return check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test'] + list(args), cwd=repo).decode()
+
+
+def make_repo(path):
+    repo = str(path)
+    git(repo, 'init', '-q')
+    git(repo, 'commit', '-q', '--allow-empty', '-m', 'init')
+    for branch in ['feature/a', 'Zed', 'dev']:
+        git(repo, 'branch', branch)
+    git(repo, 'tag', 'v1')
+    git(repo, 'pack-refs', '--all')
+    git(repo, 'tag', 'v2')
+    git(repo, 'branch', 'loose')
+    git(repo, 'remote', 'add', 'upstream', 'https://example.com/a.git')
+    git(repo, 'remote', 'add', 'origin', 'https://example.com/b.git')
+    return repo
+
+
+def test_parse_config():
+    entries = REFS.parse_config('[core]\n\tbare = false ; comment\n[remote "my \\"remote\\""]\n\turl = "a b" # c\n[Branch.dev]\nflag\n')
+    assert entries == [('core', None, 'bare', 'false'), ('remote', 'my "remote"', 'url', 'a b'), ('branch', 'dev', 'flag', None)]
+    with pytest.raises(UnsupportedRepositoryError):
+        REFS.parse_config('[core]\n\tpager = less \\\n -R\n')
+
+
+def test_matches_git(tmpdir):
+    repo = make_repo(tmpdir)
+    reader = REFS.RefReader(repo)
+    assert reader.get_branches() == git(repo, 'branch').splitlines()
+    assert reader.get_tags() == git(repo, 'tag').splitlines()
+    assert reader.get_remotes() == git(repo, 'remote').splitlines()
+    assert reader.get_ref_lines() == git(repo, 'for-each-ref', '--format=%(HEAD)%(refname)', 'refs/heads', 'refs/tags').splitlines()
+
+
+def test_unsupported_falls_back(tmpdir, monkeypatch):
+    repo = make_repo(tmpdir)
+    git(repo, 'checkout', '-q', '--detach')
+    with pytest.raises(UnsupportedRepositoryError):
+        REFS.RefReader(repo).get_branches()
+    monkeypatch.chdir(repo)
+    out, err = pyautogit.commands.git_get_branches()
+    assert err == 0
+    assert out.splitlines()[0].startswith('* (HEAD detached at ')
+
+    git(repo, 'config', 'tag.sort', '-refname')
+    with pytest.raises(UnsupportedRepositoryError):
+        REFS.RefReader(repo).get_tags()
+    out, err = pyautogit.commands.git_get_tags()
+    assert out.splitlines() == ['v2', 'v1']
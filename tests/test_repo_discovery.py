@@ -0,0 +1,36 @@
+import os
+import pytest
+import pyautogit.repo_discovery as DISCOVERY
+
+
+def make_workspace(path):
+    for repo in ['repo_a', os.path.join('group', 'repo_b'), os.path.join('node_modules', 'repo_c')]:
+        os.makedirs(os.path.join(str(path), repo, '.git'))
+    os.makedirs(os.path.join(str(path), 'not_a_repo', 'src'))
+
+
+def test_is_ignored():
+    assert DISCOVERY.is_ignored('node_modules', DISCOVERY.DEFAULT_IGNORE_PATTERNS)
+    assert DISCOVERY.is_ignored('build-x86', ['build*'])
+    assert not DISCOVERY.is_ignored('pyautogit', DISCOVERY.DEFAULT_IGNORE_PATTERNS)
+
+
+def test_find_repos_depth(tmpdir):
+    make_workspace(tmpdir)
+    assert DISCOVERY.RepoDiscovery(str(tmpdir)).find_repos() == ['repo_a']
+    assert DISCOVERY.RepoDiscovery(str(tmpdir), max_depth=2).find_repos() == [os.path.join('group', 'repo_b'), 'repo_a']
+
+
+def test_find_repos_cache(tmpdir):
+    make_workspace(tmpdir)
+    cache_file = os.path.join(str(tmpdir), '.pyautogit', 'repo_discovery_cache.json')
+    assert DISCOVERY.RepoDiscovery(str(tmpdir), max_depth=2, cache_file=cache_file).find_repos() == [os.path.join('group', 'repo_b'), 'repo_a']
+    assert os.path.exists(cache_file)
+
+    discovery = DISCOVERY.RepoDiscovery(str(tmpdir), max_depth=2, cache_file=cache_file)
+    discovery.load_cache()
+    discovery.cache['repo_a']['repo'] = False
+    # Unchanged directories are read from the cache rather than listed again
+    assert discovery.find_repos() == [os.path.join('group', 'repo_b')]
+    os.makedirs(os.path.join(str(tmpdir), 'group', 'repo_d', '.git'))
+    assert os.path.join('group', 'repo_d') in discovery.find_repos()
@@ -0,0 +1,58 @@
+import os
+from subprocess import check_output
+import pytest
+import pyautogit.repo_snapshot as SNAPSHOT
+import tests.helper_test_funcs as HELPER
+
+
+def test_parse_ref_lines():
+    ref_output = '*refs/heads/master\n refs/heads/dev\n refs/tags/v0.1\n refs/tags/v0.2\n'
+    branches, tags = SNAPSHOT.parse_ref_lines(ref_output)
+    assert HELPER.compare_lists(['* master', '  dev'], branches)
+    assert HELPER.compare_lists(['v0.1', 'v0.2'], tags)
+
+
+def test_parse_status_header_tracking():
+    assert SNAPSHOT.parse_status_header('## master...origin/master [ahead 1]') == 'master'
+
+
+def test_parse_status_header_detached():
+    assert SNAPSHOT.parse_status_header('## HEAD (no branch)') is None
+
+
+def test_parse_status_header_no_commits():
+    assert SNAPSHOT.parse_status_header('## No commits yet on main') == 'main'
+
+
+def test_take_repo_snapshot():
+    snapshot = SNAPSHOT.take_repo_snapshot('.')
+    assert len(snapshot.errors) == 0
+    assert len(snapshot.recent_commits) > 0
+
+
+def test_take_repo_snapshot_under_path_with_space(tmpdir):
+    repo = os.path.join(str(tmpdir), 'work space')
+    os.mkdir(repo)
+    check_output(['git', 'init', '-q', '-b', 'master'], cwd=repo)
+    check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test', 'commit', '-q', '--allow-empty', '-m', 'init'], cwd=repo)
+    with open(os.path.join(repo, 'untracked.txt'), 'w') as fp:
+        fp.write('test\n')
+    snapshot = SNAPSHOT.take_repo_snapshot(repo)
+    assert len(snapshot.errors) == 0
+    assert snapshot.current_branch == 'master'
+    assert len(snapshot.recent_commits) == 1
+    assert len(snapshot.status) == 1
+
+
+def test_take_repo_snapshot_tags_outside_cwd(tmpdir):
+    repo = os.path.join(str(tmpdir), 'tagged repo')
+    os.mkdir(repo)
+    check_output(['git', 'init', '-q', '-b', 'master'], cwd=repo)
+    for message in ['first', 'second']:
+        check_output(['git', '-c', 'user.name=test', '-c', 'user.email=test', 'commit', '-q', '--allow-empty', '-m', message], cwd=repo)
+    check_output(['git', 'tag', 'v0.1', 'HEAD~1'], cwd=repo)
+    snapshot = SNAPSHOT.take_repo_snapshot(repo, show_tags=True)
+    assert len(snapshot.errors) == 0
+    assert snapshot.log_target == 'v0.1'
+    assert len(snapshot.recent_commits) == 1
+    assert snapshot.recent_commits[0].endswith('first')
@@ -0,0 +1,53 @@
+import os
+import threading
+from subprocess import check_output
+import pytest
+import pyautogit.workspace_scan as SCAN
+
+
+def test_parse_ahead_behind():
+    assert SCAN.parse_ahead_behind('## master...origin/master [ahead 2, behind 13]') == (2, 13)
+    assert SCAN.parse_ahead_behind('## master...origin/master [behind 1]') == (0, 1)
+    assert SCAN.parse_ahead_behind('## master') == (0, 0)
+
+
+def test_scan_result_summary():
+    result = SCAN.RepoScanResult('pyautogit')
+    result.branch = 'master'
+    assert result.get_summary() == 'master'
+    result.ahead = 1
+    result.dirty = 4
+    assert result.get_summary() == 'master +1 ~4'
+
+
+def test_scan_repo_under_path_with_space(tmpdir):
+    workspace = os.path.join(str(tmpdir), 'work space')
+    os.makedirs(os.path.join(workspace, 'repo'))
+    check_output(['git', 'init', '-q', '-b', 'master'], cwd=os.path.join(workspace, 'repo'))
+    with open(os.path.join(workspace, 'repo', 'untracked'), 'w') as fp:
+        fp.write('x')
+    result = SCAN.scan_repo(workspace, 'repo')
+    assert result.error is None
+    assert (result.branch, result.dirty) == ('master', 1)
+
+
+def test_rescan_single_repo(tmpdir):
+    workspace = str(tmpdir)
+    for repo in ['repo_a', 'repo_b']:
+        os.mkdir(os.path.join(workspace, repo))
+        check_output(['git', 'init', '-q', '-b', 'master'], cwd=os.path.join(workspace, repo))
+    scanner = SCAN.WorkspaceScanner()
+    finished = threading.Event()
+    scanner.start_scan(workspace, ['repo_a', 'repo_b'], lambda result : None, on_finished=finished.set)
+    assert finished.wait(10)
+    assert scanner.get_result('repo_a').dirty == 0
+
+    with open(os.path.join(workspace, 'repo_a', 'untracked'), 'w') as fp:
+        fp.write('x')
+    results = []
+    rescanned = threading.Event()
+    scanner.rescan_repo(workspace, 'repo_a', lambda result : (results.append(result.repo), rescanned.set()))
+    assert rescanned.wait(10)
+    assert results == ['repo_a']
+    assert scanner.get_result('repo_a').dirty == 1
+    assert scanner.get_result('repo_b').dirty == 0
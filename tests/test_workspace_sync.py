@@ -0,0 +1,34 @@
+import os
+import threading
+from subprocess import check_call
+import pytest
+import pyautogit.workspace_sync as SYNC
+
+
+def run_git(args, cwd):
+    check_call(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + args, cwd=cwd)
+
+
+def test_sync_workspace(tmpdir):
+    workspace = os.path.join(str(tmpdir), 'work space')
+    os.mkdir(workspace)
+    run_git(['init', '-q', '--bare', 'remote.git'], workspace)
+    run_git(['clone', '-q', 'remote.git', 'upstream'], workspace)
+    run_git(['commit', '-q', '--allow-empty', '-m', 'first'], os.path.join(workspace, 'upstream'))
+    run_git(['push', '-q', 'origin', 'HEAD'], os.path.join(workspace, 'upstream'))
+    run_git(['clone', '-q', 'remote.git', 'behind'], workspace)
+    run_git(['clone', '-q', 'remote.git', 'current'], workspace)
+    run_git(['commit', '-q', '--allow-empty', '-m', 'second'], os.path.join(workspace, 'upstream'))
+    run_git(['push', '-q', 'origin', 'HEAD'], os.path.join(workspace, 'upstream'))
+    run_git(['fetch', '-q'], os.path.join(workspace, 'current'))
+    run_git(['merge', '-q', '--ff-only', '@{u}'], os.path.join(workspace, 'current'))
+
+    finished = threading.Event()
+    syncer = SYNC.WorkspaceSyncer(max_workers=2)
+    assert syncer.start_sync(workspace, ['behind', 'current', 'missing'], ['user', 'pass'], lambda result : None, on_finished=finished.set)
+    assert finished.wait(30)
+    assert syncer.results['behind'].state == 'fast-forwarded'
+    assert syncer.results['current'].state == 'up to date'
+    assert syncer.results['missing'].state == 'failed'
+    assert syncer.get_summary_text().startswith('Synced 3/3 repositories')
+    assert not syncer.running